@@ -0,0 +1,108 @@
+# baskets.py
+"""
+Market-basket statistics over (receipt, item) incidence, in NumPy.
+
+get_affinity_pairs used to self-join the window's receipt lines on RCPT_ID
+in SQL. That grows with the square of basket size and made it the slowest
+Intelligence widget. Now the window's distinct (receipt, item) pairs are
+read once and every statistic comes from them. X is the receipts x items
+0/1 incidence matrix:
+
+  - count(a)   receipts containing a (column sums of X)
+  - co_count   receipts containing both a and b (upper triangle of X'X)
+  - coverage   co_count / receipts, the pair's support
+  - lift       co_count * receipts / (count(a) * count(b))
+
+X'X is computed without building X. Receipts are grouped by basket size k.
+Each group becomes an (n, k) array of item indexes, and its k(k-1)/2 column
+pairs are counted by one np.unique over pair keys. For a 0/1 matrix that is
+the sparse product, without adding SciPy as a dependency.
+
+A PairTable holds every pair of one window. top() ranks pairs and applies a
+min-support threshold, so one table serves any top-N and threshold.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+
+
+@dataclass
+class PairTable:
+    """Co-occurrence of every item pair seen together in one window's receipts."""
+
+    labels: np.ndarray      # str, sorted; items are indexes into it
+    item_count: np.ndarray  # int64 per label: receipts containing it
+    a: np.ndarray           # int64 label index, a < b
+    b: np.ndarray           # int64 label index
+    co_count: np.ndarray    # int64 receipts containing both
+    receipts: int           # receipts with at least one line
+
+    @classmethod
+    def empty(cls) -> "PairTable":
+        none = np.empty(0, np.int64)
+        return cls(np.empty(0, "U1"), none, none, none, none, 0)
+
+    def __len__(self) -> int:
+        return len(self.co_count)
+
+    def top(self, n: int, min_support: int = 2) -> List[Dict]:
+        """
+        The <n> pairs seen together most often, in at least <min_support>
+        receipts. Ties are ordered by label a, then label b.
+        Rows: {a, b, co_count, coverage_pct, lift}.
+        """
+        idx = np.flatnonzero(self.co_count >= max(1, int(min_support)))
+        idx = idx[np.lexsort((self.b[idx], self.a[idx], -self.co_count[idx]))][:max(0, int(n))]
+        out = []
+        for i in idx:
+            a, b, co = int(self.a[i]), int(self.b[i]), int(self.co_count[i])
+            out.append({
+                "a": str(self.labels[a]),
+                "b": str(self.labels[b]),
+                "co_count": co,
+                "coverage_pct": co / self.receipts,
+                "lift": co * self.receipts / float(self.item_count[a] * self.item_count[b]),
+            })
+        return out
+
+
+def build(
+    rcpt_ids: Sequence[int], item_codes: Sequence[str], label: Callable[[str], str] = str
+) -> PairTable:
+    """
+    PairTable of parallel (RCPT_ID, item code) sequences, with items named
+    by <label>(code) (called once per distinct code). Repeated lines and
+    codes sharing a label count once per receipt.
+    """
+    if len(rcpt_ids) == 0:
+        return PairTable.empty()
+    codes, code_idx = np.unique(np.asarray(item_codes, dtype=str), return_inverse=True)
+    names, label_idx = np.unique(np.asarray([label(c) for c in codes], dtype=str), return_inverse=True)
+    item = label_idx.reshape(-1)[code_idx.reshape(-1)]
+    n_items = len(names)
+
+    # one entry per (receipt, item), sorted by receipt then item
+    _, rcpt = np.unique(np.asarray(rcpt_ids, dtype=np.int64), return_inverse=True)
+    keys = np.unique(rcpt.reshape(-1).astype(np.int64) * n_items + item)
+    rcpt, item = np.divmod(keys, n_items)
+
+    item_count = np.bincount(item, minlength=n_items).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, rcpt[1:] != rcpt[:-1]])
+    sizes = np.diff(np.r_[starts, len(rcpt)])
+
+    pair_keys = []
+    for k in np.unique(sizes[sizes >= 2]):
+        rows = starts[sizes == k]
+        basket = item[rows[:, None] + np.arange(k)]  # (receipts, k), ascending per row
+        i, j = np.triu_indices(k, 1)
+        pair_keys.append((basket[:, i] * n_items + basket[:, j]).reshape(-1))
+    if not pair_keys:
+        none = np.empty(0, np.int64)
+        return PairTable(names, item_count, none, none, none, len(starts))
+
+    pairs, co_count = np.unique(np.concatenate(pair_keys), return_counts=True)
+    a, b = np.divmod(pairs, n_items)
+    return PairTable(names, item_count, a, b, co_count.astype(np.int64), len(starts))
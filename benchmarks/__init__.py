@@ -0,0 +1,17 @@
+# benchmarks/__init__.py
+"""
+Offline performance suite for the analytics helpers and JSON routes.
+
+Every public helper (helpers_intelligence, helpers_sales, helpers_realtime,
+helpers_items) and every JSON route runs against a seeded pos_synth.py
+stand-in at one or more sizes. The suite reports p50 / p95 latency, SQLite VM
+steps (a rows-scanned proxy), rows returned and peak Python memory. It saves
+baselines to benchmarks/baselines/<size>.json and exits non-zero when a case
+regresses past the threshold:
+
+    python -m benchmarks.run --size 100k --save      # record a baseline
+    python -m benchmarks.run --size 100k             # compare against it
+    python -m benchmarks.run --size 1m --only sales  # subset, bigger data
+
+Datasets are generated once into benchmarks/.data and reused.
+"""
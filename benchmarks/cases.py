@@ -0,0 +1,221 @@
+# benchmarks/cases.py
+"""
+What the benchmark suite runs: every public helper and JSON route, with
+arguments picked from the dataset (BenchContext) so each one has data.
+"""
+from __future__ import annotations
+
+import sqlite3
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, List
+
+_OPEN_HOUR = 8  # pos_synth: business days run 08:00 -> 02:00
+
+
+@dataclass(frozen=True)
+class BenchContext:
+    """Arguments shared by the cases, derived from one stand-in database."""
+
+    live_day: date      # open business day (RECEIPT tables)
+    last_day: date      # latest closed business day
+    item_code: str      # best-selling item
+    subgroup: str       # its subgroup name
+    rcpt_id: int        # a historic receipt
+    live_rcpt_id: int   # an open-day receipt
+
+    @classmethod
+    def from_db(cls, path: str, now: datetime | None = None) -> "BenchContext":
+        now = now or datetime.now()
+        cn = sqlite3.connect(path)
+        try:
+            item_code, subgroup = cn.execute("""
+                SELECT c.ITM_CODE, COALESCE(s.SubGrp_Name, i.ITM_SUBGROUP)
+                FROM HISTORIC_RECEIPT_CONTENTS c
+                JOIN ITEMS i ON i.ITM_CODE = c.ITM_CODE
+                LEFT JOIN SUBGROUPS s ON CAST(s.SubGrp_ID AS TEXT) = i.ITM_SUBGROUP
+                                      OR s.SubGrp_Name = i.ITM_SUBGROUP
+                WHERE c.RCPT_ID >= (SELECT MAX(RCPT_ID) - 5000 FROM HISTORIC_RECEIPT)
+                GROUP BY c.ITM_CODE
+                ORDER BY SUM(c.ITM_QUANTITY) DESC
+                LIMIT 1
+            """).fetchone()
+            rcpt_id = cn.execute("SELECT MAX(RCPT_ID) FROM HISTORIC_RECEIPT").fetchone()[0]
+            live_rcpt_id = cn.execute("SELECT MAX(RCPT_ID) FROM RECEIPT").fetchone()[0] or 0
+        finally:
+            cn.close()
+        live_day = (now - timedelta(hours=_OPEN_HOUR)).date()
+        return cls(live_day, live_day - timedelta(days=1), str(item_code), str(subgroup),
+                   int(rcpt_id), int(live_rcpt_id))
+
+
+@dataclass(frozen=True)
+class Case:
+    name: str                         # "<module>.<function>" or "GET <path>"
+    call: Callable[[Any], Any]        # helpers: (BenchContext) -> result; routes: (test client) -> JSON
+
+
+def _d(day: date) -> str:
+    return day.isoformat()
+
+
+def helper_cases() -> List[Case]:
+    import helpers_intelligence as hi
+    import helpers_items as hit
+    import helpers_realtime as hr
+    import helpers_sales as hs
+
+    def case(module, fn, args: Callable[[BenchContext], tuple] = lambda c: ()) -> Case:
+        name = f"{module.__name__}.{fn}"
+        target = getattr(module, fn)
+        return Case(name, lambda c: target(*args(c)))
+
+    return [
+        case(hi, "get_kpis"),
+        case(hi, "get_receipts_by_day"),
+        case(hi, "get_hourly_last_business_day"),
+        case(hi, "get_top_items"),
+        case(hi, "get_subgroup_contribution"),
+        case(hi, "get_top_items_in_subgroup", lambda c: (c.subgroup,)),
+        case(hi, "get_items_per_receipt_histogram"),
+        case(hi, "get_receipt_amount_histogram"),
+        case(hi, "get_subgroup_velocity"),
+        case(hi, "get_affinity_pairs"),
+        case(hi, "get_hourly_profile"),
+        case(hi, "get_dow_profile"),
+        case(hi, "get_top_windows"),
+        case(hi, "get_intelligence_bundle"),
+        case(hi, "get_subgroups_list"),
+        case(hi, "get_item_trends", lambda c: (c.last_day - timedelta(days=90), c.last_day, "weekly", 10)),
+        case(hi, "search_items_explorer"),
+        case(hi, "get_item_daily_series", lambda c: (c.item_code,)),
+        case(hi, "get_item_last_invoices", lambda c: (c.item_code,)),
+        case(hi, "get_item_momentum_kpis", lambda c: (c.item_code,)),
+        case(hi, "search_invoices", lambda c: (c.last_day - timedelta(days=30), c.last_day)),
+        case(hi, "get_invoices_list", lambda c: (_d(c.last_day - timedelta(days=30)), _d(c.last_day))),
+        case(hi, "get_invoice_details", lambda c: (str(c.rcpt_id),)),
+        case(hi, "get_daily_items_summary"),
+        case(hi, "get_daily_items_for_date", lambda c: (_d(c.last_day),)),
+        case(hi, "get_daily_items_summary_legacy", lambda c: (c.last_day - timedelta(days=30), c.last_day)),
+        case(hi, "get_daily_items_detail", lambda c: (c.last_day,)),
+        case(hi, "get_dead_items"),
+        case(hi, "get_dead_items_page"),
+        case(hi, "get_reorder_radar_items"),
+        case(hi, "get_pos_sales_total_by_range", lambda c: (_d(c.last_day - timedelta(days=30)), _d(c.last_day))),
+        case(hi, "get_pos_sales_daily_by_range", lambda c: (_d(c.last_day - timedelta(days=30)), _d(c.last_day))),
+        case(hs, "get_sales_summary_range", lambda c: (_d(c.last_day - timedelta(days=365)), _d(c.last_day), "monthly")),
+        case(hs, "get_sales_summary", lambda c: (_d(c.last_day),)),
+        case(hs, "get_sales_by_hour", lambda c: (_d(c.last_day),)),
+        case(hs, "get_sales_by_hour_last4weeks", lambda c: (_d(c.last_day),)),
+        case(hs, "get_sales_cumulative_by_hour", lambda c: (_d(c.last_day),)),
+        case(hs, "get_sales_by_category", lambda c: (_d(c.last_day),)),
+        case(hs, "get_top_products", lambda c: (_d(c.last_day),)),
+        case(hs, "get_slow_products"),
+        case(hs, "get_receipts", lambda c: (_d(c.last_day),)),
+        case(hs, "get_sales_last14days"),
+        case(hs, "get_items_sold", lambda c: (_d(c.last_day),)),
+        case(hr, "rt_get_kpis", lambda c: (_d(c.live_day),)),
+        case(hr, "rt_get_hourly", lambda c: (_d(c.live_day),)),
+        case(hr, "rt_get_hourly_cumulative", lambda c: (_d(c.live_day),)),
+        case(hr, "rt_get_category", lambda c: (_d(c.live_day),)),
+        case(hr, "rt_get_items_sold", lambda c: (_d(c.live_day),)),
+        case(hr, "rt_get_receipts", lambda c: (_d(c.live_day),)),
+        case(hr, "rt_get_receipt_detail", lambda c: (c.live_rcpt_id,)),
+        case(hit, "list_items"),
+        case(hit, "list_subgroups"),
+        case(hit, "get_item_details", lambda c: (c.item_code,)),
+    ]
+
+
+def route_urls(c: BenchContext) -> List[str]:
+    """GET JSON endpoints (weather / AI routes call external APIs and are left out)."""
+    day, live = _d(c.last_day), _d(c.live_day)
+    month_ago = _d(c.last_day - timedelta(days=30))
+    return [
+        "/api/intelligence/bundle",
+        "/api/intelligence/kpis",
+        "/api/intelligence/receipts-by-day",
+        "/api/intelligence/hourly-today",
+        "/api/intelligence/top-items",
+        "/api/intelligence/subgroup",
+        f"/api/intelligence/subgroup-top-items?name={c.subgroup}",
+        "/api/intelligence/items-per-receipt",
+        "/api/intelligence/receipt-amounts",
+        "/api/intelligence/subgroup-velocity",
+        "/api/intelligence/affinity",
+        "/api/intelligence/hourly-profile",
+        "/api/intelligence/dow-profile",
+        "/api/intelligence/top-windows",
+        f"/api/sales/summary?date={day}",
+        f"/api/sales/hourly?date={day}",
+        f"/api/sales/hourly-4weeks?date={day}",
+        f"/api/sales/hourly-cumulative?date={day}",
+        f"/api/sales/category?date={day}",
+        f"/api/sales/items?date={day}",
+        f"/api/sales/top?date={day}",
+        "/api/sales/slow",
+        f"/api/sales/receipts?date={day}",
+        "/api/sales/daily-14days",
+        f"/api/sales-summary?from={month_ago}&to={day}&mode=daily",
+        f"/api/realtime/kpis?date={live}",
+        f"/api/realtime/hourly?date={live}",
+        f"/api/realtime/hourly-cumulative?date={live}",
+        f"/api/realtime/category?date={live}",
+        f"/api/realtime/items?date={live}",
+        f"/api/realtime/receipts?date={live}",
+        f"/api/realtime/receipt/{c.live_rcpt_id}",
+        "/api/items",
+        "/api/items/subgroups",
+        f"/api/items/{c.item_code}/details",
+        "/api/items/explorer",
+        f"/api/items/explorer/item-series?item_code={c.item_code}",
+        f"/api/items/360/invoices?item_code={c.item_code}",
+        f"/api/items/360/kpis?item_code={c.item_code}",
+        "/api/reports/subgroups",
+        f"/api/reports/item-trends?start_date={month_ago}&end_date={day}&bucket=weekly&top_n=10",
+        "/api/dead-items",
+    ]
+
+
+def make_app():
+    """Flask app with the JSON blueprints (no login / license middleware)."""
+    from flask import Flask
+
+    from routes.dead_items import dead_items_bp
+    from routes.intelligence import intelligence_bp
+    from routes.item_trends import item_trends_bp
+    from routes.items import items_bp
+    from routes.items_explorer import items_explorer_bp
+    from routes.realtime import realtime_bp
+    from routes.reorder_radar import reorder_radar_bp
+    from routes.sales import sales_bp
+
+    app = Flask("benchmarks")
+    for bp in (intelligence_bp, items_bp, sales_bp, realtime_bp, item_trends_bp,
+               items_explorer_bp, dead_items_bp, reorder_radar_bp):
+        app.register_blueprint(bp)
+    return app
+
+
+def route_cases(c: BenchContext) -> List[Case]:
+    cases = []
+    for url in route_urls(c):
+        path = url.split("?")[0]
+        cases.append(Case(f"GET {path}", lambda client, url=url: _get_json(client, url)))
+    cases.append(Case("POST /api/reorder-radar", lambda client: _post_json(
+        client, "/api/reorder-radar", {"draw": 1, "start": 0, "length": 50})))
+    return cases
+
+
+def _get_json(client, url: str):
+    resp = client.get(url)
+    if resp.status_code != 200:
+        raise RuntimeError(f"GET {url} -> {resp.status_code}")
+    return resp.get_json()
+
+
+def _post_json(client, url: str, payload: dict):
+    resp = client.post(url, json=payload)
+    if resp.status_code != 200:
+        raise RuntimeError(f"POST {url} -> {resp.status_code}")
+    return resp.get_json()
@@ -0,0 +1,254 @@
+# benchmarks/harness.py
+"""
+Datasets, measurement and baselines for the benchmark suite.
+
+Each size is a pos_synth.py stand-in holding roughly that many receipt lines
+over DAYS business days plus a full open day, generated once into
+benchmarks/.data (regenerated when its open day is no longer today, since
+the helpers anchor to the clock). The helpers read it through a "bench" backend: the stand-in with a
+SQLite progress handler counting VM steps, our proxy for rows scanned.
+SQLite does not report per-statement scan counts to Python.
+
+A case runs once cold (rollup store / item cube materialize, caches fill),
+then <repeats> times with the TTL caches cleared, so p50/p95 measure the
+helper's own work. Peak memory is the Python heap (tracemalloc) of one extra
+run. Timing runs are not traced.
+"""
+from __future__ import annotations
+
+import json
+import os
+import platform
+import sqlite3
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(HERE, ".data")
+BASELINE_DIR = os.path.join(HERE, "baselines")
+
+SIZES: Dict[str, int] = {"100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+DAYS = 730
+# Lines per receipt for the default SynthProfile (baskets are de-duplicated)
+# and the average of its weekday / growth factors over DAYS.
+_LINES_PER_RECEIPT = 2.45
+_VOLUME_FACTOR = 1.09
+
+VM_TICK = 1000  # progress handler granularity (VM instructions per tick)
+_vm_ticks = [0]
+
+
+def _tick() -> int:
+    _vm_ticks[0] += 1
+    return 0  # keep running
+
+
+# ---------- datasets ----------
+def _live_day(path: str) -> Optional[str]:
+    cn = sqlite3.connect(path)
+    try:
+        row = cn.execute("SELECT MIN(RCPT_DATE) FROM RECEIPT").fetchone()
+    except sqlite3.Error:
+        return None
+    finally:
+        cn.close()
+    return row[0][:10] if row and row[0] else None
+
+
+def dataset(size: str, data_dir: str = DATA_DIR, days: int = DAYS, seed: int = 7,
+            now: Optional[datetime] = None) -> str:
+    """Path of the stand-in for <size>, generating it when missing or stale."""
+    from pos_synth import _OPEN_HOUR, SynthProfile, generate
+
+    now = now or datetime.now()
+    lines = SIZES[size] if size in SIZES else int(size)
+    path = os.path.join(data_dir, f"pos-{size}-s{seed}.sqlite3")
+    if os.path.exists(path) and _live_day(path) == _open_day(now):
+        return path
+
+    # Fill the whole open day, whatever the time, so runs on the same day
+    # (and the realtime cases across days) see the same volume.
+    open_day = datetime.fromisoformat(_open_day(now))
+    close = open_day + timedelta(hours=_OPEN_HOUR + 18)
+    per_day = lines / (days * _LINES_PER_RECEIPT * _VOLUME_FACTOR)
+    print(f"Generating {size} dataset ({per_day:.0f} receipts/day x {days} days) -> {path}", flush=True)
+    t0 = time.perf_counter()
+    counts = generate(path, days, SynthProfile(receipts_per_day=per_day, seed=seed), now=close)
+    print(f"  {counts} in {time.perf_counter() - t0:.1f}s", flush=True)
+    return path
+
+
+def _open_day(now: datetime) -> str:
+    from pos_synth import _OPEN_HOUR
+
+    return (now - timedelta(hours=_OPEN_HOUR)).date().isoformat()
+
+
+def configure(db_path: str, work_dir: str) -> None:
+    """Point the helpers (and their rollup store / item cube / realtime totals / receipt caches / dimensions) at <db_path>."""
+    import dimensions
+    import helpers_intelligence as hi
+    import item_cube
+    import pos_backends
+    import realtime_aggregator
+    import receipt_details
+    import rollups
+    import tsql_sqlite
+    from cache_utils import clear_cache
+
+    def connect(cfg):
+        cn = tsql_sqlite.connect(cfg.POS_STANDIN_PATH, readonly=False)
+        cn._raw.set_progress_handler(_tick, VM_TICK)
+        return cn
+
+    pos_backends.register_backend("bench", connect)
+    hi.config.ANALYTICS_BACKEND = "bench"
+    hi.config.POS_STANDIN_PATH = db_path
+    if hi._pool is not None:
+        hi._pool.close_all()
+        hi._pool = None
+
+    os.makedirs(work_dir, exist_ok=True)
+    # background=False: backfills run in the first (cold) call, not under the timed ones
+    rollups._store = rollups.DailyRollupStore(
+        os.path.join(work_dir, "rollup.sqlite3"), rollups.MssqlRollupSource(hi._connect), background=False)
+    item_cube._cube = item_cube.ItemCube(
+        os.path.join(work_dir, "cube"), item_cube.MssqlCubeSource(hi._connect), background=False)
+    # poll_interval=0: every realtime call pays for its delta poll
+    realtime_aggregator._aggregator = realtime_aggregator.RealtimeAggregator(
+        realtime_aggregator.MssqlRealtimeSource(hi._connect_pos), poll_interval=0)
+    dimensions._cache = dimensions.DimensionCache(hi._connect)
+    receipt_details._caches = {
+        "details": receipt_details._build_details(5000),
+        "invoice_lines": receipt_details._build_invoice_lines(5000),
+    }
+    clear_cache()
+
+
+# ---------- measurement ----------
+@dataclass
+class Result:
+    name: str
+    p50_ms: float = 0.0
+    p95_ms: float = 0.0
+    cold_ms: float = 0.0
+    vm_ksteps: float = 0.0   # thousands of SQLite VM instructions per run (median)
+    rows: int = 0
+    peak_kib: float = 0.0
+    error: Optional[str] = None
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest-rank percentile (q in 0..100)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(-(-q * len(ordered) // 100)))  # ceil
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def count_rows(result: Any) -> int:
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict):
+        for key in ("rows", "items", "data", "top"):
+            if isinstance(result.get(key), list):
+                return len(result[key])
+        return 1
+    return 0 if result is None else 1
+
+
+def measure(name: str, call, repeats: int = 5) -> Result:
+    from cache_utils import clear_cache
+
+    res = Result(name)
+    try:
+        clear_cache()
+        t0 = time.perf_counter()
+        call()
+        res.cold_ms = (time.perf_counter() - t0) * 1000
+
+        times, steps = [], []
+        for _ in range(max(1, repeats)):
+            clear_cache()
+            _vm_ticks[0] = 0
+            t0 = time.perf_counter()
+            out = call()
+            times.append((time.perf_counter() - t0) * 1000)
+            steps.append(_vm_ticks[0] * VM_TICK / 1000)
+
+        clear_cache()
+        tracemalloc.start()
+        try:
+            call()
+            res.peak_kib = tracemalloc.get_traced_memory()[1] / 1024
+        finally:
+            tracemalloc.stop()
+    except Exception as e:  # reported per case; the suite goes on
+        res.error = f"{type(e).__name__}: {e}"
+        return res
+
+    res.p50_ms = percentile(times, 50)
+    res.p95_ms = percentile(times, 95)
+    res.vm_ksteps = percentile(steps, 50)
+    res.rows = count_rows(out)
+    return res
+
+
+# ---------- baselines ----------
+def baseline_path(size: str, baseline_dir: str = BASELINE_DIR) -> str:
+    return os.path.join(baseline_dir, f"{size}.json")
+
+
+def save_baseline(path: str, size: str, db_path: str, results: Iterable[Result]) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    cn = sqlite3.connect(db_path)
+    try:
+        lines = cn.execute("SELECT COUNT(*) FROM HISTORIC_RECEIPT_CONTENTS").fetchone()[0]
+    finally:
+        cn.close()
+    doc = {
+        "size": size,
+        "lines": lines,
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": {r.name: {k: v for k, v in asdict(r).items() if k != "name"} for r in results},
+    }
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(doc, fh, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def load_baseline(path: str) -> Optional[Dict]:
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def compare(results: Iterable[Result], baseline: Dict, threshold: float = 1.25,
+            min_delta_ms: float = 5.0) -> List[str]:
+    """
+    Regressions against <baseline>: p50 or VM steps above baseline * threshold
+    (p50 also by more than <min_delta_ms>, so tiny helpers do not flap), and
+    cases that now fail.
+    """
+    base = baseline.get("results", {})
+    out = []
+    for r in results:
+        b = base.get(r.name)
+        if b is None:
+            continue
+        if r.error:
+            out.append(f"{r.name}: failed ({r.error})")
+            continue
+        if r.p50_ms > b["p50_ms"] * threshold and r.p50_ms - b["p50_ms"] > min_delta_ms:
+            out.append(f"{r.name}: p50 {b['p50_ms']:.1f} -> {r.p50_ms:.1f} ms")
+        if b.get("vm_ksteps") and r.vm_ksteps > b["vm_ksteps"] * threshold:
+            out.append(f"{r.name}: VM steps {b['vm_ksteps']:.0f}k -> {r.vm_ksteps:.0f}k")
+    return out
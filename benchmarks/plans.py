@@ -0,0 +1,107 @@
+# benchmarks/plans.py
+"""
+Query plans of a subgroup join, before and after #ItemSubgroup.
+
+  python -m benchmarks.plans --size 100k
+
+Runs one day's sales by subgroup two ways against a stand-in dataset:
+with the SUBGROUPS OR-join the helpers used
+(TRY_CAST(ITM_SUBGROUP AS int) = SubGrp_ID OR trimmed names equal), and
+as an equi-join on the session's #ItemSubgroup (built on checkout by
+helpers_intelligence._ensure_item_subgroups). Prints SQLite's EXPLAIN QUERY
+PLAN and the timings of each. The OR-join scans SUBGROUPS for every line;
+the equi-join looks each line's item up by primary key. SQL Server shows
+the same change as nested loops turning into a hash or merge join.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from typing import Dict, List
+
+from benchmarks import harness
+from benchmarks.cases import BenchContext
+
+OR_JOIN_SQL = """
+    SELECT COALESCE(LTRIM(RTRIM(s.SubGrp_Name)), N'Unknown') AS subgroup,
+           CAST(SUM(c.ITM_QUANTITY * c.ITM_PRICE) AS float) AS sales
+    FROM dbo.HISTORIC_RECEIPT r
+    JOIN dbo.HISTORIC_RECEIPT_CONTENTS c ON c.RCPT_ID = r.RCPT_ID
+    LEFT JOIN dbo.ITEMS i ON i.ITM_CODE = c.ITM_CODE
+    LEFT JOIN dbo.SUBGROUPS s
+      ON (TRY_CAST(i.ITM_SUBGROUP AS int) = s.SubGrp_ID
+       OR LTRIM(RTRIM(i.ITM_SUBGROUP)) = LTRIM(RTRIM(s.SubGrp_Name)))
+    WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ?
+    GROUP BY COALESCE(LTRIM(RTRIM(s.SubGrp_Name)), N'Unknown')
+    ORDER BY sales DESC;
+"""
+
+TEMP_TABLE_SQL = """
+    SELECT COALESCE(g.SubGrpName, N'Unknown') AS subgroup,
+           CAST(SUM(c.ITM_QUANTITY * c.ITM_PRICE) AS float) AS sales
+    FROM dbo.HISTORIC_RECEIPT r
+    JOIN dbo.HISTORIC_RECEIPT_CONTENTS c ON c.RCPT_ID = r.RCPT_ID
+    LEFT JOIN #ItemSubgroup g ON g.ITM_CODE = CAST(c.ITM_CODE AS nvarchar(50))
+    WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ?
+    GROUP BY COALESCE(g.SubGrpName, N'Unknown')
+    ORDER BY sales DESC;
+"""
+
+QUERIES = {"or_join": OR_JOIN_SQL, "item_subgroup": TEMP_TABLE_SQL}
+
+
+def explain(cn, sql: str, params: list) -> List[str]:
+    """EXPLAIN QUERY PLAN lines of <sql> on a tsql_sqlite connection (possibly query_log-wrapped)."""
+    import query_log
+    import tsql_sqlite
+
+    raw = query_log.unwrap(cn)._raw
+    stmt = tsql_sqlite.translate(sql)[-1]
+    return [row[3] for row in raw.execute("EXPLAIN QUERY PLAN " + stmt.sql, stmt.bind(params))]
+
+
+def compare_plans(ctx: BenchContext, repeats: int = 5) -> Dict[str, Dict]:
+    """{query name: {"plan", "rows", "result"}} for QUERIES over <ctx>.last_day."""
+    import helpers_intelligence as hi
+    from pos_dates import biz_window_7h
+
+    params = list(biz_window_7h(ctx.last_day, ctx.last_day))
+    out: Dict[str, Dict] = {}
+    with hi._connect() as cn:  # #ItemSubgroup is built on checkout
+        def call(sql):
+            cur = cn.cursor()
+            cur.execute(sql, params)
+            return [tuple(r) for r in cur.fetchall()]
+
+        for name, sql in QUERIES.items():
+            out[name] = {
+                "plan": explain(cn, sql, params),
+                "rows": call(sql),
+                "result": harness.measure(name, lambda sql=sql: call(sql), repeats),
+            }
+    return out
+
+
+def main(argv=None) -> int:
+    from benchmarks import run  # noqa: F401  (placeholder secrets for config.py)
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", default="100k", help=f"dataset size ({', '.join(harness.SIZES)} or a line count)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per query (default 5)")
+    parser.add_argument("--data-dir", default=harness.DATA_DIR)
+    args = parser.parse_args(argv)
+
+    db_path = harness.dataset(args.size, args.data_dir)
+    harness.configure(db_path, os.path.join(args.data_dir, f"work-{args.size}"))
+    got = compare_plans(BenchContext.from_db(db_path), args.repeat)
+    for name, info in got.items():
+        r = info["result"]
+        print(f"\n== {name}: p50 {r.p50_ms:.1f} ms, p95 {r.p95_ms:.1f} ms, {r.vm_ksteps:.0f}k VM steps ==")
+        for line in info["plan"]:
+            print("  " + line)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
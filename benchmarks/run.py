@@ -0,0 +1,113 @@
+# benchmarks/run.py
+"""
+Run the benchmark suite.
+
+  python -m benchmarks.run --size 100k              # compare with baselines/100k.json
+  python -m benchmarks.run --size 100k --save       # (re)write the baseline
+  python -m benchmarks.run --size 1m --only get_kpis --repeat 9
+
+Exits 1 when a case fails or regresses past --threshold.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from typing import List
+
+# config.py refuses to import without the app's secrets. Nothing benchmarked
+# reaches MSSQL, OpenAI or the license server, so placeholders do; real values
+# from the environment win.
+_PLACEHOLDER_ENV = {
+    "MSSQL_DRIVER": "unused", "MSSQL_SERVER": "unused", "MSSQL_DATABASE": "unused",
+    "MSSQL_USERNAME": "unused", "MSSQL_PASSWORD": "unused", "SECRET_KEY": "benchmarks",
+    "APP_USERNAME": "benchmarks", "APP_PASSWORD": "benchmarks", "VISUAL_CROSSING_KEY": "unused",
+    "OPENAI_API_KEY": "unused", "USD_EXCHANGE_RATE": "89000", "CURRENCY": "LBP",
+    "MIN_TRACKING_DATE": "2000-01-01", "LICENSE_SERVER_URL": "http://localhost",
+    "SUPPORT_CONTACT": "unused",
+}
+for _key, _value in _PLACEHOLDER_ENV.items():
+    os.environ.setdefault(_key, _value)
+
+from benchmarks import harness  # noqa: E402
+from benchmarks.cases import BenchContext, helper_cases, make_app, route_cases  # noqa: E402
+
+
+def _table(results: List[harness.Result]) -> str:
+    head = f"{'case':<58} {'p50 ms':>9} {'p95 ms':>9} {'cold ms':>9} {'VM k':>10} {'rows':>6} {'peak KiB':>9}"
+    out = [head, "-" * len(head)]
+    for r in results:
+        if r.error:
+            out.append(f"{r.name:<58} ERROR {r.error}")
+            continue
+        out.append(f"{r.name:<58} {r.p50_ms:>9.1f} {r.p95_ms:>9.1f} {r.cold_ms:>9.1f} "
+                   f"{r.vm_ksteps:>10.0f} {r.rows:>6} {r.peak_kib:>9.0f}")
+    return "\n".join(out)
+
+
+def run_size(size: str, args) -> List[str]:
+    """Benchmark one dataset size; returns the problems found."""
+    db_path = harness.dataset(size, args.data_dir)
+    harness.configure(db_path, os.path.join(args.data_dir, f"work-{size}"))
+    ctx = BenchContext.from_db(db_path)
+
+    jobs = [(case, ctx) for case in helper_cases()]
+    if not args.no_routes:
+        client = make_app().test_client()
+        jobs += [(case, client) for case in route_cases(ctx)]
+    if args.only:
+        jobs = [(c, t) for c, t in jobs if any(o in c.name for o in args.only)]
+
+    results = []
+    for case, target in jobs:
+        if sys.stderr.isatty():
+            print(f"\r\033[K  {case.name} ...", end="", flush=True, file=sys.stderr)
+        results.append(harness.measure(case.name, lambda: case.call(target), args.repeat))
+    if sys.stderr.isatty():
+        print("\r\033[K", end="", file=sys.stderr)
+    print(f"\n== {size} ({os.path.basename(db_path)}) ==")
+    print(_table(results))
+
+    problems = [f"{r.name}: failed ({r.error})" for r in results if r.error]
+    path = harness.baseline_path(size, args.baseline_dir)
+    if args.save:
+        if problems:
+            print(f"Not saving {path}: {len(problems)} case(s) failed")
+        else:
+            harness.save_baseline(path, size, db_path, results)
+            print(f"Saved baseline {path}")
+        return problems
+
+    baseline = harness.load_baseline(path)
+    if baseline is None:
+        print(f"No baseline at {path}; run with --save to create one")
+        return problems
+    return harness.compare(results, baseline, args.threshold, args.min_delta_ms)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", action="append", help=f"dataset size ({', '.join(harness.SIZES)} or a line count; repeatable)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed runs per case (default 5)")
+    parser.add_argument("--only", action="append", help="run cases whose name contains this (repeatable)")
+    parser.add_argument("--no-routes", action="store_true", help="skip the Flask JSON routes")
+    parser.add_argument("--save", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=1.25, help="regression ratio vs baseline (default 1.25)")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="ignore p50 regressions smaller than this")
+    parser.add_argument("--data-dir", default=harness.DATA_DIR)
+    parser.add_argument("--baseline-dir", default=harness.BASELINE_DIR)
+    args = parser.parse_args(argv)
+
+    problems = []
+    for size in args.size or ["100k"]:
+        problems += [f"[{size}] {p}" for p in run_size(size, args)]
+    if problems:
+        print("\nRegressions / failures:")
+        for p in problems:
+            print("  " + p)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,64 +1,832 @@
 # cache_utils.py
 """
-Thread-safe in-process TTL cache for analytics endpoints.
+Thread-safe LRU + TTL cache for analytics endpoints.
 
 Prevents redundant MSSQL round-trips when the same analytics panel is loaded
 by multiple users or rapid page refreshes within the TTL window.
 
-Note: cache is per-process. Not shared across gunicorn workers (use Redis
-for multi-process deployments). Fine for single-worker Flask dev server.
+The store is bounded: it holds at most CACHE_MAX_ENTRIES entries and roughly
+CACHE_MAX_BYTES of cached values (applied via configure()). When either limit
+is exceeded the least recently used entries are evicted. Expired entries are
+dropped lazily when read and by a periodic sweep piggy-backed on writes, so
+keys for one-off arguments (item codes, dates, search strings) cannot pile up
+forever.
+
+With stale_seconds, an entry past its TTL is still served for that extra
+window while a small background worker pool recomputes it
+(stale-while-revalidate), so dashboards never block on a warm key.
+
+Each decorated function gets its own namespace, which can be flushed
+independently with clear_cache(namespace) and is reported in cache_stats().
+
+Storage is pluggable (CACHE_BACKEND):
+  - "memory" (default): per-process LRUCache. Not shared across gunicorn
+    workers; fine for the single-worker Flask dev server.
+  - "sqlite": SQLiteBackend, a WAL-mode SQLite file on local disk holding
+    pickled + zlib-compressed values. Every worker on the box shares one
+    cache, and a lease table makes sure only one process recomputes a key at
+    a time. No external service required.
 """
+import os
+import sys
 import time
+import zlib
+import pickle
+import sqlite3
+import logging
 import functools
 import threading
-from typing import Any, Callable
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Entry:
+    namespace: str
+    stored_at: float
+    fresh_until: float
+    expires_at: float  # fresh_until + stale window
+    size: int
+    value: Any
+
+
+def _approx_size(value: Any, _seen: Optional[set] = None, _depth: int = 0) -> int:
+    """
+    Rough byte size of <value>: sys.getsizeof walked through containers.
+
+    numpy / pandas objects report their buffer size via nbytes /
+    memory_usage(). Cycles are counted once and recursion stops at depth 6,
+    which is plenty for the dict/list/tuple shapes helpers return.
+    """
+    if _seen is None:
+        _seen = set()
+    oid = id(value)
+    if oid in _seen:
+        return 0
+    _seen.add(oid)
+
+    memory_usage = getattr(value, "memory_usage", None)
+    if callable(memory_usage):  # pandas DataFrame / Series
+        try:
+            usage = memory_usage(deep=True)
+            return int(usage.sum() if hasattr(usage, "sum") else usage)
+        except Exception:
+            pass
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):  # numpy arrays
+        return nbytes + sys.getsizeof(value, 0)
+
+    size = sys.getsizeof(value, 0)
+    if _depth >= 6:
+        return size
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += _approx_size(k, _seen, _depth + 1)
+            size += _approx_size(v, _seen, _depth + 1)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += _approx_size(item, _seen, _depth + 1)
+    elif hasattr(value, "__dict__"):
+        size += _approx_size(vars(value), _seen, _depth + 1)
+    return size
+
+
+class CacheBackend:
+    """
+    Storage interface used by ttl_cache.
+
+    Backends store values under (namespace, key) with a fresh TTL plus an
+    optional stale window, and keep per-namespace counters for
+    cache_stats(). Leases let a backend shared between processes elect one
+    process to compute a missing key; the in-process default needs none.
+    """
+
+    max_entries: int
+    max_bytes: int
+    purge_interval: float
+
+    def lookup(self, namespace: str, key: Hashable, record: bool = True) -> Tuple[bool, Any, bool]:
+        """Return (hit, value, stale)."""
+        raise NotImplementedError
+
+    def get(self, namespace: str, key: Hashable, record: bool = True) -> Tuple[bool, Any]:
+        """Return (hit, value); stale-window entries count as hits."""
+        hit, value, _ = self.lookup(namespace, key, record)
+        return hit, value
+
+    def set(
+        self, namespace: str, key: Hashable, value: Any, ttl: float, stale: float = 0.0
+    ) -> None:
+        raise NotImplementedError
+
+    def purge_expired(self) -> int:
+        raise NotImplementedError
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        raise NotImplementedError
+
+    def bump(self, namespace: str, counter: str, n: int = 1) -> None:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def try_lease(self, namespace: str, key: Hashable, seconds: float) -> bool:
+        """Claim the right to compute <key> for <seconds>. True if claimed."""
+        return True
+
+    def lease_active(self, namespace: str, key: Hashable) -> bool:
+        """True while another holder's lease on <key> is unexpired."""
+        return False
+
+    def release_lease(self, namespace: str, key: Hashable) -> None:
+        pass
+
+
+def _new_ns_counters() -> Dict[str, int]:
+    return {
+        "hits": 0, "stale_hits": 0, "misses": 0, "entries": 0, "bytes": 0,
+        "coalesced": 0, "flight_timeouts": 0,
+        "refreshes": 0, "refresh_errors": 0,
+    }
+
+
+class LRUCache(CacheBackend):
+    """
+    Bounded LRU store with per-entry TTL and approximate size accounting.
+
+    Keys are (namespace, key) pairs. Reads move a live entry to the
+    most-recently-used end; writes evict from the other end until both the
+    entry and byte limits hold again. A single value larger than <max_bytes>
+    is not stored at all (it would evict everything and then itself).
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 2048,
+        max_bytes: int = 128 * 1024 * 1024,
+        purge_interval: float = 60.0,
+    ) -> None:
+        self.max_entries = int(max_entries)
+        self.max_bytes = int(max_bytes)
+        self.purge_interval = float(purge_interval)
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Tuple[str, Hashable], _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._last_purge = time.monotonic()
+        self._ns: Dict[str, Dict[str, int]] = {}
+        self._evictions = 0
+        self._expirations = 0
+
+    # ---------- public API ----------
+    def lookup(self, namespace: str, key: Hashable, record: bool = True) -> Tuple[bool, Any, bool]:
+        """
+        Return (hit, value, stale). Expired entries count as a miss and are
+        dropped; entries inside their stale window are hits with stale=True.
+        <record>=False skips the hit/miss counters (internal re-checks).
+        """
+        now = time.monotonic()
+        full_key = (namespace, key)
+        with self._lock:
+            ns = self._ns_stats(namespace)
+            entry = self._data.get(full_key)
+            if entry is not None and entry.expires_at <= now:
+                self._remove(full_key)
+                self._expirations += 1
+                entry = None
+            if entry is None:
+                if record:
+                    ns["misses"] += 1
+                return False, None, False
+            self._data.move_to_end(full_key)
+            stale = entry.fresh_until <= now
+            if record:
+                ns["stale_hits" if stale else "hits"] += 1
+            return True, entry.value, stale
+
+    def set(
+        self, namespace: str, key: Hashable, value: Any, ttl: float, stale: float = 0.0
+    ) -> None:
+        """
+        Store <value> as fresh for <ttl> seconds and servable-but-stale for a
+        further <stale> seconds, evicting LRU entries to fit.
+        """
+        size = _approx_size(value)
+        now = time.monotonic()
+        full_key = (namespace, key)
+        with self._lock:
+            if full_key in self._data:
+                self._remove(full_key)
+            if now - self._last_purge >= self.purge_interval:
+                self._purge_expired_locked(now)
+            if size > self.max_bytes:
+                return
+            self._data[full_key] = _Entry(
+                namespace, now, now + ttl, now + ttl + stale, size, value
+            )
+            self._bytes += size
+            self._ns_stats(namespace)["bytes"] += size
+            self._ns_stats(namespace)["entries"] += 1
+            while self._data and (
+                len(self._data) > self.max_entries or self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self._evictions += 1
+
+    def purge_expired(self) -> int:
+        """Drop every expired entry now. Returns how many were removed."""
+        with self._lock:
+            return self._purge_expired_locked(time.monotonic())
+
+    def clear(self, namespace: Optional[str] = None) -> None:
+        """Flush one namespace, or everything when <namespace> is None."""
+        with self._lock:
+            if namespace is None:
+                self._data.clear()
+                self._bytes = 0
+                for ns in self._ns.values():
+                    ns["entries"] = 0
+                    ns["bytes"] = 0
+                return
+            for full_key in [k for k in self._data if k[0] == namespace]:
+                self._remove(full_key)
+
+    def bump(self, namespace: str, counter: str, n: int = 1) -> None:
+        """Increment a per-namespace counter kept outside get()/set()."""
+        with self._lock:
+            self._ns_stats(namespace)[counter] += n
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of totals and per-namespace counters (safe to jsonify)."""
+        with self._lock:
+            return {
+                "backend": "memory",
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "evictions": self._evictions,
+                "expirations": self._expirations,
+                "namespaces": {name: dict(ns) for name, ns in self._ns.items()},
+            }
+
+    # ---------- internals (caller holds the lock) ----------
+    def _ns_stats(self, namespace: str) -> Dict[str, int]:
+        ns = self._ns.get(namespace)
+        if ns is None:
+            ns = self._ns[namespace] = _new_ns_counters()
+        return ns
+
+    def _remove(self, full_key: Tuple[str, Hashable]) -> None:
+        entry = self._data.pop(full_key)
+        self._bytes -= entry.size
+        ns = self._ns_stats(entry.namespace)
+        ns["entries"] -= 1
+        ns["bytes"] -= entry.size
+
+    def _purge_expired_locked(self, now: float) -> int:
+        self._last_purge = now
+        dead = [k for k, e in self._data.items() if e.expires_at <= now]
+        for full_key in dead:
+            self._remove(full_key)
+        self._expirations += len(dead)
+        return len(dead)
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    Cache stored in a local SQLite file shared by every worker process.
+
+    Values are pickled and zlib-compressed; <max_bytes> bounds the compressed
+    size on disk. LRU order follows a last_access column, rewritten by a hit
+    only when it is more than <touch_interval> seconds old, so hot keys are
+    read without a write transaction. Entry and byte totals are kept by
+    triggers in cache_totals; a write checks the bounds by reading that one
+    row. Timestamps are wall-clock (time.time()) because they are compared
+    across processes.
+
+    Leases live in their own table: the first process to insert a row for
+    a key computes it; others poll for the stored value until the lease is
+    released or expires. Hit/miss counters are kept per process; entry and
+    byte totals are read from the shared file.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: int = 2048,
+        max_bytes: int = 128 * 1024 * 1024,
+        purge_interval: float = 60.0,
+        compress_level: int = 1,
+        touch_interval: float = 10.0,
+    ) -> None:
+        self.path = path
+        self.max_entries = int(max_entries)
+        self.max_bytes = int(max_bytes)
+        self.purge_interval = float(purge_interval)
+        self.compress_level = int(compress_level)
+        self.touch_interval = float(touch_interval)
+        self._local = threading.local()
+        self._lock = threading.Lock()  # guards the in-process counters
+        self._ns: Dict[str, Dict[str, int]] = {}
+        self._evictions = 0
+        self._expirations = 0
+        self._last_purge = time.time()
+
+        cn = self._conn()
+        cn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                namespace   TEXT NOT NULL,
+                key         TEXT NOT NULL,
+                fresh_until REAL NOT NULL,
+                expires_at  REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size        INTEGER NOT NULL,
+                value       BLOB NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )""")
+        cn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_cache_entries_lru "
+            "ON cache_entries (last_access)"
+        )
+        cn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_leases (
+                namespace  TEXT NOT NULL,
+                key        TEXT NOT NULL,
+                owner      TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            )""")
+        # Running totals; seeded from the entries in the same transaction
+        # that creates the triggers, so a file from before stays exact.
+        cn.execute("BEGIN IMMEDIATE")
+        try:
+            cn.execute("""
+                CREATE TABLE IF NOT EXISTS cache_totals (
+                    id      INTEGER PRIMARY KEY CHECK (id = 0),
+                    entries INTEGER NOT NULL,
+                    bytes   INTEGER NOT NULL
+                )""")
+            cn.execute(
+                "INSERT OR IGNORE INTO cache_totals (id, entries, bytes) "
+                "SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM cache_entries"
+            )
+            cn.execute("""
+                CREATE TRIGGER IF NOT EXISTS tr_cache_entries_insert AFTER INSERT ON cache_entries
+                BEGIN
+                    UPDATE cache_totals SET entries = entries + 1, bytes = bytes + NEW.size WHERE id = 0;
+                END""")
+            cn.execute("""
+                CREATE TRIGGER IF NOT EXISTS tr_cache_entries_delete AFTER DELETE ON cache_entries
+                BEGIN
+                    UPDATE cache_totals SET entries = entries - 1, bytes = bytes - OLD.size WHERE id = 0;
+                END""")
+            cn.execute("COMMIT")
+        except BaseException:
+            cn.execute("ROLLBACK")
+            raise
+
+    # ---------- connection ----------
+    def _conn(self) -> sqlite3.Connection:
+        """
+        One autocommit connection per thread (sqlite3 objects are not
+        shareable). Reopened after a fork so preloaded gunicorn workers never
+        reuse the master's handle.
+        """
+        cn = getattr(self._local, "cn", None)
+        if cn is None or self._local.pid != os.getpid():
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+            cn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            cn.execute("PRAGMA journal_mode=WAL")
+            cn.execute("PRAGMA synchronous=NORMAL")
+            # INSERT OR REPLACE must fire the delete trigger for the row it replaces
+            cn.execute("PRAGMA recursive_triggers=ON")
+            self._local.cn = cn
+            self._local.pid = os.getpid()
+        return cn
+
+    def _lease_owner(self) -> str:
+        return f"{os.getpid()}:{threading.get_ident()}"
+
+    # ---------- CacheBackend ----------
+    def lookup(self, namespace: str, key: Hashable, record: bool = True) -> Tuple[bool, Any, bool]:
+        now = time.time()
+        cn = self._conn()
+        row = cn.execute(
+            "SELECT fresh_until, expires_at, value, last_access FROM cache_entries "
+            "WHERE namespace = ? AND key = ?",
+            (namespace, str(key)),
+        ).fetchone()
+        if row is not None and row[1] <= now:
+            cn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at <= ?",
+                (namespace, str(key), now),
+            )
+            with self._lock:
+                self._expirations += 1
+            row = None
+        value = None
+        if row is not None:
+            try:
+                value = pickle.loads(zlib.decompress(row[2]))
+            except Exception:
+                row = None  # unreadable (e.g. written by another code version)
+        if row is None:
+            if record:
+                self.bump(namespace, "misses")
+            return False, None, False
+        if now - row[3] >= self.touch_interval:
+            cn.execute(
+                "UPDATE cache_entries SET last_access = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, str(key)),
+            )
+        stale = row[0] <= now
+        if record:
+            self.bump(namespace, "stale_hits" if stale else "hits")
+        return True, value, stale
+
+    def set(
+        self, namespace: str, key: Hashable, value: Any, ttl: float, stale: float = 0.0
+    ) -> None:
+        try:
+            blob = zlib.compress(
+                pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), self.compress_level
+            )
+        except Exception as e:
+            logger.warning(f"Value for {namespace} is not picklable; not cached: {e}")
+            return
+        if len(blob) > self.max_bytes:
+            return
+        now = time.time()
+        cn = self._conn()
+        cn.execute(
+            "INSERT OR REPLACE INTO cache_entries "
+            "(namespace, key, fresh_until, expires_at, last_access, size, value) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (namespace, str(key), now + ttl, now + ttl + stale, now, len(blob), blob),
+        )
+        if now - self._last_purge >= self.purge_interval:
+            self.purge_expired()
+        self._evict(cn)
 
-_lock: threading.Lock = threading.Lock()
-_store: dict = {}  # key → (timestamp, cached_value)
+    def _evict(self, cn: sqlite3.Connection) -> None:
+        count, total = cn.execute(
+            "SELECT entries, bytes FROM cache_totals WHERE id = 0"
+        ).fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        evicted = 0
+        victims = cn.execute(
+            "SELECT namespace, key, size FROM cache_entries ORDER BY last_access"
+        ).fetchall()
+        doomed = []
+        for namespace, key, size in victims:
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            doomed.append((namespace, key))
+            count -= 1
+            total -= size
+        for namespace, key in doomed:
+            cur = cn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key)
+            )
+            evicted += cur.rowcount
+        with self._lock:
+            self._evictions += evicted
 
+    def purge_expired(self) -> int:
+        now = time.time()
+        self._last_purge = now
+        cn = self._conn()
+        removed = cn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,)).rowcount
+        cn.execute("DELETE FROM cache_leases WHERE expires_at <= ?", (now,))
+        with self._lock:
+            self._expirations += removed
+        return removed
 
-def ttl_cache(seconds: int = 60):
+    def clear(self, namespace: Optional[str] = None) -> None:
+        cn = self._conn()
+        if namespace is None:
+            cn.execute("DELETE FROM cache_entries")
+            cn.execute("DELETE FROM cache_leases")
+        else:
+            cn.execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+            cn.execute("DELETE FROM cache_leases WHERE namespace = ?", (namespace,))
+
+    def bump(self, namespace: str, counter: str, n: int = 1) -> None:
+        with self._lock:
+            ns = self._ns.get(namespace)
+            if ns is None:
+                ns = self._ns[namespace] = _new_ns_counters()
+            ns[counter] += n
+
+    def stats(self) -> Dict[str, Any]:
+        rows = self._conn().execute(
+            "SELECT namespace, COUNT(*), SUM(size) FROM cache_entries GROUP BY namespace"
+        ).fetchall()
+        with self._lock:
+            namespaces = {name: dict(ns) for name, ns in self._ns.items()}
+            evictions, expirations = self._evictions, self._expirations
+        for ns in namespaces.values():
+            ns["entries"] = ns["bytes"] = 0
+        for name, entries, size in rows:
+            ns = namespaces.setdefault(name, _new_ns_counters())
+            ns["entries"], ns["bytes"] = entries, int(size or 0)
+        return {
+            "backend": "sqlite",
+            "path": self.path,
+            "entries": sum(r[1] for r in rows),
+            "bytes": sum(int(r[2] or 0) for r in rows),
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "evictions": evictions,
+            "expirations": expirations,
+            "namespaces": namespaces,
+        }
+
+    def try_lease(self, namespace: str, key: Hashable, seconds: float) -> bool:
+        now = time.time()
+        cn = self._conn()
+        cn.execute("BEGIN IMMEDIATE")
+        try:
+            cn.execute(
+                "DELETE FROM cache_leases WHERE namespace = ? AND key = ? AND expires_at <= ?",
+                (namespace, str(key), now),
+            )
+            claimed = cn.execute(
+                "INSERT OR IGNORE INTO cache_leases (namespace, key, owner, expires_at) "
+                "VALUES (?, ?, ?, ?)",
+                (namespace, str(key), self._lease_owner(), now + seconds),
+            ).rowcount == 1
+            cn.execute("COMMIT")
+        except BaseException:
+            cn.execute("ROLLBACK")
+            raise
+        return claimed
+
+    def lease_active(self, namespace: str, key: Hashable) -> bool:
+        row = self._conn().execute(
+            "SELECT 1 FROM cache_leases WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, str(key), time.time()),
+        ).fetchone()
+        return row is not None
+
+    def release_lease(self, namespace: str, key: Hashable) -> None:
+        self._conn().execute(
+            "DELETE FROM cache_leases WHERE namespace = ? AND key = ? AND owner = ?",
+            (namespace, str(key), self._lease_owner()),
+        )
+
+
+_cache: CacheBackend = LRUCache()
+
+
+def configure(
+    max_entries: Optional[int] = None,
+    max_bytes: Optional[int] = None,
+    purge_interval: Optional[float] = None,
+    backend: Optional[str] = None,
+    sqlite_path: Optional[str] = None,
+) -> None:
+    """
+    Apply settings from config.py (called once by main.py at startup).
+
+    Kept out of import time so this module stays importable without the
+    required env vars. <backend> is "memory" or "sqlite" (the latter needs
+    <sqlite_path>). Switching backends starts from an empty cache; shrinking
+    a limit takes effect on the next write.
+    """
+    global _cache
+    if backend is not None:
+        backend = backend.strip().lower()
+        if backend == "sqlite":
+            if not sqlite_path:
+                raise ValueError("sqlite cache backend needs a file path")
+            _cache = SQLiteBackend(sqlite_path)
+        elif backend == "memory":
+            _cache = LRUCache()
+        else:
+            raise ValueError(f"Unknown cache backend: {backend!r}")
+    if max_entries is not None:
+        _cache.max_entries = int(max_entries)
+    if max_bytes is not None:
+        _cache.max_bytes = int(max_bytes)
+    if purge_interval is not None:
+        _cache.purge_interval = float(purge_interval)
+
+
+def _make_key(args: tuple, kwargs: dict) -> str:
+    return f"{args!r}|{sorted(kwargs.items())!r}"
+
+
+class _Flight:
+    """One in-progress computation that concurrent missers can wait on."""
+
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+
+
+_flights_lock = threading.Lock()
+_flights: Dict[Tuple[str, str], _Flight] = {}
+
+
+def _single_flight(namespace: str, key: str, compute: Callable[[], Any], wait_timeout: float) -> Any:
+    """
+    Run <compute> once per (namespace, key) across concurrent callers.
+
+    The first caller (leader) computes and publishes its result or exception;
+    callers arriving meanwhile block on the leader's event and share the
+    outcome. A follower that waits longer than <wait_timeout> gives up on
+    the leader and computes on its own rather than failing the request.
+    """
+    flight_key = (namespace, key)
+    with _flights_lock:
+        flight = _flights.get(flight_key)
+        leader = flight is None
+        if leader:
+            flight = _flights[flight_key] = _Flight()
+
+    if not leader:
+        _cache.bump(namespace, "coalesced")
+        if flight.done.wait(wait_timeout):
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        _cache.bump(namespace, "flight_timeouts")
+        return compute()
+
+    try:
+        flight.value = _compute_with_lease(namespace, key, compute, wait_timeout)
+        return flight.value
+    except BaseException as exc:
+        flight.error = exc
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(flight_key, None)
+        flight.done.set()
+
+
+_LEASE_POLL_SECONDS = 0.05
+
+
+def _compute_with_lease(
+    namespace: str, key: str, compute: Callable[[], Any], wait_timeout: float
+) -> Any:
+    """
+    Cross-process half of single-flight (shared backends only).
+
+    The process that claims the backend lease computes; the others poll the
+    shared store for the fresh value while the lease is held, and compute
+    themselves if it is released without a value or <wait_timeout> passes.
+    The in-memory backend always grants the lease, so this is a plain call.
+    """
+    backend = _cache
+    if backend.try_lease(namespace, key, wait_timeout):
+        try:
+            return compute()
+        finally:
+            backend.release_lease(namespace, key)
+
+    backend.bump(namespace, "coalesced")
+    deadline = time.monotonic() + wait_timeout
+    while True:
+        hit, val, stale = backend.lookup(namespace, key, record=False)
+        if hit and not stale:
+            return val
+        if not backend.lease_active(namespace, key):
+            break
+        if time.monotonic() >= deadline:
+            backend.bump(namespace, "flight_timeouts")
+            break
+        time.sleep(_LEASE_POLL_SECONDS)
+    return compute()
+
+
+_REFRESH_WORKERS = 2
+_refresh_pool: Optional[ThreadPoolExecutor] = None
+_refreshing: Set[Tuple[str, str]] = set()
+
+
+def _schedule_refresh(namespace: str, key: str, compute: Callable[[], Any]) -> None:
+    """
+    Recompute a stale key on the background pool, at most once at a time.
+
+    Failures are logged and counted; the stale value keeps being served until
+    its stale window runs out, after which callers compute synchronously.
+    """
+    global _refresh_pool
+    refresh_key = (namespace, key)
+    with _flights_lock:
+        if refresh_key in _refreshing or refresh_key in _flights:
+            return
+        _refreshing.add(refresh_key)
+        if _refresh_pool is None:
+            _refresh_pool = ThreadPoolExecutor(
+                max_workers=_REFRESH_WORKERS, thread_name_prefix="cache-refresh"
+            )
+
+    def run():
+        try:
+            _single_flight(namespace, key, compute, wait_timeout=30.0)
+            _cache.bump(namespace, "refreshes")
+        except Exception as e:
+            _cache.bump(namespace, "refresh_errors")
+            logger.warning(f"Background refresh of {namespace} failed: {e}", exc_info=True)
+        finally:
+            with _flights_lock:
+                _refreshing.discard(refresh_key)
+
+    _refresh_pool.submit(run)
+
+
+# Namespaces whose fn() is running on this thread (innermost last); lets
+# query_log tag the statements a cache miss costs.
+_computing = threading.local()
+
+
+def computing_namespace() -> Optional[str]:
+    """Namespace of the cached function being computed on this thread, if any."""
+    stack = getattr(_computing, "stack", None)
+    return stack[-1] if stack else None
+
+
+def ttl_cache(seconds: int = 60, wait_timeout: float = 30.0, stale_seconds: int = 0):
     """
     Decorator: cache function return value for <seconds>.
-    Cache key = function identity + all positional/keyword arguments.
+    Namespace = function identity; key = all positional/keyword arguments.
+
+    Thread-safety: the store is protected by a lock, and misses are
+    single-flight: when several threads miss the same key at once, one runs
+    fn() and the rest wait for its result (or re-raise its exception).
+    Followers wait at most <wait_timeout> seconds, then compute themselves.
+    Coalesced calls are counted per namespace in cache_stats().
 
-    Thread-safety: the _store dict is protected by a lock. Under concurrent
-    access, two threads that both miss the cache may both call fn() before
-    either writes. The double-check on write prevents stale overwrites, but
-    duplicate executions during the same miss window are possible (best-effort
-    at-most-once-per-TTL, not strict). This is acceptable for the single-worker
-    Flask dev server deployment.
+    stale_seconds > 0 enables stale-while-revalidate: for that long after the
+    TTL runs out the old value is returned immediately and a background
+    worker recomputes it. Only a cold miss (or a value older than
+    seconds + stale_seconds) makes the caller wait.
+
+    The wrapper exposes `cache_namespace` and `cache_clear()` for targeted
+    invalidation.
 
     Usage:
         @ttl_cache(seconds=60)
         def get_kpis() -> dict: ...
 
-        @ttl_cache(seconds=300)
+        @ttl_cache(seconds=300, stale_seconds=900)
         def get_affinity_pairs(days: int = 30, top: int = 15) -> list: ...
     """
     def decorator(fn: Callable) -> Callable:
+        namespace = f"{fn.__module__}.{fn.__qualname__}"
+
         @functools.wraps(fn)
         def wrapper(*args, **kwargs):
-            key = f"{fn.__module__}.{fn.__qualname__}|{args!r}|{sorted(kwargs.items())!r}"
-            now = time.monotonic()
-            with _lock:
-                if key in _store:
-                    ts, val = _store[key]
-                    if now - ts < seconds:
-                        return val
-            result = fn(*args, **kwargs)
-            stored_at = time.monotonic()
-            with _lock:
-                # Double-check: another thread may have already populated the key
-                if key in _store and (stored_at - _store[key][0] < seconds):
-                    return _store[key][1]
-                _store[key] = (stored_at, result)
-            return result
+            key = _make_key(args, kwargs)
+            hit, val, stale = _cache.lookup(namespace, key)
+
+            def compute():
+                # Re-check: a flight that finished just before ours started
+                # has already stored a fresh value.
+                hit, val, stale = _cache.lookup(namespace, key, record=False)
+                if hit and not stale:
+                    return val
+                stack = _computing.__dict__.setdefault("stack", [])
+                stack.append(namespace)
+                try:
+                    result = fn(*args, **kwargs)
+                finally:
+                    stack.pop()
+                _cache.set(namespace, key, result, seconds, stale_seconds)
+                return result
+
+            if hit:
+                if stale:
+                    _schedule_refresh(namespace, key, compute)
+                return val
+            return _single_flight(namespace, key, compute, wait_timeout)
+
+        wrapper.cache_namespace = namespace
+        wrapper.cache_clear = lambda: _cache.clear(namespace)
         return wrapper
     return decorator
 
 
-def clear_cache() -> None:
-    """Flush the entire cache. Useful for testing or manual invalidation."""
-    with _lock:
-        _store.clear()
+def clear_cache(namespace: Optional[str] = None) -> None:
+    """Flush the entire cache, or a single function's namespace."""
+    _cache.clear(namespace)
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Entry/byte totals, evictions and per-namespace hit/miss/coalesced counters."""
+    return _cache.stats()
@@ -53,6 +53,112 @@ MSSQL_DATABASE = os.environ["MSSQL_DATABASE"]
 MSSQL_USERNAME = os.environ["MSSQL_USERNAME"]
 MSSQL_PASSWORD = os.environ["MSSQL_PASSWORD"]
 
+# ---- MSSQL connection pool (optional) ----
+# Max connections open at once (idle + in use); callers beyond it wait.
+MSSQL_POOL_SIZE: int = int(os.getenv("MSSQL_POOL_SIZE") or 8)
+# Seconds a caller waits for a free connection before failing.
+MSSQL_POOL_TIMEOUT: float = float(os.getenv("MSSQL_POOL_TIMEOUT") or 15)
+# Idle connections older than this (seconds) are closed on next checkout.
+MSSQL_POOL_MAX_IDLE: float = float(os.getenv("MSSQL_POOL_MAX_IDLE") or 300)
+# Connections are recycled after this many seconds regardless of use.
+MSSQL_POOL_MAX_LIFETIME: float = float(os.getenv("MSSQL_POOL_MAX_LIFETIME") or 1800)
+
+# ---- Analytics backend (optional) ----
+# Where analytics reads go: "mssql" (the POS), "replica" (POS_REPLICA_PATH)
+# or "standin" (POS_STANDIN_PATH); see pos_backends.py. The default paths of
+# the analytics cache, rollup store and item cube below carry its name, so
+# one backend's data is never served under another.
+ANALYTICS_BACKEND: str = (os.getenv("ANALYTICS_BACKEND") or "mssql").strip().lower()
+
+# ---- Analytics cache (optional) ----
+# LRU bounds for cache_utils: entry count and approximate size of cached values.
+CACHE_MAX_ENTRIES: int = int(os.getenv("CACHE_MAX_ENTRIES") or 2048)
+CACHE_MAX_BYTES: int = int(os.getenv("CACHE_MAX_BYTES") or 128 * 1024 * 1024)
+# Seconds between sweeps of expired entries (run on the next cache write).
+CACHE_PURGE_INTERVAL: float = float(os.getenv("CACHE_PURGE_INTERVAL") or 60)
+# "memory" (per process) or "sqlite" (one file shared by all workers on the box).
+CACHE_BACKEND: str = (os.getenv("CACHE_BACKEND") or "memory").strip().lower()
+CACHE_SQLITE_PATH: str = os.getenv("CACHE_SQLITE_PATH") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "instance", f"analytics_cache.{ANALYTICS_BACKEND}.sqlite3"
+)
+# ITEMS / SUBGROUPS / ITEM_BARCODE kept in memory by dimensions.py: full reload
+# interval, and how often their checksum is polled for changes (seconds).
+DIMENSIONS_TTL_SECONDS: float = float(os.getenv("DIMENSIONS_TTL_SECONDS") or 300)
+DIMENSIONS_CHECK_SECONDS: float = float(os.getenv("DIMENSIONS_CHECK_SECONDS") or 30)
+
+# ---- Dashboard bundles (optional) ----
+# Widgets of /api/intelligence/bundle run concurrently on this many threads,
+# each on its own pooled connection (keep it below MSSQL_POOL_SIZE).
+# 1 = run them one after another over a single shared connection.
+INTEL_BUNDLE_WORKERS: int = int(os.getenv("INTEL_BUNDLE_WORKERS") or 4)
+# Seconds a widget may run before the bundle reports it as timed out.
+INTEL_WIDGET_TIMEOUT: float = float(os.getenv("INTEL_WIDGET_TIMEOUT") or 20)
+
+# ---- Daily rollup store (optional) ----
+# Local SQLite file holding closed-day aggregates of HISTORIC_RECEIPT.
+ROLLUP_SQLITE_PATH: str = os.getenv("ROLLUP_SQLITE_PATH") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "instance", f"daily_rollup.{ANALYTICS_BACKEND}.sqlite3"
+)
+# Closed days younger than this stay live (receipts may still be archiving).
+# Also applies to the item cube below.
+ROLLUP_SETTLE_DAYS: int = int(os.getenv("ROLLUP_SETTLE_DAYS") or 1)
+# Directory of per-day item cube partitions (.npz) used by item-level reports.
+ITEM_CUBE_DIR: str = os.getenv("ITEM_CUBE_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "instance", f"item_cube.{ANALYTICS_BACKEND}"
+)
+
+# ---- Columnar POS export (optional) ----
+# Date-partitioned copy of receipt headers/lines written by pos_export.py.
+POS_EXPORT_DIR: str = os.getenv("POS_EXPORT_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "instance", "pos_export"
+)
+# "parquet" or "arrow" (Arrow IPC).
+POS_EXPORT_FORMAT: str = (os.getenv("POS_EXPORT_FORMAT") or "parquet").strip().lower()
+# Rows fetched per round-trip and written per row group.
+POS_EXPORT_CHUNK_ROWS: int = int(os.getenv("POS_EXPORT_CHUNK_ROWS") or 50000)
+
+# ---- Local POS replica (optional) ----
+# SQLite mirror of the POS history kept current by pos_sync.py.
+POS_REPLICA_PATH: str = os.getenv("POS_REPLICA_PATH") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "instance", "pos_replica.sqlite3"
+)
+# Seconds between in-process sync passes; 0 disables the in-process daemon
+# (run `python pos_sync.py` as its own process instead).
+POS_SYNC_INTERVAL: float = float(os.getenv("POS_SYNC_INTERVAL") or 0)
+# Receipts copied per round-trip.
+POS_SYNC_BATCH_ROWS: int = int(os.getenv("POS_SYNC_BATCH_ROWS") or 5000)
+# Synthetic POS database written by pos_synth.py (benchmarks, offline dev).
+POS_STANDIN_PATH: str = os.getenv("POS_STANDIN_PATH") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "instance", "pos_standin.sqlite3"
+)
+
+# ---- Realtime tab (optional) ----
+# Serve the open business day from in-memory running totals fed by RCPT_ID
+# deltas (realtime_aggregator.py); "0" re-aggregates dbo.RECEIPT per request.
+REALTIME_AGGREGATOR: bool = (os.getenv("REALTIME_AGGREGATOR") or "1").strip().lower() not in ("0", "false", "no")
+# Minimum seconds between delta polls of dbo.RECEIPT.
+REALTIME_POLL_SECONDS: float = float(os.getenv("REALTIME_POLL_SECONDS") or 2)
+# /api/realtime/stream: seconds between the shared poller's snapshots, and
+# between keep-alive comments on an idle stream.
+REALTIME_STREAM_INTERVAL: float = float(os.getenv("REALTIME_STREAM_INTERVAL") or 3)
+REALTIME_STREAM_HEARTBEAT: float = float(os.getenv("REALTIME_STREAM_HEARTBEAT") or 15)
+# Closed receipts' details (header + lines) kept in memory by RCPT_ID.
+RECEIPT_DETAIL_CACHE_SIZE: int = int(os.getenv("RECEIPT_DETAIL_CACHE_SIZE") or 5000)
+
+# ---- Instrumentation (optional) ----
+# Record every POS statement (helper, timings, rows) in query_log; "0" disables.
+QUERY_LOG_ENABLED: bool = (os.getenv("QUERY_LOG_ENABLED") or "1").strip().lower() not in ("0", "false", "no")
+# Statements kept in the in-memory ring buffer behind /api/admin/queries.
+QUERY_LOG_SIZE: int = int(os.getenv("QUERY_LOG_SIZE") or 2000)
+# Statements at or above this many milliseconds go to the slow-query log; 0 = never.
+QUERY_SLOW_MS: float = float(os.getenv("QUERY_SLOW_MS") or 1000)
+QUERY_SLOW_LOG_PATH: str = os.getenv("QUERY_SLOW_LOG_PATH") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "instance", "slow_queries.log"
+)
+# Serve /metrics (request_timing, Prometheus text) without logging in, for a
+# scraper on the local network. Off by default: it names every endpoint.
+METRICS_PUBLIC: bool = (os.getenv("METRICS_PUBLIC") or "0").strip().lower() in ("1", "true", "yes")
+
 # ---- Flask ----
 SECRET_KEY = os.environ["SECRET_KEY"]
 APP_USERNAME = os.environ["APP_USERNAME"]
@@ -28,3 +28,32 @@ _DUMMY_ENV = {
 
 for key, value in _DUMMY_ENV.items():
     os.environ.setdefault(key, value)
+
+
+import importlib.util
+import sys
+
+import pytest
+
+_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def _load_root_module(name, relpath):
+    """
+    Load <relpath> (e.g. "routes/admin.py") from the repo root as module <name>.
+
+    In the full run "config" and "routes" may already resolve to server/'s
+    copies, so root modules are loaded by path. The module is registered in
+    sys.modules (@dataclass and pickling look it up there).
+    """
+    spec = importlib.util.spec_from_file_location(name, os.path.join(_ROOT, *relpath.split("/")))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(scope="session")
+def load_root_module():
+    """load_root_module(name, relpath) -> a fresh module loaded by path from the repo root."""
+    return _load_root_module
@@ -0,0 +1,270 @@
+"""
+Bounded, thread-safe connection pool for the POS MSSQL database.
+
+Every analytics helper used to open a fresh pyodbc connection (full encrypted
+TLS login) per query and close it right after. Loading the Intelligence page
+alone fired 13 logins. The pool keeps a small set of warm connections and
+hands them out through a context manager, so callers keep the exact
+`with _connect() as cn:` contract.
+
+Behaviour:
+  - At most <max_size> connections exist at any time (idle + checked out).
+    Callers beyond that wait up to <timeout> seconds, then get PoolTimeout.
+  - On checkout, idle connections are recycled if they sat idle longer than
+    <max_idle> seconds or have lived longer than <max_lifetime> seconds, and
+    every reused connection is health-checked with a cheap `SELECT 1`.
+  - A connection whose caller raised is discarded instead of being returned:
+    its session state (open transaction, broken link) cannot be trusted.
+  - session(conn) is a dict that lives as long as the physical connection,
+    for callers that set up per-session objects (temp tables) once and
+    reuse them on later checkouts. <on_checkout>(conn, session), when given,
+    runs on every checkout before the caller gets the connection, so that
+    setup never happens in the middle of a caller's transaction.
+
+The pool knows nothing about pyodbc: it is given a zero-argument factory that
+returns a DB-API connection. That keeps it testable without a driver.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+class PoolTimeout(RuntimeError):
+    """Raised when no connection frees up within the pool timeout."""
+
+
+@dataclass
+class _Pooled:
+    """A physical connection plus the bookkeeping the pool needs."""
+    conn: Any
+    created_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+    session: Dict[str, Any] = field(default_factory=dict)
+
+
+class ConnectionPool:
+    """
+    LIFO pool of DB-API connections.
+
+    LIFO keeps the most recently used connections hot and lets the tail age
+    out through <max_idle> when traffic drops.
+
+    Usage:
+        pool = ConnectionPool(lambda: pyodbc.connect(conn_str), max_size=8)
+        with pool.connection() as conn:
+            conn.cursor().execute("SELECT 1")
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        max_size: int = 8,
+        timeout: float = 15.0,
+        max_idle: float = 300.0,
+        max_lifetime: float = 1800.0,
+        health_check_sql: str = "SELECT 1",
+        on_checkout: Optional[Callable[[Any, Dict[str, Any]], None]] = None,
+    ) -> None:
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+        self._factory = factory
+        self.max_size = int(max_size)
+        self.timeout = float(timeout)
+        self.max_idle = float(max_idle)
+        self.max_lifetime = float(max_lifetime)
+        self._health_check_sql = health_check_sql
+        self._on_checkout = on_checkout
+
+        self._cond = threading.Condition(threading.Lock())
+        self._idle: List[_Pooled] = []
+        self._open = 0  # idle + checked out
+        self._in_use: Dict[int, _Pooled] = {}  # id(conn) -> checked-out entry
+        self._closed = False
+
+        # Counters exposed through stats()
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._creations = 0
+        self._recycled = 0
+        self._health_failures = 0
+        self._discarded = 0
+
+    # ---------- checkout / return ----------
+    def acquire(self) -> _Pooled:
+        """Check out a healthy connection, creating one if the pool has room."""
+        deadline = time.monotonic() + self.timeout
+        waited = False
+        while True:
+            stale: List[_Pooled] = []
+            candidate = None
+            create = False
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed.")
+                while candidate is None and not create:
+                    now = time.monotonic()
+                    while self._idle:
+                        pooled = self._idle.pop()
+                        if self._expired(pooled, now):
+                            self._open -= 1
+                            self._recycled += 1
+                            stale.append(pooled)
+                            continue
+                        candidate = pooled
+                        break
+                    if candidate is not None:
+                        break
+                    if self._open < self.max_size:
+                        self._open += 1
+                        create = True
+                        break
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f"No MSSQL connection available within {self.timeout:.1f}s "
+                            f"(pool size {self.max_size})."
+                        )
+                    if not waited:
+                        self._waits += 1
+                        waited = True
+                    self._cond.wait(remaining)
+                if stale:
+                    self._cond.notify(len(stale))
+
+            # Network work happens outside the lock.
+            for pooled in stale:
+                self._close_quietly(pooled.conn)
+
+            if create:
+                try:
+                    conn = self._factory()
+                except BaseException:
+                    with self._cond:
+                        self._open -= 1
+                        self._cond.notify()
+                    raise
+                pooled = _Pooled(conn)
+                with self._cond:
+                    self._creations += 1
+                    self._checkouts += 1
+                    self._in_use[id(conn)] = pooled
+                return pooled
+
+            if self._healthy(candidate.conn):
+                with self._cond:
+                    self._checkouts += 1
+                    self._in_use[id(candidate.conn)] = candidate
+                candidate.last_used = time.monotonic()
+                return candidate
+
+            # Dead connection: drop it and try again (counts against nothing).
+            with self._cond:
+                self._open -= 1
+                self._health_failures += 1
+                self._cond.notify()
+            self._close_quietly(candidate.conn)
+
+    def release(self, pooled: _Pooled, discard: bool = False) -> None:
+        """Return a connection to the pool, or close it when <discard> is set."""
+        now = time.monotonic()
+        with self._cond:
+            self._in_use.pop(id(pooled.conn), None)
+            keep = (
+                not discard
+                and not self._closed
+                and now - pooled.created_at < self.max_lifetime
+            )
+            if keep:
+                pooled.last_used = now
+                self._idle.append(pooled)
+            else:
+                self._open -= 1
+                if discard:
+                    self._discarded += 1
+                else:
+                    self._recycled += 1
+            self._cond.notify()
+        if not keep:
+            self._close_quietly(pooled.conn)
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        """Context manager: check out, yield the raw connection, give it back."""
+        pooled = self.acquire()
+        try:
+            if self._on_checkout is not None:
+                self._on_checkout(pooled.conn, pooled.session)
+            yield pooled.conn
+        except BaseException:
+            self.release(pooled, discard=True)
+            raise
+        else:
+            self.release(pooled)
+
+    def session(self, conn: Any) -> Dict[str, Any]:
+        """
+        State kept with a checked-out connection for its whole life; gone when
+        the connection is closed or discarded. An unknown <conn> gets a fresh
+        dict that nothing keeps.
+        """
+        with self._cond:
+            pooled = self._in_use.get(id(conn))
+        return pooled.session if pooled is not None else {}
+
+    # ---------- maintenance ----------
+    def close_all(self) -> None:
+        """Close idle connections and refuse new checkouts (shutdown/tests)."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for pooled in idle:
+            self._close_quietly(pooled.conn)
+
+    def stats(self) -> Dict[str, int]:
+        """Snapshot of pool counters (safe to jsonify)."""
+        with self._cond:
+            return {
+                "max_size": self.max_size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._open - len(self._idle),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "timeouts": self._timeouts,
+                "creations": self._creations,
+                "recycled": self._recycled,
+                "health_failures": self._health_failures,
+                "discarded": self._discarded,
+            }
+
+    # ---------- internals ----------
+    def _expired(self, pooled: _Pooled, now: float) -> bool:
+        return (
+            now - pooled.last_used >= self.max_idle
+            or now - pooled.created_at >= self.max_lifetime
+        )
+
+    def _healthy(self, conn: Any) -> bool:
+        try:
+            cur = conn.cursor()
+            cur.execute(self._health_check_sql)
+            cur.fetchall()
+            cur.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn: Any) -> None:
+        try:
+            conn.close()
+        except Exception:
+            pass
@@ -0,0 +1,258 @@
+# dimensions.py
+"""
+Process-wide ITEMS / SUBGROUPS / ITEM_BARCODE dimension cache.
+
+ITEMS.ITM_SUBGROUP holds either a SUBGROUPS id or a subgroup name, so the
+helpers resolved it in SQL on every query. That took a CROSS APPLY with a
+digits-only test and two SUBGROUPS joins, or a TRY_CAST ... OR join. Now the
+three small tables are loaded once and each item's labels are resolved here.
+Fact queries return bare ITM_CODEs and attach labels in Python.
+
+A subgroup is resolved the way the CROSS APPLY did it: a digits-only
+ITM_SUBGROUP is looked up by SubGrp_ID, then the trimmed text by
+SubGrp_Name (case-insensitive, like the POS collation). If neither matches,
+the raw text is the label, else 'Unknown'. Every item gets exactly one
+label.
+
+DimensionCache reloads after <ttl> seconds. At most every <check_interval>
+seconds it also compares a CHECKSUM_AGG of the three tables and reloads
+when they changed. Item edits call invalidate(). A caller already holding
+an analytics connection passes it to get(cn), so a check never takes a
+second connection from the pool.
+"""
+from __future__ import annotations
+
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+_DIGITS = re.compile(r"[0-9]+")
+
+CHECKSUM_SQL = """
+    SET NOCOUNT ON;
+    SELECT
+      (SELECT COUNT(*) FROM dbo.ITEMS) AS items_n,
+      (SELECT CHECKSUM_AGG(BINARY_CHECKSUM(ITM_CODE, ITM_TITLE, ITM_SUBGROUP)) FROM dbo.ITEMS) AS items_ck,
+      (SELECT COUNT(*) FROM dbo.SUBGROUPS) AS subgroups_n,
+      (SELECT CHECKSUM_AGG(BINARY_CHECKSUM(SubGrp_ID, SubGrp_Name)) FROM dbo.SUBGROUPS) AS subgroups_ck,
+      (SELECT COUNT(*) FROM dbo.ITEM_BARCODE) AS barcodes_n,
+      (SELECT CHECKSUM_AGG(BINARY_CHECKSUM(ITM_CODE, ITM_BARCODE, ITM_PRICE)) FROM dbo.ITEM_BARCODE) AS barcodes_ck;
+"""
+
+
+@dataclass(frozen=True)
+class Item:
+    code: str
+    title: str                    # trimmed ITM_TITLE, or the code when blank
+    subgroup_raw: str             # trimmed ITM_SUBGROUP ('' when blank)
+    subgroup_id: Optional[int]    # resolved SubGrp_ID (None when unresolved)
+    subgroup: str                 # resolved label (see module docstring)
+    barcode: Optional[str]        # lowest ITM_BARCODE
+    price: Optional[float]        # highest ITEM_BARCODE.ITM_PRICE
+
+
+def _trim(value) -> str:
+    # LTRIM(RTRIM(...)) only strips spaces
+    return str(value).strip(" ") if value is not None else ""
+
+
+def resolve_subgroup(
+    raw, by_id: Dict[int, str], by_name: Dict[str, int]
+) -> Tuple[Optional[int], str]:
+    """(SubGrp_ID, label) for an ITM_SUBGROUP value; <by_name> is keyed by casefolded trimmed name."""
+    text = _trim(raw)
+    if not text:
+        return None, "Unknown"
+    if _DIGITS.fullmatch(str(raw)) and int(raw) in by_id:
+        return int(raw), by_id[int(raw)]
+    sid = by_name.get(text.casefold())
+    if sid is not None:
+        return sid, by_id[sid]
+    return None, text
+
+
+class Dimensions:
+    """One loaded snapshot; never mutated after load()."""
+
+    def __init__(self, items: Dict[str, Item], subgroups: Dict[int, str], checksum: tuple = ()) -> None:
+        self.items = items
+        self.subgroups = subgroups
+        self.checksum = checksum
+        self._labels: Optional[Dict[str, Dict[str, str]]] = None
+
+    def get(self, code) -> Optional[Item]:
+        return self.items.get(_trim(code)) if code is not None else None
+
+    def title(self, code, missing: Optional[str] = None) -> str:
+        """Item title; <missing> (default: the code itself) when the code is not in ITEMS."""
+        item = self.get(code)
+        if item is not None:
+            return item.title
+        return missing if missing is not None else _trim(code)
+
+    def subgroup(self, code) -> str:
+        item = self.get(code)
+        return item.subgroup if item is not None else "Unknown"
+
+    def labels(self) -> Dict[str, Dict[str, str]]:
+        """{code: {"title", "subgroup_raw", "subgroup_label"}} for the cube-based reports."""
+        if self._labels is None:
+            self._labels = {
+                code: {"title": it.title, "subgroup_raw": it.subgroup_raw, "subgroup_label": it.subgroup}
+                for code, it in self.items.items()
+            }
+        return self._labels
+
+
+def checksum(cn) -> tuple:
+    cur = cn.cursor()
+    cur.execute(CHECKSUM_SQL)
+    return tuple(cur.fetchone())
+
+
+def load(cn, checksum_value: tuple = ()) -> Dimensions:
+    """Read ITEMS, SUBGROUPS and ITEM_BARCODE and resolve every item's labels."""
+    cur = cn.cursor()
+    cur.execute("SELECT SubGrp_ID, SubGrp_Name FROM dbo.SUBGROUPS ORDER BY SubGrp_ID;")
+    by_id: Dict[int, str] = {}
+    by_name: Dict[str, int] = {}
+    for r in cur.fetchall():
+        if r.SubGrp_ID is None:
+            continue
+        name = _trim(r.SubGrp_Name)
+        by_id[int(r.SubGrp_ID)] = name
+        if name:
+            by_name.setdefault(name.casefold(), int(r.SubGrp_ID))
+
+    cur.execute("""
+        SELECT CAST(ITM_CODE AS nvarchar(50)) AS item_code,
+               MIN(ITM_BARCODE) AS barcode, MAX(CAST(ITM_PRICE AS float)) AS price
+        FROM dbo.ITEM_BARCODE
+        GROUP BY ITM_CODE;
+    """)
+    barcodes = {_trim(r.item_code): (r.barcode, r.price) for r in cur.fetchall()}
+
+    cur.execute("""
+        SELECT CAST(ITM_CODE AS nvarchar(50)) AS item_code, ITM_TITLE, ITM_SUBGROUP
+        FROM dbo.ITEMS;
+    """)
+    items: Dict[str, Item] = {}
+    for r in cur.fetchall():
+        code = _trim(r.item_code)
+        sid, label = resolve_subgroup(r.ITM_SUBGROUP, by_id, by_name)
+        barcode, price = barcodes.get(code, (None, None))
+        items[code] = Item(
+            code=code,
+            title=_trim(r.ITM_TITLE) or code,
+            subgroup_raw=_trim(r.ITM_SUBGROUP),
+            subgroup_id=sid,
+            subgroup=label,
+            barcode=str(barcode) if barcode is not None else None,
+            price=float(price) if price is not None else None,
+        )
+    return Dimensions(items, by_id, checksum_value)
+
+
+class DimensionCache:
+    """
+    The current Dimensions, reloaded after <ttl> seconds or when the
+    tables' checksum (polled every <check_interval> seconds) changes.
+    """
+
+    def __init__(
+        self,
+        connect: Callable,
+        ttl: float = 300.0,
+        check_interval: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._connect = connect
+        self.ttl = float(ttl)
+        self.check_interval = float(check_interval)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._dims: Optional[Dimensions] = None
+        self._loaded = self._checked = 0.0
+        self._refreshing = False
+        self.loads = 0
+
+    def get(self, cn=None) -> Dimensions:
+        """
+        The current Dimensions. A due check or reload runs on <cn> when the
+        caller already holds a connection, else on one from connect(). The
+        lock is never held across a checkout or a query: while one caller
+        refreshes, the others keep the snapshot they have.
+        """
+        now = self._clock()
+        with self._lock:
+            dims = self._dims
+            due = (dims is None or now - self._loaded >= self.ttl
+                   or now - self._checked >= self.check_interval)
+            if not due or (dims is not None and self._refreshing):
+                return dims
+            claimed = dims is not None
+            self._refreshing = self._refreshing or claimed
+        try:
+            if cn is not None:
+                return self._refresh(cn, dims, now)
+            with self._connect() as own:
+                return self._refresh(own, dims, now)
+        finally:
+            if claimed:
+                with self._lock:
+                    self._refreshing = False
+
+    def _refresh(self, cn, dims: Optional[Dimensions], now: float) -> Dimensions:
+        with self._lock:
+            if self._dims is not dims and self._dims is not None:
+                return self._dims  # replaced meanwhile (e.g. on the connection's checkout)
+        current = checksum(cn)
+        if dims is not None and now - self._loaded < self.ttl and current == dims.checksum:
+            with self._lock:
+                self._checked = now
+            return dims
+        fresh = load(cn, current)
+        with self._lock:
+            self._dims = fresh
+            self._loaded = self._checked = now
+            self.loads += 1
+        return fresh
+
+    def invalidate(self) -> None:
+        """Reload on the next get()."""
+        with self._lock:
+            self._dims = None
+
+
+_cache: Optional[DimensionCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> DimensionCache:
+    """Process-wide cache over the analytics _connect()."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                import config
+                from helpers_intelligence import _connect
+
+                _cache = DimensionCache(
+                    _connect,
+                    ttl=config.DIMENSIONS_TTL_SECONDS,
+                    check_interval=config.DIMENSIONS_CHECK_SECONDS,
+                )
+    return _cache
+
+
+def get(cn=None) -> Dimensions:
+    """The process-wide Dimensions; pass <cn> when holding an analytics connection."""
+    return get_cache().get(cn)
+
+
+def invalidate() -> None:
+    """Reload on next use, e.g. after an item's title or subgroup changed."""
+    if _cache is not None:
+        _cache.invalidate()
@@ -2,12 +2,23 @@
 # Receipt-centric analytics for the Intelligence dashboard
 # Business day window: starts 07:00, ends next day 05:00 (safe for late EOD)
 
-import pyodbc
+import threading
+import time
 from contextlib import contextmanager
 from datetime import datetime, timedelta, date
-from typing import Any, Dict, List, Tuple, Optional
-from pos_dates import cutoff_dt_7h
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from pos_dates import cutoff_dt_7h, biz_window_7h, biz_date_7h, parse_date
 from cache_utils import ttl_cache
+from db_pool import ConnectionPool
+import pos_backends
+import baskets
+import dimensions
+import query_log
+import receipt_details
+from rollups import daily_rows as rollup_rows, get_store as rollup_store, open_business_day
+from item_cube import get_cube, from_ts
+from reorder_scoring import WINDOW_DAYS as REORDER_WINDOW_DAYS, qty_matrix, score_items
+import numpy as np
 
 # NOTE: assumes you already have _connect() defined in helpers_intelligence.py
 
@@ -28,24 +39,121 @@ def _conn_str() -> str:
     )
 
 
+def _new_pos_connection():
+    # pyodbc is imported lazily so modules that only need the helpers' pure
+    # logic (tests, tooling) do not require the ODBC driver manager.
+    import pyodbc
+    return pyodbc.connect(_conn_str())
+
+
+pos_backends.register_backend("mssql", lambda cfg: _new_pos_connection())
+
+
+def _new_connection():
+    """
+    Connection for analytics reads from the ANALYTICS_BACKEND backend: the
+    POS itself, the pos_sync.py replica or the pos_synth.py stand-in (see
+    pos_backends). All of them take the helpers' T-SQL unchanged.
+    """
+    return pos_backends.get_backend(config.ANALYTICS_BACKEND).connect(config)
+
+
+_pool: Optional[ConnectionPool] = None
+_pos_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def _build_pool(factory, on_checkout=None) -> ConnectionPool:
+    return ConnectionPool(
+        factory,
+        max_size=config.MSSQL_POOL_SIZE,
+        timeout=config.MSSQL_POOL_TIMEOUT,
+        max_idle=config.MSSQL_POOL_MAX_IDLE,
+        max_lifetime=config.MSSQL_POOL_MAX_LIFETIME,
+        on_checkout=on_checkout,
+    )
+
+
+def _get_pool() -> ConnectionPool:
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = _build_pool(_new_connection, on_checkout=_ensure_item_subgroups)
+    return _pool
+
+
+def _get_pos_pool() -> ConnectionPool:
+    # Same pool as the analytics reads unless their backend is read-only
+    # history (the replica); then a pool of its own to MSSQL.
+    global _pos_pool
+    if pos_backends.get_backend(config.ANALYTICS_BACKEND).full_pos:
+        return _get_pool()
+    if _pos_pool is None:
+        with _pool_lock:
+            if _pos_pool is None:
+                _pos_pool = _build_pool(_new_pos_connection)
+    return _pos_pool
+
+
+def pool_stats() -> Dict:
+    """Connection pool counters (checkouts, waits, creations, ...)."""
+    return _get_pool().stats()
+
+
+# Per-thread state of an active _shared_scope(): the connection, the memoized
+# MaxBizDate and the first BizDate materialized into #Rcpt.
+_scope = threading.local()
+
+
 @contextmanager
 def _connect():
-    conn = pyodbc.connect(_conn_str())
-    try:
-        yield conn
-    except Exception:
-        conn.rollback()
-        raise
-    else:
-        conn.commit()
-    finally:
-        conn.close()
+    """
+    Check out a pooled MSSQL connection.
+    Commits on success, rolls back on error; the pool discards connections
+    whose caller raised. Statements run on it are recorded by query_log.
+    Inside _shared_scope() the scope's connection is handed out instead, so
+    a batch of helpers shares one session.
+    """
+    shared = getattr(_scope, "cn", None)
+    if shared is not None:
+        yield shared
+        return
+    started = time.perf_counter()
+    with _get_pool().connection() as raw, query_log.track(raw, started) as conn:
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
+
+
+@contextmanager
+def _connect_pos():
+    """
+    Check out a pooled connection to the POS itself (or the stand-in), even
+    when analytics read the replica. Used for writes (item edits), open-day
+    reads and by the replica sync.
+    """
+    started = time.perf_counter()
+    with _get_pos_pool().connection() as raw, query_log.track(raw, started) as conn:
+        try:
+            yield conn
+        except Exception:
+            conn.rollback()
+            raise
+        else:
+            conn.commit()
 
 
 def execute_sql_readonly(sql_query: str):
     """
-    Executes a safe read-only SQL query on the POS database.
-    Returns rows as list[dict].
+    Executes a safe read-only SQL query on the analytics backend.
+    Returns rows as list[dict]. Like every analytics read (see
+    mssql_readonly_query) it goes to ANALYTICS_BACKEND; on the replica or
+    stand-in, T-SQL that tsql_sqlite cannot translate raises.
     """
     query = sql_query.strip().lower()
     if not query.startswith("select"):
@@ -63,7 +171,8 @@ def execute_sql_readonly(sql_query: str):
 
 def mssql_readonly_query(sql_query: str, params: Optional[dict] = None):
     """
-    Alias used by analytics pages (Reorder Radar, etc.).
+    Alias used by analytics pages (Reorder Radar, etc.). Runs on the
+    analytics backend, like execute_sql_readonly.
 
     IMPORTANT:
     - Read-only enforced (SELECT-only)
@@ -88,6 +197,38 @@ def mssql_readonly_query(sql_query: str, params: Optional[dict] = None):
         rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
     return rows
 
+
+def mssql_readonly_stream(sql_query: str, params: Optional[Sequence] = None, batch_size: int = 1000):
+    """
+    Streaming variant of mssql_readonly_query for exports.
+
+    Yields the column names first, then every row as a tuple, reading the
+    cursor with fetchmany(<batch_size>) so memory stays flat regardless of
+    the result size. The pooled connection is held until the generator is
+    exhausted or closed (e.g. the client aborts a download).
+    """
+    normalized = sql_query.strip().lower()
+
+    if not normalized.startswith("select") and not normalized.startswith("with"):
+        raise ValueError("Only SELECT/CTE (WITH...) statements are allowed.")
+
+    if ";" in normalized[:-1]:
+        raise ValueError("Multiple statements detected; query rejected.")
+
+    with _connect() as conn:
+        cursor = conn.cursor()
+        if params:
+            cursor.execute(sql_query, tuple(params))
+        else:
+            cursor.execute(sql_query)
+        yield [col[0] for col in cursor.description]
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            for row in batch:
+                yield tuple(row)
+
 # ---------- Time window helpers ----------
 def _last_business_window(cur) -> Optional[Tuple[datetime, datetime, datetime]]:
     """
@@ -96,25 +237,188 @@ def _last_business_window(cur) -> Optional[Tuple[datetime, datetime, datetime]]:
       end    = BusinessDate + 1 day @ 05:00  (exclusive)
       bdate  = BusinessDate (date at 07:00 boundary)
 
-    BusinessDate is derived from MAX(RCPT_DATE) using a -7h shift.
+    BusinessDate is the data-anchored MaxBizDate (see _max_biz_date).
     """
-    cur.execute("""
-        SET NOCOUNT ON;
+    bdate = _max_biz_date(cur)
+    if bdate is None:
+        return None
+    start = datetime(bdate.year, bdate.month, bdate.day, 7)
+    return (start, start + timedelta(hours=22), datetime(bdate.year, bdate.month, bdate.day))
 
-        WITH X AS (
-          SELECT CAST(DATEADD(HOUR,-7, MAX(RCPT_DATE)) AS date) AS BizDate
-          FROM dbo.HISTORIC_RECEIPT
-        )
-        SELECT
-          CAST(DATEADD(HOUR, 7, CAST(BizDate AS datetime2)) AS datetime2) AS WinStart,
-          CAST(DATEADD(HOUR, 5, DATEADD(DAY, 1, CAST(BizDate AS datetime2))) AS datetime2) AS WinEnd,
-          CAST(BizDate AS datetime2) AS BizDate
-        FROM X;
-    """)
+
+# ---------- Sargable BizDate windows ----------
+# Every BizDate filter is turned into RCPT_DATE >= ? AND RCPT_DATE < ? bounds
+# (pos_dates.biz_window_7h) so SQL Server can seek the RCPT_DATE index instead
+# of evaluating CAST(DATEADD(HOUR,-7,RCPT_DATE) AS date) on every row.
+def _max_biz_date(cur) -> Optional[date]:
+    """
+    Latest BizDate with receipts: a single MAX(RCPT_DATE) index seek
+    (looked up once per _shared_scope).
+    """
+    if "max_biz" in _scope.__dict__:
+        return _scope.max_biz
+    cur.execute("SET NOCOUNT ON; SELECT MAX(r.RCPT_DATE) AS max_dt FROM dbo.HISTORIC_RECEIPT r;")
+    row = cur.fetchone()
+    max_biz = biz_date_7h(row.max_dt) if row and row.max_dt is not None else None
+    if getattr(_scope, "cn", None) is not None:
+        _scope.max_biz = max_biz
+    return max_biz
+
+
+def _min_biz_date(cur) -> Optional[date]:
+    """Earliest BizDate with receipts: a single MIN(RCPT_DATE) index seek."""
+    cur.execute("SET NOCOUNT ON; SELECT MIN(r.RCPT_DATE) AS min_dt FROM dbo.HISTORIC_RECEIPT r;")
     row = cur.fetchone()
-    if not row or row.WinStart is None:
+    if not row or row.min_dt is None:
+        return None
+    return biz_date_7h(row.min_dt)
+
+
+def _trailing_window(cur, days: int) -> Optional[Tuple[datetime, datetime, date]]:
+    """
+    RCPT_DATE bounds of the last <days> BizDates ending at the data's MaxBizDate.
+    Returns (start, end, max_biz_date), or None when there are no receipts.
+    """
+    max_biz = _max_biz_date(cur)
+    if max_biz is None:
+        return None
+    start, end = biz_window_7h(max_biz - timedelta(days=max(1, days) - 1), max_biz)
+    return start, end, max_biz
+
+
+def _range_window(cur, start_date=None, end_date=None) -> Optional[Tuple[datetime, datetime]]:
+    """
+    RCPT_DATE bounds for BizDates start_date..end_date (inclusive).
+    A blank start means the first BizDate with data, a blank end the last one.
+    Returns None when a bound is blank and there are no receipts.
+    """
+    first, last = parse_date(start_date), parse_date(end_date)
+    if first is None:
+        first = _min_biz_date(cur)
+    if last is None:
+        last = _max_biz_date(cur)
+    if first is None or last is None:
+        return None
+    return biz_window_7h(first, last)
+
+
+# ---------- Shared dashboard scope ----------
+# Receipt relation the widget queries select from (RCPT_ID, RCPT_DATE,
+# RCPT_AMOUNT, BizDate, BizHour); params: RCPT_DATE bounds.
+_RECEIPTS_SQL = """(
+              SELECT
+                r.RCPT_ID,
+                r.RCPT_DATE,
+                r.RCPT_AMOUNT,
+                CAST(DATEADD(HOUR,-7, r.RCPT_DATE) AS date)   AS BizDate,
+                DATEPART(HOUR, DATEADD(HOUR,-7, r.RCPT_DATE)) AS BizHour
+              FROM dbo.HISTORIC_RECEIPT r
+              WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ?
+            )"""
+
+
+@contextmanager
+def _shared_scope(materialize_days: int = 0):
+    """
+    Run several helpers over ONE pooled connection.
+
+    Inside the block _connect() yields the same connection, MaxBizDate is
+    looked up once, and the first widget that needs receipts copies the last
+    <materialize_days> BizDates into a #Rcpt temp table that later widgets
+    filter instead of re-reading HISTORIC_RECEIPT. Nested scopes reuse the
+    outer one.
+    """
+    if getattr(_scope, "cn", None) is not None:
+        yield
+        return
+    with _connect() as cn:
+        _scope.cn = cn
+        _scope.materialize_days = max(0, int(materialize_days or 0))
+        try:
+            yield
+            if getattr(_scope, "rcpt_first", None) is not None:
+                # Pooled sessions outlive the request: drop the temp table.
+                # (On error the pool discards the session, temp table included.)
+                cn.cursor().execute("IF OBJECT_ID('tempdb..#Rcpt') IS NOT NULL DROP TABLE #Rcpt;")
+        finally:
+            _scope.__dict__.clear()
+
+
+def _materialize_receipts(cur, max_biz: date) -> Optional[date]:
+    """Copy the scope's receipt window into #Rcpt once; returns its first BizDate."""
+    if not getattr(_scope, "materialize_days", 0):
+        return None
+    first = getattr(_scope, "rcpt_first", None)
+    if first is None:
+        first = max_biz - timedelta(days=_scope.materialize_days - 1)
+        cur.execute("""
+            SET NOCOUNT ON;
+            IF OBJECT_ID('tempdb..#Rcpt') IS NOT NULL DROP TABLE #Rcpt;
+            SELECT R.RCPT_ID, R.RCPT_DATE, R.RCPT_AMOUNT, R.BizDate, R.BizHour
+            INTO #Rcpt
+            FROM """ + _RECEIPTS_SQL + """ AS R;
+            CREATE CLUSTERED INDEX IX_Rcpt_BizDate ON #Rcpt (BizDate, RCPT_ID);
+        """, biz_window_7h(first, max_biz))
+        _scope.rcpt_first = first
+    return first
+
+
+def _receipt_window(cur, days: int) -> Optional[Tuple[str, list]]:
+    """
+    Receipts of the last <days> BizDates ending at MaxBizDate, as
+    (relation_sql, params) to splice into a widget query. Reads #Rcpt when
+    the active scope has materialized it, HISTORIC_RECEIPT otherwise.
+    Returns None when there are no receipts.
+    """
+    max_biz = _max_biz_date(cur)
+    if max_biz is None:
         return None
-    return (row.WinStart, row.WinEnd, row.BizDate)
+    first = max_biz - timedelta(days=max(1, days) - 1)
+    rcpt_first = _materialize_receipts(cur, max_biz)
+    if rcpt_first is not None and first >= rcpt_first:
+        return "(SELECT * FROM #Rcpt WHERE BizDate >= ?)", [first]
+    return _RECEIPTS_SQL, list(biz_window_7h(first, max_biz))
+
+
+# ---------- Resolved subgroups per session ----------
+_ITEM_SUBGROUP_DDL = """
+    SET NOCOUNT ON;
+    IF OBJECT_ID('tempdb..#ItemSubgroup') IS NOT NULL DROP TABLE #ItemSubgroup;
+    CREATE TABLE #ItemSubgroup (
+      ITM_CODE   nvarchar(50)  COLLATE DATABASE_DEFAULT NOT NULL PRIMARY KEY CLUSTERED,
+      SubGrpID   int           NULL,
+      SubGrpName nvarchar(200) COLLATE DATABASE_DEFAULT NOT NULL
+    );
+"""
+
+
+def _ensure_item_subgroups(cn, session: Dict) -> None:
+    """
+    Give <cn>'s session a #ItemSubgroup(ITM_CODE, SubGrpID, SubGrpName)
+    temp table: every item's subgroup as dimensions.py resolves it. Queries
+    that must filter or sort on the subgroup in SQL then join it on
+    CAST(ITM_CODE AS nvarchar(50)) instead of the SUBGROUPS OR-join.
+
+    The analytics pool's on_checkout hook: runs on every checkout, before
+    the caller has done any work, and rebuilds the table only when the
+    dimension checksum differs from the one it was built from. Items added
+    since the snapshot are missing; callers fall back to the raw
+    ITM_SUBGROUP text for them.
+    """
+    dims = dimensions.get(cn)
+    if "item_subgroups" in session and session["item_subgroups"] == dims.checksum:
+        return
+    cur = cn.cursor()
+    cur.execute(_ITEM_SUBGROUP_DDL)
+    rows = [(it.code, it.subgroup_id, it.subgroup) for it in dims.items.values()]
+    if rows:
+        cur.fast_executemany = True
+        cur.executemany("INSERT INTO #ItemSubgroup (ITM_CODE, SubGrpID, SubGrpName) VALUES (?, ?, ?);", rows)
+    cur.execute("CREATE NONCLUSTERED INDEX IX_ItemSubgroup_SubGrp ON #ItemSubgroup (SubGrpID);")
+    # nothing of the caller's is open yet; a later rollback must not take the table with it
+    cn.commit()
+    session["item_subgroups"] = dims.checksum
+
 
 # ---------- Public API (used by routes) ----------
 @ttl_cache(seconds=60)
@@ -174,36 +478,18 @@ def get_kpis() -> Dict:
 def get_receipts_by_day(days:int=7) -> List[Dict]:
     """
     Last N business days (grouped by business date using 07:00 boundary).
+    Closed days come from the local rollup store; the open day is read live.
     """
     days = max(1, min(int(days), 60))  # safety clamp
-    with _connect() as cn:
-        cur = cn.cursor()
-        cutoff = cutoff_dt_7h(days + 1)
-        cur.execute("""
-            SET NOCOUNT ON;
-            WITH R AS (
-              SELECT
-                CAST(DATEADD(HOUR,-7, r.RCPT_DATE) AS date) AS BizDate,
-                r.RCPT_AMOUNT
-              FROM dbo.HISTORIC_RECEIPT r
-              WHERE r.RCPT_DATE >= ?
-            ),
-            LAST AS (
-              SELECT MAX(BizDate) AS MaxBiz FROM R
-            )
-            SELECT TOP (?)
-              CONVERT(varchar(10), R.BizDate, 23) AS [date],
-              COUNT(*)                              AS receipts,
-              SUM(R.RCPT_AMOUNT)                    AS amount
-            FROM R
-            CROSS JOIN LAST
-            WHERE R.BizDate <= LAST.MaxBiz
-              AND R.BizDate > DATEADD(DAY, -?+1, LAST.MaxBiz)
-            GROUP BY R.BizDate
-            ORDER BY R.BizDate DESC;
-        """, (cutoff, days, days))
-        rows = cur.fetchall()
-        return [{"date": r.date, "receipts": int(r.receipts or 0), "amount": float(r.amount or 0.0)} for r in rows]
+    rows = rollup_rows(cutoff_dt_7h(days + 1).date(), open_business_day(7), 7)
+    if not rows:
+        return []
+    first = rows[-1]["biz_date"] - timedelta(days=days - 1)
+    return [
+        {"date": r["biz_date"].isoformat(), "receipts": r["receipts"], "amount": r["amount"]}
+        for r in reversed(rows)
+        if r["biz_date"] >= first
+    ]
 
 
 @ttl_cache(seconds=60)
@@ -241,24 +527,15 @@ def get_top_items(limit:int=10, days:int=1) -> List[Dict]:
     days  = max(10, min(int(days), 30))
     with _connect() as cn:
         cur = cn.cursor()
-        cutoff = cutoff_dt_7h(days + 1)
+        win = _receipt_window(cur, days)
+        if not win:
+            return []
+        receipts, params = win
         cur.execute("""
             SET NOCOUNT ON;
 
-            WITH R AS (
-              SELECT
-                r.RCPT_ID,
-                CAST(DATEADD(HOUR,-7, r.RCPT_DATE) AS date) AS BizDate
-              FROM dbo.HISTORIC_RECEIPT r
-              WHERE r.RCPT_DATE >= ?
-            ),
-            LAST AS (
-              SELECT MAX(BizDate) AS MaxBiz FROM R
-            ),
-            CUT AS (
-              SELECT RCPT_ID
-              FROM R CROSS JOIN LAST
-              WHERE R.BizDate BETWEEN DATEADD(DAY, -?+1, LAST.MaxBiz) AND LAST.MaxBiz
+            WITH CUT AS (
+              SELECT R.RCPT_ID FROM {receipts} AS R
             )
             SELECT TOP (?)
               CAST(
@@ -281,7 +558,7 @@ def get_top_items(limit:int=10, days:int=1) -> List[Dict]:
                 END
               AS nvarchar(128))
             ORDER BY qty DESC, item ASC;
-        """, (cutoff, days, limit))
+        """.format(receipts=receipts), (*params, limit))
         return [
             {"item": r.item, "qty": float(r.qty or 0.0), "amount": float(r.amount or 0.0)}
             for r in cur.fetchall()
@@ -292,82 +569,46 @@ def get_top_items(limit:int=10, days:int=1) -> List[Dict]:
 def get_subgroup_contribution(days: int = 7, limit: int = 12):
     """
     Top subgroups over the last <days> business days (default 7).
-    Resolves subgroup via SUBGROUPS:
-      1) if ITEMS.ITM_SUBGROUP is numeric -> join by SubGrp_ID
-      2) else join by SubGrp_Name (trimmed)
-      3) else fallback to raw ITEMS.ITM_SUBGROUP text
+    Sums per ITM_CODE in SQL; the subgroup label comes from dimensions.py:
+      1) if ITEMS.ITM_SUBGROUP is numeric -> SUBGROUPS by SubGrp_ID
+      2) else SUBGROUPS by SubGrp_Name (trimmed)
+      3) else the raw ITEMS.ITM_SUBGROUP text
       4) else 'Unknown'
-    SQL-2008 safe (no TRY_CONVERT).
     """
     days = max(1, min(int(days), 60))
     limit = max(1, min(int(limit), 50))
 
     with _connect() as cn:
         cur = cn.cursor()
-        cutoff = cutoff_dt_7h(days + 1)
+        win = _receipt_window(cur, days)
+        if not win:
+            return []
+        receipts, params = win
         cur.execute("""
             SET NOCOUNT ON;
 
-            -- Label business days with a -7h shift (07:00 start → next-day 05:00 end)
-            WITH R AS (
-              SELECT r.RCPT_ID,
-                     CAST(DATEADD(HOUR,-7, r.RCPT_DATE) AS date) AS BizDate
-              FROM dbo.HISTORIC_RECEIPT r
-              WHERE r.RCPT_DATE >= ?
-            ),
-            LAST AS ( SELECT MAX(BizDate) AS MaxBiz FROM R ),
-            CUT AS (  -- RCPT_IDs inside the last <days> business dates
-              SELECT RCPT_ID
-              FROM R CROSS JOIN LAST
-              WHERE R.BizDate BETWEEN DATEADD(DAY, -?+1, LAST.MaxBiz) AND LAST.MaxBiz
+            WITH CUT AS (  -- RCPT_IDs inside the last <days> business dates
+              SELECT R.RCPT_ID FROM {receipts} AS R
             )
 
-            SELECT TOP (?)
-              COALESCE(
-                  s_id.SubGrp_Name,
-                  s_name.SubGrp_Name,
-                  NULLIF(x.SubGrpText, N''),
-                  N'Unknown'
-              ) AS subgroup,
+            SELECT
+              CAST(c.ITM_CODE AS nvarchar(50))                              AS item_code,
               SUM(CAST(c.ITM_QUANTITY AS float))                            AS qty,
               SUM(CAST(c.ITM_QUANTITY AS float) * CAST(c.ITM_PRICE AS float)) AS amount
             FROM dbo.HISTORIC_RECEIPT_CONTENTS AS c
             JOIN CUT ON CUT.RCPT_ID = c.RCPT_ID
-            LEFT JOIN dbo.ITEMS AS i ON i.ITM_CODE = c.ITM_CODE
-
-            -- Derive numeric ID (only digits) and a trimmed text
-            CROSS APPLY (
-              SELECT
-                CASE
-                  WHEN i.ITM_SUBGROUP IS NULL THEN NULL
-                  WHEN LTRIM(RTRIM(i.ITM_SUBGROUP)) = N'' THEN NULL
-                  -- numeric-only test: NOT LIKE any non-digit char
-                  WHEN i.ITM_SUBGROUP NOT LIKE N'%[^0-9]%' THEN CONVERT(int, i.ITM_SUBGROUP)
-                  ELSE NULL
-                END AS SubGrpID,
-                LTRIM(RTRIM(i.ITM_SUBGROUP)) AS SubGrpText
-            ) AS x
-
-            -- Prefer lookup by ID, else by name
-            LEFT JOIN dbo.SUBGROUPS AS s_id
-              ON s_id.SubGrp_ID = x.SubGrpID
-            LEFT JOIN dbo.SUBGROUPS AS s_name
-              ON LTRIM(RTRIM(s_name.SubGrp_Name)) = x.SubGrpText
-
-            GROUP BY COALESCE(
-                      s_id.SubGrp_Name,
-                      s_name.SubGrp_Name,
-                      NULLIF(x.SubGrpText, N''),
-                      N'Unknown'
-                     )
-            ORDER BY amount DESC, subgroup ASC;
-        """, (cutoff, days, limit))
-
+            GROUP BY c.ITM_CODE;
+        """.format(receipts=receipts), (*params,))
         rows = cur.fetchall()
-        return [
-            {"subgroup": r.subgroup, "qty": float(r.qty or 0.0), "amount": float(r.amount or 0.0)}
-            for r in rows
-        ]
+
+    dims = dimensions.get()
+    totals: Dict[str, List[float]] = {}
+    for r in rows:
+        t = totals.setdefault(dims.subgroup(r.item_code), [0.0, 0.0])
+        t[0] += float(r.qty or 0.0)
+        t[1] += float(r.amount or 0.0)
+    ranked = sorted(totals.items(), key=lambda kv: (-kv[1][1], kv[0]))[:limit]
+    return [{"subgroup": name, "qty": qty, "amount": amount} for name, (qty, amount) in ranked]
 
 
 @ttl_cache(seconds=60)
@@ -388,78 +629,39 @@ def get_top_items_in_subgroup(subgroup_name: str, days: int = 7, limit: int = 10
 
     with _connect() as cn:
         cur = cn.cursor()
-        cutoff = cutoff_dt_7h(days + 1)
+        win = _receipt_window(cur, days)
+        if not win:
+            return []
+        receipts, params = win
         cur.execute("""
             SET NOCOUNT ON;
 
-            -- Label business days with a -7h shift (07:00 start)
-            WITH R AS (
-              SELECT r.RCPT_ID,
-                     CAST(DATEADD(HOUR,-7, r.RCPT_DATE) AS date) AS BizDate
-              FROM dbo.HISTORIC_RECEIPT r
-              WHERE r.RCPT_DATE >= ?
-            ),
-            LAST AS ( SELECT MAX(BizDate) AS MaxBiz FROM R ),
-            CUT AS (  -- RCPT_IDs inside the last <days> business dates
-              SELECT RCPT_ID
-              FROM R CROSS JOIN LAST
-              WHERE R.BizDate BETWEEN DATEADD(DAY, -?+1, LAST.MaxBiz) AND LAST.MaxBiz
-            ),
-            -- Resolve each line's subgroup label using SUBGROUPS (ID or Name)
-            Labeled AS (
-              SELECT
-                -- subgroup label (resolved)
-                COALESCE(
-                  s_id.SubGrp_Name,
-                  s_nm.SubGrp_Name,
-                  NULLIF(x.SubGrpText, N''),
-                  N'Unknown'
-                ) AS subgroup_label,
-                -- item display label (title or code as text)
-                CAST(
-                  CASE
-                    WHEN i.ITM_TITLE IS NOT NULL AND LTRIM(RTRIM(i.ITM_TITLE)) <> N'' THEN i.ITM_TITLE
-                    ELSE CAST(c.ITM_CODE AS nvarchar(128))
-                  END AS nvarchar(128)
-                ) AS item_label,
-                CAST(c.ITM_QUANTITY AS float) AS qty,
-                CAST(c.ITM_PRICE    AS float) AS price
-              FROM dbo.HISTORIC_RECEIPT_CONTENTS AS c
-              JOIN CUT ON CUT.RCPT_ID = c.RCPT_ID
-              LEFT JOIN dbo.ITEMS AS i ON i.ITM_CODE = c.ITM_CODE
-
-              CROSS APPLY (
-                SELECT
-                  CASE
-                    WHEN i.ITM_SUBGROUP IS NULL THEN NULL
-                    WHEN LTRIM(RTRIM(i.ITM_SUBGROUP)) = N'' THEN NULL
-                    WHEN i.ITM_SUBGROUP NOT LIKE N'%[^0-9]%' THEN CONVERT(int, i.ITM_SUBGROUP)
-                    ELSE NULL
-                  END AS SubGrpID,
-                  LTRIM(RTRIM(i.ITM_SUBGROUP)) AS SubGrpText
-              ) AS x
-
-              LEFT JOIN dbo.SUBGROUPS AS s_id
-                ON s_id.SubGrp_ID = x.SubGrpID
-              LEFT JOIN dbo.SUBGROUPS AS s_nm
-                ON LTRIM(RTRIM(s_nm.SubGrp_Name)) = x.SubGrpText
+            WITH CUT AS (  -- RCPT_IDs inside the last <days> business dates
+              SELECT R.RCPT_ID FROM {receipts} AS R
             )
 
-            SELECT TOP (?)
-              item_label AS item,
-              SUM(qty)   AS qty,
-              SUM(qty * price) AS amount
-            FROM Labeled
-            WHERE UPPER(LTRIM(RTRIM(subgroup_label))) = UPPER(LTRIM(RTRIM(?)))
-            GROUP BY item_label
-            ORDER BY qty DESC, item ASC;
-        """, (cutoff, days, limit, subgroup_name))
-
+            SELECT
+              CAST(c.ITM_CODE AS nvarchar(50))                              AS item_code,
+              SUM(CAST(c.ITM_QUANTITY AS float))                            AS qty,
+              SUM(CAST(c.ITM_QUANTITY AS float) * CAST(c.ITM_PRICE AS float)) AS amount
+            FROM dbo.HISTORIC_RECEIPT_CONTENTS AS c
+            JOIN CUT ON CUT.RCPT_ID = c.RCPT_ID
+            GROUP BY c.ITM_CODE;
+        """.format(receipts=receipts), (*params,))
         rows = cur.fetchall()
-        return [
-            {"item": r.item, "qty": float(r.qty or 0.0), "amount": float(r.amount or 0.0)}
-            for r in rows
-        ]
+
+    # Resolved subgroup label and item display label (title, else the code)
+    dims = dimensions.get()
+    wanted = str(subgroup_name).strip().upper()
+    totals: Dict[str, List[float]] = {}
+    for r in rows:
+        if dims.subgroup(r.item_code).strip().upper() != wanted:
+            continue
+        t = totals.setdefault(dims.title(r.item_code), [0.0, 0.0])
+        t[0] += float(r.qty or 0.0)
+        t[1] += float(r.amount or 0.0)
+    ranked = sorted(totals.items(), key=lambda kv: (-kv[1][0], kv[0]))[:limit]
+    return [{"item": item, "qty": qty, "amount": amount} for item, (qty, amount) in ranked]
 
 
 @ttl_cache(seconds=60)
@@ -471,20 +673,15 @@ def get_items_per_receipt_histogram(days: int = 7):
     days = max(1, min(int(days), 60))
     with _connect() as cn:
         cur = cn.cursor()
-        cutoff = cutoff_dt_7h(days + 1)
+        win = _receipt_window(cur, days)
+        if not win:
+            return []
+        receipts, params = win
         cur.execute("""
             SET NOCOUNT ON;
 
-            WITH R AS (
-              SELECT r.RCPT_ID, CAST(DATEADD(HOUR,-7, r.RCPT_DATE) AS date) AS BizDate
-              FROM dbo.HISTORIC_RECEIPT r
-              WHERE r.RCPT_DATE >= ?
-            ),
-            LAST AS ( SELECT MAX(BizDate) AS MaxBiz FROM R ),
-            CUT AS (
-              SELECT RCPT_ID
-              FROM R CROSS JOIN LAST
-              WHERE R.BizDate BETWEEN DATEADD(DAY, -?+1, LAST.MaxBiz) AND LAST.MaxBiz
+            WITH CUT AS (
+              SELECT R.RCPT_ID FROM {receipts} AS R
             ),
             ItemsPerReceipt AS (
               SELECT c.RCPT_ID, SUM(CAST(c.ITM_QUANTITY AS float)) AS itemcnt
@@ -541,7 +738,7 @@ def get_items_per_receipt_histogram(days: int = 7):
                 ELSE 9
               END
             ORDER BY seq;
-        """, (cutoff, days))
+        """.format(receipts=receipts), (*params,))
         rows = cur.fetchall()
         return [{"bin": r.bin, "count": int(r.cnt or 0)} for r in rows]
 
@@ -555,20 +752,15 @@ def get_receipt_amount_histogram(days: int = 7):
     days = max(1, min(int(days), 60))
     with _connect() as cn:
         cur = cn.cursor()
-        cutoff = cutoff_dt_7h(days + 1)
+        win = _receipt_window(cur, days)
+        if not win:
+            return []
+        receipts, params = win
         cur.execute("""
             SET NOCOUNT ON;
 
-            WITH R AS (
-              SELECT r.RCPT_ID, r.RCPT_AMOUNT, CAST(DATEADD(HOUR,-7, r.RCPT_DATE) AS date) AS BizDate
-              FROM dbo.HISTORIC_RECEIPT r
-              WHERE r.RCPT_DATE >= ?
-            ),
-            LAST AS ( SELECT MAX(BizDate) AS MaxBiz FROM R ),
-            CUT AS (
-              SELECT RCPT_ID, RCPT_AMOUNT
-              FROM R CROSS JOIN LAST
-              WHERE R.BizDate BETWEEN DATEADD(DAY, -?+1, LAST.MaxBiz) AND LAST.MaxBiz
+            WITH CUT AS (
+              SELECT R.RCPT_ID, R.RCPT_AMOUNT FROM {receipts} AS R
             )
             SELECT
               CASE
@@ -615,7 +807,7 @@ def get_receipt_amount_histogram(days: int = 7):
                 ELSE 8
               END
             ORDER BY seq;
-        """, (cutoff, days))
+        """.format(receipts=receipts), (*params,))
         rows = cur.fetchall()
         return [{"bin": r.bin, "count": int(r.cnt or 0)} for r in rows]
 
@@ -630,190 +822,98 @@ def get_subgroup_velocity(days: int = 14, top: int = 8):
     top  = max(1, min(int(top), 20))
     with _connect() as cn:
         cur = cn.cursor()
-        cutoff = cutoff_dt_7h(days + 1)
+        win = _receipt_window(cur, days)
+        if not win:
+            return []
+        receipts, params = win
         cur.execute("""
             SET NOCOUNT ON;
 
-            -- Label business dates
-            WITH R AS (
-              SELECT r.RCPT_ID, CAST(DATEADD(HOUR,-7, r.RCPT_DATE) AS date) AS BizDate
-              FROM dbo.HISTORIC_RECEIPT r
-              WHERE r.RCPT_DATE >= ?
-            ),
-            LAST AS ( SELECT MAX(BizDate) AS MaxBiz FROM R ),
-            CUT AS (  -- last <days> business days
-              SELECT R.RCPT_ID, R.BizDate
-              FROM R CROSS JOIN LAST
-              WHERE R.BizDate BETWEEN DATEADD(DAY, -?+1, LAST.MaxBiz) AND LAST.MaxBiz
-            ),
-            -- Resolve subgroup label (ID or Name)
-            Labeled AS (
-              SELECT
-                COALESCE(s_id.SubGrp_Name, s_nm.SubGrp_Name, NULLIF(x.SubGrpText, N''), N'Unknown') AS subgroup_label,
-                CAST(c.ITM_QUANTITY AS float) AS qty,
-                CAST(c.ITM_PRICE    AS float) AS price,
-                CUT.BizDate
-              FROM dbo.HISTORIC_RECEIPT_CONTENTS c
-              JOIN CUT ON CUT.RCPT_ID = c.RCPT_ID
-              LEFT JOIN dbo.ITEMS i ON i.ITM_CODE = c.ITM_CODE
-              CROSS APPLY (
-                SELECT
-                  CASE
-                    WHEN i.ITM_SUBGROUP IS NULL THEN NULL
-                    WHEN LTRIM(RTRIM(i.ITM_SUBGROUP)) = N'' THEN NULL
-                    WHEN i.ITM_SUBGROUP NOT LIKE N'%[^0-9]%' THEN CONVERT(int, i.ITM_SUBGROUP)
-                    ELSE NULL
-                  END AS SubGrpID,
-                  LTRIM(RTRIM(i.ITM_SUBGROUP)) AS SubGrpText
-              ) x
-              LEFT JOIN dbo.SUBGROUPS s_id ON s_id.SubGrp_ID = x.SubGrpID
-              LEFT JOIN dbo.SUBGROUPS s_nm ON LTRIM(RTRIM(s_nm.SubGrp_Name)) = x.SubGrpText
-            ),
-            Agg AS (
-              SELECT subgroup_label AS subgroup,
-                     SUM(qty*price) AS amount,
-                     BizDate
-              FROM Labeled
-              GROUP BY subgroup_label, BizDate
-            ),
-            MB AS ( SELECT MAX(BizDate) AS MaxBiz FROM Agg ),
-            WinFlag AS (
-              SELECT a.subgroup, a.amount, a.BizDate,
-                     CASE WHEN a.BizDate >  DATEADD(DAY, -7, MB.MaxBiz) THEN 1 ELSE 0 END AS is_last7
-              FROM Agg a CROSS JOIN MB
-              WHERE a.BizDate > DATEADD(DAY, -14, MB.MaxBiz)
-            ),
-            WIN AS (
-              SELECT subgroup,
-                     SUM(CASE WHEN is_last7 = 1 THEN amount ELSE 0 END) AS last7,
-                     SUM(CASE WHEN is_last7 = 0 THEN amount ELSE 0 END) AS prev7
-              FROM WinFlag
-              GROUP BY subgroup
+            WITH CUT AS (  -- last <days> business days
+              SELECT R.RCPT_ID, R.BizDate FROM {receipts} AS R
             )
-            SELECT TOP (?)
-              s.subgroup,
-              s.last7,
-              s.prev7,
-              s.delta_pct
-            FROM (
-              SELECT
-                subgroup,
-                last7,
-                prev7,
-                CASE WHEN prev7 > 0 THEN (last7/prev7) - 1 ELSE NULL END AS delta_pct
-              FROM WIN
-            ) AS s
-            ORDER BY
-              CASE WHEN s.delta_pct IS NULL THEN 0 ELSE ABS(s.delta_pct) END DESC,
-              s.subgroup ASC;
-        """, (cutoff, days, top))
+            SELECT
+              CAST(c.ITM_CODE AS nvarchar(50)) AS item_code,
+              CUT.BizDate,
+              SUM(CAST(c.ITM_QUANTITY AS float) * CAST(c.ITM_PRICE AS float)) AS amount
+            FROM dbo.HISTORIC_RECEIPT_CONTENTS c
+            JOIN CUT ON CUT.RCPT_ID = c.RCPT_ID
+            GROUP BY c.ITM_CODE, CUT.BizDate;
+        """.format(receipts=receipts), (*params,))
         rows = cur.fetchall()
-        return [
-            {
-                "subgroup": r.subgroup,
-                "last7": float(r.last7 or 0.0),
-                "prev7": float(r.prev7 or 0.0),
-                "delta_pct": None if r.delta_pct is None else float(r.delta_pct)
-            }
-            for r in rows
-        ]
+    if not rows:
+        return []
 
+    # amount per (subgroup label, BizDate); last 7 vs prior 7 BizDates
+    dims = dimensions.get()
+    max_biz = max(r.BizDate for r in rows)
+    sums: Dict[str, List[float]] = {}
+    for r in rows:
+        if r.BizDate <= max_biz - timedelta(days=14):
+            continue
+        w = sums.setdefault(dims.subgroup(r.item_code), [0.0, 0.0])
+        w[0 if r.BizDate > max_biz - timedelta(days=7) else 1] += float(r.amount or 0.0)
 
-@ttl_cache(seconds=300)
-def get_affinity_pairs(days: int = 30, top: int = 15):
+    out = [
+        {
+            "subgroup": name,
+            "last7": last7,
+            "prev7": prev7,
+            "delta_pct": (last7 / prev7) - 1 if prev7 > 0 else None,
+        }
+        for name, (last7, prev7) in sums.items()
+    ]
+    out.sort(key=lambda r: (-abs(r["delta_pct"] or 0.0), r["subgroup"]))
+    return out[:top]
+
+
+@ttl_cache(seconds=300, stale_seconds=900)
+def get_affinity_pairs(days: int = 30, top: int = 15, min_support: int = 2):
     """
     Top co-occurring item pairs over the last <days> business days (default 30).
     - De-duplicates per receipt (an item counted once per receipt).
+    - Pairs seen together in fewer than <min_support> receipts are dropped.
     - Returns [{a, b, co_count, coverage_pct, lift}]
       where:
         coverage_pct = co_count / total_receipts
         lift = (co_count * total_receipts) / (count(a) * count(b))
+    Ranks the window's pair table (_basket_pairs), which is cached on its
+    own, so other top / min_support values reuse it.
     """
-    days = max(1, min(int(days), 60))
+    days = max(1, min(int(days), 90))
     top  = max(1, min(int(top), 50))
+    return _basket_pairs(days).top(top, min_support=max(1, int(min_support)))
 
+
+@ttl_cache(seconds=300, stale_seconds=900)
+def _basket_pairs(days: int) -> baskets.PairTable:
+    """
+    Co-occurrence of every item pair over the last <days> business days.
+    Reads each receipt's distinct items once; the pair counting happens in
+    baskets.py rather than a self-join on RCPT_ID. Items are labelled by
+    title (the code when blank), so items sharing a title count as one.
+    """
     with _connect() as cn:
         cur = cn.cursor()
-        cutoff = cutoff_dt_7h(days + 1)
+        win = _receipt_window(cur, days)
+        if not win:
+            return baskets.PairTable.empty()
+        receipts, params = win
         cur.execute("""
             SET NOCOUNT ON;
-
-            -- Label business days (start 07:00)
-            WITH R AS (
-              SELECT r.RCPT_ID, CAST(DATEADD(HOUR,-7, r.RCPT_DATE) AS date) AS BizDate
-              FROM dbo.HISTORIC_RECEIPT r
-              WHERE r.RCPT_DATE >= ?
-            ),
-            LAST AS ( SELECT MAX(BizDate) AS MaxBiz FROM R ),
-            CUT AS (  -- target window receipts
-              SELECT R.RCPT_ID
-              FROM R CROSS JOIN LAST
-              WHERE R.BizDate BETWEEN DATEADD(DAY, -?+1, LAST.MaxBiz) AND LAST.MaxBiz
-            ),
-            -- Build a stable item label (title if present, else code as text)
-            LinesRaw AS (
-              SELECT c.RCPT_ID,
-                     CAST(
-                       CASE
-                         WHEN i.ITM_TITLE IS NOT NULL AND LTRIM(RTRIM(i.ITM_TITLE)) <> N'' THEN i.ITM_TITLE
-                         ELSE CAST(c.ITM_CODE AS nvarchar(128))
-                       END AS nvarchar(128)
-                     ) AS item_label
-              FROM dbo.HISTORIC_RECEIPT_CONTENTS c
-              JOIN CUT ON CUT.RCPT_ID = c.RCPT_ID
-              LEFT JOIN dbo.ITEMS i ON i.ITM_CODE = c.ITM_CODE
-            ),
-            -- De-duplicate per receipt/item (so a pair is counted once per receipt)
-            Lines AS (
-              SELECT DISTINCT RCPT_ID, item_label
-              FROM LinesRaw
-            ),
-            ItemCnt AS (
-              SELECT item_label, COUNT(DISTINCT RCPT_ID) AS rcpt_count
-              FROM Lines
-              GROUP BY item_label
-            ),
-            Total AS (
-              SELECT COUNT(DISTINCT RCPT_ID) AS total_rcpts FROM Lines
-            ),
-            Pairs AS (
-              SELECT
-                a.item_label AS a_label,
-                b.item_label AS b_label,
-                COUNT(*)     AS co_count
-              FROM Lines a
-              JOIN Lines b
-                ON a.RCPT_ID = b.RCPT_ID
-               AND a.item_label < b.item_label       -- lexicographic to avoid dup/self-pairs
-              GROUP BY a.item_label, b.item_label
-            )
-            SELECT TOP (?)
-              p.a_label AS a,
-              p.b_label AS b,
-              p.co_count,
-              CAST(p.co_count * 1.0 / NULLIF(t.total_rcpts,0) AS float)                       AS coverage_pct,
-              CAST(p.co_count * 1.0 * t.total_rcpts / NULLIF(ia.rcpt_count * ib.rcpt_count,0) AS float) AS lift
-            FROM Pairs p
-            CROSS JOIN Total t
-            JOIN ItemCnt ia ON ia.item_label = p.a_label
-            JOIN ItemCnt ib ON ib.item_label = p.b_label
-            WHERE p.co_count >= 2         -- tiny noise filter
-            ORDER BY p.co_count DESC, a, b;
-        """, (cutoff, days, top))
-
+            SELECT DISTINCT R.RCPT_ID, CAST(c.ITM_CODE AS nvarchar(50)) AS item_code
+            FROM {receipts} AS R
+            JOIN dbo.HISTORIC_RECEIPT_CONTENTS c ON c.RCPT_ID = R.RCPT_ID;
+        """.format(receipts=receipts), params)
         rows = cur.fetchall()
-        return [
-            {
-                "a": r.a, "b": r.b,
-                "co_count": int(r.co_count or 0),
-                "coverage_pct": float(r.coverage_pct or 0.0),
-                "lift": None if r.lift is None else float(r.lift)
-            }
-            for r in rows
-        ]
+
+    if not rows:
+        return baskets.PairTable.empty()
+    rcpt_ids, item_codes = zip(*rows)
+    return baskets.build(rcpt_ids, item_codes, dimensions.get().title)
 
 
-@ttl_cache(seconds=300)
+@ttl_cache(seconds=300, stale_seconds=900)
 def get_hourly_profile(days: int = 30):
     """
     Average receipts per business hour over the last <days> DISTINCT business days with receipts.
@@ -824,17 +924,16 @@ def get_hourly_profile(days: int = 30):
     days = max(1, min(int(days), 90))
     with _connect() as cn:
         cur = cn.cursor()
-        cutoff = cutoff_dt_7h(days + 1)
+        win = _receipt_window(cur, days)
+        if not win:
+            return []
+        receipts, params = win
         cur.execute("""
             SET NOCOUNT ON;
 
-            -- Shift to business calendar
+            -- Business calendar (BizDate / BizHour) of the window's receipts
             WITH R AS (
-              SELECT
-                CAST(DATEADD(HOUR,-7, r.RCPT_DATE) AS date)   AS BizDate,
-                DATEPART(HOUR, DATEADD(HOUR,-7, r.RCPT_DATE)) AS BizHour
-              FROM dbo.HISTORIC_RECEIPT r
-              WHERE r.RCPT_DATE >= ?
+              SELECT W.BizDate, W.BizHour FROM {receipts} AS W
             ),
 
             -- Take the last N DISTINCT business days that actually have receipts
@@ -875,7 +974,7 @@ def get_hourly_profile(days: int = 30):
             CROSS JOIN DayCount DC
             LEFT JOIN Hourly ON Hourly.BizHour = H.h
             ORDER BY H.h;
-        """, (cutoff, days))
+        """.format(receipts=receipts), (*params, days))
         rows = cur.fetchall()
         out = []
         for r in rows:
@@ -895,53 +994,28 @@ def get_hourly_profile(days: int = 30):
 def get_dow_profile(days: int = 56):
     """
     Average receipts per business day-of-week over the last <days> business days.
-    Uses Monday=0 .. Sunday=6 via a fixed Monday anchor (2000-01-03).
+    Monday=0 .. Sunday=6. Daily counts come from the rollup store.
     Returns: [{dow_index:int, dow_label:str, avg_receipts:float}]
     """
     days = max(7, min(int(days), 140))
-    with _connect() as cn:
-        cur = cn.cursor()
-        cutoff = cutoff_dt_7h(days + 1)
-        cur.execute("""
-            SET NOCOUNT ON;
-            WITH R AS (
-              SELECT CAST(DATEADD(HOUR,-7, r.RCPT_DATE) AS date) AS BizDate
-              FROM dbo.HISTORIC_RECEIPT r
-              WHERE r.RCPT_DATE >= ?
-            ),
-            LAST AS ( SELECT MAX(BizDate) AS MaxBiz FROM R ),
-            CUT AS (
-              SELECT BizDate
-              FROM R CROSS JOIN LAST
-              WHERE R.BizDate BETWEEN DATEADD(DAY, -?+1, LAST.MaxBiz) AND LAST.MaxBiz
-            ),
-            Daily AS (
-              SELECT CUT.BizDate, COUNT(*) AS rcpts
-              FROM CUT
-              JOIN R ON R.BizDate = CUT.BizDate
-              GROUP BY CUT.BizDate
-            ),
-            DOW AS (
-              SELECT
-                -- Monday anchor 2000-01-03 is a Monday
-                ((DATEDIFF(DAY, '20000103', BizDate) % 7) + 7) % 7 AS dow_idx,
-                rcpts
-              FROM Daily
-            )
-            SELECT dow_idx, AVG(CAST(rcpts AS float)) AS avg_rcpts
-            FROM DOW
-            GROUP BY dow_idx
-            ORDER BY dow_idx;
-        """, (cutoff, days))
-        idx_to_name = ["Mon","Tue","Wed","Thu","Fri","Sat","Sun"]
-        rows = cur.fetchall()
-        return [
-            {"dow_index": int(r.dow_idx), "dow_label": idx_to_name[int(r.dow_idx) % 7], "avg_receipts": float(r.avg_rcpts or 0.0)}
-            for r in rows
-        ]
+    rows = rollup_rows(cutoff_dt_7h(days + 1).date(), open_business_day(7), 7)
+    if not rows:
+        return []
+    first = rows[-1]["biz_date"] - timedelta(days=days - 1)
 
+    per_dow: Dict[int, List[int]] = {}
+    for r in rows:
+        if r["biz_date"] >= first:
+            per_dow.setdefault(r["biz_date"].weekday(), []).append(r["receipts"])
 
-@ttl_cache(seconds=300)
+    idx_to_name = ["Mon","Tue","Wed","Thu","Fri","Sat","Sun"]
+    return [
+        {"dow_index": idx, "dow_label": idx_to_name[idx], "avg_receipts": sum(v) / len(v)}
+        for idx, v in sorted(per_dow.items())
+    ]
+
+
+@ttl_cache(seconds=300, stale_seconds=900)
 def get_top_windows(window_hours: int = 3, days: int = 30, top: int = 5, quiet: int = 3):
     """
     Top and quiet rolling <window_hours>-hour windows within operational hours (08:00..23:59 and 00:00..03:59),
@@ -956,17 +1030,16 @@ def get_top_windows(window_hours: int = 3, days: int = 30, top: int = 5, quiet:
 
     with _connect() as cn:
         cur = cn.cursor()
-        cutoff = cutoff_dt_7h(days + 1)
+        win = _receipt_window(cur, days)
+        if not win:
+            return {"top": [], "quiet": []}
+        receipts, params = win
         cur.execute("""
             SET NOCOUNT ON;
 
-            -- Business calendar from receipts (shift -7h)
+            -- Business calendar of the window's receipts (shift -7h)
             WITH R AS (
-              SELECT
-                CAST(DATEADD(HOUR,-7, r.RCPT_DATE) AS date)   AS BizDate,
-                DATEPART(HOUR, DATEADD(HOUR,-7, r.RCPT_DATE)) AS BizHour
-              FROM dbo.HISTORIC_RECEIPT r
-              WHERE r.RCPT_DATE >= ?
+              SELECT W.RCPT_ID, W.BizDate, W.BizHour FROM {receipts} AS W
             ),
             DistinctDays AS ( SELECT DISTINCT BizDate FROM R ),
             Ranked AS (
@@ -1029,14 +1102,12 @@ def get_top_windows(window_hours: int = 3, days: int = 30, top: int = 5, quiet:
             -- Amounts by business hour (sum of contents per receipt hour)
             C AS (
               SELECT
-                CAST(DATEADD(HOUR,-7, r.RCPT_DATE) AS date)   AS BizDate,
-                DATEPART(HOUR, DATEADD(HOUR,-7, r.RCPT_DATE)) AS BizHour,
+                R.BizDate,
+                R.BizHour,
                 SUM(CAST(c.ITM_QUANTITY AS float) * CAST(c.ITM_PRICE AS float)) AS amt
               FROM dbo.HISTORIC_RECEIPT_CONTENTS c
-              JOIN dbo.HISTORIC_RECEIPT r ON r.RCPT_ID = c.RCPT_ID
-              WHERE r.RCPT_DATE >= ?
-              GROUP BY CAST(DATEADD(HOUR,-7, r.RCPT_DATE) AS date),
-                       DATEPART(HOUR, DATEADD(HOUR,-7, r.RCPT_DATE))
+              JOIN R ON R.RCPT_ID = c.RCPT_ID
+              GROUP BY R.BizDate, R.BizHour
             ),
             HourlyAmt AS (
               SELECT C.BizHour, SUM(C.amt) AS amount
@@ -1106,7 +1177,7 @@ def get_top_windows(window_hours: int = 3, days: int = 30, top: int = 5, quiet:
             UNION ALL
             SELECT 'quiet' AS kind, start_bh, win_avg_rcpts, win_avg_amt FROM QuietWins
             ORDER BY kind, start_bh;
-        """, (cutoff, days, cutoff, window_hours, top, quiet))
+        """.format(receipts=receipts), (*params, days, window_hours, top, quiet))
 
         rows = cur.fetchall()
         top_rows, quiet_rows = [], []
@@ -1129,10 +1200,68 @@ def get_top_windows(window_hours: int = 3, days: int = 30, top: int = 5, quiet:
 
 
 
+# ---------- Dashboard bundle ----------
+# Intelligence dashboard widgets, keyed as in the bundle payload, with the
+# arguments the per-widget /api/intelligence/* routes use.
+INTELLIGENCE_WIDGETS: Dict[str, Tuple[Any, Dict[str, Any]]] = {
+    "kpis":              (get_kpis, {}),
+    "receipts_by_day":   (get_receipts_by_day, {"days": 7}),
+    "hourly_today":      (get_hourly_last_business_day, {}),
+    "top_items":         (get_top_items, {"limit": 10, "days": 1}),
+    "subgroup":          (get_subgroup_contribution, {"days": 7}),
+    "items_per_receipt": (get_items_per_receipt_histogram, {"days": 7}),
+    "receipt_amounts":   (get_receipt_amount_histogram, {"days": 7}),
+    "subgroup_velocity": (get_subgroup_velocity, {"days": 14, "top": 8}),
+    "affinity":          (get_affinity_pairs, {"days": 30, "top": 15}),
+    "hourly_profile":    (get_hourly_profile, {"days": 30}),
+    "dow_profile":       (get_dow_profile, {"days": 56}),
+    "top_windows":       (get_top_windows, {"window_hours": 3, "days": 30, "top": 5, "quiet": 3}),
+}
+
+# Widest receipt window any bundled widget reads (affinity / profiles: 30 days)
+BUNDLE_WINDOW_DAYS = 30
+
+
+def get_intelligence_bundle() -> Dict[str, Any]:
+    """
+    Every Intelligence dashboard widget in one call.
+
+    Widgets run over a single connection (see _shared_scope): MaxBizDate is
+    looked up once and the last BUNDLE_WINDOW_DAYS of receipts are copied
+    into #Rcpt once for all of them. Each widget still goes through its own
+    ttl_cache, so only expired widgets touch MSSQL at all.
+    """
+    with _shared_scope(materialize_days=BUNDLE_WINDOW_DAYS):
+        return {name: fn(**kwargs) for name, (fn, kwargs) in INTELLIGENCE_WIDGETS.items()}
+
+
 # -------------------------------------------------------------------
 # Dynamic Trends helpers (Item Trends report)
 # -------------------------------------------------------------------
 
+def _item_dimension() -> Dict[str, Dict[str, str]]:
+    """
+    ITEMS labels keyed by item code (as text), for reports that aggregate
+    from the item cube and attach names in Python (see dimensions.py):
+      title          ITM_TITLE, or the code when blank
+      subgroup_raw   trimmed ITM_SUBGROUP text ('' when blank)
+      subgroup_label resolved subgroup name (ID match, then name match,
+                     then the raw text, else 'Unknown')
+    """
+    return dimensions.get().labels()
+
+
+def _qty_by_item(sl) -> Dict[str, float]:
+    """{item_code: qty} totals of an item-cube slice."""
+    totals = sl.per_item()
+    return dict(zip(totals["item_code"].tolist(), totals["qty"].tolist()))
+
+
+def _contains(haystack: str, needle: str) -> bool:
+    """LIKE '%needle%' under a case-insensitive collation."""
+    return needle.casefold() in (haystack or "").casefold()
+
+
 def get_subgroups_list() -> List[Dict]:
     """
     Returns a clean list of subgroups for dropdowns:
@@ -1172,6 +1301,9 @@ def get_item_trends(
         rank_by="last_bucket" => qty in the last bucket within range
     - Optional subgroup filter uses your proven subgroup resolution logic.
     - Optional item_codes limits the universe further.
+    - Reads the item cube; receipts are selected by calendar date
+      [start_date .. end_date] exactly as before (a receipt on BizDate d
+      before 07:00 happened on calendar day d+1).
 
     Returns (long format):
       [{bucket_start, item_code, item, subgroup, qty}, ...]
@@ -1192,187 +1324,69 @@ def get_item_trends(
     # Keeping parameter now avoids breaking the API later.
     _ = output_format
 
-    # ---------- Bucket expression (SAFE: whitelist only) ----------
-    # We compute BizDate = CAST(DATEADD(HOUR,-7, r.RCPT_DATE) AS date)
-    # Then bucket_start is derived from BizDate.
-    if bucket == "daily":
-        bucket_expr = "BizDate"
-    elif bucket == "weekly":
-        # Monday-based week start, using the same stable Monday anchor you used in get_dow_profile()
-        bucket_expr = "DATEADD(DAY, -(((DATEDIFF(DAY, '20000103', BizDate) % 7) + 7) % 7), BizDate)"
-    else:  # monthly
-        bucket_expr = "DATEFROMPARTS(YEAR(BizDate), MONTH(BizDate), 1)"
-
-    # ---------- Optional IN (...) for item codes ----------
-    item_code_filter_sql = ""
-    item_code_params: List = []
+    # ---------- Lines in the calendar window ----------
+    sl = get_cube().slice(start_date - timedelta(days=1), end_date)
+    calendar_day = sl.day + (sl.hour < 7)
+    sl = sl.filter((calendar_day >= start_date.toordinal()) & (calendar_day <= end_date.toordinal()))
     if item_codes:
-        # pyodbc needs ? placeholders; build safely
-        placeholders = ",".join(["?"] * len(item_codes))
-        item_code_filter_sql = f" AND CAST(c.ITM_CODE AS nvarchar(128)) IN ({placeholders}) "
-        item_code_params.extend(item_codes)
-
-    # ---------- Optional subgroup filter ----------
-    subgroup_filter_sql = ""
-    subgroup_params: List = []
-    if subgroup_label and str(subgroup_label).strip():
-        subgroup_filter_sql = " AND UPPER(LTRIM(RTRIM(subgroup_label))) = UPPER(LTRIM(RTRIM(?))) "
-        subgroup_params.append(subgroup_label.strip())
-
-    # ---------- Date window ----------
-    # Inclusive dates: [start_date 00:00 .. end_date+1 00:00)
-    start_dt = datetime.combine(start_date, datetime.min.time())
-    end_dt_exclusive = datetime.combine(end_date, datetime.min.time()) + timedelta(days=1)
-
-    with _connect() as cn:
-        cur = cn.cursor()
-
-        # IMPORTANT: We do a two-phase query:
-        #  1) Build a labeled line dataset with BizDate + subgroup resolution + item labels
-        #  2) Pick TOP N items based on rank_by
-        #  3) Return bucketed trends for those TOP N items
-        #
-        # This keeps performance sane and prevents “everything in DB” results.
-
-        sql = f"""
-            SET NOCOUNT ON;
-
-            WITH Receipts AS (
-              SELECT
-                r.RCPT_ID,
-                r.RCPT_DATE,
-                CAST(DATEADD(HOUR,-7, r.RCPT_DATE) AS date) AS BizDate
-              FROM dbo.HISTORIC_RECEIPT r
-              WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ?
-            ),
-
-            Lines AS (
-              SELECT
-                rc.BizDate,
-
-                -- stable item code as text (safe for mixed numeric types)
-                CAST(c.ITM_CODE AS nvarchar(128)) AS item_code,
-
-                -- item display label (title if present else code)
-                CAST(
-                  CASE
-                    WHEN i.ITM_TITLE IS NOT NULL AND LTRIM(RTRIM(i.ITM_TITLE)) <> N'' THEN i.ITM_TITLE
-                    ELSE CAST(c.ITM_CODE AS nvarchar(128))
-                  END
-                AS nvarchar(128)) AS item_label,
-
-                -- subgroup resolution logic (same pattern you already use)
-                COALESCE(
-                  s_id.SubGrp_Name,
-                  s_nm.SubGrp_Name,
-                  NULLIF(x.SubGrpText, N''),
-                  N'Unknown'
-                ) AS subgroup_label,
-
-                CAST(c.ITM_QUANTITY AS float) AS qty
-
-              FROM dbo.HISTORIC_RECEIPT_CONTENTS c
-              JOIN Receipts rc ON rc.RCPT_ID = c.RCPT_ID
-              LEFT JOIN dbo.ITEMS i ON i.ITM_CODE = c.ITM_CODE
-
-              CROSS APPLY (
-                SELECT
-                  CASE
-                    WHEN i.ITM_SUBGROUP IS NULL THEN NULL
-                    WHEN LTRIM(RTRIM(i.ITM_SUBGROUP)) = N'' THEN NULL
-                    WHEN i.ITM_SUBGROUP NOT LIKE N'%[^0-9]%' THEN CONVERT(int, i.ITM_SUBGROUP)
-                    ELSE NULL
-                  END AS SubGrpID,
-                  LTRIM(RTRIM(i.ITM_SUBGROUP)) AS SubGrpText
-              ) AS x
-
-              LEFT JOIN dbo.SUBGROUPS AS s_id
-                ON s_id.SubGrp_ID = x.SubGrpID
-              LEFT JOIN dbo.SUBGROUPS AS s_nm
-                ON LTRIM(RTRIM(s_nm.SubGrp_Name)) = x.SubGrpText
-
-              WHERE 1=1
-              {item_code_filter_sql}
-            ),
-
-            Filtered AS (
-              SELECT *
-              FROM Lines
-              WHERE 1=1
-              {subgroup_filter_sql}
-            ),
-
-            LastBucket AS (
-              SELECT MAX({bucket_expr}) AS last_bucket_start
-              FROM Filtered
-            ),
-
-            Ranked AS (
-              SELECT
-                f.item_code,
-                f.item_label,
-                f.subgroup_label,
-                SUM(
-                  CASE
-                    WHEN ? = 'last_bucket'
-                      THEN CASE WHEN {bucket_expr} = lb.last_bucket_start THEN f.qty ELSE 0 END
-                    ELSE f.qty
-                  END
-                ) AS rank_qty
-              FROM Filtered f
-              CROSS JOIN LastBucket lb
-              GROUP BY f.item_code, f.item_label, f.subgroup_label
-            ),
-
+        sl = sl.for_items(item_codes)
+    if not len(sl):
+        return []
 
-            TopItems AS (
-              SELECT TOP (?)
-                item_code, item_label, subgroup_label
-              FROM Ranked
-              WHERE rank_qty > 0
-              ORDER BY rank_qty DESC, item_label ASC
-            )
+    dim = _item_dimension()
+    codes = [str(c) for c in np.unique(sl.item_code)]
+    labels = {
+        code: (
+            dim[code]["title"] if code in dim else code,
+            dim[code]["subgroup_label"] if code in dim else "Unknown",
+        )
+        for code in codes
+    }
+    if subgroup_label and str(subgroup_label).strip():
+        wanted = subgroup_label.strip().upper()
+        keep = [c for c in codes if labels[c][1].strip().upper() == wanted]
+        sl = sl.for_items(keep)
+        if not len(sl):
+            return []
 
-            SELECT
-              CONVERT(varchar(10), {bucket_expr}, 23) AS bucket_start,
-              f.item_code,
-              f.item_label AS item,
-              f.subgroup_label AS subgroup,
-              SUM(f.qty) AS qty
-            FROM Filtered f
-            JOIN TopItems t ON t.item_code = f.item_code
-            GROUP BY
-              {bucket_expr},
-              f.item_code,
-              f.item_label,
-              f.subgroup_label
-            ORDER BY
-              {bucket_expr} ASC,
-              qty DESC,
-              item ASC;
-        """
-
-        # Params order MUST match ? placeholders above
-        params: List = []
-        params.extend([start_dt, end_dt_exclusive])   # Receipts date range
-        params.extend(item_code_params)               # optional item_codes IN (...)
-        params.extend(subgroup_params)                # optional subgroup label filter
-        params.append(rank_by)                        # ? = 'last_bucket' check
-        params.append(top_n)                          # TOP (?)
+    # ---------- Bucket start per BizDate (Monday-based weeks) ----------
+    if bucket == "daily":
+        bucket_day = sl.day
+    elif bucket == "weekly":
+        bucket_day = sl.day - (sl.day - 1) % 7  # date.fromordinal(1) is a Monday
+    else:  # monthly
+        month_start = {d: date.fromordinal(int(d)).replace(day=1).toordinal() for d in np.unique(sl.day)}
+        bucket_day = np.fromiter((month_start[d] for d in sl.day), np.int64, len(sl))
+
+    # ---------- Rank items ----------
+    rank_qty = sl.qty if rank_by == "total" else np.where(bucket_day == bucket_day.max(), sl.qty, 0.0)
+    codes, inv = np.unique(sl.item_code, return_inverse=True)
+    totals = np.bincount(inv, weights=rank_qty, minlength=len(codes))
+    ranked = sorted(
+        (i for i in range(len(codes)) if totals[i] > 0),
+        key=lambda i: (-totals[i], labels[codes[i]][0]),
+    )[:top_n]
+    if not ranked:
+        return []
 
-        cur.execute(sql, params)
-        rows = cur.fetchall()
+    # ---------- Bucketed qty for the top items ----------
+    top = np.isin(inv, ranked)
+    series: Dict[Tuple[int, str], float] = {}
+    for b, code, q in zip(bucket_day[top], sl.item_code[top], sl.qty[top]):
+        series[(int(b), str(code))] = series.get((int(b), str(code)), 0.0) + float(q)
 
-        return [
-            {
-                "bucket_start": r.bucket_start,
-                "item_code": r.item_code,
-                "item": r.item,
-                "subgroup": r.subgroup,
-                "qty": float(r.qty or 0.0),
-            }
-            for r in rows
-        ]
+    out = [
+        {
+            "bucket_start": date.fromordinal(b).isoformat(),
+            "item_code": code,
+            "item": labels[code][0],
+            "subgroup": labels[code][1],
+            "qty": qty,
+        }
+        for (b, code), qty in series.items()
+    ]
+    out.sort(key=lambda r: (r["bucket_start"], -r["qty"], r["item"]))
+    return out
         
         
 def search_items_explorer(
@@ -1392,6 +1406,9 @@ def search_items_explorer(
     Builds trust that the item is active and shows recency.
   - trend: compares last business day qty vs previous business day qty (within the window).
     up/down/flat is a quick signal; details belong to Item 360.
+
+  Aggregated from the item cube; the window is anchored on the latest
+  BizDate with sales, then goes back N days.
   """
   query = (query or "").strip()
   subgroup_name = (subgroup_name or "").strip()
@@ -1402,160 +1419,73 @@ def search_items_explorer(
   if trend not in ("", "up", "down", "flat"):
       trend = ""
 
-  with _connect() as cn:
-      cur = cn.cursor()
-
-      # IMPORTANT: define the analysis window based on business date (07:00 boundary via DATEADD(HOUR,-7,...))
-      # We anchor on the latest BizDate present in the receipts table, then go back N days.
-      sql = f"""
-SET NOCOUNT ON;
-
-WITH R AS (
-  SELECT
-    r.RCPT_ID,
-    r.RCPT_DATE,
-    CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date) AS BizDate
-  FROM dbo.HISTORIC_RECEIPT r
-),
-MaxBiz AS (
-  SELECT MAX(BizDate) AS MaxBizDate FROM R
-),
-Windowed AS (
-  SELECT
-    r.RCPT_ID,
-    r.RCPT_DATE,
-    r.BizDate
-  FROM R r
-  CROSS JOIN MaxBiz m
-  WHERE r.BizDate >= DATEADD(DAY, -? + 1, m.MaxBizDate)
-    AND r.BizDate <= m.MaxBizDate
-),
-Top2Days AS (
-  SELECT TOP (2) BizDate
-  FROM (SELECT DISTINCT BizDate FROM Windowed) d
-  ORDER BY BizDate DESC
-),
-DayMarks AS (
-  SELECT
-    MAX(BizDate) AS LastBiz,
-    MIN(BizDate) AS PrevBiz
-  FROM Top2Days
-),
-Base AS (
-  SELECT
-CAST(i.ITM_CODE AS nvarchar(50)) AS item_code,
-    COALESCE(
-      NULLIF(LTRIM(RTRIM(CAST(i.ITM_TITLE AS nvarchar(255)))), ''),
-      CAST(i.ITM_CODE AS nvarchar(50))
-    ) AS item_title,
-
-    -- subgroup_name:
-    -- We intentionally take it from ITEMS.ITM_SUBGROUP to avoid any int/text conversion issues.
-    -- This supports values like numeric IDs, 'PAYMENT', or Arabic labels.
-    COALESCE(
-      NULLIF(LTRIM(RTRIM(CAST(i.ITM_SUBGROUP AS nvarchar(100)))), ''),
-      ''
-    ) AS subgroup_name,
-
-    w.RCPT_DATE,
-    w.BizDate,
-    c.ITM_QUANTITY AS qty
-  FROM Windowed w
-  JOIN dbo.HISTORIC_RECEIPT_CONTENTS c ON c.RCPT_ID = w.RCPT_ID
-  JOIN dbo.ITEMS i ON i.ITM_CODE = c.ITM_CODE
-),
-Agg AS (
-  SELECT
-    b.item_code,
-    b.item_title,
-    b.subgroup_name,
-    MAX(b.RCPT_DATE) AS last_sold_dt,
-    SUM(b.qty)       AS total_qty,
-    SUM(CASE WHEN b.BizDate = dm.LastBiz THEN b.qty ELSE 0 END) AS qty_last_day,
-    SUM(CASE WHEN b.BizDate = dm.PrevBiz THEN b.qty ELSE 0 END) AS qty_prev_day
-  FROM Base b
-  CROSS JOIN DayMarks dm
-  WHERE ( ? = '' OR b.subgroup_name = ? )
-    AND (
-      ? = '' OR
-      b.item_code LIKE '%' + ? + '%' OR
-      b.item_title LIKE '%' + ? + '%'
-    )
-  GROUP BY b.item_code, b.item_title, b.subgroup_name
-)
-SELECT TOP (?)
-  a.item_code,
-  a.item_title,
-  a.subgroup_name,
-  a.total_qty,
-  CONVERT(varchar(19), a.last_sold_dt, 120) AS last_sold,
-  CAST(a.total_qty AS float) / NULLIF(?, 0) AS avg_per_day,
-  a.qty_last_day,
-  a.qty_prev_day
-FROM Agg a
-ORDER BY avg_per_day DESC, a.last_sold_dt DESC;
-"""
-
-
-      # We divide by "days" in SQL (simple baseline average)
-      # IMPORTANT: params order MUST match the ? placeholders in the SQL.
-      # Placeholder order in SQL:
-      # 1) days window (int)
-      # 2) subgroup filter check (? = '')
-      # 3) subgroup filter value (b.subgroup_name = ?)
-      # 4) query empty check (? = '')
-      # 5) item_code LIKE
-      # 6) item_title LIKE
-      # 7) TOP limit
-      # 8) avg_per_day divisor days
-      params = [
-          int(days),
-          subgroup_name, subgroup_name,
-          query, query, query,
-          int(limit),
-          int(days),
-      ]
-      
-      cur.execute(sql, params)
-      rows = cur.fetchall()
-
-      result = []
-      for r in rows:
-          last_qty = float(r.qty_last_day or 0.0)
-          prev_qty = float(r.qty_prev_day or 0.0)
-
-          # IMPORTANT: Trend logic kept simple and explainable:
-          # - prev=0 and last>0 => "up" (new spike)
-          # - small change => "flat"
-          # - otherwise compare
-          if prev_qty == 0 and last_qty == 0:
+  cube = get_cube()
+  max_biz = cube.max_biz_date()
+  if max_biz is None:
+      return []
+  sl = cube.slice(max_biz - timedelta(days=days - 1), max_biz)
+
+  # Last two business days with sales in the window drive the trend
+  window_days = sl.days()
+  last_biz = window_days[-1] if len(window_days) else None
+  prev_biz = window_days[-2] if len(window_days) > 1 else last_biz
+
+  totals = sl.per_item()
+  last_qty_by_item = _qty_by_item(sl.filter(sl.day == last_biz)) if last_biz is not None else {}
+  prev_qty_by_item = _qty_by_item(sl.filter(sl.day == prev_biz)) if prev_biz is not None else {}
+
+  dim = _item_dimension()
+  candidates = []
+  for i, code in enumerate(totals["item_code"]):
+      code = str(code)
+      labels = dim.get(code)
+      if labels is None:
+          continue  # only items present in ITEMS
+      if subgroup_name and labels["subgroup_raw"] != subgroup_name:
+          continue
+      if query and not (_contains(code, query) or _contains(labels["title"], query)):
+          continue
+      candidates.append((float(totals["qty"][i]) / days, int(totals["last_ts"][i]), code, labels, float(totals["qty"][i])))
+
+  candidates.sort(key=lambda c: (-c[0], -c[1]))
+
+  result = []
+  for avg_per_day, last_ts, code, labels, total_qty in candidates[:limit]:
+      last_qty = last_qty_by_item.get(code, 0.0)
+      prev_qty = prev_qty_by_item.get(code, 0.0)
+
+      # IMPORTANT: Trend logic kept simple and explainable:
+      # - prev=0 and last>0 => "up" (new spike)
+      # - small change => "flat"
+      # - otherwise compare
+      if prev_qty == 0 and last_qty == 0:
+          t = "flat"
+      elif prev_qty == 0 and last_qty > 0:
+          t = "up"
+      else:
+          pct = ((last_qty - prev_qty) / prev_qty) * 100.0 if prev_qty else 0.0
+          if abs(pct) < 5.0:
               t = "flat"
-          elif prev_qty == 0 and last_qty > 0:
+          elif pct > 0:
               t = "up"
           else:
-              pct = ((last_qty - prev_qty) / prev_qty) * 100.0 if prev_qty else 0.0
-              if abs(pct) < 5.0:
-                  t = "flat"
-              elif pct > 0:
-                  t = "up"
-              else:
-                  t = "down"
-
-          # Apply optional trend filter server-side
-          if trend and t != trend:
-              continue
-
-          result.append({
-              "item_code": r.item_code,
-              "item": r.item_title,
-              "subgroup": r.subgroup_name,
-              "avg_per_day": round(float(r.avg_per_day or 0.0), 2),
-              "last_sold": r.last_sold or "",
-              "total_qty": float(r.total_qty or 0.0),
-              "trend": t
-          })
-
-      return result
+              t = "down"
+
+      # Apply optional trend filter server-side
+      if trend and t != trend:
+          continue
+
+      result.append({
+          "item_code": code,
+          "item": labels["title"],
+          "subgroup": labels["subgroup_raw"],
+          "avg_per_day": round(avg_per_day, 2),
+          "last_sold": from_ts(last_ts).strftime("%Y-%m-%d %H:%M:%S"),
+          "total_qty": total_qty,
+          "trend": t
+      })
+
+  return result
        
         
 
@@ -1565,68 +1495,30 @@ def get_item_daily_series(item_code: str, days: int = 30, lookback: int = 14) ->
     BizDate is defined as: CAST(DATEADD(HOUR, -7, RCPT_DATE) AS date)
 
     Bullet-proof rules:
-    - We compare item_code as NVARCHAR to avoid any int/arabic conversion issues.
-    - We generate a full date spine (last 14 BizDates), then LEFT JOIN sales (fills missing days with 0).
+    - We compare item_code as text to avoid any int/arabic conversion issues.
+    - We generate a full date spine (last <lookback> BizDates), filling missing days with 0.
+    - Sales come from the item cube; only days inside the <days> window count.
     """
 
     # Safety clamps (avoid insane requests)
     lookback = max(7, min(int(lookback or 14), 60))
     days = max(1, min(int(days or 30), 366))
 
-    sql = """
-    SET NOCOUNT ON;
-
-    WITH R AS (
-      SELECT
-        r.RCPT_ID,
-        r.RCPT_DATE,
-        CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date) AS BizDate
-      FROM dbo.HISTORIC_RECEIPT r
-    ),
-    MaxBiz AS (
-      SELECT MAX(BizDate) AS MaxBizDate FROM R
-    ),
-    -- Date spine: last <lookback> biz dates
-    Dates AS (
-      SELECT m.MaxBizDate AS BizDate, 0 AS n
-      FROM MaxBiz m
-      UNION ALL
-      SELECT DATEADD(DAY, -1, d.BizDate) AS BizDate, d.n + 1
-      FROM Dates d
-      WHERE d.n + 1 < ?
-    ),
-    -- Sales for that item within the requested window (days) but we only output last <lookback> from the spine
-    Sales AS (
-      SELECT
-        rr.BizDate,
-        SUM(c.ITM_QUANTITY) AS qty
-      FROM R rr
-      JOIN dbo.HISTORIC_RECEIPT_CONTENTS c ON c.RCPT_ID = rr.RCPT_ID
-      JOIN dbo.ITEMS i ON i.ITM_CODE = c.ITM_CODE
-      CROSS JOIN MaxBiz m
-      WHERE rr.BizDate >= DATEADD(DAY, -? + 1, m.MaxBizDate)
-        AND rr.BizDate <= m.MaxBizDate
-        -- Bullet-proof: compare item codes as strings
-        AND CAST(i.ITM_CODE AS nvarchar(50)) = ?
-      GROUP BY rr.BizDate
-    )
-    SELECT
-      CONVERT(varchar(10), d.BizDate, 120) AS biz_date,
-      ISNULL(s.qty, 0) AS qty
-    FROM Dates d
-    LEFT JOIN Sales s ON s.BizDate = d.BizDate
-    ORDER BY d.BizDate
-    OPTION (MAXRECURSION 100);
-    """
-
-    params = [lookback, days, str(item_code)]
+    cube = get_cube()
+    max_biz = cube.max_biz_date()
+    if max_biz is None:
+        return []
 
-    with _connect() as cn:
-        cur = cn.cursor()
-        cur.execute(sql, params)
-        rows = cur.fetchall()
+    spine = [max_biz - timedelta(days=n) for n in range(lookback - 1, -1, -1)]
+    qty_by_day: Dict[int, float] = {}
+    code = str(item_code)
+    if code in _item_dimension():
+        first = max(spine[0], max_biz - timedelta(days=days - 1))
+        sl = cube.slice(first, max_biz).for_items([code])
+        for d, q in zip(sl.day, sl.qty):
+            qty_by_day[int(d)] = qty_by_day.get(int(d), 0.0) + float(q)
 
-    return [{"biz_date": r.biz_date, "qty": float(r.qty or 0)} for r in rows]
+    return [{"biz_date": d.isoformat(), "qty": qty_by_day.get(d.toordinal(), 0.0)} for d in spine]
 
 
 def get_item_last_invoices(item_code: str, days: int = 30, limit: int = 10):
@@ -1653,25 +1545,12 @@ def get_item_last_invoices(item_code: str, days: int = 30, limit: int = 10):
     sql = """
     SET NOCOUNT ON;
 
-    WITH R AS (
+    WITH Windowed AS (
       SELECT
         r.RCPT_ID,
-        r.RCPT_DATE,
-        CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date) AS BizDate
+        r.RCPT_DATE
       FROM dbo.HISTORIC_RECEIPT r
-    ),
-    MaxBiz AS (
-      SELECT MAX(BizDate) AS MaxBizDate FROM R
-    ),
-    Windowed AS (
-      SELECT
-        r.RCPT_ID,
-        r.RCPT_DATE,
-        r.BizDate
-      FROM R r
-      CROSS JOIN MaxBiz m
-      WHERE r.BizDate >= DATEADD(DAY, -? + 1, m.MaxBizDate)
-        AND r.BizDate <= m.MaxBizDate
+      WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ?
     ),
     ItemInReceipts AS (
       SELECT
@@ -1693,11 +1572,12 @@ def get_item_last_invoices(item_code: str, days: int = 30, limit: int = 10):
     ORDER BY i.rcpt_date DESC;
     """
 
-    params = [safe_days, safe_item_code, safe_limit]
-
     with _connect() as cn:
         cur = cn.cursor()
-        cur.execute(sql, params)
+        win = _trailing_window(cur, safe_days)
+        if not win:
+            return []
+        cur.execute(sql, [win[0], win[1], safe_item_code, safe_limit])
         rows = cur.fetchall()
 
     # ✅ Return dicts (safe for jsonify)
@@ -1710,126 +1590,56 @@ def get_item_last_invoices(item_code: str, days: int = 30, limit: int = 10):
             "rcpt_amount": float(r.rcpt_amount or 0.0),
         })
     return result
-
-
-def get_item_momentum_kpis(item_code: str, days: int = 30):
-    """
-    Momentum KPIs for Item 360 drawer:
-      1) days_since_last_sold: business days since last sale in the selected window
-      2) peak_hour: hour (0-23) where item qty is highest in the selected window
-
-    Important:
-    - Uses BizDate = CAST(DATEADD(HOUR, -7, RCPT_DATE) AS date)
-    - Never forces ITM_CODE or subgroup to int (avoids PAYMENT / Arabic conversion errors)
-    """
-    safe_days = max(1, min(int(days or 30), 3650))
-    safe_item_code = (str(item_code or "")).strip()
-    if not safe_item_code:
-        return {
-            "item_code": safe_item_code,
-            "last_biz_date": None,
-            "days_since_last_sold": None,
-            "peak_hour": None,
-            "peak_hour_qty": None,
-        }
-
-    sql = """
-    SET NOCOUNT ON;
-
-    WITH R AS (
-      SELECT
-        r.RCPT_ID,
-        r.RCPT_DATE,
-        CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date) AS BizDate
-      FROM dbo.HISTORIC_RECEIPT r
-    ),
-    MaxBiz AS (
-      SELECT MAX(BizDate) AS MaxBizDate FROM R
-    ),
-    Windowed AS (
-      SELECT
-        r.RCPT_ID,
-        r.RCPT_DATE,
-        r.BizDate
-      FROM R r
-      CROSS JOIN MaxBiz m
-      WHERE r.BizDate >= DATEADD(DAY, -? + 1, m.MaxBizDate)
-        AND r.BizDate <= m.MaxBizDate
-    ),
-    Base AS (
-      SELECT
-        w.RCPT_ID,
-        w.RCPT_DATE,
-        w.BizDate,
-        COALESCE(c.ITM_QUANTITY, 0) AS qty
-      FROM Windowed w
-      JOIN dbo.HISTORIC_RECEIPT_CONTENTS c ON c.RCPT_ID = w.RCPT_ID
-      WHERE CAST(c.ITM_CODE AS nvarchar(50)) = ?
-    ),
-    LastSold AS (
-      SELECT MAX(BizDate) AS last_biz_date
-      FROM Base
-      WHERE qty > 0
-    ),
-    HourAgg AS (
-      SELECT
-        DATEPART(HOUR, b.RCPT_DATE) AS sale_hour,
-        SUM(b.qty) AS hour_qty
-      FROM Base b
-      GROUP BY DATEPART(HOUR, b.RCPT_DATE)
-    ),
-    PeakHour AS (
-      SELECT TOP (1)
-        sale_hour,
-        hour_qty
-      FROM HourAgg
-      ORDER BY hour_qty DESC, sale_hour ASC
-    )
-    SELECT
-      CONVERT(varchar(10), ls.last_biz_date, 120) AS last_biz_date,
-      CASE
-        WHEN ls.last_biz_date IS NULL THEN NULL
-        ELSE DATEDIFF(DAY, ls.last_biz_date, mb.MaxBizDate)
-      END AS days_since_last_sold,
-      ph.sale_hour AS peak_hour,
-      ph.hour_qty  AS peak_hour_qty
-    FROM MaxBiz mb
-    CROSS JOIN LastSold ls
-    OUTER APPLY (SELECT sale_hour, hour_qty FROM PeakHour) ph;
+
+
+def get_item_momentum_kpis(item_code: str, days: int = 30):
     """
+    Momentum KPIs for Item 360 drawer:
+      1) days_since_last_sold: business days since last sale in the selected window
+      2) peak_hour: hour (0-23) where item qty is highest in the selected window
 
-    params = [safe_days, safe_item_code]
+    Important:
+    - Uses BizDate = CAST(DATEADD(HOUR, -7, RCPT_DATE) AS date)
+    - Never forces ITM_CODE or subgroup to int (avoids PAYMENT / Arabic conversion errors)
+    - Computed from the item cube (per-hour quantities)
+    """
+    safe_days = max(1, min(int(days or 30), 3650))
+    safe_item_code = (str(item_code or "")).strip()
+    empty = {
+        "item_code": safe_item_code,
+        "last_biz_date": None,
+        "days_since_last_sold": None,
+        "peak_hour": None,
+        "peak_hour_qty": None,
+    }
+    if not safe_item_code:
+        return empty
 
-    with _connect() as cn:
-        cur = cn.cursor()
-        cur.execute(sql, params)
-        row = cur.fetchone()
+    cube = get_cube()
+    max_biz = cube.max_biz_date()
+    if max_biz is None:
+        return empty
+    sl = cube.slice(max_biz - timedelta(days=safe_days - 1), max_biz).for_items([safe_item_code])
+    if not len(sl):
+        return empty
 
-    if not row:
-        return {
-            "item_code": safe_item_code,
-            "last_biz_date": None,
-            "days_since_last_sold": None,
-            "peak_hour": None,
-            "peak_hour_qty": None,
-        }
+    sold = sl.day[sl.qty > 0]
+    last_biz = date.fromordinal(int(sold.max())) if len(sold) else None
 
-    # Defensive parsing: avoid NaN / type issues
-    last_biz_date = row.last_biz_date if row.last_biz_date else None
-    days_since = int(row.days_since_last_sold) if row.days_since_last_sold is not None else None
-    peak_hour = int(row.peak_hour) if row.peak_hour is not None else None
-    peak_qty = float(row.peak_hour_qty) if row.peak_hour_qty is not None else None
+    hour_qty = np.bincount(sl.hour.astype(np.int64), weights=sl.qty, minlength=24)
+    present = np.unique(sl.hour)
+    peak_hour = int(present[np.argmax(hour_qty[present])])  # first max → lowest hour on ties
 
     # Clamp peak_hour into range if weird source data exists
-    if peak_hour is not None and (peak_hour < 0 or peak_hour > 23):
+    if peak_hour < 0 or peak_hour > 23:
         peak_hour = None
 
     return {
         "item_code": safe_item_code,
-        "last_biz_date": last_biz_date,
-        "days_since_last_sold": days_since,
+        "last_biz_date": last_biz.isoformat() if last_biz else None,
+        "days_since_last_sold": (max_biz - last_biz).days if last_biz else None,
         "peak_hour": peak_hour,
-        "peak_hour_qty": peak_qty,
+        "peak_hour_qty": float(hour_qty[peak_hour]) if peak_hour is not None else None,
     }
 
 
@@ -1846,7 +1656,7 @@ def search_invoices(
 ):
     """
     List receipts (invoices) with filters + pagination.
-    - Uses BizDate (RCPT_DATE shifted -7h) for date range filtering.
+    - BizDate range (07:00 boundary) is applied as sargable RCPT_DATE bounds.
     - Does NOT do any int conversion on item codes (avoids Arabic / PAYMENT / mixed types issues).
     """
     safe_limit = max(1, min(int(limit or 200), 500))
@@ -1855,32 +1665,17 @@ def search_invoices(
     safe_item_code = (item_code or "").strip()
     safe_q = (q or "").strip()
 
-    # Default date range: last 30 biz days ending at max biz date in table
-    # Important: we avoid relying on system time; we anchor on data's max BizDate.
     sql = """
     SET NOCOUNT ON;
 
-    WITH R AS (
+    WITH Windowed AS (
       SELECT
         r.RCPT_ID,
         r.RCPT_DATE,
         r.RCPT_AMOUNT,
         CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date) AS BizDate
       FROM dbo.HISTORIC_RECEIPT r
-    ),
-    MaxBiz AS (
-      SELECT MAX(BizDate) AS MaxBizDate FROM R
-    ),
-    Windowed AS (
-      SELECT r.*
-      FROM R r
-      CROSS JOIN MaxBiz m
-      WHERE
-        (
-          (? IS NOT NULL AND ? IS NOT NULL AND r.BizDate BETWEEN ? AND ?)
-          OR
-          (? IS NULL OR ? IS NULL) AND r.BizDate BETWEEN DATEADD(DAY, -30 + 1, m.MaxBizDate) AND m.MaxBizDate
-        )
+      WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ?
     ),
     -- Receipts filter by item_code (optional)
     ItemFiltered AS (
@@ -1921,12 +1716,13 @@ def search_invoices(
         AND
         (? IS NULL OR s.RCPT_AMOUNT <= ?)
     ),
-    -- Count distinct line items per receipt (for display)
+    -- Count distinct line items per receipt (for display), only for matching receipts
     LinesAgg AS (
       SELECT
         c.RCPT_ID,
         COUNT(DISTINCT CAST(c.ITM_CODE AS nvarchar(50))) AS items_count
-      FROM dbo.HISTORIC_RECEIPT_CONTENTS c
+      FROM AmountFiltered a
+      JOIN dbo.HISTORIC_RECEIPT_CONTENTS c ON c.RCPT_ID = a.RCPT_ID
       GROUP BY c.RCPT_ID
     ),
     Ranked AS (
@@ -1951,22 +1747,29 @@ def search_invoices(
     ORDER BY rn;
     """
 
-    params = [
-        start_date, end_date, start_date, end_date,
-        start_date, end_date,
+    with _connect() as cn:
+        cur = cn.cursor()
+        # Default date range: last 30 biz days ending at max biz date in table
+        # Important: we avoid relying on system time; we anchor on data's max BizDate.
+        if start_date and end_date:
+            win = biz_window_7h(parse_date(start_date), parse_date(end_date))
+        else:
+            win = _trailing_window(cur, 30)
+        if not win:
+            return []
 
-        safe_item_code, safe_item_code,
+        params = [
+            win[0], win[1],
 
-        safe_q, safe_q, safe_q, safe_q,
+            safe_item_code, safe_item_code,
 
-        min_amount, min_amount,
-        max_amount, max_amount,
+            safe_q, safe_q, safe_q, safe_q,
 
-        safe_offset, safe_offset, safe_limit
-    ]
+            min_amount, min_amount,
+            max_amount, max_amount,
 
-    with _connect() as cn:
-        cur = cn.cursor()
+            safe_offset, safe_offset, safe_limit
+        ]
         cur.execute(sql, params)
         rows = cur.fetchall()
 
@@ -1996,7 +1799,8 @@ def get_invoices_list(
     Returns paginated receipts (invoice headers) with safe filtering.
 
     Notes:
-    - BizDate = RCPT_DATE shifted by -7 hours, cast to date.
+    - BizDate = RCPT_DATE shifted by -7 hours, cast to date; the range is
+      applied as sargable RCPT_DATE bounds (blank = first/last BizDate with data).
     - Uses ROW_NUMBER() pagination (works on older SQL Server versions).
     - Avoids any int conversions on item codes.
     """
@@ -2011,24 +1815,15 @@ def get_invoices_list(
     sql = """
     SET NOCOUNT ON;
 
-    WITH R AS (
+    WITH Filtered AS (
       SELECT
         r.RCPT_ID,
         r.RCPT_DATE,
         r.RCPT_AMOUNT,
         CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date) AS BizDate
       FROM dbo.HISTORIC_RECEIPT r
-    ),
-    Filtered AS (
-      SELECT
-        r.RCPT_ID,
-        r.RCPT_DATE,
-        r.RCPT_AMOUNT,
-        r.BizDate
-      FROM R r
       WHERE
-        ( ? = '' OR r.BizDate >= CAST(? AS date) )
-        AND ( ? = '' OR r.BizDate <= CAST(? AS date) )
+        r.RCPT_DATE >= ? AND r.RCPT_DATE < ?
         AND ( ? IS NULL OR r.RCPT_AMOUNT >= ? )
         AND ( ? IS NULL OR r.RCPT_AMOUNT <= ? )
         AND (
@@ -2044,45 +1839,39 @@ def get_invoices_list(
           )
         )
     ),
-    Enriched AS (
-      SELECT
-        f.RCPT_ID,
-        f.RCPT_DATE,
-        f.RCPT_AMOUNT,
-        f.BizDate,
-        (SELECT COUNT(*) FROM dbo.HISTORIC_RECEIPT_CONTENTS c WHERE c.RCPT_ID = f.RCPT_ID) AS lines_count
-      FROM Filtered f
-    ),
     Numbered AS (
       SELECT
-        e.*,
-        ROW_NUMBER() OVER (ORDER BY e.RCPT_DATE DESC, e.RCPT_ID DESC) AS rn
-      FROM Enriched e
+        f.*,
+        ROW_NUMBER() OVER (ORDER BY f.RCPT_DATE DESC, f.RCPT_ID DESC) AS rn,
+        COUNT(*) OVER () AS total_rows
+      FROM Filtered f
     )
     SELECT
-      (SELECT COUNT(*) FROM Enriched) AS total_rows,
+      n.total_rows,
       n.RCPT_ID,
       CONVERT(varchar(19), n.RCPT_DATE, 120) AS rcpt_date,
       CONVERT(varchar(10), n.BizDate, 120) AS biz_date,
       CAST(n.RCPT_AMOUNT AS float) AS amount,
-      CAST(n.lines_count AS int) AS lines_count
+      CAST((SELECT COUNT(*) FROM dbo.HISTORIC_RECEIPT_CONTENTS c WHERE c.RCPT_ID = n.RCPT_ID) AS int) AS lines_count
     FROM Numbered n
     WHERE n.rn BETWEEN ? AND ?
     ORDER BY n.rn ASC;
     """
 
-    params = [
-        start_date, start_date,
-        end_date, end_date,
-        min_amount, min_amount,
-        max_amount, max_amount,
-        q, q,
-        item_code, item_code,
-        row_start, row_end
-    ]
-
     with _connect() as cn:
         cur = cn.cursor()
+        win = _range_window(cur, start_date, end_date)
+        if not win:
+            return {"total": 0, "rows": []}
+
+        params = [
+            win[0], win[1],
+            min_amount, min_amount,
+            max_amount, max_amount,
+            q, q,
+            item_code, item_code,
+            row_start, row_end
+        ]
         cur.execute(sql, params)
         rows = cur.fetchall()
 
@@ -2108,33 +1897,46 @@ def get_invoice_details(rcpt_id: str):
     """
     Returns line items for a single receipt:
     - item_code, item_title, qty, subgroup
+    Closed receipts never change, so they are served from receipt_details' LRU.
     """
     rcpt_id = (rcpt_id or "").strip()
-    if not rcpt_id:
+    if not rcpt_id.isdigit():
         return []
+    return receipt_details.get_invoice_lines([int(rcpt_id)])[int(rcpt_id)]
 
-    sql = """
+
+def get_invoice_details_many(rcpt_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    get_invoice_details rows for several receipts in one round trip:
+    {rcpt_id: rows}, receipts without lines left out.
+    """
+    if not rcpt_ids:
+        return {}
+    marks = ", ".join("?" for _ in rcpt_ids)
+    # ITEMS joined on the raw ITM_CODE columns so the index seek survives
+    sql = f"""
     SET NOCOUNT ON;
 
     SELECT
+      c.RCPT_ID,
       CAST(c.ITM_CODE AS nvarchar(50)) AS item_code,
       COALESCE(NULLIF(LTRIM(RTRIM(CAST(i.ITM_TITLE AS nvarchar(255)))), ''), CAST(c.ITM_CODE AS nvarchar(50))) AS item_title,
       COALESCE(NULLIF(LTRIM(RTRIM(CAST(i.ITM_SUBGROUP AS nvarchar(100)))), ''), '') AS subgroup,
       CAST(COALESCE(c.ITM_QUANTITY, 0) AS float) AS qty
     FROM dbo.HISTORIC_RECEIPT_CONTENTS c
-    LEFT JOIN dbo.ITEMS i ON CAST(i.ITM_CODE AS nvarchar(50)) = CAST(c.ITM_CODE AS nvarchar(50))
-    WHERE c.RCPT_ID = ?
-    ORDER BY item_title ASC, item_code ASC;
+    LEFT JOIN dbo.ITEMS i ON i.ITM_CODE = c.ITM_CODE
+    WHERE c.RCPT_ID IN ({marks})
+    ORDER BY c.RCPT_ID ASC, item_title ASC, item_code ASC;
     """
 
     with _connect() as cn:
         cur = cn.cursor()
-        cur.execute(sql, [rcpt_id])
+        cur.execute(sql, [int(r) for r in rcpt_ids])
         rows = cur.fetchall()
 
-    result = []
+    result: Dict[int, List[Dict[str, Any]]] = {}
     for r in rows:
-        result.append({
+        result.setdefault(int(r.RCPT_ID), []).append({
             "item_code": r.item_code,
             "item_title": r.item_title,
             "subgroup": r.subgroup,
@@ -2145,103 +1947,37 @@ def get_invoice_details(rcpt_id: str):
 
 def get_daily_items_summary(start_date: str = "", end_date: str = "", page: int = 1, page_size: int = 31):
     """
-    Returns day-level aggregates:
+    Returns day-level aggregates (newest first, paged):
     - unique_items: distinct item codes sold that day
     - total_qty: sum of quantities that day
     - receipts_count: distinct receipts that day
     - total_sales: sum of receipt amounts that day
+
+    Read from the rollup store; blank start/end mean "all history" / "today".
     """
     safe_page = max(1, int(page or 1))
     safe_page_size = max(7, min(int(page_size or 31), 90))
-    row_start = (safe_page - 1) * safe_page_size + 1
-    row_end = safe_page * safe_page_size
-
-    sql = """
-    SET NOCOUNT ON;
-
-    WITH R AS (
-      SELECT
-        r.RCPT_ID,
-        r.RCPT_DATE,
-        r.RCPT_AMOUNT,
-        CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date) AS BizDate
-      FROM dbo.HISTORIC_RECEIPT r
-    ),
-    Filtered AS (
-      SELECT *
-      FROM R
-      WHERE
-        ( ? = '' OR BizDate >= CAST(? AS date) )
-        AND ( ? = '' OR BizDate <= CAST(? AS date) )
-    ),
-    DayAgg AS (
-      SELECT
-        f.BizDate,
-        COUNT(DISTINCT f.RCPT_ID) AS receipts_count,
-        SUM(COALESCE(f.RCPT_AMOUNT, 0)) AS total_sales
-      FROM Filtered f
-      GROUP BY f.BizDate
-    ),
-    ItemAgg AS (
-      SELECT
-        f.BizDate,
-        COUNT(DISTINCT CAST(c.ITM_CODE AS nvarchar(50))) AS unique_items,
-        SUM(COALESCE(c.ITM_QUANTITY, 0)) AS total_qty
-      FROM Filtered f
-      JOIN dbo.HISTORIC_RECEIPT_CONTENTS c ON c.RCPT_ID = f.RCPT_ID
-      GROUP BY f.BizDate
-    ),
-    Joined AS (
-      SELECT
-        d.BizDate,
-        d.receipts_count,
-        CAST(d.total_sales AS float) AS total_sales,
-        i.unique_items,
-        CAST(i.total_qty AS float) AS total_qty
-      FROM DayAgg d
-      LEFT JOIN ItemAgg i ON i.BizDate = d.BizDate
-    ),
-    Numbered AS (
-      SELECT
-        j.*,
-        ROW_NUMBER() OVER (ORDER BY j.BizDate DESC) AS rn
-      FROM Joined j
-    )
-    SELECT
-      (SELECT COUNT(*) FROM Joined) AS total_rows,
-      CONVERT(varchar(10), BizDate, 120) AS biz_date,
-      CAST(COALESCE(unique_items, 0) AS int) AS unique_items,
-      CAST(COALESCE(total_qty, 0) AS float) AS total_qty,
-      CAST(COALESCE(receipts_count, 0) AS int) AS receipts_count,
-      CAST(COALESCE(total_sales, 0) AS float) AS total_sales
-    FROM Numbered
-    WHERE rn BETWEEN ? AND ?
-    ORDER BY rn ASC;
-    """
+    row_start = (safe_page - 1) * safe_page_size
 
-    params = [start_date, start_date, end_date, end_date, row_start, row_end]
-
-    with _connect() as cn:
-        cur = cn.cursor()
-        cur.execute(sql, params)
-        rows = cur.fetchall()
-
-    if not rows:
+    start_date = (start_date or "").strip()
+    end_date = (end_date or "").strip()
+    first = start_date or rollup_store().first_day(7)
+    if not first:
         return {"total": 0, "rows": []}
-
-    total = int(rows[0].total_rows or 0)
+    rows = rollup_rows(first, end_date or open_business_day(7), 7)
+    rows.reverse()
 
     out = []
-    for r in rows:
+    for r in rows[row_start:row_start + safe_page_size]:
         out.append({
-            "biz_date": r.biz_date,
-            "unique_items": int(r.unique_items or 0),
-            "total_qty": float(r.total_qty or 0.0),
-            "receipts_count": int(r.receipts_count or 0),
-            "total_sales": float(r.total_sales or 0.0),
+            "biz_date": r["biz_date"].isoformat(),
+            "unique_items": r["unique_items"],
+            "total_qty": r["item_qty"],
+            "receipts_count": r["receipts"],
+            "total_sales": r["amount"],
         })
 
-    return {"total": total, "rows": out}
+    return {"total": len(rows), "rows": out}
 
 
 def get_daily_items_for_date(biz_date: str):
@@ -2252,18 +1988,17 @@ def get_daily_items_for_date(biz_date: str):
     - subgroup
     - total_qty
     """
-    biz_date = (biz_date or "").strip()
-    if not biz_date:
+    day = parse_date(biz_date)
+    if day is None:
         return []
 
     sql = """
     SET NOCOUNT ON;
 
     WITH R AS (
-      SELECT
-        r.RCPT_ID,
-        CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date) AS BizDate
+      SELECT r.RCPT_ID
       FROM dbo.HISTORIC_RECEIPT r
+      WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ?
     )
     SELECT
       CAST(c.ITM_CODE AS nvarchar(50)) AS item_code,
@@ -2286,7 +2021,6 @@ def get_daily_items_for_date(biz_date: str):
       ON CAST(i.ITM_CODE AS nvarchar(50)) = CAST(c.ITM_CODE AS nvarchar(50))
     LEFT JOIN dbo.SUBGROUPS sg
       ON CAST(sg.SubGrp_ID AS nvarchar(50)) = CAST(i.ITM_SUBGROUP AS nvarchar(50))
-    WHERE r.BizDate = CAST(? AS date)
     GROUP BY
       CAST(c.ITM_CODE AS nvarchar(50)),
       COALESCE(
@@ -2305,7 +2039,7 @@ def get_daily_items_for_date(biz_date: str):
 
     with _connect() as cn:
         cur = cn.cursor()
-        cur.execute(sql, [biz_date])
+        cur.execute(sql, list(biz_window_7h(day, day)))
         rows = cur.fetchall()
 
     result = []
@@ -2337,8 +2071,7 @@ def get_daily_items_summary_legacy(start_date: date, end_date: date, item_code:
         r.RCPT_AMOUNT,
         CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date) AS BizDate
       FROM dbo.HISTORIC_RECEIPT r
-      WHERE CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date) >= ?
-        AND CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date) <= ?
+      WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ?
     ),
     L AS (
       SELECT
@@ -2365,8 +2098,9 @@ def get_daily_items_summary_legacy(start_date: date, end_date: date, item_code:
     ORDER BY BizDate DESC;
     """
 
+    range_start, range_end = biz_window_7h(parse_date(start_date), parse_date(end_date))
     params = [
-        start_date, end_date,
+        range_start, range_end,
         item_code, item_code,
         subgroup, subgroup
     ]
@@ -2402,7 +2136,7 @@ def get_daily_items_detail(biz_date: date, item_code: str = "", subgroup: str =
         r.RCPT_DATE,
         CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date) AS BizDate
       FROM dbo.HISTORIC_RECEIPT r
-      WHERE CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date) = ?
+      WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ?
     ),
     L AS (
       SELECT
@@ -2428,7 +2162,8 @@ def get_daily_items_detail(biz_date: date, item_code: str = "", subgroup: str =
     ORDER BY total_qty DESC, last_sold_dt DESC;
     """
 
-    params = [biz_date, item_code, item_code, subgroup, subgroup, limit]
+    day = parse_date(biz_date)
+    params = [*biz_window_7h(day, day), item_code, item_code, subgroup, subgroup, limit]
 
     with _connect() as cn:
         cur = cn.cursor()
@@ -2467,7 +2202,8 @@ def get_dead_items(
 
     Notes:
     - BizDate = CAST(DATEADD(HOUR, -7, RCPT_DATE) AS date)
-    - Anchors max_biz_date from data (not server/system date)
+    - Anchors max_biz_date from data (not server/system date), via one MAX(RCPT_DATE) seek
+    - Window and dead cutoff are passed as RCPT_DATE bounds (sargable)
     - Avoids ALL int conversions on subgroup/item_code
     """
 
@@ -2485,34 +2221,22 @@ def get_dead_items(
     sql = """
     SET NOCOUNT ON;
 
-    WITH R AS (
-      SELECT
-        r.RCPT_ID,
-        r.RCPT_DATE,
-        r.RCPT_AMOUNT,
-        CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date) AS BizDate
+    WITH Windowed AS (
+      SELECT r.RCPT_ID
       FROM dbo.HISTORIC_RECEIPT r
-    ),
-    MaxBiz AS (
-      SELECT MAX(BizDate) AS MaxBizDate FROM R
-    ),
-    Windowed AS (
-      SELECT r.*
-      FROM R r
-      CROSS JOIN MaxBiz m
-      WHERE r.BizDate >= DATEADD(DAY, -? + 1, m.MaxBizDate)
-        AND r.BizDate <= m.MaxBizDate
+      WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ?
     ),
 
-    -- Last sold (ALL TIME, anchored to data)
+    -- Last sold (ALL TIME, anchored to data): only items whose latest sale is
+    -- before the dead cutoff survive the HAVING
     ItemLastSold AS (
       SELECT
         CAST(c.ITM_CODE AS nvarchar(50)) AS item_code,
-        MAX(w.BizDate)  AS last_sold_biz_date,
-        MAX(w.RCPT_DATE) AS last_sold_dt
-      FROM R w
-      JOIN dbo.HISTORIC_RECEIPT_CONTENTS c ON c.RCPT_ID = w.RCPT_ID
+        MAX(r.RCPT_DATE) AS last_sold_dt
+      FROM dbo.HISTORIC_RECEIPT r
+      JOIN dbo.HISTORIC_RECEIPT_CONTENTS c ON c.RCPT_ID = r.RCPT_ID
       GROUP BY CAST(c.ITM_CODE AS nvarchar(50))
+      HAVING MAX(r.RCPT_DATE) < ?
     ),
 
     -- Totals (within window for performance / meaningful “recent” measure)
@@ -2531,18 +2255,15 @@ def get_dead_items(
         COALESCE(NULLIF(LTRIM(RTRIM(CAST(i.ITM_TITLE AS nvarchar(255)))), ''), ils.item_code) AS item_title,
         COALESCE(NULLIF(LTRIM(RTRIM(CAST(i.ITM_SUBGROUP AS nvarchar(100)))), ''), '') AS subgroup_name,
         ils.last_sold_dt,
-        ils.last_sold_biz_date,
+        CAST(DATEADD(HOUR, -7, ils.last_sold_dt) AS date) AS last_sold_biz_date,
         CAST(COALESCE(iwa.total_qty_window, 0) AS float) AS total_qty_window,
-        m.MaxBizDate
+        CAST(? AS date) AS MaxBizDate
       FROM ItemLastSold ils
-      CROSS JOIN MaxBiz m
       LEFT JOIN dbo.ITEMS i
         ON CAST(i.ITM_CODE AS nvarchar(50)) = ils.item_code
       LEFT JOIN ItemWindowAgg iwa
         ON iwa.item_code = ils.item_code
       WHERE 1=1
-        AND ils.last_sold_biz_date IS NOT NULL
-        AND ils.last_sold_biz_date <= DATEADD(DAY, -?, m.MaxBizDate)
         AND ( ? = '' OR COALESCE(NULLIF(LTRIM(RTRIM(CAST(i.ITM_SUBGROUP AS nvarchar(100)))), ''), '') = ? )
         AND (
           ? = '' OR
@@ -2576,19 +2297,27 @@ def get_dead_items(
     ORDER BY rn ASC;
     """
 
-    params = [
-        safe_window_days,         # Windowed: -window_days + 1
-        safe_dead_days,           # dead_days threshold
+    with _connect() as cn:
+      cur = cn.cursor()
+      win = _trailing_window(cur, safe_window_days)
+      if not win:
+        return {"total": 0, "rows": []}
+      window_start, window_end, max_biz = win
+      # dead: last_sold_biz_date <= max_biz - dead_days, i.e. no sale since
+      # the start of BizDate (max_biz - dead_days + 1)
+      dead_cutoff, _ = biz_window_7h(max_biz - timedelta(days=safe_dead_days - 1), max_biz)
 
-        subgroup, subgroup,       # subgroup filter
-        q, q, q,                  # search filter
-        min_total_qty, min_total_qty,  # min_total_qty filter
+      params = [
+          window_start, window_end,  # Windowed: RCPT_DATE bounds
+          dead_cutoff,               # ItemLastSold: HAVING MAX(RCPT_DATE) < cutoff
+          max_biz,                   # MaxBizDate
 
-        row_start, row_end        # pagination
-    ]
+          subgroup, subgroup,        # subgroup filter
+          q, q, q,                   # search filter
+          min_total_qty, min_total_qty,  # min_total_qty filter
 
-    with _connect() as cn:
-      cur = cn.cursor()
+          row_start, row_end         # pagination
+      ]
       cur.execute(sql, params)
       rows = cur.fetchall()
 
@@ -2626,14 +2355,14 @@ def get_dead_items_page(
     Recently Active -> Now Dead (actionable).
     - Active window: sold at least once in last `lookback_days` BizDates
     - Dead window: zero sales in last `dead_days` BizDates
-    - Anchored to Max RCPT_DATE in data (not system time)
+    - Anchored to the latest BizDate with sales (not system time)
     - No int conversions on item_code/subgroup (safe with Arabic/text)
+    - Aggregated from the item cube
     - Returns: {"total": int, "rows": [...]}
     """
     safe_page = max(1, int(page or 1))
     safe_page_size = max(10, min(int(page_size or 50), 200))
-    row_start = (safe_page - 1) * safe_page_size + 1
-    row_end = safe_page * safe_page_size
+    row_start = (safe_page - 1) * safe_page_size
 
     safe_q = (q or "").strip()
     safe_subgroup = (subgroup or "").strip()
@@ -2643,191 +2372,91 @@ def get_dead_items_page(
     safe_min_qty = float(min_qty or 1.0)
     safe_min_receipts = max(1, int(min_receipts or 1))
 
-    sql = """
-    SET NOCOUNT ON;
-
-    -- 1) Anchor on data (fast when RCPT_DATE is indexed)
-    WITH MaxDt AS (
-      SELECT MAX(r.RCPT_DATE) AS MaxRCPT_DATE
-      FROM dbo.HISTORIC_RECEIPT r
-    ),
-    MaxBiz AS (
-      SELECT
-        CAST(DATEADD(HOUR, -7, MaxRCPT_DATE) AS date) AS MaxBizDate,
-        MaxRCPT_DATE
-      FROM MaxDt
-    ),
-
-    -- 2) Convert BizDate windows to RCPT_DATE datetime boundaries (index-friendly)
-    Bounds AS (
-      SELECT
-        m.MaxBizDate,
-
-        -- Lookback BizDate start
-        DATEADD(DAY, -? + 1, m.MaxBizDate) AS LookbackStartBiz,
-
-        -- Dead BizDate start
-        DATEADD(DAY, -? + 1, m.MaxBizDate) AS DeadStartBiz,
-
-        -- Lookback window datetime start: BizDate + 07:00
-        DATEADD(HOUR, 7, CAST(DATEADD(DAY, -? + 1, m.MaxBizDate) AS datetime)) AS LookbackStartDT,
-
-        -- Dead window datetime start: BizDate + 07:00
-        DATEADD(HOUR, 7, CAST(DATEADD(DAY, -? + 1, m.MaxBizDate) AS datetime)) AS DeadStartDT,
-
-        -- Window end datetime (exclusive): (MaxBizDate + 1 day) + 07:00
-        DATEADD(HOUR, 7, CAST(DATEADD(DAY, 1, m.MaxBizDate) AS datetime)) AS EndDT
-      FROM MaxBiz m
-    ),
-
-    -- 3) Receipts in lookback window (filter by RCPT_DATE so indexes work)
-    LookbackReceipts AS (
-      SELECT
-        r.RCPT_ID,
-        r.RCPT_DATE,
-        CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date) AS BizDate
-      FROM dbo.HISTORIC_RECEIPT r
-      CROSS JOIN Bounds b
-      WHERE r.RCPT_DATE >= b.LookbackStartDT
-        AND r.RCPT_DATE <  b.EndDT
-    ),
-
-    -- 4) Receipts in dead window (again index-friendly)
-    DeadReceipts AS (
-      SELECT
-        r.RCPT_ID,
-        r.RCPT_DATE,
-        CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date) AS BizDate
-      FROM dbo.HISTORIC_RECEIPT r
-      CROSS JOIN Bounds b
-      WHERE r.RCPT_DATE >= b.DeadStartDT
-        AND r.RCPT_DATE <  b.EndDT
-    ),
+    cube = get_cube()
+    max_biz = cube.max_biz_date()
+    if max_biz is None:
+        return {"total": 0, "rows": []}
 
-    -- 5) Lines in lookback window
-    LbLines AS (
-      SELECT
-        CAST(c.ITM_CODE AS nvarchar(50)) AS item_code,
-        COALESCE(NULLIF(LTRIM(RTRIM(CAST(i.ITM_TITLE AS nvarchar(255)))), ''), CAST(c.ITM_CODE AS nvarchar(50))) AS item_title,
-        COALESCE(NULLIF(LTRIM(RTRIM(CAST(i.ITM_SUBGROUP AS nvarchar(100)))), ''), '') AS subgroup,
-        CAST(COALESCE(c.ITM_QUANTITY, 0) AS float) AS qty,
-        lr.RCPT_ID,
-        lr.RCPT_DATE,
-        lr.BizDate
-      FROM LookbackReceipts lr
-      JOIN dbo.HISTORIC_RECEIPT_CONTENTS c ON c.RCPT_ID = lr.RCPT_ID
-      LEFT JOIN dbo.ITEMS i
-        ON CAST(i.ITM_CODE AS nvarchar(50)) = CAST(c.ITM_CODE AS nvarchar(50))
-    ),
+    lookback_first = max_biz - timedelta(days=safe_lookback - 1)
+    dead_first = max_biz - timedelta(days=safe_dead - 1)
+    lookback = cube.slice(lookback_first, max_biz)
 
-    -- 6) Aggregate per item over lookback
-    LbAgg AS (
-      SELECT
-        l.item_code,
-        MAX(l.item_title) AS item_title,
-        MAX(l.subgroup)   AS subgroup,
-        MAX(l.RCPT_DATE)  AS last_sold_dt,
-        MAX(l.BizDate)    AS last_sold_biz,
-        SUM(l.qty)        AS qty_lookback,
-        COUNT(DISTINCT l.RCPT_ID) AS receipts_lookback
-      FROM LbLines l
-      GROUP BY l.item_code
-      HAVING
-        SUM(l.qty) >= ?
-        AND COUNT(DISTINCT l.RCPT_ID) >= ?
-    ),
+    # Anything with a line in the dead window is NOT dead
+    if dead_first >= lookback_first:
+        dead_window = lookback.filter(lookback.day >= dead_first.toordinal())
+    else:
+        dead_window = cube.slice(dead_first, max_biz)
+    sold_recently = set(np.unique(dead_window.item_code).tolist())
+
+    totals = lookback.per_item()
+    dim = _item_dimension()
+    filtered = []
+    for i, code in enumerate(totals["item_code"]):
+        code = str(code)
+        qty = float(totals["qty"][i])
+        receipts = int(totals["receipts"][i])
+        if qty < safe_min_qty or receipts < safe_min_receipts or code in sold_recently:
+            continue
+        labels = dim.get(code, {"title": code, "subgroup_raw": ""})
+        if safe_subgroup and labels["subgroup_raw"] != safe_subgroup:
+            continue
+        if safe_q and not (_contains(code, safe_q) or _contains(labels["title"], safe_q)):
+            continue
+        filtered.append({
+            "item_code": code,
+            "item_title": labels["title"],
+            "subgroup": labels["subgroup_raw"],
+            "last_sold": from_ts(totals["last_ts"][i]).strftime("%Y-%m-%d %H:%M:%S"),
+            "days_since_last_sold": max_biz.toordinal() - int(totals["last_day"][i]),
+            "qty_lookback": qty,
+            "receipts_lookback": receipts,
+        })
 
-    -- 7) Anything sold in dead window is NOT dead
-    DeadSold AS (
-      SELECT DISTINCT CAST(c.ITM_CODE AS nvarchar(50)) AS item_code
-      FROM DeadReceipts dr
-      JOIN dbo.HISTORIC_RECEIPT_CONTENTS c ON c.RCPT_ID = dr.RCPT_ID
-    ),
+    filtered.sort(key=lambda r: (-r["days_since_last_sold"], -r["qty_lookback"], r["item_code"]))
+    return {"total": len(filtered), "rows": filtered[row_start:row_start + safe_page_size]}
 
-    -- 8) Apply filters + compute days since last sold
-    Filtered AS (
-      SELECT
-        a.item_code,
-        a.item_title,
-        a.subgroup,
-        a.last_sold_dt,
-        a.last_sold_biz,
-        a.qty_lookback,
-        a.receipts_lookback,
-        DATEDIFF(DAY, a.last_sold_biz, b.MaxBizDate) AS days_since_last_sold
-      FROM LbAgg a
-      CROSS JOIN Bounds b
-      WHERE NOT EXISTS (SELECT 1 FROM DeadSold d WHERE d.item_code = a.item_code)
-        AND ( ? = '' OR a.subgroup = ? )
-        AND (
-          ? = ''
-          OR a.item_code LIKE '%' + ? + '%'
-          OR a.item_title LIKE '%' + ? + '%'
-        )
-    ),
 
-    Numbered AS (
-      SELECT
-        (SELECT COUNT(*) FROM Filtered) AS total_rows,
-        f.*,
-        ROW_NUMBER() OVER (
-          ORDER BY f.days_since_last_sold DESC, f.qty_lookback DESC, f.item_code ASC
-        ) AS rn
-      FROM Filtered f
-    )
-    SELECT
-      total_rows,
-      item_code,
-      item_title,
-      subgroup,
-      CONVERT(varchar(19), last_sold_dt, 120) AS last_sold,
-      CAST(days_since_last_sold AS int)       AS days_since_last_sold,
-      CAST(qty_lookback AS float)             AS qty_lookback,
-      CAST(receipts_lookback AS int)          AS receipts_lookback
-    FROM Numbered
-    WHERE rn BETWEEN ? AND ?
-    ORDER BY rn ASC;
+# ------------------------------------------------------------
+# Reorder Radar
+# ------------------------------------------------------------
+@ttl_cache(seconds=300, stale_seconds=900)
+def _reorder_radar_scores() -> List[Dict]:
     """
+    Every item sold in the last REORDER_WINDOW_DAYS BizDates, scored by
+    reorder_scoring over one item-cube slice, with ITEMS labels attached.
+    Anchored to the latest BizDate with sales; items missing from ITEMS
+    are skipped.
+    """
+    cube = get_cube()
+    max_biz = cube.max_biz_date()
+    if max_biz is None:
+        return []
 
-    # NOTE: lookback/dead are used twice in Bounds, so we pass them twice.
-    params = [
-        safe_lookback,  # LookbackStartBiz
-        safe_dead,      # DeadStartBiz
-        safe_lookback,  # LookbackStartDT
-        safe_dead,      # DeadStartDT
-
-        safe_min_qty,
-        safe_min_receipts,
-
-        safe_subgroup, safe_subgroup,
-        safe_q, safe_q, safe_q,
-
-        row_start, row_end
-    ]
-
-    with _connect() as cn:
-        cur = cn.cursor()
-        cur.execute(sql, params)
-        rows = cur.fetchall()
-
-    if not rows:
-        return {"total": 0, "rows": []}
-
-    total = int(rows[0].total_rows or 0)
-
+    first = max_biz - timedelta(days=REORDER_WINDOW_DAYS - 1)
+    codes, matrix = qty_matrix(cube.slice(first, max_biz), max_biz)
+    dim = _item_dimension()
     out = []
-    for r in rows:
-        out.append({
-            "item_code": r.item_code,
-            "item_title": r.item_title,
-            "subgroup": r.subgroup or "",
-            "last_sold": r.last_sold or "",
-            "days_since_last_sold": int(r.days_since_last_sold or 0),
-            "qty_lookback": float(r.qty_lookback or 0.0),
-            "receipts_lookback": int(r.receipts_lookback or 0),
-        })
+    for row in score_items(codes, matrix).rows(max_biz):
+        labels = dim.get(row["itm_code"])
+        if labels is None:
+            continue
+        row["itm_name"] = labels["title"]
+        row["subgroup_id"] = labels["subgroup_raw"]
+        row["subgroup_name"] = labels["subgroup_label"]
+        out.append(row)
+    return out
 
-    return {"total": total, "rows": out}
+
+def get_reorder_radar_items(lookback_days: int = 30) -> List[Dict]:
+    """
+    Reorder Radar population: scored items with a sale in the last
+    <lookback_days> BizDates (1..90). Scores always use the full 7/30/90-day
+    windows; the lookback only decides which items are listed.
+    Rows are shared with the cache: callers filter/sort copies of the list,
+    never the dicts.
+    """
+    safe_lookback = max(1, min(int(lookback_days or 30), REORDER_WINDOW_DAYS))
+    return [r for r in _reorder_radar_scores() if r["days_since_last_sale"] < safe_lookback]
 
 
 # ------------------------------------------------------------
@@ -2841,32 +2470,12 @@ def get_pos_sales_total_by_range(start_date, end_date) -> float:
     CAST(DATEADD(HOUR, -7, RCPT_DATE) AS date)
 
     This matches your existing business-date logic used in the app.
+    Summed from the daily rollup store (open day read live).
     """
     if not start_date or not end_date:
         return 0.0
 
-    sql = """
-    SET NOCOUNT ON;
-
-    WITH R AS (
-      SELECT
-        CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date) AS BizDate,
-        CAST(r.RCPT_AMOUNT AS float) AS RCPT_AMOUNT
-      FROM dbo.HISTORIC_RECEIPT r
-    )
-    SELECT
-      CAST(COALESCE(SUM(RCPT_AMOUNT), 0) AS float) AS total_sales
-    FROM R
-    WHERE BizDate >= CAST(? AS date)
-      AND BizDate <= CAST(? AS date);
-    """
-
-    with _connect() as cn:
-        cur = cn.cursor()
-        cur.execute(sql, [start_date, end_date])
-        row = cur.fetchone()
-
-    return float(row.total_sales or 0.0) if row else 0.0
+    return float(sum(r["amount"] for r in rollup_rows(start_date, end_date, 7)))
   
   
   
@@ -2882,38 +2491,15 @@ def get_pos_sales_daily_by_range(start_date, end_date):
 
     BizDate rule:
     CAST(DATEADD(HOUR, -7, RCPT_DATE) AS date)
+    Served from the daily rollup store (open day read live).
     """
     if not start_date or not end_date:
         return []
 
-    sql = """
-    SET NOCOUNT ON;
-
-    WITH R AS (
-      SELECT
-        CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date) AS BizDate,
-        CAST(r.RCPT_AMOUNT AS float) AS RCPT_AMOUNT
-      FROM dbo.HISTORIC_RECEIPT r
-    )
-    SELECT
-      CONVERT(varchar(10), BizDate, 120) AS biz_date,
-      CAST(COALESCE(SUM(RCPT_AMOUNT), 0) AS float) AS sales_lbp
-    FROM R
-    WHERE BizDate >= CAST(? AS date)
-      AND BizDate <= CAST(? AS date)
-    GROUP BY BizDate
-    ORDER BY BizDate ASC;
-    """
-
-    with _connect() as cn:
-        cur = cn.cursor()
-        cur.execute(sql, [start_date, end_date])
-        rows = cur.fetchall()
-
     return [
         {
-            "biz_date": r.biz_date,
-            "sales_lbp": float(r.sales_lbp or 0.0),
+            "biz_date": r["biz_date"].isoformat(),
+            "sales_lbp": r["amount"],
         }
-        for r in rows
-    ]
\ No newline at end of file
+        for r in rollup_rows(start_date, end_date, 7)
+    ]
@@ -1,5 +1,8 @@
 # helpers_items.py
-from helpers_intelligence import _connect
+from helpers_intelligence import _connect, _connect_pos
+import dimensions
+import realtime_aggregator
+import receipt_details
 
 def list_items(page=1, page_size=25, q="", sort="", subgroup_id=None, subgroup="", inactive_days=None, never_sold=0):
     page = max(1, int(page))
@@ -33,26 +36,15 @@ def list_items(page=1, page_size=25, q="", sort="", subgroup_id=None, subgroup="
             DECLARE @inact int           = ?;
             DECLARE @never bit           = ?;
 
-            /* Base items */
-            WITH I AS (
+            /* Base items; subgroups resolved in #ItemSubgroup (built on checkout by _ensure_item_subgroups) */
+            WITH J AS (
               SELECT
                 i.ITM_CODE, i.ITM_TITLE, i.ITM_DESCRIPTION, i.ITM_TYPE,
-                LTRIM(RTRIM(i.ITM_SUBGROUP)) AS SubGrpRaw,
-                CASE
-                  WHEN i.ITM_SUBGROUP IS NOT NULL AND i.ITM_SUBGROUP NOT LIKE N'%[^0-9]%' THEN CONVERT(int, i.ITM_SUBGROUP)
-                  ELSE NULL
-                END AS SubGrpID
-              FROM dbo.ITEMS i
-            ),
-            J AS (
-              SELECT
-                I.ITM_CODE, I.ITM_TITLE, I.ITM_DESCRIPTION, I.ITM_TYPE, I.SubGrpRaw,
-                COALESCE(s_id.SubGrp_ID, s_nm.SubGrp_ID) AS ResolvedSubGrpID,
-                LTRIM(RTRIM(COALESCE(s_id.SubGrp_Name, s_nm.SubGrp_Name, NULLIF(I.SubGrpRaw,N''), N'Unknown')))
+                g.SubGrpID AS ResolvedSubGrpID,
+                COALESCE(g.SubGrpName, NULLIF(LTRIM(RTRIM(i.ITM_SUBGROUP)), N''), N'Unknown')
                   COLLATE DATABASE_DEFAULT AS ResolvedSubgroup
-              FROM I
-              LEFT JOIN dbo.SUBGROUPS s_id ON s_id.SubGrp_ID = I.SubGrpID
-              LEFT JOIN dbo.SUBGROUPS s_nm ON LTRIM(RTRIM(s_nm.SubGrp_Name)) = I.SubGrpRaw
+              FROM dbo.ITEMS i
+              LEFT JOIN #ItemSubgroup g ON g.ITM_CODE = CAST(i.ITM_CODE AS nvarchar(50))
             ),
             LP AS (
               SELECT c.ITM_CODE, MAX(r.RCPT_DATE) AS LastPurchased
@@ -141,16 +133,10 @@ def list_subgroups():
             SET NOCOUNT ON;
             SELECT s.SubGrp_ID AS id,
                    LTRIM(RTRIM(s.SubGrp_Name)) AS Subgroup,
-                   COUNT(i.ITM_CODE) AS items_count
+                   COUNT(g.ITM_CODE) AS items_count
             FROM dbo.SUBGROUPS s
-            LEFT JOIN dbo.ITEMS i
-              ON (
-                   -- match by numeric id when possible
-                   (i.ITM_SUBGROUP NOT LIKE N'%[^0-9]%' AND CONVERT(int, i.ITM_SUBGROUP) = s.SubGrp_ID)
-                   OR
-                   -- or by trimmed name
-                   (LTRIM(RTRIM(i.ITM_SUBGROUP)) = LTRIM(RTRIM(s.SubGrp_Name)))
-                 )
+            -- each item counts under the one subgroup it resolves to
+            LEFT JOIN #ItemSubgroup g ON g.SubGrpID = s.SubGrp_ID
             GROUP BY s.SubGrp_ID, LTRIM(RTRIM(s.SubGrp_Name))
             ORDER BY items_count DESC, Subgroup;
         """)
@@ -378,7 +364,7 @@ def update_item_fields(code: str, title: str = None, subgroup: str = None, price
         return False, "No fields to update"
 
     try:
-        with _connect() as cn:
+        with _connect_pos() as cn:
             cur = cn.cursor()
 
             # --- update dbo.ITEMS ---
@@ -412,6 +398,10 @@ def update_item_fields(code: str, title: str = None, subgroup: str = None, price
                 """, (float(price), code))
 
             cn.commit()
+        # realtime totals and cached receipt details label lines with item titles / subgroups
+        dimensions.invalidate()
+        realtime_aggregator.invalidate()
+        receipt_details.clear()
         return True, None
 
     except Exception as e:
@@ -1,18 +1,28 @@
 # helpers_realtime.py
 # --------------------------------------------------------------
 # Realtime (open-day) analytics helpers
-# Reads from RECEIPT / RECEIPT_CONTENTS (+ ITEMS, SUBGROUPS)
+# Reads from RECEIPT / RECEIPT_CONTENTS; item and subgroup labels from dimensions.py
 # Business day window: 08:00 → 07:59 next day
+# The open business day is served from realtime_aggregator's running totals
+# (RCPT_ID deltas); other dates, or REALTIME_AGGREGATOR=0, run the SQL below.
 # --------------------------------------------------------------
 
 from datetime import datetime
-from helpers_intelligence import _connect  # <-- keep same connector used elsewhere
+# Open-day receipts only exist on the POS (the replica mirrors HISTORIC_*), so
+# realtime always reads the POS whatever ANALYTICS_BACKEND says.
+from helpers_intelligence import _connect_pos as _connect
 from pos_dates import biz_date_range_8h
+import dimensions
+import realtime_aggregator
+import receipt_details
 
 # --------------------------- KPIs ----------------------------
 def rt_get_kpis(date_str: str):
     """Live KPIs for the open business day. Was 3 queries, now 1 CTE."""
     date = datetime.strptime(date_str, "%Y-%m-%d").date()
+    live = realtime_aggregator.live(date)
+    if live is not None:
+        return live.kpis()
     start, end = biz_date_range_8h(date)
 
     with _connect() as cn:
@@ -66,6 +76,9 @@ def rt_get_kpis(date_str: str):
 def rt_get_hourly(date_str: str):
     """Live hourly sales for the business day, shifted hour buckets."""
     date = datetime.strptime(date_str, "%Y-%m-%d").date()
+    live = realtime_aggregator.live(date)
+    if live is not None:
+        return live.hourly()
     start, end = biz_date_range_8h(date)
     with _connect() as cn:
         cur = cn.cursor()
@@ -92,65 +105,75 @@ def rt_get_hourly_cumulative(date_str: str):
 
 # ---------------------- Category (live) ----------------------
 def rt_get_category(date_str: str):
-    """Revenue per subgroup from live lines."""
+    """Revenue per subgroup from live lines (labels from dimensions.py)."""
     date = datetime.strptime(date_str, "%Y-%m-%d").date()
+    live = realtime_aggregator.live(date)
+    if live is not None:
+        return live.category()
     start, end = biz_date_range_8h(date)
     with _connect() as cn:
         cur = cn.cursor()
         cur.execute("""
             SELECT
-              LTRIM(RTRIM(COALESCE(s.SubGrp_Name, 'Unknown'))) AS subgroup,
+              CAST(c.ITM_CODE AS nvarchar(50)) AS item_code,
               SUM(CAST(c.ITM_QUANTITY * c.ITM_PRICE AS float)) AS sales
             FROM dbo.RECEIPT r
             JOIN dbo.RECEIPT_CONTENTS c ON c.RCPT_ID = r.RCPT_ID
-            LEFT JOIN dbo.ITEMS i ON i.ITM_CODE = c.ITM_CODE
-            LEFT JOIN dbo.SUBGROUPS s
-              ON (TRY_CAST(i.ITM_SUBGROUP AS int) = s.SubGrp_ID
-               OR LTRIM(RTRIM(i.ITM_SUBGROUP)) = LTRIM(RTRIM(s.SubGrp_Name)))
             WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ?
-            GROUP BY LTRIM(RTRIM(COALESCE(s.SubGrp_Name, 'Unknown')))
-            ORDER BY sales DESC;
+            GROUP BY c.ITM_CODE;
         """, (start, end))
-        return [{"subgroup": r.subgroup, "sales": float(r.sales or 0)} for r in cur.fetchall()]
+        rows = cur.fetchall()
+    dims = dimensions.get()
+    sales = {}
+    for r in rows:
+        name = dims.subgroup(r.item_code)
+        sales[name] = sales.get(name, 0.0) + float(r.sales or 0)
+    return [{"subgroup": k, "sales": v} for k, v in sorted(sales.items(), key=lambda kv: kv[1], reverse=True)]
 
 # --------------------- Items Sold (live) ---------------------
 def rt_get_items_sold(date_str: str):
     """Aggregated items sold table for the live business day."""
     date = datetime.strptime(date_str, "%Y-%m-%d").date()
+    live = realtime_aggregator.live(date)
+    if live is not None:
+        return live.items_sold()
     start, end = biz_date_range_8h(date)
     with _connect() as cn:
         cur = cn.cursor()
         cur.execute("""
             SELECT
-              LTRIM(RTRIM(COALESCE(i.ITM_TITLE, '(Unknown)'))) AS item_name,
-              LTRIM(RTRIM(COALESCE(s.SubGrp_Name, 'Unknown'))) AS category,
+              CAST(c.ITM_CODE AS nvarchar(50)) AS item_code,
               SUM(CAST(c.ITM_QUANTITY AS float)) AS total_qty,
-              AVG(CAST(c.ITM_PRICE AS float)) AS avg_price,
+              SUM(CAST(c.ITM_PRICE AS float)) AS price_sum,
+              COUNT(c.ITM_PRICE) AS price_rows,
               SUM(CAST(c.ITM_QUANTITY * c.ITM_PRICE AS float)) AS total_revenue
             FROM dbo.RECEIPT r
             JOIN dbo.RECEIPT_CONTENTS c ON c.RCPT_ID = r.RCPT_ID
-            LEFT JOIN dbo.ITEMS i ON i.ITM_CODE = c.ITM_CODE
-            LEFT JOIN dbo.SUBGROUPS s
-              ON (TRY_CAST(i.ITM_SUBGROUP AS int) = s.SubGrp_ID
-               OR LTRIM(RTRIM(i.ITM_SUBGROUP)) = LTRIM(RTRIM(s.SubGrp_Name)))
             WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ?
-            GROUP BY
-              LTRIM(RTRIM(COALESCE(i.ITM_TITLE, '(Unknown)'))),
-              LTRIM(RTRIM(COALESCE(s.SubGrp_Name, 'Unknown')))
-            ORDER BY total_revenue DESC;
+            GROUP BY c.ITM_CODE;
         """, (start, end))
         rows = cur.fetchall()
-    total_rev = sum(float(r.total_revenue or 0) for r in rows) or 1.0
+    # (item_name, category) -> [qty, price_sum, price_rows, revenue]
+    dims = dimensions.get()
+    agg = {}
+    for r in rows:
+        a = agg.setdefault((dims.title(r.item_code, "(Unknown)"), dims.subgroup(r.item_code)), [0.0, 0.0, 0, 0.0])
+        a[0] += float(r.total_qty or 0)
+        a[1] += float(r.price_sum or 0)
+        a[2] += int(r.price_rows or 0)
+        a[3] += float(r.total_revenue or 0)
+    ranked = sorted(agg.items(), key=lambda kv: kv[1][3], reverse=True)
+    total_rev = sum(a[3] for _, a in ranked) or 1.0
     return [
         {
-            "item_name": r.item_name,
-            "category": r.category,
-            "total_qty": float(r.total_qty or 0),
-            "avg_price": float(r.avg_price or 0),
-            "total_revenue": float(r.total_revenue or 0),
-            "share": round((float(r.total_revenue or 0) / total_rev) * 100, 1),
+            "item_name": name,
+            "category": cat,
+            "total_qty": qty,
+            "avg_price": (price_sum / n) if n else 0.0,
+            "total_revenue": rev,
+            "share": round((rev / total_rev) * 100, 1),
         }
-        for r in rows
+        for (name, cat), (qty, price_sum, n, rev) in ranked
     ]
 
 # --------------------- Receipts list (live) ------------------
@@ -160,6 +183,9 @@ def rt_get_receipts(date_str: str):
     Only header-level info here; lines are fetched via rt_get_receipt_detail.
     """
     date = datetime.strptime(date_str, "%Y-%m-%d").date()
+    live = realtime_aggregator.live(date)
+    if live is not None:
+        return live.receipts()
     start, end = biz_date_range_8h(date)
     with _connect() as cn:
         cur = cn.cursor()
@@ -190,56 +216,6 @@ def rt_get_receipt_detail(rcpt_id: int):
     """
     Full invoice data for a single receipt:
     header, lines with item name/category, and totals.
+    One statement via receipt_details; closed receipts come from its cache.
     """
-    with _connect() as cn:
-        cur = cn.cursor()
-        # Header
-        cur.execute("""
-            SELECT
-              r.RCPT_ID,
-              r.RCPT_NO,
-              r.RCPT_DATE,
-              CAST(r.RCPT_AMOUNT AS float) AS total_amount
-            FROM dbo.RECEIPT r
-            WHERE r.RCPT_ID = ?
-        """, (rcpt_id,))
-        hdr = cur.fetchone()
-        if not hdr:
-            return {"exists": False}
-
-        # Lines
-        cur.execute("""
-            SELECT
-              c.RCPT_LINE,
-              LTRIM(RTRIM(COALESCE(i.ITM_TITLE, '(Unknown)'))) AS item_name,
-              LTRIM(RTRIM(COALESCE(s.SubGrp_Name, 'Unknown'))) AS category,
-              CAST(c.ITM_QUANTITY AS float) AS qty,
-              CAST(c.ITM_PRICE AS float) AS unit_price,
-              CAST(c.ITM_QUANTITY * c.ITM_PRICE AS float) AS line_total
-            FROM dbo.RECEIPT_CONTENTS c
-            LEFT JOIN dbo.ITEMS i ON i.ITM_CODE = c.ITM_CODE
-            LEFT JOIN dbo.SUBGROUPS s
-              ON (TRY_CAST(i.ITM_SUBGROUP AS int) = s.SubGrp_ID
-               OR LTRIM(RTRIM(i.ITM_SUBGROUP)) = LTRIM(RTRIM(s.SubGrp_Name)))
-            WHERE c.RCPT_ID = ?
-            ORDER BY c.RCPT_LINE
-        """, (rcpt_id,))
-        lines = [{
-            "line": int(r.RCPT_LINE),
-            "item_name": r.item_name,
-            "category": r.category,
-            "qty": float(r.qty or 0),
-            "unit_price": float(r.unit_price or 0),
-            "line_total": float(r.line_total or 0),
-        } for r in cur.fetchall()]
-
-    return {
-        "exists": True,
-        "header": {
-            "rcpt_id": int(hdr.RCPT_ID),
-            "rcpt_no": int(hdr.RCPT_NO or 0) if getattr(hdr, "RCPT_NO", None) is not None else None,
-            "datetime": hdr.RCPT_DATE.strftime("%Y-%m-%d %H:%M"),
-            "total_amount": float(hdr.total_amount or 0),
-        },
-        "lines": lines,
-    }
+    return receipt_details.get_details([rcpt_id])[int(rcpt_id)]
@@ -2,7 +2,9 @@
 from datetime import datetime, timedelta
 from collections import defaultdict
 from helpers_intelligence import _connect
+import dimensions
 from pos_dates import biz_date_range_8h
+from rollups import daily_rows as rollup_rows
 
 
 # ----------------------------------------------------------
@@ -23,6 +25,9 @@ def get_sales_summary_range(from_str: str, to_str: str, mode: str = "daily"):
         "rows": [{"label": "2026-03-01", "total": 123.0}, ...],
         "meta": {"count": int, "avg": float}
       }
+
+    Daily totals (08:00 boundary) come from the rollup store; closed days are
+    materialized locally and only the open day hits MSSQL.
     """
     mode = (mode or "daily").strip().lower()
     if mode not in ("daily", "monthly"):
@@ -33,54 +38,21 @@ def get_sales_summary_range(from_str: str, to_str: str, mode: str = "daily"):
     if from_date > to_date:
         return {"total_sales": 0.0, "rows": [], "meta": {"count": 0, "avg": 0.0}}
 
-    # Sargable outer bounds for the WHERE
-    range_start = datetime(from_date.year, from_date.month, from_date.day, 8, 0, 0)
-    range_end   = datetime(to_date.year, to_date.month, to_date.day, 8, 0, 0) + timedelta(days=1)
-
-    BIZ_DATE = """CAST(CASE
-        WHEN DATEPART(HOUR, r.RCPT_DATE) < 8
-          THEN DATEADD(DAY, -1, CAST(r.RCPT_DATE AS date))
-        ELSE CAST(r.RCPT_DATE AS date)
-      END AS date)"""
-
-    with _connect() as cn:
-        cur = cn.cursor()
-        if mode == "monthly":
-            cur.execute(f"""
-                SELECT
-                  YEAR({BIZ_DATE})  AS yr,
-                  MONTH({BIZ_DATE}) AS mo,
-                  SUM(r.RCPT_AMOUNT) AS total
-                FROM dbo.HISTORIC_RECEIPT r
-                WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ?
-                  AND {BIZ_DATE} BETWEEN ? AND ?
-                GROUP BY YEAR({BIZ_DATE}), MONTH({BIZ_DATE})
-                ORDER BY yr, mo;
-            """, (range_start, range_end, from_date, to_date))
-            rows = cur.fetchall()
-            parsed_rows = [
-                {"label": f"{r.yr}-{r.mo:02d}", "total": float(r.total or 0)}
-                for r in rows
-            ]
-        else:
-            cur.execute(f"""
-                SELECT
-                  {BIZ_DATE} AS label,
-                  SUM(r.RCPT_AMOUNT) AS total
-                FROM dbo.HISTORIC_RECEIPT r
-                WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ?
-                  AND {BIZ_DATE} BETWEEN ? AND ?
-                GROUP BY {BIZ_DATE}
-                ORDER BY label;
-            """, (range_start, range_end, from_date, to_date))
-            rows = cur.fetchall()
-            parsed_rows = []
-            for r in rows:
-                try:
-                    label_text = r.label.strftime("%Y-%m-%d")
-                except Exception:
-                    label_text = str(r.label)
-                parsed_rows.append({"label": label_text, "total": float(r.total or 0)})
+    days = rollup_rows(from_date, to_date, 8)
+
+    if mode == "monthly":
+        by_month = defaultdict(float)
+        for d in days:
+            by_month[(d["biz_date"].year, d["biz_date"].month)] += d["amount"]
+        parsed_rows = [
+            {"label": f"{yr}-{mo:02d}", "total": total}
+            for (yr, mo), total in sorted(by_month.items())
+        ]
+    else:
+        parsed_rows = [
+            {"label": d["biz_date"].strftime("%Y-%m-%d"), "total": d["amount"]}
+            for d in days
+        ]
 
     total_sales = sum(r["total"] for r in parsed_rows)
     count = len(parsed_rows)
@@ -337,21 +309,22 @@ def get_sales_by_category(date_str: str):
     with _connect() as cn:
         cur = cn.cursor()
         cur.execute("""
-            SELECT TOP (20)
-              LTRIM(RTRIM(COALESCE(s.SubGrp_Name, 'Unknown'))) AS Subgroup,
+            SELECT
+              CAST(c.ITM_CODE AS nvarchar(50)) AS item_code,
               SUM(c.ITM_QUANTITY * c.ITM_PRICE) AS total_sales
             FROM dbo.HISTORIC_RECEIPT r
             JOIN dbo.HISTORIC_RECEIPT_CONTENTS c ON c.RCPT_ID = r.RCPT_ID
-            LEFT JOIN dbo.ITEMS i ON i.ITM_CODE = c.ITM_CODE
-            LEFT JOIN dbo.SUBGROUPS s
-              ON (TRY_CAST(i.ITM_SUBGROUP AS int) = s.SubGrp_ID
-                  OR LTRIM(RTRIM(i.ITM_SUBGROUP)) = LTRIM(RTRIM(s.SubGrp_Name)))
             WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ?
-            GROUP BY LTRIM(RTRIM(COALESCE(s.SubGrp_Name, 'Unknown')))
-            ORDER BY total_sales DESC;
+            GROUP BY c.ITM_CODE;
         """, (start, end))
         rows = cur.fetchall()
-    return [{"subgroup": r.Subgroup, "sales": float(r.total_sales or 0)} for r in rows]
+    # subgroup labels from dimensions.py, top 20 by sales
+    dims = dimensions.get()
+    sales = defaultdict(float)
+    for r in rows:
+        sales[dims.subgroup(r.item_code)] += float(r.total_sales or 0)
+    ranked = sorted(sales.items(), key=lambda kv: kv[1], reverse=True)[:20]
+    return [{"subgroup": name, "sales": total} for name, total in ranked]
 
 
 # ----------------------------------------------------------
@@ -393,21 +366,18 @@ def get_slow_products(days: int = 7):
         cur.execute("""
             SELECT TOP (50)
               i.ITM_CODE, i.ITM_TITLE,
-              LTRIM(RTRIM(COALESCE(s.SubGrp_Name, 'Unknown'))) AS Subgroup,
               MAX(r.RCPT_DATE) AS LastSold
             FROM dbo.ITEMS i
             LEFT JOIN dbo.HISTORIC_RECEIPT_CONTENTS c ON c.ITM_CODE = i.ITM_CODE
             LEFT JOIN dbo.HISTORIC_RECEIPT r
                 ON r.RCPT_ID = c.RCPT_ID AND r.RCPT_DATE >= ?
-            LEFT JOIN dbo.SUBGROUPS s
-              ON (TRY_CAST(i.ITM_SUBGROUP AS int) = s.SubGrp_ID
-                  OR LTRIM(RTRIM(i.ITM_SUBGROUP)) = LTRIM(RTRIM(s.SubGrp_Name)))
-            GROUP BY i.ITM_CODE, i.ITM_TITLE, s.SubGrp_Name
+            GROUP BY i.ITM_CODE, i.ITM_TITLE
             HAVING MAX(r.RCPT_DATE) IS NULL OR MAX(r.RCPT_DATE) < ?
             ORDER BY MAX(r.RCPT_DATE) ASC;
         """, (history_start, cutoff))
         rows = cur.fetchall()
 
+    dims = dimensions.get()
     results = []
     for r in rows:
         last = None
@@ -419,7 +389,7 @@ def get_slow_products(days: int = 7):
         results.append({
             "code": r.ITM_CODE,
             "title": r.ITM_TITLE or "",
-            "subgroup": r.Subgroup or "Unknown",
+            "subgroup": dims.subgroup(r.ITM_CODE),
             "last_sold": last,
         })
     return results
@@ -511,34 +481,38 @@ def get_items_sold(date_str: str):
         cur = cn.cursor()
         cur.execute("""
             SELECT
-              LTRIM(RTRIM(COALESCE(i.ITM_TITLE, '(Unknown)'))) AS item_name,
-              LTRIM(RTRIM(COALESCE(s.SubGrp_Name, 'Unknown'))) AS category,
+              CAST(c.ITM_CODE AS nvarchar(50)) AS item_code,
               SUM(c.ITM_QUANTITY) AS total_qty,
-              AVG(c.ITM_PRICE) AS avg_price,
+              SUM(c.ITM_PRICE) AS price_sum,
+              COUNT(c.ITM_PRICE) AS price_rows,
               SUM(c.ITM_QUANTITY * c.ITM_PRICE) AS total_revenue
             FROM dbo.HISTORIC_RECEIPT r
             JOIN dbo.HISTORIC_RECEIPT_CONTENTS c ON c.RCPT_ID = r.RCPT_ID
-            LEFT JOIN dbo.ITEMS i ON i.ITM_CODE = c.ITM_CODE
-            LEFT JOIN dbo.SUBGROUPS s
-              ON (TRY_CAST(i.ITM_SUBGROUP AS int) = s.SubGrp_ID
-                  OR LTRIM(RTRIM(i.ITM_SUBGROUP)) = LTRIM(RTRIM(s.SubGrp_Name)))
             WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ?
-            GROUP BY
-              LTRIM(RTRIM(COALESCE(i.ITM_TITLE, '(Unknown)'))),
-              LTRIM(RTRIM(COALESCE(s.SubGrp_Name, 'Unknown')))
-            ORDER BY total_revenue DESC;
+            GROUP BY c.ITM_CODE;
         """, (start, end))
         rows = cur.fetchall()
 
-    total_revenue = sum(float(r.total_revenue or 0) for r in rows) or 1
+    # (item name, category) from dimensions.py; [qty, price_sum, price_rows, revenue]
+    dims = dimensions.get()
+    agg = defaultdict(lambda: [0.0, 0.0, 0, 0.0])
+    for r in rows:
+        a = agg[(dims.title(r.item_code, "(Unknown)"), dims.subgroup(r.item_code))]
+        a[0] += float(r.total_qty or 0)
+        a[1] += float(r.price_sum or 0)
+        a[2] += int(r.price_rows or 0)
+        a[3] += float(r.total_revenue or 0)
+    ranked = sorted(agg.items(), key=lambda kv: kv[1][3], reverse=True)
+
+    total_revenue = sum(a[3] for _, a in ranked) or 1
     return [
         {
-            "item_name": r.item_name,
-            "category": r.category,
-            "total_qty": float(r.total_qty or 0),
-            "avg_price": float(r.avg_price or 0),
-            "total_revenue": float(r.total_revenue or 0),
-            "share": round((float(r.total_revenue or 0) / total_revenue) * 100, 1),
+            "item_name": name,
+            "category": category,
+            "total_qty": qty,
+            "avg_price": (price_sum / n) if n else 0.0,
+            "total_revenue": revenue,
+            "share": round((revenue / total_revenue) * 100, 1),
         }
-        for r in rows
+        for (name, category), (qty, price_sum, n, revenue) in ranked
     ]
@@ -0,0 +1,433 @@
+# item_cube.py
+"""
+Per-item, per-business-day, per-hour sales cube for item-level reports.
+
+Items Explorer, Item 360, Dead Items and Item Trends used to rescan
+HISTORIC_RECEIPT_CONTENTS joined to HISTORIC_RECEIPT on every request just
+to get quantities per item per BizDate. The cube holds that aggregate:
+
+    (biz_date, item_code, hour) -> qty, amount, receipts, last_ts
+
+  - biz_date   business date with the 07:00 boundary (intelligence helpers)
+  - hour       clock hour of RCPT_DATE (0-23)
+  - qty        SUM(ITM_QUANTITY)
+  - amount     SUM(ITM_QUANTITY * ITM_PRICE)
+  - receipts   COUNT(DISTINCT RCPT_ID); a receipt has a single timestamp, so
+               summing across hours/days stays an exact distinct count
+  - last_ts    MAX(RCPT_DATE) as seconds since 1970-01-01 (naive local time)
+
+Storage is one compressed numpy partition per closed business day
+(<dir>/<YYYY-MM-DD>.npz) plus a small JSON manifest. Closed days never
+change, so refresh only fetches days after the manifest's closed_through.
+The open day and the last <settle_days> closed days are fetched live (and
+memoized for a few seconds) and appended to every slice.
+
+Refreshes run on a background thread and never hold the lock that reads
+take. Until the first backfill is done, slices read the missing days live.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from rollups import open_business_day
+
+logger = logging.getLogger(__name__)
+
+BOUNDARY_HOUR = 7
+BACKFILL_CHUNK_DAYS = 7
+_EPOCH = datetime(1970, 1, 1)
+
+COLUMNS = ("day", "item_code", "hour", "qty", "amount", "receipts", "last_ts")
+
+
+def to_ts(dt: datetime) -> int:
+    """Naive datetime -> int seconds (no timezone conversion)."""
+    return int((dt - _EPOCH).total_seconds())
+
+
+def from_ts(ts) -> datetime:
+    return _EPOCH + timedelta(seconds=int(ts))
+
+
+def from_ordinal(day) -> date:
+    return date.fromordinal(int(day))
+
+
+@dataclass
+class CubeSlice:
+    """Columnar rows of the cube (one row per biz_date/item/hour)."""
+
+    day: np.ndarray        # int32  date.toordinal()
+    item_code: np.ndarray  # str
+    hour: np.ndarray       # int8
+    qty: np.ndarray        # float64
+    amount: np.ndarray     # float64
+    receipts: np.ndarray   # int32
+    last_ts: np.ndarray    # int64
+
+    @classmethod
+    def empty(cls) -> "CubeSlice":
+        return cls(
+            np.empty(0, np.int32), np.empty(0, "U1"), np.empty(0, np.int8),
+            np.empty(0, np.float64), np.empty(0, np.float64),
+            np.empty(0, np.int32), np.empty(0, np.int64),
+        )
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict]) -> "CubeSlice":
+        if not rows:
+            return cls.empty()
+        return cls(
+            np.fromiter((r["biz_date"].toordinal() for r in rows), np.int32, len(rows)),
+            np.array([r["item_code"] for r in rows], dtype=str),
+            np.fromiter((r["hour"] for r in rows), np.int8, len(rows)),
+            np.fromiter((r["qty"] for r in rows), np.float64, len(rows)),
+            np.fromiter((r["amount"] for r in rows), np.float64, len(rows)),
+            np.fromiter((r["receipts"] for r in rows), np.int32, len(rows)),
+            np.fromiter((to_ts(r["last_ts"]) for r in rows), np.int64, len(rows)),
+        )
+
+    @classmethod
+    def concat(cls, parts: Iterable["CubeSlice"]) -> "CubeSlice":
+        parts = [p for p in parts if len(p)]
+        if not parts:
+            return cls.empty()
+        if len(parts) == 1:
+            return parts[0]
+        return cls(*(np.concatenate([getattr(p, c) for p in parts]) for c in COLUMNS))
+
+    def __len__(self) -> int:
+        return int(self.day.shape[0])
+
+    def filter(self, mask: np.ndarray) -> "CubeSlice":
+        return CubeSlice(*(getattr(self, c)[mask] for c in COLUMNS))
+
+    def for_items(self, item_codes: Iterable[str]) -> "CubeSlice":
+        codes = np.array([str(c) for c in item_codes], dtype=str)
+        return self.filter(np.isin(self.item_code, codes))
+
+    def days(self) -> np.ndarray:
+        """Sorted distinct business-day ordinals present in the slice."""
+        return np.unique(self.day)
+
+    def per_item(self) -> Dict[str, np.ndarray]:
+        """
+        Totals per item: item_code, qty, amount, receipts, last_ts, last_day.
+        Arrays are aligned and sorted by item_code.
+        """
+        if not len(self):
+            return {
+                "item_code": np.empty(0, "U1"), "qty": np.empty(0), "amount": np.empty(0),
+                "receipts": np.empty(0, np.int64), "last_ts": np.empty(0, np.int64),
+                "last_day": np.empty(0, np.int64),
+            }
+        codes, inv = np.unique(self.item_code, return_inverse=True)
+        n = len(codes)
+        last_ts = np.full(n, np.iinfo(np.int64).min, np.int64)
+        np.maximum.at(last_ts, inv, self.last_ts)
+        last_day = np.zeros(n, np.int64)
+        np.maximum.at(last_day, inv, self.day.astype(np.int64))
+        return {
+            "item_code": codes,
+            "qty": np.bincount(inv, weights=self.qty, minlength=n),
+            "amount": np.bincount(inv, weights=self.amount, minlength=n),
+            "receipts": np.bincount(inv, weights=self.receipts, minlength=n).astype(np.int64),
+            "last_ts": last_ts,
+            "last_day": last_day,
+        }
+
+
+class MssqlCubeSource:
+    """Aggregates HISTORIC_RECEIPT_CONTENTS per (biz_date, item, hour) for a day range."""
+
+    def __init__(self, connect: Callable):
+        self._connect = connect
+
+    def first_day(self) -> Optional[date]:
+        with self._connect() as cn:
+            cur = cn.cursor()
+            cur.execute("SELECT MIN(RCPT_DATE) FROM dbo.HISTORIC_RECEIPT;")
+            row = cur.fetchone()
+        if not row or row[0] is None:
+            return None
+        return open_business_day(BOUNDARY_HOUR, row[0])
+
+    def fetch_rows(self, first: date, last: date) -> List[Dict]:
+        range_start = datetime(first.year, first.month, first.day, BOUNDARY_HOUR)
+        range_end = datetime(last.year, last.month, last.day, BOUNDARY_HOUR) + timedelta(days=1)
+        with self._connect() as cn:
+            cur = cn.cursor()
+            cur.execute("""
+                SET NOCOUNT ON;
+                SELECT
+                  CONVERT(varchar(10), CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date), 23) AS biz_date,
+                  CAST(c.ITM_CODE AS nvarchar(50))                             AS item_code,
+                  DATEPART(HOUR, r.RCPT_DATE)                                  AS hr,
+                  SUM(CAST(COALESCE(c.ITM_QUANTITY, 0) AS float))              AS qty,
+                  SUM(CAST(COALESCE(c.ITM_QUANTITY, 0) * COALESCE(c.ITM_PRICE, 0) AS float)) AS amount,
+                  COUNT(DISTINCT r.RCPT_ID)                                    AS receipts,
+                  MAX(r.RCPT_DATE)                                             AS last_ts
+                FROM dbo.HISTORIC_RECEIPT r
+                JOIN dbo.HISTORIC_RECEIPT_CONTENTS c ON c.RCPT_ID = r.RCPT_ID
+                WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ?
+                GROUP BY
+                  CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date),
+                  CAST(c.ITM_CODE AS nvarchar(50)),
+                  DATEPART(HOUR, r.RCPT_DATE);
+            """, (range_start, range_end))
+            rows = cur.fetchall()
+        return [
+            {
+                "biz_date": datetime.strptime(r.biz_date, "%Y-%m-%d").date(),
+                "item_code": str(r.item_code),
+                "hour": int(r.hr),
+                "qty": float(r.qty or 0.0),
+                "amount": float(r.amount or 0.0),
+                "receipts": int(r.receipts or 0),
+                "last_ts": r.last_ts,
+            }
+            for r in rows
+        ]
+
+
+class ItemCube:
+    """
+    Partitioned on-disk cube plus live tail.
+
+    <source> provides first_day() and fetch_rows(first, last); see
+    MssqlCubeSource. Loaded partitions are kept in a small in-memory LRU
+    (they are immutable once written). Refreshes run at most once per
+    <refresh_interval> seconds, on a background thread unless <background>
+    is False. Partitions built from another <backend> (ANALYTICS_BACKEND,
+    recorded in the manifest) are deleted on open.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        source,
+        settle_days: int = 1,
+        refresh_interval: float = 300.0,
+        live_ttl: float = 30.0,
+        max_loaded_days: int = 800,
+        background: bool = True,
+        backend: Optional[str] = None,
+    ) -> None:
+        self.directory = directory
+        self.source = source
+        self.settle_days = max(0, int(settle_days))
+        self.refresh_interval = float(refresh_interval)
+        self.live_ttl = float(live_ttl)
+        self.max_loaded_days = int(max_loaded_days)
+        self.background = background
+        self._lock = threading.Lock()  # in-memory partitions and live tail
+        self._refresh_lock = threading.Lock()  # one refresh at a time; reads never take it
+        self._thread: Optional[threading.Thread] = None
+        self._loaded: "OrderedDict[int, CubeSlice]" = OrderedDict()
+        self._live: Optional[Tuple[float, date, date, CubeSlice]] = None
+        self._last_refresh: Optional[float] = None
+        self.backend = backend
+        os.makedirs(directory, exist_ok=True)
+        if backend is not None:
+            self._claim(backend)
+
+    # ---------- manifest / partitions ----------
+    @property
+    def _manifest_path(self) -> str:
+        return os.path.join(self.directory, "manifest.json")
+
+    def _manifest(self) -> Dict:
+        try:
+            with open(self._manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, manifest: Dict) -> None:
+        tmp = f"{self._manifest_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(tmp, self._manifest_path)
+
+    def _claim(self, backend: str) -> None:
+        manifest = self._manifest()
+        if manifest.get("backend") == backend:
+            return
+        if manifest:
+            for name in os.listdir(self.directory):
+                if name.endswith(".npz"):
+                    os.remove(os.path.join(self.directory, name))
+        self._write_manifest({"backend": backend})
+
+    def _partition_path(self, day: date) -> str:
+        return os.path.join(self.directory, f"{day.isoformat()}.npz")
+
+    def _write_partition(self, day: date, part: CubeSlice) -> None:
+        tmp = f"{self._partition_path(day)}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez_compressed(
+                f,
+                item_code=part.item_code, hour=part.hour, qty=part.qty,
+                amount=part.amount, receipts=part.receipts, last_ts=part.last_ts,
+            )
+        os.replace(tmp, self._partition_path(day))
+
+    def _load_partition(self, day: date) -> CubeSlice:
+        key = day.toordinal()
+        with self._lock:
+            part = self._loaded.get(key)
+            if part is not None:
+                self._loaded.move_to_end(key)
+                return part
+        try:
+            with np.load(self._partition_path(day), allow_pickle=False) as z:
+                n = z["qty"].shape[0]
+                part = CubeSlice(
+                    np.full(n, key, np.int32), z["item_code"], z["hour"], z["qty"],
+                    z["amount"], z["receipts"], z["last_ts"],
+                )
+        except FileNotFoundError:
+            part = CubeSlice.empty()  # closed day without sales
+        with self._lock:
+            self._loaded[key] = part
+            while len(self._loaded) > self.max_loaded_days:
+                self._loaded.popitem(last=False)
+        return part
+
+    # ---------- refresh ----------
+    def last_closed_day(self, now: Optional[datetime] = None) -> date:
+        return open_business_day(BOUNDARY_HOUR, now) - timedelta(days=self.settle_days + 1)
+
+    def closed_through(self) -> Optional[date]:
+        value = self._manifest().get("closed_through")
+        return date.fromisoformat(value) if value else None
+
+    def refresh(self, now: Optional[datetime] = None) -> int:
+        """Write partitions for closed days not stored yet. Returns days written."""
+        with self._refresh_lock:
+            manifest = self._manifest()
+            first_day = manifest.get("first_day")
+            first_day = date.fromisoformat(first_day) if first_day else self.source.first_day()
+            if first_day is None:
+                self._last_refresh = time.monotonic()
+                return 0
+            closed = manifest.get("closed_through")
+            last_day = manifest.get("last_day")
+            start = date.fromisoformat(closed) + timedelta(days=1) if closed else first_day
+            target = self.last_closed_day(now)
+            written = 0
+            while start <= target:
+                end = min(target, start + timedelta(days=BACKFILL_CHUNK_DAYS - 1))
+                chunk = CubeSlice.from_rows(self.source.fetch_rows(start, end))
+                for ordinal in chunk.days():
+                    self._write_partition(from_ordinal(ordinal), chunk.filter(chunk.day == ordinal))
+                    last_day = from_ordinal(ordinal).isoformat()
+                    written += 1
+                self._write_manifest({
+                    "backend": self.backend,
+                    "first_day": first_day.isoformat(),
+                    "closed_through": end.isoformat(),
+                    "last_day": last_day,
+                })
+                start = end + timedelta(days=1)
+            self._last_refresh = time.monotonic()
+            return written
+
+    def start_refresh(self) -> threading.Thread:
+        """Run refresh() on a daemon thread, unless one already is."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._refresh_quietly, name="item-cube-refresh", daemon=True)
+                self._thread.start()
+            return self._thread
+
+    def _refresh_quietly(self) -> None:
+        try:
+            self.refresh()
+        except Exception:
+            logger.exception("Item cube refresh failed")
+            self._last_refresh = time.monotonic()  # retry after refresh_interval
+
+    def _maybe_refresh(self) -> None:
+        if self._last_refresh is None or time.monotonic() - self._last_refresh >= self.refresh_interval:
+            if self.background:
+                self.start_refresh()
+            else:
+                self.refresh()
+
+    # ---------- reads ----------
+    def _live_slice(self, first: date, last: date) -> CubeSlice:
+        with self._lock:
+            cached = self._live
+            if cached and time.monotonic() - cached[0] < self.live_ttl and cached[1] <= first and last <= cached[2]:
+                part = cached[3]
+                return part.filter((part.day >= first.toordinal()) & (part.day <= last.toordinal()))
+        part = CubeSlice.from_rows(self.source.fetch_rows(first, last))
+        with self._lock:
+            self._live = (time.monotonic(), first, last, part)
+        return part
+
+    def _live_range(self) -> Tuple[date, date]:
+        closed = self.closed_through()
+        first = closed + timedelta(days=1) if closed else self.last_closed_day() + timedelta(days=1)
+        return first, open_business_day(BOUNDARY_HOUR)
+
+    def slice(self, first: date, last: date) -> CubeSlice:
+        """All cube rows for business days first..last (inclusive)."""
+        if first > last:
+            return CubeSlice.empty()
+        self._maybe_refresh()
+        closed = self.closed_through()
+        parts = []
+        day = first
+        stored_last = min(last, closed) if closed else None
+        while stored_last is not None and day <= stored_last:
+            parts.append(self._load_partition(day))
+            day += timedelta(days=1)
+        if day <= last:
+            # Fetch the whole live range once so repeated reads share it.
+            live_first, live_last = self._live_range()
+            tail = self._live_slice(min(day, live_first), max(last, live_last))
+            parts.append(tail.filter((tail.day >= day.toordinal()) & (tail.day <= last.toordinal())))
+        return CubeSlice.concat(parts)
+
+    def max_biz_date(self) -> Optional[date]:
+        """Latest business day with any sales (anchor used by the item reports)."""
+        live_first, live_last = self._live_range()
+        live = self._live_slice(live_first, live_last)
+        if len(live):
+            return from_ordinal(live.day.max())
+        last_day = self._manifest().get("last_day")
+        return date.fromisoformat(last_day) if last_day else None
+
+
+_cube: Optional[ItemCube] = None
+_cube_lock = threading.Lock()
+
+
+def get_cube() -> ItemCube:
+    """Process-wide cube reading MSSQL through the pooled _connect()."""
+    global _cube
+    if _cube is None:
+        with _cube_lock:
+            if _cube is None:
+                import config
+                from helpers_intelligence import _connect
+
+                _cube = ItemCube(
+                    config.ITEM_CUBE_DIR,
+                    MssqlCubeSource(_connect),
+                    settle_days=config.ROLLUP_SETTLE_DAYS,
+                    backend=config.ANALYTICS_BACKEND,
+                )
+    return _cube
@@ -10,6 +10,7 @@ import os
 
 from flask import Flask, request, redirect
 from license_heartbeat import get_license_status
+from request_timing import timed_phase
 
 _ALWAYS_ALLOWED_PREFIXES = ("/static/",)
 
@@ -23,6 +24,7 @@ def register_license_middleware(app: Flask) -> None:
     """Register the license check as a before_request hook."""
 
     @app.before_request
+    @timed_phase("license")
     def check_license():
         # Bypass entirely if enforcement disabled
         if not _enforcement_enabled():
@@ -37,6 +37,7 @@ from routes.item_trends import item_trends_bp
 from routes.items_explorer import items_explorer_bp
 from routes.dead_items import dead_items_bp
 from routes.reorder_radar import reorder_radar_bp
+from routes.admin import admin_bp
 
 from helpers_intelligence import (
     get_pos_sales_total_by_range,
@@ -46,6 +47,10 @@ from helpers_intelligence import (
 from license_client import get_hw_fingerprint, activate as license_activate
 from license_heartbeat import start_heartbeat_thread, notify_activated
 from license_middleware import register_license_middleware
+import cache_utils
+import query_log
+from request_timing import register_request_timing, timed_phase
+from pos_sync import start_sync_daemon
 
 
 # ───────────────────────────────
@@ -56,11 +61,34 @@ app.config["SECRET_KEY"] = config.SECRET_KEY
 app.config["SQLALCHEMY_DATABASE_URI"] = config.DATABASE_URL
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+# Server-Timing headers + /metrics; registered first so its clock starts first
+register_request_timing(app)
+
 db.init_app(app)
 
+# Analytics cache: backend + bounds
+cache_utils.configure(
+    max_entries=config.CACHE_MAX_ENTRIES,
+    max_bytes=config.CACHE_MAX_BYTES,
+    purge_interval=config.CACHE_PURGE_INTERVAL,
+    backend=config.CACHE_BACKEND,
+    sqlite_path=config.CACHE_SQLITE_PATH,
+)
+
+# Per-statement timings + slow-query log (see /api/admin/queries)
+query_log.configure(
+    enabled=config.QUERY_LOG_ENABLED,
+    size=config.QUERY_LOG_SIZE,
+    slow_ms=config.QUERY_SLOW_MS,
+    slow_log_path=config.QUERY_SLOW_LOG_PATH,
+)
+
 # Start license heartbeat daemon
 start_heartbeat_thread()
 
+# Keep the local POS replica current (POS_SYNC_INTERVAL=0: run pos_sync.py instead)
+start_sync_daemon(config.POS_SYNC_INTERVAL)
+
 # Register license middleware (runs before require_login)
 register_license_middleware(app)
 
@@ -337,11 +365,15 @@ app.register_blueprint(item_trends_bp)
 app.register_blueprint(items_explorer_bp)
 app.register_blueprint(dead_items_bp)
 app.register_blueprint(reorder_radar_bp)
+app.register_blueprint(admin_bp)
 
 
 @app.before_request
+@timed_phase("auth")
 def require_login():
     allowed_routes = ["login", "static", "activate_page", "license_expired_page"]
+    if config.METRICS_PUBLIC:
+        allowed_routes.append("metrics")
     if request.endpoint not in allowed_routes:
         if not session.get("logged_in"):
             return redirect(url_for("login"))
@@ -0,0 +1,72 @@
+# pos_backends.py
+"""
+Connection backends behind helpers_intelligence._connect().
+
+ANALYTICS_BACKEND picks one by name:
+
+  mssql    the POS SQL Server through pyodbc (default; registered by
+           helpers_intelligence, which owns the connection string)
+  replica  local mirror of the POS history kept by pos_sync.py; read-only,
+           so item edits and open-day reads still go to the POS
+  standin  synthetic POS written by pos_synth.py; a full stand-in (history,
+           open-day tables, item edits) for benchmarking and load-testing
+           the helpers without a SQL Server
+
+Every backend hands out pyodbc-shaped connections speaking T-SQL
+(tsql_sqlite translates for the SQLite ones). Factories receive the config
+module; register_backend() adds more.
+"""
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+
+
+@dataclass(frozen=True)
+class Backend:
+    name: str
+    connect: Callable[[Any], Any]  # (config) -> connection
+    # True when the backend also serves open-day reads and item edits
+    # (helpers_intelligence._connect_pos); False means those go to MSSQL.
+    full_pos: bool = True
+
+
+_backends: Dict[str, Backend] = {}
+_lock = threading.Lock()
+
+
+def register_backend(name: str, connect: Callable[[Any], Any], full_pos: bool = True) -> Backend:
+    """Register (or replace) the connection factory for <name>."""
+    backend = Backend(name.strip().lower(), connect, full_pos)
+    with _lock:
+        _backends[backend.name] = backend
+    return backend
+
+
+def get_backend(name: str) -> Backend:
+    key = (name or "").strip().lower()
+    try:
+        return _backends[key]
+    except KeyError:
+        raise ValueError(
+            f"Unknown ANALYTICS_BACKEND {name!r}; expected one of: {', '.join(backend_names())}"
+        ) from None
+
+
+def backend_names() -> List[str]:
+    return sorted(_backends)
+
+
+def _replica_connection(config):
+    import tsql_sqlite
+    return tsql_sqlite.connect(config.POS_REPLICA_PATH)
+
+
+def _standin_connection(config):
+    import tsql_sqlite
+    return tsql_sqlite.connect(config.POS_STANDIN_PATH, readonly=False)
+
+
+register_backend("replica", _replica_connection, full_pos=False)
+register_backend("standin", _standin_connection, full_pos=True)
@@ -73,3 +73,40 @@ def cutoff_dt_7h(days: int) -> datetime:
     """
     cutoff_date = datetime.now().date() - timedelta(days=days + 1)
     return datetime(cutoff_date.year, cutoff_date.month, cutoff_date.day, 7, 0, 0)
+
+
+def biz_window_7h(first: date, last: date) -> tuple[datetime, datetime]:
+    """
+    RCPT_DATE bounds covering business days first..last (inclusive), 07:00 boundary.
+    Returns (inclusive_start, exclusive_end).
+
+    SQL usage:
+        start, end = biz_window_7h(first, last)
+        WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ?   -- params: (start, end)
+    """
+    return biz_date_range_7h(first)[0], biz_date_range_7h(last)[1]
+
+
+def biz_date_7h(dt: datetime) -> date:
+    """
+    Business date a receipt timestamp belongs to (07:00 boundary).
+    Python-side equivalent of CAST(DATEADD(HOUR, -7, RCPT_DATE) AS date).
+    """
+    return (dt - timedelta(hours=7)).date()
+
+
+def parse_date(value) -> date | None:
+    """
+    Accepts a date, datetime or 'YYYY-MM-DD' string (route query args).
+    Returns None for blank values.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    text = str(value).strip()
+    if not text:
+        return None
+    return datetime.strptime(text[:10], "%Y-%m-%d").date()
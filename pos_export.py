@@ -0,0 +1,380 @@
+# pos_export.py
+"""
+Columnar bulk export of raw POS history for offline analysis.
+
+Copies HISTORIC_RECEIPT and HISTORIC_RECEIPT_CONTENTS into date-partitioned
+Parquet (or Arrow IPC) files so heavy ad-hoc analysis can run on a local
+columnar copy (pandas / pyarrow.dataset / DuckDB) instead of the live POS
+server:
+
+    <dir>/receipts/biz_date=2026-05-19/part-0.parquet
+    <dir>/receipt_contents/biz_date=2026-05-19/part-0.parquet
+
+  - one partition per business date (07:00 boundary, like the intelligence
+    helpers); rows are selected with sargable RCPT_DATE bounds
+  - reads go through the read-only mssql_readonly_stream() (fetchmany), and
+    every <chunk_rows> rows are written out as one row group / record
+    batch, so memory stays flat for any day size
+  - incremental: only closed days (same settle rule as the rollup store)
+    whose partition file does not exist yet are exported; files are written
+    to a temp name and renamed, so a crash never leaves a half partition
+    that would be skipped next time
+
+Entry points:
+    python pos_export.py --from 2025-01-01 [--to 2026-05-18] [--format arrow]
+    POST /api/admin/pos-export  (routes/admin.py; runs in the background)
+
+pyarrow is imported lazily: the rest of the app does not need it.
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import threading
+import time
+from contextlib import closing
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from pos_dates import biz_window_7h, parse_date
+from rollups import open_business_day
+
+logger = logging.getLogger(__name__)
+
+BOUNDARY_HOUR = 7
+
+# (table, SQL, [(column, arrow type)]); the SQL is bounded by (start, end)
+TABLES: Dict[str, Tuple[str, List[Tuple[str, str]]]] = {
+    "receipts": (
+        """
+        SELECT r.RCPT_ID, r.RCPT_NO, r.RCPT_DATE, r.RCPT_AMOUNT
+        FROM dbo.HISTORIC_RECEIPT r
+        WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ?
+        ORDER BY r.RCPT_ID
+        """,
+        [
+            ("RCPT_ID", "int64"),
+            ("RCPT_NO", "int64"),
+            ("RCPT_DATE", "timestamp"),
+            ("RCPT_AMOUNT", "float64"),
+        ],
+    ),
+    "receipt_contents": (
+        """
+        SELECT c.RCPT_ID, c.RCPT_LINE, c.ITM_CODE, c.ITM_QUANTITY, c.ITM_PRICE, r.RCPT_DATE
+        FROM dbo.HISTORIC_RECEIPT r
+        INNER JOIN dbo.HISTORIC_RECEIPT_CONTENTS c
+            ON c.RCPT_ID = r.RCPT_ID
+        WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ?
+        ORDER BY c.RCPT_ID, c.RCPT_LINE
+        """,
+        [
+            ("RCPT_ID", "int64"),
+            ("RCPT_LINE", "int64"),
+            ("ITM_CODE", "string"),
+            ("ITM_QUANTITY", "float64"),
+            ("ITM_PRICE", "float64"),
+            ("RCPT_DATE", "timestamp"),
+        ],
+    ),
+}
+
+FIRST_DAY_SQL = "SELECT MIN(r.RCPT_DATE) AS min_dt FROM dbo.HISTORIC_RECEIPT r"
+
+
+def _arrow_schema(columns: Sequence[Tuple[str, str]]):
+    import pyarrow as pa
+
+    types = {
+        "int64": pa.int64(),
+        "float64": pa.float64(),
+        "string": pa.string(),
+        "timestamp": pa.timestamp("s"),
+    }
+    return pa.schema([(name, types[kind]) for name, kind in columns])
+
+
+def _coerce(kind: str, value: Any) -> Any:
+    # NUMERIC columns arrive as Decimal; ITM_CODE may be numeric or text
+    if value is None:
+        return None
+    if kind == "float64":
+        return float(value)
+    if kind == "int64":
+        return int(value)
+    if kind == "string":
+        return str(value)
+    return value
+
+
+class ParquetPartWriter:
+    """One Parquet file; each write() becomes a row group."""
+
+    extension = "parquet"
+
+    def __init__(self, path: str, columns: Sequence[Tuple[str, str]]):
+        import pyarrow.parquet as pq
+
+        self.schema = _arrow_schema(columns)
+        self._writer = pq.ParquetWriter(path, self.schema, compression="zstd")
+
+    def write(self, chunk: Dict[str, list]) -> None:
+        import pyarrow as pa
+
+        self._writer.write_table(pa.Table.from_pydict(chunk, schema=self.schema))
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+class ArrowPartWriter:
+    """One Arrow IPC file; each write() becomes a record batch."""
+
+    extension = "arrow"
+
+    def __init__(self, path: str, columns: Sequence[Tuple[str, str]]):
+        import pyarrow as pa
+
+        self.schema = _arrow_schema(columns)
+        self._sink = pa.OSFile(path, "wb")
+        self._writer = pa.ipc.new_file(self._sink, self.schema)
+
+    def write(self, chunk: Dict[str, list]) -> None:
+        import pyarrow as pa
+
+        self._writer.write_batch(pa.RecordBatch.from_pydict(chunk, schema=self.schema))
+
+    def close(self) -> None:
+        self._writer.close()
+        self._sink.close()
+
+
+WRITERS: Dict[str, Callable[..., Any]] = {
+    "parquet": ParquetPartWriter,
+    "arrow": ArrowPartWriter,
+}
+
+
+class PosExporter:
+    """
+    Date-partitioned export of receipt headers and lines.
+
+    stream(sql, params) must behave like mssql_readonly_stream: yield the
+    column names, then row tuples. first_day() returns the earliest business
+    date with receipts (None when there are none).
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        stream: Callable[[str, Sequence], Iterator],
+        first_day: Callable[[], Optional[date]],
+        fmt: str = "parquet",
+        chunk_rows: int = 50_000,
+        settle_days: int = 1,
+    ):
+        if fmt not in WRITERS:
+            raise ValueError(f"Unknown export format: {fmt!r} (use {', '.join(WRITERS)})")
+        self.directory = directory
+        self.stream = stream
+        self.first_day = first_day
+        self.fmt = fmt
+        self.chunk_rows = max(1, int(chunk_rows))
+        self.settle_days = max(0, int(settle_days))
+
+    def partition_path(self, table: str, day: date) -> str:
+        ext = WRITERS[self.fmt].extension
+        return os.path.join(self.directory, table, f"biz_date={day.isoformat()}", f"part-0.{ext}")
+
+    def last_closed_day(self, now: Optional[datetime] = None) -> date:
+        return open_business_day(BOUNDARY_HOUR, now) - timedelta(days=self.settle_days + 1)
+
+    def is_exported(self, day: date) -> bool:
+        return all(os.path.exists(self.partition_path(t, day)) for t in TABLES)
+
+    def pending_days(self, first: date, last: date) -> List[date]:
+        out = []
+        d = first
+        while d <= last:
+            if not self.is_exported(d):
+                out.append(d)
+            d += timedelta(days=1)
+        return out
+
+    def _write_table(self, table: str, day: date) -> int:
+        sql, columns = TABLES[table]
+        path = self.partition_path(table, day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = path + ".tmp"
+
+        names = [name for name, _ in columns]
+        kinds = [kind for _, kind in columns]
+        total = 0
+        # closing(): a failed write must also release the stream's pooled connection
+        with closing(self.stream(sql, biz_window_7h(day, day))) as rows:
+            next(rows)  # column names; the schema is fixed by TABLES
+            writer = WRITERS[self.fmt](tmp, columns)
+            try:
+                chunk: Dict[str, list] = {name: [] for name in names}
+                pending = 0
+                for row in rows:
+                    for name, kind, value in zip(names, kinds, row):
+                        chunk[name].append(_coerce(kind, value))
+                    pending += 1
+                    if pending >= self.chunk_rows:
+                        writer.write(chunk)
+                        total += pending
+                        chunk = {name: [] for name in names}
+                        pending = 0
+                if pending or not total:
+                    writer.write(chunk)  # an empty day still gets a (0-row) partition
+                    total += pending
+            except BaseException:
+                writer.close()
+                os.remove(tmp)
+                raise
+            writer.close()
+        os.replace(tmp, path)
+        return total
+
+    def export_day(self, day: date) -> Dict[str, int]:
+        """Write the missing table partitions of one business day; returns rows per table."""
+        written = {}
+        for table in TABLES:
+            if not os.path.exists(self.partition_path(table, day)):
+                written[table] = self._write_table(table, day)
+        return written
+
+    def export_range(
+        self,
+        first: Optional[date] = None,
+        last: Optional[date] = None,
+        now: Optional[datetime] = None,
+        progress: Optional[Callable[[date, Dict[str, int]], None]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Export every closed, not yet exported business day in first..last.
+        first defaults to the first day with receipts; last is capped at the
+        last closed day.
+        """
+        closed = self.last_closed_day(now)
+        last = min(last or closed, closed)
+        first = first or self.first_day()
+        if first is None or first > last:
+            return {"days": 0, "rows": {t: 0 for t in TABLES}, "first": None, "last": None}
+
+        rows = {t: 0 for t in TABLES}
+        days = self.pending_days(first, last)
+        for day in days:
+            written = self.export_day(day)
+            for table, n in written.items():
+                rows[table] += n
+            if progress:
+                progress(day, written)
+        return {"days": len(days), "rows": rows, "first": first.isoformat(), "last": last.isoformat()}
+
+
+def _mssql_first_day() -> Optional[date]:
+    from helpers_intelligence import mssql_readonly_query
+
+    rows = mssql_readonly_query(FIRST_DAY_SQL)
+    min_dt = rows[0]["min_dt"] if rows else None
+    if min_dt is None:
+        return None
+    return (min_dt - timedelta(hours=BOUNDARY_HOUR)).date()
+
+
+_exporter: Optional[PosExporter] = None
+_exporter_lock = threading.Lock()
+
+
+def get_exporter() -> PosExporter:
+    """Process-wide exporter reading MSSQL through the pooled read-only stream."""
+    global _exporter
+    if _exporter is None:
+        with _exporter_lock:
+            if _exporter is None:
+                import config
+                from helpers_intelligence import mssql_readonly_stream
+
+                _exporter = PosExporter(
+                    config.POS_EXPORT_DIR,
+                    lambda sql, params: mssql_readonly_stream(sql, params, config.POS_EXPORT_CHUNK_ROWS),
+                    _mssql_first_day,
+                    fmt=config.POS_EXPORT_FORMAT,
+                    chunk_rows=config.POS_EXPORT_CHUNK_ROWS,
+                    settle_days=config.ROLLUP_SETTLE_DAYS,
+                )
+    return _exporter
+
+
+# ---------- Background job (admin route) ----------
+_job: Dict[str, Any] = {"running": False}
+_job_lock = threading.Lock()
+
+
+def export_status() -> Dict[str, Any]:
+    with _job_lock:
+        return dict(_job)
+
+
+def start_export(first: Optional[date] = None, last: Optional[date] = None,
+                 exporter: Optional[PosExporter] = None) -> bool:
+    """Run export_range on a background thread; False if one is already running."""
+    exporter = exporter or get_exporter()
+    with _job_lock:
+        if _job.get("running"):
+            return False
+        _job.clear()
+        _job.update({"running": True, "started_at": time.time(), "days_done": 0,
+                     "last_day": None, "result": None, "error": None})
+
+    def progress(day: date, written: Dict[str, int]) -> None:
+        with _job_lock:
+            _job["days_done"] += 1
+            _job["last_day"] = day.isoformat()
+
+    def run() -> None:
+        try:
+            result = exporter.export_range(first, last, progress=progress)
+            with _job_lock:
+                _job["result"] = result
+        except Exception as e:
+            logger.exception("POS export failed")
+            with _job_lock:
+                _job["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            with _job_lock:
+                _job["running"] = False
+                _job["finished_at"] = time.time()
+
+    threading.Thread(target=run, name="pos-export", daemon=True).start()
+    return True
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Export POS receipt history to date-partitioned columnar files.")
+    parser.add_argument("--from", dest="first", help="first business date (default: earliest receipt)")
+    parser.add_argument("--to", dest="last", help="last business date (default/cap: last closed day)")
+    parser.add_argument("--format", choices=sorted(WRITERS), help="default: POS_EXPORT_FORMAT")
+    parser.add_argument("--dir", help="default: POS_EXPORT_DIR")
+    args = parser.parse_args(list(argv) if argv is not None else None)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    exporter = get_exporter()
+    if args.format:
+        exporter.fmt = args.format
+    if args.dir:
+        exporter.directory = args.dir
+
+    def progress(day: date, written: Dict[str, int]) -> None:
+        logger.info(f"{day}: " + ", ".join(f"{t}={n}" for t, n in written.items()))
+
+    result = exporter.export_range(parse_date(args.first), parse_date(args.last), progress=progress)
+    logger.info(f"Exported {result['days']} day(s) to {exporter.directory}: {result['rows']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
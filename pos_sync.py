@@ -0,0 +1,383 @@
+# pos_sync.py
+"""
+Incremental mirror of the POS history into a local SQLite replica.
+
+Every analytics read used to hit the POS's production SQL Server, the same
+instance the checkout terminals write to. PosReplica copies what the
+analytics need into a local SQLite file (same table and column names), and
+with ANALYTICS_BACKEND=replica helpers_intelligence._connect() reads that
+file through tsql_sqlite instead of MSSQL:
+
+  - HISTORIC_RECEIPT / HISTORIC_RECEIPT_CONTENTS: new receipts by RCPT_ID
+    high-water mark (PK seek, <batch_rows> receipts per round-trip). The
+    last <overlap_minutes> before the RCPT_DATE high-water mark are re-read
+    each run so receipts archived late with a lower RCPT_ID are picked up;
+    re-read receipts are replaced, never duplicated.
+  - ITEMS / SUBGROUPS / ITEM_BARCODE: full snapshot every
+    <snapshot_interval> seconds (small tables; titles and prices change).
+
+The replica is indexed for the helpers' access paths (RCPT_DATE ranges,
+lines by RCPT_ID and by ITM_CODE). Writes to the POS (item edits) always go
+to MSSQL; the replica is read-only for the app.
+
+Run it as its own process (one writer for all gunicorn workers):
+    python pos_sync.py            # loop every POS_SYNC_INTERVAL seconds
+    python pos_sync.py --once     # one pass (cron)
+or in-process with POS_SYNC_INTERVAL > 0 (main.py starts start_sync_daemon).
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+_DT_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS HISTORIC_RECEIPT (
+        RCPT_ID     INTEGER PRIMARY KEY,
+        RCPT_NO     INTEGER,
+        RCPT_DATE   TEXT NOT NULL,
+        RCPT_AMOUNT REAL
+    )""",
+    "CREATE INDEX IF NOT EXISTS IX_HISTORIC_RECEIPT_DATE ON HISTORIC_RECEIPT (RCPT_DATE, RCPT_ID)",
+    """CREATE TABLE IF NOT EXISTS HISTORIC_RECEIPT_CONTENTS (
+        RCPT_ID      INTEGER NOT NULL,
+        RCPT_LINE    INTEGER NOT NULL,
+        ITM_CODE     INTEGER,
+        ITM_QUANTITY REAL,
+        ITM_PRICE    REAL,
+        PRIMARY KEY (RCPT_ID, RCPT_LINE)
+    )""",
+    "CREATE INDEX IF NOT EXISTS IX_CONTENTS_ITEM ON HISTORIC_RECEIPT_CONTENTS (ITM_CODE, RCPT_ID)",
+    """CREATE TABLE IF NOT EXISTS ITEMS (
+        ITM_CODE        INTEGER PRIMARY KEY,
+        ITM_TITLE       TEXT,
+        ITM_DESCRIPTION TEXT,
+        ITM_BRAND       INTEGER,
+        ITM_TYPE        INTEGER,
+        ITM_SUBGROUP    TEXT,
+        ITM_SUPPLIER    INTEGER
+    )""",
+    "CREATE INDEX IF NOT EXISTS IX_ITEMS_SUBGROUP ON ITEMS (ITM_SUBGROUP)",
+    """CREATE TABLE IF NOT EXISTS SUBGROUPS (
+        SubGrp_ID       INTEGER PRIMARY KEY,
+        SubGrp_Name     TEXT,
+        SubGrp_PARENTID INTEGER
+    )""",
+    """CREATE TABLE IF NOT EXISTS ITEM_BARCODE (
+        ITM_CODE    INTEGER NOT NULL,
+        ITM_BARCODE TEXT NOT NULL,
+        ITM_PRICE   REAL,
+        PRIMARY KEY (ITM_CODE, ITM_BARCODE)
+    )""",
+    """CREATE TABLE IF NOT EXISTS sync_state (
+        name  TEXT PRIMARY KEY,
+        value TEXT
+    )""",
+]
+
+# Snapshot tables and the columns mirrored (the rest of ITEMS is not used)
+DIMENSIONS: Dict[str, Tuple[str, ...]] = {
+    "ITEMS": ("ITM_CODE", "ITM_TITLE", "ITM_DESCRIPTION", "ITM_BRAND", "ITM_TYPE",
+              "ITM_SUBGROUP", "ITM_SUPPLIER"),
+    "SUBGROUPS": ("SubGrp_ID", "SubGrp_Name", "SubGrp_PARENTID"),
+    "ITEM_BARCODE": ("ITM_CODE", "ITM_BARCODE", "ITM_PRICE"),
+}
+RECEIPT_COLUMNS = ("RCPT_ID", "RCPT_NO", "RCPT_DATE", "RCPT_AMOUNT")
+LINE_COLUMNS = ("RCPT_ID", "RCPT_LINE", "ITM_CODE", "ITM_QUANTITY", "ITM_PRICE")
+
+
+def _value(v: Any) -> Any:
+    # pyodbc types -> what the replica stores (see tsql_sqlite)
+    if isinstance(v, datetime):
+        return v.strftime(_DT_FORMAT)
+    if hasattr(v, "as_tuple"):  # Decimal
+        return float(v)
+    return v
+
+
+class MssqlSyncSource:
+    """Reads new receipts and dimension snapshots from the POS (read-only)."""
+
+    def __init__(self, connect: Callable):
+        self._connect = connect
+
+    def _rows(self, sql: str, params: Sequence = ()) -> List[Tuple]:
+        with self._connect() as cn:
+            cur = cn.cursor()
+            cur.execute(sql, tuple(params))
+            return [tuple(_value(v) for v in row) for row in cur.fetchall()]
+
+    def receipts_after(self, after_id: int, limit: int) -> List[Tuple]:
+        return self._rows("""
+            SET NOCOUNT ON;
+            SELECT TOP (?) r.RCPT_ID, r.RCPT_NO, r.RCPT_DATE, r.RCPT_AMOUNT
+            FROM dbo.HISTORIC_RECEIPT r
+            WHERE r.RCPT_ID > ?
+            ORDER BY r.RCPT_ID;
+        """, (int(limit), int(after_id)))
+
+    def receipts_between(self, start: datetime, end: datetime) -> List[Tuple]:
+        return self._rows("""
+            SET NOCOUNT ON;
+            SELECT r.RCPT_ID, r.RCPT_NO, r.RCPT_DATE, r.RCPT_AMOUNT
+            FROM dbo.HISTORIC_RECEIPT r
+            WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ?
+            ORDER BY r.RCPT_ID;
+        """, (start, end))
+
+    def lines_for_ids(self, first_id: int, last_id: int) -> List[Tuple]:
+        return self._rows("""
+            SET NOCOUNT ON;
+            SELECT c.RCPT_ID, c.RCPT_LINE, c.ITM_CODE, c.ITM_QUANTITY, c.ITM_PRICE
+            FROM dbo.HISTORIC_RECEIPT_CONTENTS c
+            WHERE c.RCPT_ID >= ? AND c.RCPT_ID <= ?;
+        """, (int(first_id), int(last_id)))
+
+    def lines_between(self, start: datetime, end: datetime) -> List[Tuple]:
+        return self._rows("""
+            SET NOCOUNT ON;
+            SELECT c.RCPT_ID, c.RCPT_LINE, c.ITM_CODE, c.ITM_QUANTITY, c.ITM_PRICE
+            FROM dbo.HISTORIC_RECEIPT r
+            INNER JOIN dbo.HISTORIC_RECEIPT_CONTENTS c
+                ON c.RCPT_ID = r.RCPT_ID
+            WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ?;
+        """, (start, end))
+
+    def snapshot(self, table: str) -> List[Tuple]:
+        columns = ", ".join(DIMENSIONS[table])  # whitelisted names only
+        return self._rows(f"SET NOCOUNT ON; SELECT {columns} FROM dbo.{table};")
+
+
+class PosReplica:
+    """
+    SQLite mirror of the POS tables the analytics read.
+
+    <source> provides receipts_after, receipts_between, lines_for_ids,
+    lines_between and snapshot(table); see MssqlSyncSource.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        source,
+        batch_rows: int = 5000,
+        overlap_minutes: int = 60,
+        snapshot_interval: float = 3600.0,
+    ) -> None:
+        self.path = path
+        self.source = source
+        self.batch_rows = max(1, int(batch_rows))
+        self.overlap = timedelta(minutes=max(0, int(overlap_minutes)))
+        self.snapshot_interval = float(snapshot_interval)
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+
+        cn = self._conn()
+        for ddl in SCHEMA:
+            cn.execute(ddl)
+
+    def _conn(self) -> sqlite3.Connection:
+        cn = getattr(self._local, "cn", None)
+        if cn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            cn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            cn.execute("PRAGMA journal_mode=WAL")
+            cn.execute("PRAGMA synchronous=NORMAL")
+            self._local.cn = cn
+            self._local.pid = os.getpid()
+        return cn
+
+    # ---------- state ----------
+    def state(self) -> Dict[str, Optional[str]]:
+        rows = self._conn().execute("SELECT name, value FROM sync_state").fetchall()
+        return dict(rows)
+
+    def _set_state(self, cn: sqlite3.Connection, **values: Any) -> None:
+        cn.executemany(
+            "INSERT OR REPLACE INTO sync_state (name, value) VALUES (?, ?)",
+            [(k, None if v is None else str(v)) for k, v in values.items()],
+        )
+
+    def high_water_mark(self) -> Tuple[int, Optional[datetime]]:
+        """(max RCPT_ID, max RCPT_DATE) already mirrored."""
+        row = self._conn().execute(
+            "SELECT MAX(RCPT_ID), MAX(RCPT_DATE) FROM HISTORIC_RECEIPT"
+        ).fetchone()
+        max_id = int(row[0]) if row and row[0] is not None else 0
+        max_dt = datetime.strptime(row[1], _DT_FORMAT) if row and row[1] else None
+        return max_id, max_dt
+
+    # ---------- writes ----------
+    def _upsert_receipts(self, receipts: List[Tuple], lines: List[Tuple]) -> None:
+        cn = self._conn()
+        cn.execute("BEGIN IMMEDIATE")
+        try:
+            ids = [(r[0],) for r in receipts]
+            cn.executemany("DELETE FROM HISTORIC_RECEIPT_CONTENTS WHERE RCPT_ID = ?", ids)
+            cn.executemany(
+                "INSERT OR REPLACE INTO HISTORIC_RECEIPT (RCPT_ID, RCPT_NO, RCPT_DATE, RCPT_AMOUNT) "
+                "VALUES (?, ?, ?, ?)",
+                receipts,
+            )
+            cn.executemany(
+                "INSERT OR REPLACE INTO HISTORIC_RECEIPT_CONTENTS "
+                "(RCPT_ID, RCPT_LINE, ITM_CODE, ITM_QUANTITY, ITM_PRICE) VALUES (?, ?, ?, ?, ?)",
+                lines,
+            )
+            cn.execute("COMMIT")
+        except BaseException:
+            cn.execute("ROLLBACK")
+            raise
+
+    def sync_receipts(self) -> int:
+        """Copy receipts past the high-water mark (and re-read the overlap). Returns receipts written."""
+        max_id, max_dt = self.high_water_mark()
+        written = 0
+
+        if max_dt is not None and self.overlap:
+            start = max_dt - self.overlap
+            end = max_dt + timedelta(seconds=1)
+            receipts = self.source.receipts_between(start, end)
+            if receipts:
+                self._upsert_receipts(receipts, self.source.lines_between(start, end))
+                written += len(receipts)
+
+        while True:
+            receipts = self.source.receipts_after(max_id, self.batch_rows)
+            if not receipts:
+                break
+            first_id, last_id = receipts[0][0], receipts[-1][0]
+            self._upsert_receipts(receipts, self.source.lines_for_ids(first_id, last_id))
+            written += len(receipts)
+            max_id = last_id
+            if len(receipts) < self.batch_rows:
+                break
+        return written
+
+    def snapshot_dimensions(self) -> Dict[str, int]:
+        """Replace ITEMS / SUBGROUPS / ITEM_BARCODE with a fresh copy. Returns rows per table."""
+        counts = {}
+        snapshots = {table: self.source.snapshot(table) for table in DIMENSIONS}
+        cn = self._conn()
+        cn.execute("BEGIN IMMEDIATE")
+        try:
+            for table, rows in snapshots.items():
+                columns = DIMENSIONS[table]
+                cn.execute(f"DELETE FROM {table}")
+                cn.executemany(
+                    f"INSERT OR REPLACE INTO {table} ({', '.join(columns)}) "
+                    f"VALUES ({', '.join('?' * len(columns))})",
+                    rows,
+                )
+                counts[table] = len(rows)
+            self._set_state(cn, last_snapshot=time.time())
+            cn.execute("COMMIT")
+        except BaseException:
+            cn.execute("ROLLBACK")
+            raise
+        return counts
+
+    def sync(self, force_snapshot: bool = False) -> Dict[str, Any]:
+        """One pass: new receipts, plus dimension snapshots when due."""
+        with self._sync_lock:
+            t0 = time.monotonic()
+            receipts = self.sync_receipts()
+            last_snapshot = float(self.state().get("last_snapshot") or 0)
+            dimensions = None
+            if force_snapshot or time.time() - last_snapshot >= self.snapshot_interval:
+                dimensions = self.snapshot_dimensions()
+            max_id, max_dt = self.high_water_mark()
+            cn = self._conn()
+            self._set_state(cn, last_sync=time.time(), hwm_id=max_id,
+                            hwm_date=max_dt.strftime(_DT_FORMAT) if max_dt else None)
+            return {
+                "receipts": receipts,
+                "dimensions": dimensions,
+                "hwm_id": max_id,
+                "hwm_date": max_dt.strftime(_DT_FORMAT) if max_dt else None,
+                "seconds": round(time.monotonic() - t0, 3),
+            }
+
+
+_replica: Optional[PosReplica] = None
+_replica_lock = threading.Lock()
+
+
+def get_replica() -> PosReplica:
+    """Process-wide replica fed from the POS through the pooled MSSQL connection."""
+    global _replica
+    if _replica is None:
+        with _replica_lock:
+            if _replica is None:
+                import config
+                from helpers_intelligence import _connect_pos
+
+                _replica = PosReplica(
+                    config.POS_REPLICA_PATH,
+                    MssqlSyncSource(_connect_pos),
+                    batch_rows=config.POS_SYNC_BATCH_ROWS,
+                )
+    return _replica
+
+
+def run_forever(replica: PosReplica, interval: float, stop: Optional[threading.Event] = None) -> None:
+    """Sync every <interval> seconds until <stop> is set; errors are logged and retried."""
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        try:
+            result = replica.sync()
+            if result["receipts"] or result["dimensions"]:
+                logger.info(f"POS sync: {result}")
+        except Exception:
+            logger.exception("POS sync failed")
+        stop.wait(interval)
+
+
+_daemon: Optional[threading.Thread] = None
+_daemon_lock = threading.Lock()
+
+
+def start_sync_daemon(interval: float) -> Optional[threading.Thread]:
+    """Start the in-process sync loop once (interval <= 0 disables it)."""
+    global _daemon
+    if interval <= 0:
+        return None
+    replica = get_replica()  # takes _replica_lock itself
+    with _daemon_lock:
+        if _daemon is None or not _daemon.is_alive():
+            _daemon = threading.Thread(
+                target=run_forever, args=(replica, interval), name="pos-sync", daemon=True
+            )
+            _daemon.start()
+    return _daemon
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    import config
+
+    parser = argparse.ArgumentParser(description="Mirror POS history into the local SQLite replica.")
+    parser.add_argument("--once", action="store_true", help="run one sync pass and exit")
+    parser.add_argument("--interval", type=float, default=None,
+                        help="seconds between passes (default: POS_SYNC_INTERVAL, or 60)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+    replica = get_replica()
+    if args.once:
+        logger.info(f"POS sync: {replica.sync(force_snapshot=True)}")
+        return 0
+    run_forever(replica, args.interval or config.POS_SYNC_INTERVAL or 60)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,289 @@
+# pos_synth.py
+"""
+Synthetic POS database for the "standin" analytics backend.
+
+Writes a SQLite file with the POS schema (helpers_ai.POS_SCHEMA_DESCRIPTION;
+same tables and indexes as the pos_sync.py replica, plus the open-day
+RECEIPT / RECEIPT_CONTENTS tables) filled with generated trading:
+
+  - ITEMS in SUBGROUPS with Zipf-like popularity and fixed LBP prices; a few
+    items never sell, a few stop selling <stop_days> before the end, and some
+    ITM_SUBGROUP values hold the subgroup name instead of its id (the real
+    POS has both)
+  - receipts during store hours (08:00-02:00) with an hourly curve, busier
+    Fridays/Saturdays, yearly growth and Poisson day-to-day noise
+  - baskets of 1 + Poisson(<lines_mean> - 1) distinct items
+  - optionally the open business day (up to <now>) in RECEIPT tables
+
+With ANALYTICS_BACKEND=standin every helper (analytics, realtime, item
+edits) runs against the file, so they can be exercised and timed offline:
+    python pos_synth.py --years 3 --receipts-per-day 400
+Generation is seeded and deterministic.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sqlite3
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from pos_sync import SCHEMA
+
+LIVE_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS RECEIPT (
+        RCPT_ID     INTEGER PRIMARY KEY,
+        RCPT_NO     INTEGER,
+        RCPT_DATE   TEXT NOT NULL,
+        RCPT_AMOUNT REAL
+    )""",
+    "CREATE INDEX IF NOT EXISTS IX_RECEIPT_DATE ON RECEIPT (RCPT_DATE, RCPT_ID)",
+    """CREATE TABLE IF NOT EXISTS RECEIPT_CONTENTS (
+        RCPT_ID      INTEGER NOT NULL,
+        RCPT_LINE    INTEGER NOT NULL,
+        ITM_CODE     INTEGER,
+        ITM_QUANTITY REAL,
+        ITM_PRICE    REAL,
+        PRIMARY KEY (RCPT_ID, RCPT_LINE)
+    )""",
+]
+
+SUBGROUP_NAMES = [
+    "Tobacco", "Alcohol", "Energy Drinks", "Water", "Coffee", "Soft Drinks",
+    "Biscuits", "Chocolate", "Croissants", "Chips", "Dairy", "Household",
+    "Gum & Candy", "Ice Cream", "Juices", "Bakery",
+]
+
+# Relative receipt volume per clock hour (0 = closed)
+HOUR_WEIGHTS = np.array([
+    5, 3, 0, 0, 0, 0, 0, 0,         # 00-07
+    4, 6, 6, 6, 7, 8, 7, 6,         # 08-15
+    7, 9, 11, 12, 12, 11, 9, 7,     # 16-23
+], np.float64)
+# Monday .. Sunday
+WEEKDAY_FACTORS = np.array([0.9, 0.9, 0.95, 1.0, 1.15, 1.25, 1.0])
+
+_FMT = "%Y-%m-%d %H:%M:%S"
+_OPEN_HOUR = 8
+
+
+@dataclass
+class SynthProfile:
+    """Volume and shape of the generated trading."""
+
+    items: int = 400
+    subgroups: int = 12
+    receipts_per_day: float = 350.0
+    lines_mean: float = 2.6
+    yearly_growth: float = 0.08
+    dead_items: float = 0.05        # share of items that never sell
+    stopped_items: float = 0.03     # share that stop selling <stop_days> before the end
+    stop_days: int = 45
+    named_subgroups: float = 0.05   # share of ITM_SUBGROUP holding the name, not the id
+    seed: int = 7
+
+
+class SynthPos:
+    """Generates dimensions and receipts for one profile; write() fills a database."""
+
+    def __init__(self, profile: Optional[SynthProfile] = None):
+        self.profile = profile or SynthProfile()
+        p = self.profile
+        rng = np.random.default_rng(p.seed)
+
+        n_sub = max(1, min(p.subgroups, len(SUBGROUP_NAMES)))
+        self.subgroups: List[Tuple] = [(i + 1, SUBGROUP_NAMES[i], 1) for i in range(n_sub)]
+
+        codes = np.arange(1, p.items + 1)
+        sub_ids = rng.integers(1, n_sub + 1, p.items)
+        self.prices = (rng.lognormal(11.0, 0.7, p.items) // 1000 * 1000 + 1000).astype(np.float64)
+        weights = 1.0 / np.arange(1, p.items + 1) ** 0.8
+        rng.shuffle(weights)
+
+        n_dead = int(p.items * p.dead_items)
+        n_stopped = int(p.items * p.stopped_items)
+        order = rng.permutation(p.items)
+        weights[order[:n_dead]] = 0.0
+        self.stopped = np.zeros(p.items, bool)
+        self.stopped[order[n_dead:n_dead + n_stopped]] = True
+        self.weights = weights
+        self.codes = codes
+
+        named = rng.random(p.items) < p.named_subgroups
+        self.items: List[Tuple] = [
+            (
+                int(code),
+                f"{SUBGROUP_NAMES[sub - 1]} item {code}",
+                None,
+                int(rng.integers(1, 20)),
+                1,
+                SUBGROUP_NAMES[sub - 1] if is_named else str(int(sub)),
+                int(rng.integers(1, 40)),
+            )
+            for code, sub, is_named in zip(codes.tolist(), sub_ids.tolist(), named.tolist())
+        ]
+        self.barcodes: List[Tuple] = [
+            (int(code), f"{5280000000000 + int(code)}", float(price))
+            for code, price in zip(codes.tolist(), self.prices.tolist())
+        ]
+        self._rng = rng
+
+    # ---------- receipts ----------
+    def _day_volume(self, d: date, first: date) -> int:
+        p = self.profile
+        growth = (1.0 + p.yearly_growth) ** ((d - first).days / 365.0)
+        mean = p.receipts_per_day * WEEKDAY_FACTORS[d.weekday()] * growth
+        return int(self._rng.poisson(mean))
+
+    def _day_receipts(self, d: date, n: int, active: np.ndarray,
+                      until: Optional[datetime] = None) -> Tuple[List[datetime], List[np.ndarray], List[np.ndarray]]:
+        """Timestamps plus (codes, qty) per receipt for business day <d>."""
+        rng = self._rng
+        hour_p = HOUR_WEIGHTS / HOUR_WEIGHTS.sum()
+        # business hours as offsets from 08:00 so the day runs 08:00 -> 02:00
+        hours = (rng.choice(24, n, p=hour_p) - _OPEN_HOUR) % 24
+        seconds = np.sort(hours * 3600 + rng.integers(0, 3600, n))
+        start = datetime(d.year, d.month, d.day, _OPEN_HOUR)
+        stamps = [start + timedelta(seconds=int(s)) for s in seconds]
+        if until is not None:
+            stamps = [t for t in stamps if t < until]
+
+        w = self.weights * active
+        w = w / w.sum()
+        sizes = np.minimum(1 + rng.poisson(max(self.profile.lines_mean - 1.0, 0.0), len(stamps)),
+                           int((w > 0).sum()))
+        picks = rng.choice(len(w), int(sizes.sum()), p=w)
+        qty = np.where(rng.random(len(picks)) < 0.85, 1, rng.integers(2, 5, len(picks))).astype(np.float64)
+        codes, qtys, pos = [], [], 0
+        for size in sizes.tolist():
+            c = np.unique(picks[pos:pos + size])  # one line per item
+            codes.append(self.codes[c])
+            qtys.append(qty[pos:pos + len(c)])
+            pos += size
+        return stamps, codes, qtys
+
+    def write(
+        self,
+        path: str,
+        first: date,
+        last: date,
+        live_until: Optional[datetime] = None,
+        progress=None,
+    ) -> Dict[str, int]:
+        """
+        Create <path> with business days <first>..<last> in HISTORIC_* tables
+        and, with <live_until>, business day last + 1 up to that moment in the
+        open-day RECEIPT tables. Returns row counts.
+        """
+        for stale in (path, path + "-wal", path + "-shm"):
+            if os.path.exists(stale):
+                os.remove(stale)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        cn = sqlite3.connect(path, isolation_level=None)
+        cn.execute("PRAGMA journal_mode=WAL")
+        cn.execute("PRAGMA synchronous=OFF")
+        for ddl in SCHEMA + LIVE_SCHEMA:
+            cn.execute(ddl)
+        cn.execute("BEGIN")
+        cn.executemany("INSERT INTO SUBGROUPS VALUES (?, ?, ?)", self.subgroups)
+        cn.executemany("INSERT INTO ITEMS VALUES (?, ?, ?, ?, ?, ?, ?)", self.items)
+        cn.executemany("INSERT INTO ITEM_BARCODE VALUES (?, ?, ?)", self.barcodes)
+        cn.execute("COMMIT")
+
+        counts = {"receipts": 0, "lines": 0, "live_receipts": 0}
+        rcpt_id = 100000
+        stop_from = last - timedelta(days=self.profile.stop_days)
+        active_all = np.ones(len(self.codes))
+        active_late = (~self.stopped).astype(np.float64)
+
+        def insert(table: str, d: date, until: Optional[datetime] = None) -> int:
+            nonlocal rcpt_id
+            active = active_late if d > stop_from else active_all
+            stamps, codes, qtys = self._day_receipts(d, self._day_volume(d, first), active, until)
+            receipts, lines = [], []
+            for no, (ts, c, q) in enumerate(zip(stamps, codes, qtys), 1):
+                rcpt_id += 1
+                price = self.prices[c - 1]
+                receipts.append((rcpt_id, no, ts.strftime(_FMT), float((price * q).sum())))
+                lines += [
+                    (rcpt_id, ln, int(ci), float(qi), float(pi))
+                    for ln, (ci, qi, pi) in enumerate(zip(c.tolist(), q.tolist(), price.tolist()), 1)
+                ]
+            cn.execute("BEGIN")
+            cn.executemany(f"INSERT INTO {table} VALUES (?, ?, ?, ?)", receipts)
+            cn.executemany(f"INSERT INTO {table}_CONTENTS VALUES (?, ?, ?, ?, ?)", lines)
+            cn.execute("COMMIT")
+            counts["lines"] += len(lines)
+            return len(receipts)
+
+        d = first
+        while d <= last:
+            counts["receipts"] += insert("HISTORIC_RECEIPT", d)
+            if progress and d.day == 1:
+                progress(d, counts["receipts"])
+            d += timedelta(days=1)
+        if live_until is not None:
+            counts["live_receipts"] = insert("RECEIPT", last + timedelta(days=1), live_until)
+
+        cn.execute("ANALYZE")
+        cn.close()
+        return counts
+
+
+def generate(
+    path: str,
+    days: int,
+    profile: Optional[SynthProfile] = None,
+    now: Optional[datetime] = None,
+    live: bool = True,
+    progress=None,
+) -> Dict[str, int]:
+    """
+    <days> closed business days ending yesterday (relative to <now>), plus
+    today's open day so far when <live>.
+    """
+    now = now or datetime.now()
+    open_day = (now - timedelta(hours=_OPEN_HOUR)).date()
+    last = open_day - timedelta(days=1)
+    first = last - timedelta(days=max(1, int(days)) - 1)
+    return SynthPos(profile).write(path, first, last, now if live else None, progress)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    import config
+
+    defaults = SynthProfile()
+    parser = argparse.ArgumentParser(description="Generate a synthetic POS database for ANALYTICS_BACKEND=standin.")
+    parser.add_argument("--out", default=config.POS_STANDIN_PATH, help="SQLite file (default: POS_STANDIN_PATH)")
+    parser.add_argument("--years", type=float, default=2.0, help="years of closed business days")
+    parser.add_argument("--receipts-per-day", type=float, default=defaults.receipts_per_day)
+    parser.add_argument("--items", type=int, default=defaults.items)
+    parser.add_argument("--subgroups", type=int, default=defaults.subgroups)
+    parser.add_argument("--lines-mean", type=float, default=defaults.lines_mean)
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--no-live", action="store_true", help="skip the open-day RECEIPT tables")
+    args = parser.parse_args(argv)
+
+    profile = SynthProfile(
+        items=args.items,
+        subgroups=args.subgroups,
+        receipts_per_day=args.receipts_per_day,
+        lines_mean=args.lines_mean,
+        seed=args.seed,
+    )
+    counts = generate(
+        args.out,
+        int(args.years * 365),
+        profile,
+        live=not args.no_live,
+        progress=lambda d, n: print(f"  {d:%Y-%m}: {n} receipts", flush=True),
+    )
+    print(f"Wrote {args.out}: {counts}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
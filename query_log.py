@@ -0,0 +1,404 @@
+# query_log.py
+"""
+Per-statement instrumentation for the POS connections.
+
+helpers_intelligence._connect() / _connect_pos() wrap every checked-out
+connection with track(). Each statement executed through it is recorded as
+a QueryRecord:
+
+  - the helper that ran it (first caller frame outside the connection layer)
+    and, when it ran inside a ttl_cache miss, the cached function's namespace
+  - fingerprints of the statement (whitespace-normalised SQL) and of its
+    parameters, so repeated calls group together without storing values
+  - connect time (pool checkout, charged to the connection's first
+    statement), execute time, fetch time and rows fetched
+
+Records go to a bounded in-memory ring buffer, which top_offenders() groups
+by (helper, statement). Statements slower than QUERY_SLOW_MS also go to the
+"query_log.slow" logger, one JSON line each, which configure() points at
+QUERY_SLOW_LOG_PATH. Cache hits run no SQL; top_offenders() reports them
+from cache_stats() next to the statements of the same namespace.
+
+The wrappers know nothing about pyodbc: anything they do not intercept is
+passed through to the real connection / cursor.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from logging.handlers import RotatingFileHandler
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+slow_logger = logging.getLogger("query_log.slow")
+
+_SQL_PREVIEW = 300
+# Modules between the calling helper and the driver; their frames are skipped.
+_LAYER_MODULES = {"query_log", "contextlib", "db_pool", "tsql_sqlite"}
+
+
+def _skip(filename: str) -> bool:
+    return os.path.splitext(os.path.basename(filename))[0] in _LAYER_MODULES
+
+
+def _caller() -> str:
+    frame = sys._getframe(2)
+    while frame is not None and _skip(frame.f_code.co_filename):
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{frame.f_globals.get('__name__', '?')}.{name}"
+
+
+_WS = re.compile(r"\s+")
+
+
+def _fingerprint(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8", "replace"), digest_size=6).hexdigest()
+
+
+@dataclass
+class QueryRecord:
+    ts: float                      # wall-clock start (epoch seconds)
+    helper: str
+    sql: str                       # normalised, truncated to _SQL_PREVIEW
+    sql_fp: str
+    params_fp: str
+    cache_ns: Optional[str] = None  # ttl_cache namespace being computed (a miss)
+    connect_ms: float = 0.0
+    execute_ms: float = 0.0
+    fetch_ms: float = 0.0
+    rows: int = 0
+    error: Optional[str] = None
+
+    @property
+    def total_ms(self) -> float:
+        return self.connect_ms + self.execute_ms + self.fetch_ms
+
+    def to_dict(self) -> Dict[str, Any]:
+        d = asdict(self)
+        d["total_ms"] = round(self.total_ms, 3)
+        d["cache"] = "miss" if self.cache_ns else None
+        return d
+
+
+class QueryLog:
+    """Ring buffer of the last <size> statements plus the slow-query threshold."""
+
+    def __init__(self, size: int = 2000, slow_ms: float = 1000.0) -> None:
+        self.slow_ms = float(slow_ms)
+        self._lock = threading.Lock()
+        self._records: Deque[QueryRecord] = deque(maxlen=max(1, int(size)))
+        self._total = 0
+        self._slow = 0
+
+    def add(self, rec: QueryRecord) -> None:
+        slow = self.slow_ms > 0 and rec.total_ms >= self.slow_ms
+        with self._lock:
+            self._records.append(rec)
+            self._total += 1
+            self._slow += slow
+        if slow:
+            slow_logger.warning(json.dumps(rec.to_dict(), default=str))
+
+    def resize(self, size: int) -> None:
+        with self._lock:
+            self._records = deque(self._records, maxlen=max(1, int(size)))
+
+    def records(self) -> List[QueryRecord]:
+        with self._lock:
+            return list(self._records)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
+            self._total = self._slow = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "recorded": self._total,
+                "slow": self._slow,
+                "buffered": len(self._records),
+                "buffer_size": self._records.maxlen,
+                "slow_ms": self.slow_ms,
+            }
+
+    def top_offenders(self, limit: int = 20, sort: str = "total_ms") -> List[Dict[str, Any]]:
+        """
+        Buffered statements grouped by (helper, statement), heaviest first.
+        <sort> is one of total_ms, max_ms, avg_ms, count, rows.
+        """
+        groups: Dict[tuple, Dict[str, Any]] = {}
+        for r in self.records():
+            g = groups.get((r.helper, r.sql_fp))
+            if g is None:
+                g = groups[(r.helper, r.sql_fp)] = {
+                    "helper": r.helper, "sql_fp": r.sql_fp, "sql": r.sql, "cache_ns": r.cache_ns,
+                    "count": 0, "errors": 0, "rows": 0, "total_ms": 0.0, "max_ms": 0.0,
+                    "connect_ms": 0.0, "execute_ms": 0.0, "fetch_ms": 0.0,
+                    "params": set(), "last_ts": 0.0,
+                }
+            g["count"] += 1
+            g["errors"] += r.error is not None
+            g["rows"] += r.rows
+            g["total_ms"] += r.total_ms
+            g["max_ms"] = max(g["max_ms"], r.total_ms)
+            g["connect_ms"] += r.connect_ms
+            g["execute_ms"] += r.execute_ms
+            g["fetch_ms"] += r.fetch_ms
+            g["params"].add(r.params_fp)
+            g["last_ts"] = max(g["last_ts"], r.ts)
+            g["cache_ns"] = g["cache_ns"] or r.cache_ns
+
+        out = []
+        for g in groups.values():
+            g["distinct_params"] = len(g.pop("params"))
+            g["avg_ms"] = g["total_ms"] / g["count"]
+            for key in ("total_ms", "max_ms", "avg_ms", "connect_ms", "execute_ms", "fetch_ms"):
+                g[key] = round(g[key], 3)
+            out.append(g)
+        if sort not in ("total_ms", "max_ms", "avg_ms", "count", "rows"):
+            raise ValueError(f"Unknown sort key: {sort!r}")
+        out.sort(key=lambda g: g[sort], reverse=True)
+        return out[:limit]
+
+
+class _Cursor:
+    """Cursor proxy that times execute / fetch and records each statement."""
+
+    def __init__(self, cursor: Any, conn: "_Connection") -> None:
+        object.__setattr__(self, "_cur", cursor)
+        object.__setattr__(self, "_conn", conn)
+        object.__setattr__(self, "_rec", None)
+
+    # ---- statements ----
+    def execute(self, sql: str, *params: Any):
+        self._finish()
+        rec = self._conn._new_record(sql, params)
+        object.__setattr__(self, "_rec", rec)
+        t0 = time.perf_counter()
+        try:
+            self._cur.execute(sql, *params)
+        except Exception as e:
+            rec.error = f"{type(e).__name__}: {e}"[:300]
+            raise
+        finally:
+            rec.execute_ms += (time.perf_counter() - t0) * 1000
+        return self
+
+    def executemany(self, sql: str, seq_of_params):
+        self._finish()
+        seq = list(seq_of_params)
+        rec = self._conn._new_record(sql, (len(seq),))
+        object.__setattr__(self, "_rec", rec)
+        t0 = time.perf_counter()
+        try:
+            self._cur.executemany(sql, seq)
+        except Exception as e:
+            rec.error = f"{type(e).__name__}: {e}"[:300]
+            raise
+        finally:
+            rec.execute_ms += (time.perf_counter() - t0) * 1000
+        return self
+
+    # ---- fetches ----
+    def _timed(self, fn, *args):
+        t0 = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            if self._rec is not None:
+                self._rec.fetch_ms += (time.perf_counter() - t0) * 1000
+
+    def fetchone(self):
+        row = self._timed(self._cur.fetchone)
+        if row is not None and self._rec is not None:
+            self._rec.rows += 1
+        return row
+
+    def fetchall(self):
+        rows = self._timed(self._cur.fetchall)
+        if self._rec is not None:
+            self._rec.rows += len(rows)
+        return rows
+
+    def fetchmany(self, size: int = None):
+        rows = self._timed(self._cur.fetchmany, *(() if size is None else (size,)))
+        if self._rec is not None:
+            self._rec.rows += len(rows)
+        return rows
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def nextset(self):
+        # Later result sets of the same batch count as the same statement.
+        return self._timed(self._cur.nextset)
+
+    def close(self) -> None:
+        self._finish()
+        self._cur.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _finish(self) -> None:
+        rec = self._rec
+        if rec is not None:
+            object.__setattr__(self, "_rec", None)
+            self._conn._log.add(rec)
+            _thread.count = getattr(_thread, "count", 0) + 1
+            _thread.ms = getattr(_thread, "ms", 0.0) + rec.total_ms
+
+    def __getattr__(self, name: str):
+        return getattr(self._cur, name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._cur, name, value)
+
+
+class _Connection:
+    """Connection proxy handing out _Cursor; flushes pending records on close()."""
+
+    def __init__(self, conn: Any, connect_ms: float, log: QueryLog) -> None:
+        self._raw = conn
+        self._log = log
+        self._connect_ms = connect_ms
+        self._cursors: List[_Cursor] = []
+
+    def cursor(self) -> _Cursor:
+        cur = _Cursor(self._raw.cursor(), self)
+        self._cursors.append(cur)
+        return cur
+
+    def execute(self, sql: str, *params: Any) -> _Cursor:
+        return self.cursor().execute(sql, *params)
+
+    def _new_record(self, sql: str, params: tuple) -> QueryRecord:
+        from cache_utils import computing_namespace
+
+        text = _WS.sub(" ", sql).strip()
+        rec = QueryRecord(
+            ts=time.time(),
+            helper=_caller(),
+            sql=text[:_SQL_PREVIEW],
+            sql_fp=_fingerprint(text),
+            params_fp=_fingerprint(repr(params)),
+            cache_ns=computing_namespace(),
+            connect_ms=self._connect_ms,
+        )
+        self._connect_ms = 0.0
+        return rec
+
+    def flush(self) -> None:
+        cursors, self._cursors = self._cursors, []
+        for cur in cursors:
+            cur._finish()
+
+    def __getattr__(self, name: str):
+        return getattr(self._raw, name)
+
+
+_log = QueryLog()
+_enabled = True
+_thread = threading.local()  # running statement count / ms per thread
+_handler: Optional[logging.Handler] = None
+
+
+def configure(
+    enabled: Optional[bool] = None,
+    size: Optional[int] = None,
+    slow_ms: Optional[float] = None,
+    slow_log_path: Optional[str] = None,
+) -> None:
+    """
+    Apply settings from config.py (called once by main.py at startup).
+    An empty <slow_log_path> leaves slow queries on the default logging setup.
+    """
+    global _enabled, _handler
+    if enabled is not None:
+        _enabled = bool(enabled)
+    if size is not None:
+        _log.resize(size)
+    if slow_ms is not None:
+        _log.slow_ms = float(slow_ms)
+    if slow_log_path:
+        if _handler is not None:
+            slow_logger.removeHandler(_handler)
+            _handler.close()
+        os.makedirs(os.path.dirname(os.path.abspath(slow_log_path)), exist_ok=True)
+        _handler = RotatingFileHandler(slow_log_path, maxBytes=5 * 1024 * 1024, backupCount=3)
+        _handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        slow_logger.addHandler(_handler)
+        slow_logger.propagate = False
+
+
+@contextmanager
+def track(conn: Any, checkout_started: float) -> Iterator[Any]:
+    """
+    Yield <conn> wrapped for recording (as is when disabled).
+    <checkout_started> is the perf_counter() value from before the pool
+    checkout; the difference becomes the first statement's connect time.
+    """
+    if not _enabled:
+        yield conn
+        return
+    wrapped = _Connection(conn, (time.perf_counter() - checkout_started) * 1000, _log)
+    try:
+        yield wrapped
+    finally:
+        wrapped.flush()
+
+
+def unwrap(conn: Any) -> Any:
+    """The driver connection behind a track() wrapper (<conn> itself when not wrapped)."""
+    return conn._raw if isinstance(conn, _Connection) else conn
+
+
+def recent(limit: int = 100) -> List[Dict[str, Any]]:
+    """The last <limit> statements, newest first."""
+    return [r.to_dict() for r in reversed(_log.records()[-limit:])] if limit > 0 else []
+
+
+def top_offenders(limit: int = 20, sort: str = "total_ms") -> List[Dict[str, Any]]:
+    """Heaviest (helper, statement) groups, with cache hit/miss counts for their namespace."""
+    from cache_utils import cache_stats
+
+    namespaces = cache_stats().get("namespaces", {})
+    out = _log.top_offenders(limit, sort)
+    for g in out:
+        ns = namespaces.get(g["cache_ns"] or "", {})
+        g["cache_hits"] = ns.get("hits", 0) + ns.get("stale_hits", 0)
+        g["cache_misses"] = ns.get("misses", 0)
+    return out
+
+
+def thread_totals() -> Tuple[int, float]:
+    """(statements, milliseconds) recorded on this thread so far; diff two calls."""
+    return getattr(_thread, "count", 0), getattr(_thread, "ms", 0.0)
+
+
+def stats() -> Dict[str, Any]:
+    return {"enabled": _enabled, **_log.stats()}
+
+
+def clear() -> None:
+    _log.clear()
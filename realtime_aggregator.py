@@ -0,0 +1,333 @@
+# realtime_aggregator.py
+"""
+Running totals for the open business day (08:00 boundary).
+
+Every refresh of the realtime tab used to re-aggregate the whole open day in
+dbo.RECEIPT five times over (KPIs, hourly, category, items, receipts).
+RealtimeAggregator keeps those aggregates in memory instead. A poll fetches
+only receipts above its high-water mark and folds them in, and all five
+helpers in helpers_realtime.py answer from that state.
+
+A receipt's header can be committed a moment before its lines, and a
+receipt can be voided right after it is rung up. So each poll re-reads the
+newest <overlap> receipts it already holds as well. Their old contribution
+is taken out and the fresh one folded in, and a receipt that has
+disappeared is dropped.
+
+Polls run at most once per <poll_interval> seconds, so one page refresh (5
+requests) costs one delta query. When the 08:00 boundary passes, the state
+starts over for the new business day. Item names and subgroups come from
+dimensions.py as receipts are folded in, so item edits call invalidate()
+to reload the day.
+
+Results match the SQL helpers row for row.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+import dimensions
+from pos_dates import biz_date_range_8h
+from rollups import open_business_day
+
+BOUNDARY_HOUR = 8
+
+
+class MssqlRealtimeSource:
+    """Reads open-day receipts above a RCPT_ID from dbo.RECEIPT / RECEIPT_CONTENTS."""
+
+    def __init__(self, connect: Callable):
+        self._connect = connect
+
+    def fetch(self, start: datetime, end: datetime, since_id: int) -> Tuple[List[Dict], List[Dict]]:
+        """Receipts in [start, end) with RCPT_ID > since_id, and their lines."""
+        with self._connect() as cn:
+            cur = cn.cursor()
+            cur.execute("""
+                SELECT r.RCPT_ID, r.RCPT_DATE, CAST(r.RCPT_AMOUNT AS float) AS amount
+                FROM dbo.RECEIPT r
+                WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ? AND r.RCPT_ID > ?
+                ORDER BY r.RCPT_ID;
+            """, (start, end, since_id))
+            receipts = [
+                {"id": int(r.RCPT_ID), "date": r.RCPT_DATE, "amount": float(r.amount or 0)}
+                for r in cur.fetchall()
+            ]
+            if not receipts:
+                return [], []
+
+            cur.execute("""
+                SELECT c.RCPT_ID, CAST(c.ITM_CODE AS nvarchar(50)) AS code,
+                       CAST(c.ITM_QUANTITY AS float) AS qty, CAST(c.ITM_PRICE AS float) AS price
+                FROM dbo.RECEIPT r
+                JOIN dbo.RECEIPT_CONTENTS c ON c.RCPT_ID = r.RCPT_ID
+                WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ? AND r.RCPT_ID > ?;
+            """, (start, end, since_id))
+            lines = [
+                {"rcpt_id": int(r.RCPT_ID), "code": str(r.code).strip() if r.code is not None else None,
+                 "qty": float(r.qty or 0), "price": float(r.price or 0)}
+                for r in cur.fetchall()
+            ]
+
+        return receipts, lines
+
+
+@dataclass
+class _Receipt:
+    id: int
+    when: datetime
+    amount: float
+    qty: float = 0.0        # SUM(ITM_QUANTITY) of its lines
+    total: float = 0.0      # SUM(qty * price) of its lines
+    # one (item_name, category, qty, price) per line
+    joined: List[Tuple[str, str, float, float]] = field(default_factory=list)
+
+
+def _biz_hour(when: datetime) -> int:
+    return (when.hour + 24 - BOUNDARY_HOUR) % 24
+
+
+def dimension_label(code: Optional[str]) -> Tuple[str, str]:
+    """(item_name, category) of an item code, as the SQL helpers label it."""
+    dims = dimensions.get()
+    return dims.title(code, "(Unknown)"), dims.subgroup(code)
+
+
+class RealtimeAggregator:
+    """
+    Open-day aggregates kept current from RCPT_ID deltas.
+
+    <source> provides fetch(start, end, since_id); see MssqlRealtimeSource.
+    <label> maps an item code to (item_name, category). <now> is injectable
+    for tests.
+    """
+
+    def __init__(
+        self,
+        source,
+        poll_interval: float = 2.0,
+        overlap: int = 25,
+        now: Callable[[], datetime] = datetime.now,
+        label: Callable[[Optional[str]], Tuple[str, str]] = dimension_label,
+    ) -> None:
+        self.source = source
+        self._label = label
+        self.poll_interval = float(poll_interval)
+        self.overlap = max(0, int(overlap))
+        self._now = now
+        self._lock = threading.Lock()  # the state below; views take it
+        self._poll_lock = threading.Lock()  # one poll at a time
+        self._generation = 0
+        self._reset(None)
+
+    # ---------- state ----------
+    def _reset(self, day: Optional[date]) -> None:
+        self._generation += 1
+        self.day = day
+        self._last_poll = 0.0
+        self._receipts: Dict[int, _Receipt] = {}
+        self._hourly: Dict[int, List] = {}      # biz hour -> [amount, receipts]
+        self._category: Dict[str, List] = {}    # subgroup -> [revenue, line rows]
+        # (item_name, category) -> [qty, price_sum, price_rows, revenue]
+        self._items: Dict[Tuple[str, str], List[float]] = {}
+        self._sales = 0.0
+        self._items_sold = 0.0
+        self.polls = 0
+
+    @property
+    def high_water_mark(self) -> int:
+        return max(self._receipts) if self._receipts else 0
+
+    @staticmethod
+    def _bump(table: Dict, key, sign: int, amount: float) -> None:
+        # [sum, rows]; a key leaves the table with its last row, as in GROUP BY
+        entry = table.get(key)
+        if entry is None:
+            entry = table[key] = [0.0, 0]
+        entry[0] += sign * amount
+        entry[1] += sign
+        if entry[1] <= 0:
+            del table[key]
+
+    def _apply(self, rc: _Receipt, sign: int) -> None:
+        self._bump(self._hourly, _biz_hour(rc.when), sign, rc.amount)
+        self._sales += sign * rc.amount
+        self._items_sold += sign * rc.qty
+        for name, cat, qty, price in rc.joined:
+            self._bump(self._category, cat, sign, qty * price)
+            agg = self._items.get((name, cat))
+            if agg is None:
+                agg = self._items[(name, cat)] = [0.0, 0.0, 0, 0.0]
+            agg[0] += sign * qty
+            agg[1] += sign * price
+            agg[2] += sign
+            agg[3] += sign * qty * price
+            if agg[2] <= 0:
+                del self._items[(name, cat)]
+
+    def refresh(self, force: bool = False) -> None:
+        """
+        Fold in receipts since the last poll (throttled to <poll_interval>).
+
+        The fetch and the labelling run outside the lock the views take; only
+        folding the result in holds it. While another thread is polling a
+        warm day, callers return at once and read the state of the last poll.
+        """
+        if not self._poll_lock.acquire(blocking=False):
+            with self._lock:
+                warm = self.polls > 0 and self.day == open_business_day(BOUNDARY_HOUR, self._now())
+            if warm and not force:
+                return
+            self._poll_lock.acquire()
+        try:
+            self._poll(force)
+        finally:
+            self._poll_lock.release()
+
+    def _poll(self, force: bool) -> None:
+        with self._lock:
+            day = open_business_day(BOUNDARY_HOUR, self._now())
+            if day != self.day:
+                self._reset(day)
+            elif not force and time.monotonic() - self._last_poll < self.poll_interval:
+                return
+            generation = self._generation
+            known = sorted(self._receipts)
+        if not known:
+            since = 0
+        elif self.overlap and len(known) > self.overlap:
+            since = known[-self.overlap - 1]
+        else:
+            since = known[0] - 1 if self.overlap else known[-1]
+
+        start, end = biz_date_range_8h(day)
+        receipts, lines = self.source.fetch(start, end, since)
+
+        fresh: Dict[int, _Receipt] = {
+            r["id"]: _Receipt(r["id"], r["date"], r["amount"]) for r in receipts
+        }
+        for ln in lines:
+            rc = fresh.get(ln["rcpt_id"])
+            if rc is None:
+                continue
+            rc.qty += ln["qty"]
+            rc.total += ln["qty"] * ln["price"]
+            name, cat = self._label(ln["code"])
+            rc.joined.append((name, cat, ln["qty"], ln["price"]))
+
+        with self._lock:
+            if self._generation != generation:
+                return  # invalidated meanwhile; the next refresh reloads the day
+            # Re-read window: retract what we had, including receipts now gone
+            for rid in [rid for rid in known if rid > since]:
+                self._apply(self._receipts[rid], -1)
+                del self._receipts[rid]
+            for rid, rc in fresh.items():
+                self._receipts[rid] = rc
+                self._apply(rc, +1)
+
+            self._last_poll = time.monotonic()
+            self.polls += 1
+
+    def invalidate(self) -> None:
+        """Drop the state; the next refresh reloads the whole open day."""
+        with self._lock:
+            self._reset(None)
+
+    # ---------- views (same shapes as helpers_realtime) ----------
+    def kpis(self) -> Dict:
+        with self._lock:
+            receipts = len(self._receipts)
+            total = self._sales if receipts else 0.0
+            peak = None
+            if self._hourly:
+                peak = min(self._hourly, key=lambda h: (-self._hourly[h][0], h))
+            return {
+                "total_sales": float(total),
+                "receipts": receipts,
+                "avg_ticket": (total / receipts) if receipts else 0.0,
+                "items_sold": float(self._items_sold) if receipts else 0.0,
+                "peak_hour": f"{(peak + BOUNDARY_HOUR) % 24:02d}:00" if peak is not None else None,
+                "growth_vs_yesterday": 0.0,
+                "growth_vs_4week": 0.0,
+            }
+
+    def hourly(self) -> List[Dict]:
+        with self._lock:
+            return [{"hour": h, "sales": float(self._hourly[h][0])} for h in sorted(self._hourly)]
+
+    def category(self) -> List[Dict]:
+        with self._lock:
+            rows = [{"subgroup": k, "sales": float(v[0])} for k, v in self._category.items()]
+        rows.sort(key=lambda r: r["sales"], reverse=True)
+        return rows
+
+    def items_sold(self) -> List[Dict]:
+        with self._lock:
+            rows = [(k, list(v)) for k, v in self._items.items()]
+        rows.sort(key=lambda kv: kv[1][3], reverse=True)
+        total_rev = sum(v[3] for _, v in rows) or 1.0
+        return [
+            {
+                "item_name": name,
+                "category": cat,
+                "total_qty": float(qty),
+                "avg_price": float(price_sum / n) if n else 0.0,
+                "total_revenue": float(rev),
+                "share": round((float(rev) / total_rev) * 100, 1),
+            }
+            for (name, cat), (qty, price_sum, n, rev) in rows
+        ]
+
+    def receipts(self) -> List[Dict]:
+        with self._lock:
+            return [
+                {
+                    "id": rc.id,
+                    "datetime": rc.when.strftime("%H:%M") if rc.when else "",
+                    "items_count": float(rc.qty),
+                    "total": float(rc.total),
+                }
+                for rc in sorted(self._receipts.values(), key=lambda r: r.id, reverse=True)
+            ]
+
+
+_aggregator: Optional[RealtimeAggregator] = None
+_aggregator_lock = threading.Lock()
+
+
+def get_aggregator() -> Optional[RealtimeAggregator]:
+    """Process-wide aggregator over the pooled _connect_pos(); None when disabled."""
+    global _aggregator
+    if _aggregator is None:
+        with _aggregator_lock:
+            if _aggregator is None:
+                import config
+                from helpers_intelligence import _connect_pos
+
+                if not config.REALTIME_AGGREGATOR:
+                    return None
+                _aggregator = RealtimeAggregator(
+                    MssqlRealtimeSource(_connect_pos),
+                    poll_interval=config.REALTIME_POLL_SECONDS,
+                )
+    return _aggregator
+
+
+def invalidate() -> None:
+    """Reload on next use, e.g. after an item's title or subgroup changed."""
+    if _aggregator is not None:
+        _aggregator.invalidate()
+
+
+def live(day: date) -> Optional[RealtimeAggregator]:
+    """The refreshed aggregator when <day> is the open business day, else None."""
+    agg = get_aggregator()
+    if agg is None or day != open_business_day(BOUNDARY_HOUR, agg._now()):
+        return None
+    agg.refresh()
+    return agg
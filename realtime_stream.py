@@ -0,0 +1,205 @@
+# realtime_stream.py
+"""
+Server-Sent Events fan-out for the realtime tab.
+
+Each open browser used to poll all realtime endpoints on its own, so the
+queries against dbo.RECEIPT grew with the number of viewers.
+RealtimeBroadcaster runs one poller thread per process instead. Every
+<interval> seconds it builds the open day's payloads once, diffs them with
+the last ones it sent, and pushes only what changed to every subscriber.
+The payloads come from the helpers_realtime helpers, so from
+realtime_aggregator's running totals when that is enabled.
+
+Events (SSE "event:" names, JSON "data:"):
+
+  kpis / hourly / category / items   the whole payload, when it changed
+  receipts                           {"day", "reset", "upsert": [...], "remove": [ids]}
+                                     changed rows only; reset=true means
+                                     replace everything (new subscriber,
+                                     new business day)
+
+A subscriber first gets the full current state, then deltas. A subscriber
+whose queue fills up (a stalled tab) is dropped; EventSource reconnects it
+and it starts again from a fresh snapshot. The poller thread exits when the
+last subscriber leaves and restarts with the next one.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+TOPICS = ("kpis", "hourly", "category", "items")
+Event = Tuple[str, Any]
+
+
+def open_day_payloads() -> Dict[str, Any]:
+    """Everything the realtime tab shows, for the open business day."""
+    import helpers_realtime as hr
+    from realtime_aggregator import BOUNDARY_HOUR
+    from rollups import open_business_day
+
+    day = open_business_day(BOUNDARY_HOUR).isoformat()
+    return {
+        "day": day,
+        "kpis": hr.rt_get_kpis(day),
+        "hourly": hr.rt_get_hourly(day),
+        "category": hr.rt_get_category(day),
+        "items": hr.rt_get_items_sold(day),
+        "receipts": hr.rt_get_receipts(day),
+    }
+
+
+class Subscriber:
+    """One connected client: a bounded queue of events."""
+
+    def __init__(self, max_events: int) -> None:
+        self.queue: "queue.Queue[Event]" = queue.Queue(maxsize=max_events)
+        self.closed = threading.Event()
+
+    def offer(self, events: List[Event]) -> bool:
+        try:
+            for event in events:
+                self.queue.put_nowait(event)
+        except queue.Full:
+            self.closed.set()
+            return False
+        return True
+
+
+class RealtimeBroadcaster:
+    """
+    One poller, many subscribers.
+
+    <snapshot> returns the payload dict (see open_day_payloads). With
+    <autostart>=False no thread is started; call tick() yourself (tests).
+    """
+
+    def __init__(
+        self,
+        snapshot: Callable[[], Dict[str, Any]] = open_day_payloads,
+        interval: float = 3.0,
+        queue_size: int = 64,
+        autostart: bool = True,
+    ) -> None:
+        self.snapshot = snapshot
+        self.interval = float(interval)
+        self.queue_size = int(queue_size)
+        self.autostart = autostart
+        self._lock = threading.Lock()
+        self._subs: List[Subscriber] = []
+        self._last: Optional[Dict[str, Any]] = None
+        self._thread: Optional[threading.Thread] = None
+        self._wake = threading.Event()
+        self.ticks = 0
+
+    # ---------- subscribers ----------
+    def subscribe(self) -> Subscriber:
+        sub = Subscriber(self.queue_size)
+        with self._lock:
+            self._subs.append(sub)
+            if self._last is not None:
+                sub.offer(self._full(self._last))
+            if self.autostart and (self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, name="realtime-stream", daemon=True)
+                self._thread.start()
+        return sub
+
+    def unsubscribe(self, sub: Subscriber) -> None:
+        sub.closed.set()
+        with self._lock:
+            if sub in self._subs:
+                self._subs.remove(sub)
+
+    @property
+    def subscribers(self) -> int:
+        with self._lock:
+            return len(self._subs)
+
+    # ---------- polling ----------
+    def _run(self) -> None:
+        while True:
+            with self._lock:
+                if not self._subs:
+                    self._thread = None
+                    return
+            try:
+                self.tick()
+            except Exception as e:  # keep serving the last state
+                logger.warning(f"Realtime stream poll failed: {e}", exc_info=True)
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def tick(self) -> List[Event]:
+        """Poll once and fan the changes out; returns the events sent."""
+        data = self.snapshot()
+        with self._lock:
+            events = self._diff(self._last, data)
+            self._last = data
+            self.ticks += 1
+            if events:
+                for sub in list(self._subs):
+                    if not sub.offer(events):
+                        self._subs.remove(sub)
+        return events
+
+    @staticmethod
+    def _full(data: Dict[str, Any]) -> List[Event]:
+        events: List[Event] = [(t, data[t]) for t in TOPICS]
+        events.append(("receipts", {"day": data["day"], "reset": True,
+                                    "upsert": data["receipts"], "remove": []}))
+        return events
+
+    @classmethod
+    def _diff(cls, old: Optional[Dict[str, Any]], new: Dict[str, Any]) -> List[Event]:
+        if old is None or old["day"] != new["day"]:
+            return cls._full(new)
+        events: List[Event] = [(t, new[t]) for t in TOPICS if new[t] != old[t]]
+        before = {r["id"]: r for r in old["receipts"]}
+        after = {r["id"]: r for r in new["receipts"]}
+        upsert = [r for rid, r in after.items() if before.get(rid) != r]
+        remove = [rid for rid in before if rid not in after]
+        if upsert or remove:
+            events.append(("receipts", {"day": new["day"], "reset": False,
+                                        "upsert": upsert, "remove": remove}))
+        return events
+
+
+def sse_format(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str, separators=(',', ':'))}\n\n"
+
+
+def stream(broadcaster: RealtimeBroadcaster, heartbeat: float = 15.0) -> Iterator[str]:
+    """SSE body for one client; a comment line every <heartbeat> idle seconds."""
+    sub = broadcaster.subscribe()
+    try:
+        yield "retry: 5000\n\n"
+        while not sub.closed.is_set():
+            try:
+                event, data = sub.queue.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ": ping\n\n"
+                continue
+            yield sse_format(event, data)
+    finally:
+        broadcaster.unsubscribe(sub)
+
+
+_broadcaster: Optional[RealtimeBroadcaster] = None
+_broadcaster_lock = threading.Lock()
+
+
+def get_broadcaster() -> RealtimeBroadcaster:
+    """Process-wide broadcaster polling every REALTIME_STREAM_INTERVAL seconds."""
+    global _broadcaster
+    if _broadcaster is None:
+        with _broadcaster_lock:
+            if _broadcaster is None:
+                import config
+
+                _broadcaster = RealtimeBroadcaster(interval=config.REALTIME_STREAM_INTERVAL)
+    return _broadcaster
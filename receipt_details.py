@@ -0,0 +1,212 @@
+# receipt_details.py
+"""
+Receipt detail (header + lines) by RCPT_ID, batched and cached.
+
+The receipt modal used to run two queries per click: the header, then the
+lines with the ITEMS / SUBGROUPS join. fetch_details() gets any number of
+receipts, headers and lines together, in one statement, and labels the
+lines from dimensions.py. It reads the open day's RECEIPT tables and
+HISTORIC_RECEIPT in the same UNION ALL, so it works for realtime and
+invoices alike.
+
+A receipt in HISTORIC_RECEIPT is closed and never changes, so its detail is
+kept in an LRU keyed by RCPT_ID (ReceiptCache, RECEIPT_DETAIL_CACHE_SIZE
+receipts). Open-day receipts can still gain lines or be voided, so they are
+always read fresh. The invoices' line lists (get_invoice_details) sit in a
+second cache of the same kind. Item names and subgroups are part of a
+cached value, so item edits call clear().
+"""
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import dimensions
+
+# SQL Server allows 2100 parameters per statement; the IN list is used twice
+CHUNK = 500
+
+_LINES_SQL = """
+    SELECT
+      {historic} AS is_historic,
+      r.RCPT_ID AS RCPT_ID, r.RCPT_NO, r.RCPT_DATE,
+      CAST(r.RCPT_AMOUNT AS float) AS total_amount,
+      c.RCPT_LINE AS RCPT_LINE,
+      CAST(c.ITM_CODE AS nvarchar(50)) AS item_code,
+      CAST(c.ITM_QUANTITY AS float) AS qty,
+      CAST(c.ITM_PRICE AS float) AS unit_price,
+      CAST(c.ITM_QUANTITY * c.ITM_PRICE AS float) AS line_total
+    FROM dbo.{prefix}RECEIPT r
+    LEFT JOIN dbo.{prefix}RECEIPT_CONTENTS c ON c.RCPT_ID = r.RCPT_ID
+    WHERE r.RCPT_ID IN ({marks})
+"""
+
+
+def fetch_details(cn, ids: List[int], dims: Optional[dimensions.Dimensions] = None) -> Dict[int, Dict]:
+    """
+    {rcpt_id: detail} for the receipts in <ids> that exist; one statement.
+    Each detail also carries "historic" (True when read from HISTORIC_RECEIPT).
+    Lines are labelled from <dims> (default: the process-wide cache). Pass
+    <dims> when <cn> is pooled: the cache may need a connection of its own.
+    """
+    if not ids:
+        return {}
+    if dims is None:
+        dims = dimensions.get()
+    marks = ", ".join("?" for _ in ids)
+    sql = (
+        _LINES_SQL.format(historic=0, prefix="", marks=marks)
+        + "    UNION ALL\n"
+        + _LINES_SQL.format(historic=1, prefix="HISTORIC_", marks=marks)
+        + "    ORDER BY is_historic, RCPT_ID, RCPT_LINE;"
+    )
+    cur = cn.cursor()
+    cur.execute(sql, (*ids, *ids))
+
+    out: Dict[int, Dict] = {}
+    for r in cur.fetchall():
+        rid = int(r.RCPT_ID)
+        detail = out.get(rid)
+        if detail is None:
+            detail = out[rid] = {
+                "exists": True,
+                "historic": bool(r.is_historic),
+                "header": {
+                    "rcpt_id": rid,
+                    "rcpt_no": int(r.RCPT_NO) if r.RCPT_NO is not None else None,
+                    "datetime": r.RCPT_DATE.strftime("%Y-%m-%d %H:%M"),
+                    "total_amount": float(r.total_amount or 0),
+                },
+                "lines": [],
+            }
+        elif detail["historic"] != bool(r.is_historic):
+            continue  # still in RECEIPT while being archived; the live copy wins
+        if r.RCPT_LINE is None:
+            continue
+        code = str(r.item_code).strip() if r.item_code is not None else None
+        detail["lines"].append({
+            "line": int(r.RCPT_LINE),
+            "item_code": code,
+            "item_name": dims.title(code, "(Unknown)"),
+            "category": dims.subgroup(code),
+            "qty": float(r.qty or 0),
+            "unit_price": float(r.unit_price or 0),
+            "line_total": float(r.line_total or 0),
+        })
+    return out
+
+
+class ReceiptCache:
+    """
+    LRU keyed by RCPT_ID in front of a batch loader.
+
+    <load>(ids) returns {rcpt_id: value} for the ids it found, in one round
+    trip. Only values for which <keep>(value) is true are cached; ids the
+    loader did not find map to <missing>.
+    """
+
+    def __init__(
+        self,
+        load: Callable[[List[int]], Dict[int, Any]],
+        max_size: int = 5000,
+        keep: Callable[[Any], bool] = lambda value: True,
+        missing: Any = None,
+    ) -> None:
+        self._load = load
+        self.max_size = int(max_size)
+        self._keep = keep
+        self._missing = missing
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[int, Any]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, ids: Iterable[int]) -> Dict[int, Any]:
+        wanted = list(dict.fromkeys(int(i) for i in ids))
+        out: Dict[int, Any] = {}
+        with self._lock:
+            for rid in wanted:
+                if rid in self._entries:
+                    self._entries.move_to_end(rid)
+                    out[rid] = self._entries[rid]
+            self.hits += len(out)
+            self.misses += len(wanted) - len(out)
+
+        missing = [rid for rid in wanted if rid not in out]
+        if missing:
+            fetched: Dict[int, Any] = {}
+            for i in range(0, len(missing), CHUNK):
+                fetched.update(self._load(missing[i:i + CHUNK]))
+            with self._lock:
+                for rid, value in fetched.items():
+                    if self.max_size > 0 and self._keep(value):
+                        self._entries[rid] = value
+                        self._entries.move_to_end(rid)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+            for rid in missing:
+                out[rid] = fetched.get(rid, self._missing)
+        return {rid: out[rid] for rid in wanted}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"size": len(self._entries), "max_size": self.max_size,
+                    "hits": self.hits, "misses": self.misses}
+
+
+_caches: Dict[str, ReceiptCache] = {}
+_caches_lock = threading.Lock()
+
+
+def _cache(name: str, build: Callable[[int], ReceiptCache]) -> ReceiptCache:
+    cache = _caches.get(name)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(name)
+            if cache is None:
+                import config
+
+                cache = _caches[name] = build(config.RECEIPT_DETAIL_CACHE_SIZE)
+    return cache
+
+
+def _build_details(max_size: int) -> ReceiptCache:
+    from helpers_intelligence import _connect_pos
+
+    def load(ids: List[int]) -> Dict[int, Dict]:
+        # labels first: a dimension check must not wait on the pool while
+        # this holds a connection. Open-day receipts only exist on the POS,
+        # whatever ANALYTICS_BACKEND says.
+        dims = dimensions.get()
+        with _connect_pos() as cn:
+            return fetch_details(cn, ids, dims)
+
+    return ReceiptCache(load, max_size, keep=lambda d: d["historic"], missing={"exists": False})
+
+
+def _build_invoice_lines(max_size: int) -> ReceiptCache:
+    from helpers_intelligence import get_invoice_details_many
+
+    # a receipt without lines yet may still be mid-sync on the replica
+    return ReceiptCache(get_invoice_details_many, max_size, keep=bool, missing=[])
+
+
+def get_details(ids: Iterable[int]) -> Dict[int, Dict]:
+    """{rcpt_id: detail} (see fetch_details); unknown ids map to {"exists": False}."""
+    return _cache("details", _build_details).get_many(ids)
+
+
+def get_invoice_lines(ids: Iterable[int]) -> Dict[int, List[Dict]]:
+    """{rcpt_id: get_invoice_details rows} for HISTORIC receipts; unknown ids map to []."""
+    return _cache("invoice_lines", _build_invoice_lines).get_many(ids)
+
+
+def clear() -> None:
+    """Forget cached details, e.g. after an item's title or subgroup changed."""
+    for cache in list(_caches.values()):
+        cache.clear()
@@ -0,0 +1,156 @@
+# reorder_scoring.py
+"""
+Reorder Radar scoring engine, vectorized over the item cube.
+
+The radar used to score every item inside one large T-SQL expression (the
+trend formula repeated six times, windows measured from GETDATE()). Here the
+last WINDOW_DAYS business days are pulled from the item cube once as a dense
+(item x day) qty matrix and every metric is computed for all items at once:
+
+  qty_7d / qty_30d / qty_90d   qty sold in the last 7 / 30 / 90 BizDates
+  days_sold_90d                BizDates with qty > 0
+  avg_daily_30d                qty_30d / 30
+  trend_ratio                  (qty_7d / 7 + eps) / (qty_90d / 90 + eps)
+  days_since_last_sale         BizDates since the last day with qty > 0
+                               (NO_SALE_DAYS when none in the window)
+  score                        avg_daily_30d * 10
+                               + 6 if FAST (trend >= 1.4), 3 if trend >= 1.1
+                               + 8 if STOCKOUT?
+  flags                        FAST        trend >= 1.4
+                               STOCKOUT?   a regular seller (>= 10 days sold)
+                                           that has not sold for >= 5 days
+                               SLOW        qty_30d <= 2 and <= 3 days sold
+
+Windows are anchored to the cube's latest BizDate with sales, not system
+time. The formula is unchanged from the SQL version.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from item_cube import CubeSlice
+
+WINDOW_DAYS = 90
+NO_SALE_DAYS = 9999
+TREND_EPS = 0.001
+
+FAST_TREND = 1.4
+WARM_TREND = 1.1
+STOCKOUT_GAP_DAYS = 5
+STOCKOUT_MIN_DAYS_SOLD = 10
+SLOW_MAX_QTY_30D = 2
+SLOW_MAX_DAYS_SOLD = 3
+
+
+def qty_matrix(sl: CubeSlice, last: date, days: int = WINDOW_DAYS) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Dense qty per (item, BizDate) for the <days> business days ending at <last>.
+    Returns (item_codes sorted, matrix[len(item_codes), days]); column
+    days - 1 is <last>. Rows outside the window are ignored.
+    """
+    first = last.toordinal() - days + 1
+    in_window = (sl.day >= first) & (sl.day <= last.toordinal())
+    codes, inv = np.unique(sl.item_code[in_window], return_inverse=True)
+    matrix = np.zeros((len(codes), days), np.float64)
+    np.add.at(matrix, (inv, sl.day[in_window] - first), sl.qty[in_window])
+    return codes, matrix
+
+
+@dataclass
+class ReorderScores:
+    """Per-item metrics, aligned with item_code."""
+
+    item_code: np.ndarray
+    qty_7d: np.ndarray
+    qty_30d: np.ndarray
+    qty_90d: np.ndarray
+    days_sold_90d: np.ndarray
+    avg_daily_30d: np.ndarray
+    trend_ratio: np.ndarray
+    days_since_last_sale: np.ndarray
+    score: np.ndarray
+    fast: np.ndarray
+    stockout: np.ndarray
+    slow: np.ndarray
+
+    def __len__(self) -> int:
+        return int(self.item_code.shape[0])
+
+    def flags(self, i: int) -> str:
+        parts = []
+        if self.fast[i]:
+            parts.append("FAST")
+        if self.stockout[i]:
+            parts.append("STOCKOUT?")
+        if self.slow[i]:
+            parts.append("SLOW")
+        return " ".join(parts)
+
+    def rows(self, last: date) -> List[Dict]:
+        """Plain rows (Reorder Radar column names), in item_code order."""
+        last_ord = last.toordinal()
+        out = []
+        for i, code in enumerate(self.item_code.tolist()):
+            since = int(self.days_since_last_sale[i])
+            out.append({
+                "itm_code": code,
+                "score": float(self.score[i]),
+                "qty_7d": float(self.qty_7d[i]),
+                "qty_30d": float(self.qty_30d[i]),
+                "avg_daily_30d": float(self.avg_daily_30d[i]),
+                "trend_ratio": float(self.trend_ratio[i]),
+                "days_since_last_sale": since,
+                "last_sold_bizdate": (
+                    None if since == NO_SALE_DAYS
+                    else date.fromordinal(last_ord - since).isoformat()
+                ),
+                "flags": self.flags(i),
+            })
+        return out
+
+
+def score_items(item_codes: np.ndarray, matrix: np.ndarray) -> ReorderScores:
+    """Score every row of a qty_matrix() in one vectorized pass."""
+    days = matrix.shape[1]
+    qty_7d = matrix[:, -7:].sum(axis=1)
+    qty_30d = matrix[:, -30:].sum(axis=1)
+    qty_90d = matrix.sum(axis=1)
+
+    sold = matrix > 0
+    days_sold = sold.sum(axis=1)
+    # First True scanning back from the last column = days since last sale
+    since = np.where(sold.any(axis=1), np.argmax(sold[:, ::-1], axis=1), NO_SALE_DAYS).astype(np.int64)
+
+    trend = (qty_7d / 7.0 + TREND_EPS) / (qty_90d / days + TREND_EPS)
+    avg_daily = qty_30d / 30.0
+
+    fast = trend >= FAST_TREND
+    stockout = (
+        (since != NO_SALE_DAYS) & (since >= STOCKOUT_GAP_DAYS) & (days_sold >= STOCKOUT_MIN_DAYS_SOLD)
+    )
+    slow = (qty_30d <= SLOW_MAX_QTY_30D) & (days_sold <= SLOW_MAX_DAYS_SOLD)
+
+    score = (
+        avg_daily * 10.0
+        + np.select([fast, trend >= WARM_TREND], [6.0, 3.0], 0.0)
+        + np.where(stockout, 8.0, 0.0)
+    )
+
+    return ReorderScores(
+        item_code=item_codes,
+        qty_7d=qty_7d,
+        qty_30d=qty_30d,
+        qty_90d=qty_90d,
+        days_sold_90d=days_sold,
+        avg_daily_30d=np.round(avg_daily, 3),
+        trend_ratio=np.round(trend, 3),
+        days_since_last_sale=since,
+        score=np.round(score, 2),
+        fast=fast,
+        stockout=stockout,
+        slow=slow,
+    )
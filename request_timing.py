@@ -0,0 +1,217 @@
+# request_timing.py
+"""
+Request-level timing: Server-Timing headers and in-memory latency metrics.
+
+register_request_timing(app) must run before any other before_request hook
+(main.py calls it right after creating the app) so the clock starts first.
+Each request is split into phases, reported in a Server-Timing header that
+browser dev tools show under Network -> Timing:
+
+  license    the license middleware          (timed_phase("license"))
+  auth       require_login                   (timed_phase("auth"))
+  db         POS statements run on the request thread (query_log)
+  serialize  JSON encoding (jsonify / dict returns)
+  render     Jinja templates
+  app        whatever is left: view logic, Python-side aggregation
+  total      first before_request hook -> after_request
+
+Statements run on worker threads (the intelligence bundle's widgets) are not
+on the request thread, so their time lands in "app".
+
+Every request also feeds per-endpoint latency histograms and per-phase
+totals, served at /metrics in the Prometheus text format. Nothing leaves
+the process; point a scraper at it, or read it by hand.
+"""
+from __future__ import annotations
+
+import functools
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from flask import Flask, Response, g, request
+from flask.json.provider import DefaultJSONProvider
+from flask.signals import before_render_template, template_rendered
+
+import query_log
+
+PHASES = ("license", "auth", "db", "serialize", "render", "app")
+# Seconds; the Prometheus client's defaults.
+BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# ---------- per-request phases ----------
+def _add(phase: str, ms: float) -> None:
+    timings = g.get("_timings")
+    if timings is not None:
+        timings[phase] = timings.get(phase, 0.0) + ms
+
+
+def timed_phase(phase: str) -> Callable:
+    """Decorator: charge the wrapped request hook's time to <phase>."""
+    def decorator(fn: Callable) -> Callable:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _add(phase, (time.perf_counter() - t0) * 1000)
+        return wrapper
+    return decorator
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Flask's JSON provider, charging encoding time to "serialize"."""
+
+    def dumps(self, obj, **kwargs) -> str:
+        t0 = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            _add("serialize", (time.perf_counter() - t0) * 1000)
+
+
+def _render_started(sender, template, context, **extra) -> None:
+    g._render_started = time.perf_counter()
+
+
+def _render_done(sender, template, context, **extra) -> None:
+    started = g.pop("_render_started", None)
+    if started is not None:
+        _add("render", (time.perf_counter() - started) * 1000)
+
+
+def server_timing(timings: Dict[str, float], total_ms: float, statements: int = 0) -> str:
+    parts = []
+    for phase in PHASES:
+        ms = timings.get(phase)
+        if ms is None:
+            continue
+        part = f"{phase};dur={ms:.1f}"
+        if phase == "db":
+            part += f';desc="{statements} statements"'
+        parts.append(part)
+    parts.append(f"total;dur={total_ms:.1f}")
+    return ", ".join(parts)
+
+
+# ---------- aggregated metrics ----------
+class Metrics:
+    """Per-(endpoint, method) latency histograms and per-phase totals."""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # (endpoint, method) -> [bucket counts..., +Inf count], sum seconds
+        self._hist: Dict[Tuple[str, str], List] = {}
+        self._phases: Dict[Tuple[str, str], float] = {}
+        self._status: Dict[Tuple[str, str], int] = {}
+
+    def observe(self, endpoint: str, method: str, status: int, seconds: float,
+                phases: Dict[str, float]) -> None:
+        key = (endpoint, method)
+        with self._lock:
+            hist = self._hist.get(key)
+            if hist is None:
+                hist = self._hist[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            counts = hist[0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            hist[1] += seconds
+            for phase, ms in phases.items():
+                self._phases[(endpoint, phase)] = self._phases.get((endpoint, phase), 0.0) + ms / 1000
+            skey = (endpoint, f"{status // 100}xx")
+            self._status[skey] = self._status.get(skey, 0) + 1
+
+    def reset(self) -> None:
+        with self._lock:
+            self._hist.clear()
+            self._phases.clear()
+            self._status.clear()
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            hist = {k: (list(v[0]), v[1]) for k, v in self._hist.items()}
+            phases = dict(self._phases)
+            status = dict(self._status)
+
+        lines = [
+            "# HELP http_request_duration_seconds Request latency by Flask endpoint.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (endpoint, method), (counts, total) in sorted(hist.items()):
+            labels = f'endpoint="{_esc(endpoint)}",method="{method}"'
+            running = 0
+            for bound, n in zip(self.buckets, counts):
+                running += n
+                lines.append(f'http_request_duration_seconds_bucket{{{labels},le="{bound:g}"}} {running}')
+            running += counts[-1]
+            lines.append(f'http_request_duration_seconds_bucket{{{labels},le="+Inf"}} {running}')
+            lines.append(f"http_request_duration_seconds_sum{{{labels}}} {total:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{labels}}} {running}")
+
+        lines += [
+            "# HELP http_request_phase_seconds_total Time spent per request phase (see request_timing.PHASES).",
+            "# TYPE http_request_phase_seconds_total counter",
+        ]
+        for (endpoint, phase), seconds in sorted(phases.items()):
+            lines.append(
+                f'http_request_phase_seconds_total{{endpoint="{_esc(endpoint)}",phase="{phase}"}} {seconds:.6f}'
+            )
+
+        lines += [
+            "# HELP http_responses_total Responses by Flask endpoint and status class.",
+            "# TYPE http_responses_total counter",
+        ]
+        for (endpoint, code), n in sorted(status.items()):
+            lines.append(f'http_responses_total{{endpoint="{_esc(endpoint)}",status="{code}"}} {n}')
+        return "\n".join(lines) + "\n"
+
+
+def _esc(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = Metrics()
+
+
+# ---------- wiring ----------
+def register_request_timing(app: Flask, metrics_path: Optional[str] = "/metrics") -> None:
+    """Install the timing hooks, the JSON provider and the metrics route on <app>."""
+    app.json = TimedJSONProvider(app)
+    before_render_template.connect(_render_started, app)
+    template_rendered.connect(_render_done, app)
+
+    @app.before_request
+    def start_request_timer():
+        g._timings = {}
+        g._started = time.perf_counter()
+        g._db_start = query_log.thread_totals()
+
+    @app.after_request
+    def emit_server_timing(response: Response) -> Response:
+        started = g.get("_started")
+        if started is None:  # a hook registered earlier returned a response
+            return response
+        total_ms = (time.perf_counter() - started) * 1000
+        timings = g._timings
+        count0, ms0 = g._db_start
+        count1, ms1 = query_log.thread_totals()
+        if count1 > count0:
+            timings["db"] = ms1 - ms0
+        timings["app"] = max(0.0, total_ms - sum(v for k, v in timings.items() if k != "app"))
+        response.headers["Server-Timing"] = server_timing(timings, total_ms, count1 - count0)
+        metrics.observe(request.endpoint or "<unmatched>", request.method,
+                        response.status_code, total_ms / 1000, timings)
+        return response
+
+    if metrics_path:
+        @app.get(metrics_path, endpoint="metrics")
+        def prometheus_metrics():
+            return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
@@ -0,0 +1,361 @@
+# rollups.py
+"""
+Materialized daily aggregates of HISTORIC_RECEIPT.
+
+Historic helpers used to re-aggregate raw receipt rows by BizDate on every
+call, although a business day never changes once it is closed. This module
+keeps one row per (biz_date, boundary_hour) in a local SQLite file:
+
+    receipts      COUNT of receipts
+    amount        SUM(RCPT_AMOUNT)
+    item_qty      SUM(ITM_QUANTITY) over the receipts' lines
+    unique_items  COUNT(DISTINCT ITM_CODE)
+
+boundary_hour is the hour a business day starts at: 7 for the intelligence
+helpers, 8 for sales/realtime (see pos_dates.py).
+
+Refresh is incremental: only days after the last materialized one are
+fetched from MSSQL, in month-sized chunks. The open business day and the
+last <settle_days> closed days (receipts may still be moving into
+HISTORIC_RECEIPT) are never stored; daily_rows() reads them live and merges
+them with the stored history.
+
+Reads never wait for a refresh: a due refresh starts on a background
+thread, and every day after closed_through is read live until it is done.
+On first use that is the whole history backfill.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_CHUNK_DAYS = 31
+
+
+def open_business_day(boundary_hour: int, now: Optional[datetime] = None) -> date:
+    """Business date that is still in progress at <now> (default: now)."""
+    now = now or datetime.now()
+    return (now - timedelta(hours=boundary_hour)).date()
+
+
+def _to_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value).strip()[:10], "%Y-%m-%d").date()
+
+
+class MssqlRollupSource:
+    """Reads per-day aggregates from HISTORIC_RECEIPT (sargable range scans)."""
+
+    def __init__(self, connect: Callable):
+        self._connect = connect
+
+    def first_day(self, boundary_hour: int) -> Optional[date]:
+        with self._connect() as cn:
+            cur = cn.cursor()
+            cur.execute("SELECT MIN(RCPT_DATE) FROM dbo.HISTORIC_RECEIPT;")
+            row = cur.fetchone()
+        if not row or row[0] is None:
+            return None
+        return open_business_day(boundary_hour, row[0])
+
+    def fetch_days(self, first: date, last: date, boundary_hour: int) -> List[Dict]:
+        """Aggregates for business days first..last (inclusive); empty days omitted."""
+        range_start = datetime(first.year, first.month, first.day, boundary_hour)
+        range_end = datetime(last.year, last.month, last.day, boundary_hour) + timedelta(days=1)
+        with self._connect() as cn:
+            cur = cn.cursor()
+            cur.execute("""
+                SET NOCOUNT ON;
+                WITH R AS (
+                  SELECT
+                    r.RCPT_ID,
+                    CAST(DATEADD(HOUR, -?, r.RCPT_DATE) AS date) AS BizDate,
+                    CAST(r.RCPT_AMOUNT AS float) AS RCPT_AMOUNT
+                  FROM dbo.HISTORIC_RECEIPT r
+                  WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ?
+                ),
+                DayAgg AS (
+                  SELECT BizDate, COUNT(*) AS receipts, SUM(RCPT_AMOUNT) AS amount
+                  FROM R
+                  GROUP BY BizDate
+                ),
+                ItemAgg AS (
+                  SELECT
+                    R.BizDate,
+                    SUM(CAST(COALESCE(c.ITM_QUANTITY, 0) AS float)) AS item_qty,
+                    COUNT(DISTINCT CAST(c.ITM_CODE AS nvarchar(50))) AS unique_items
+                  FROM R
+                  JOIN dbo.HISTORIC_RECEIPT_CONTENTS c ON c.RCPT_ID = R.RCPT_ID
+                  GROUP BY R.BizDate
+                )
+                SELECT
+                  CONVERT(varchar(10), d.BizDate, 23) AS biz_date,
+                  d.receipts,
+                  d.amount,
+                  COALESCE(i.item_qty, 0)     AS item_qty,
+                  COALESCE(i.unique_items, 0) AS unique_items
+                FROM DayAgg d
+                LEFT JOIN ItemAgg i ON i.BizDate = d.BizDate
+                ORDER BY d.BizDate;
+            """, (boundary_hour, range_start, range_end))
+            rows = cur.fetchall()
+        return [
+            {
+                "biz_date": _to_date(r.biz_date),
+                "receipts": int(r.receipts or 0),
+                "amount": float(r.amount or 0.0),
+                "item_qty": float(r.item_qty or 0.0),
+                "unique_items": int(r.unique_items or 0),
+            }
+            for r in rows
+        ]
+
+
+class DailyRollupStore:
+    """
+    SQLite-backed store of closed-day aggregates plus a live tail.
+
+    <source> provides first_day(boundary_hour) and
+    fetch_days(first, last, boundary_hour); see MssqlRollupSource.
+    Refreshes run at most once per <refresh_interval> seconds per boundary,
+    on a background thread unless <background> is False. A file built from
+    another <backend> (ANALYTICS_BACKEND) is emptied on open.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        source,
+        settle_days: int = 1,
+        refresh_interval: float = 300.0,
+        background: bool = True,
+        backend: Optional[str] = None,
+    ) -> None:
+        self.path = path
+        self.source = source
+        self.settle_days = max(0, int(settle_days))
+        self.refresh_interval = float(refresh_interval)
+        self.background = background
+        self._local = threading.local()
+        self._refresh_lock = threading.Lock()
+        self._last_refresh: Dict[int, float] = {}
+        self._threads: Dict[int, threading.Thread] = {}
+        self._threads_lock = threading.Lock()
+
+        cn = self._conn()
+        cn.execute("""
+            CREATE TABLE IF NOT EXISTS daily_rollup (
+                biz_date      TEXT    NOT NULL,
+                boundary_hour INTEGER NOT NULL,
+                receipts      INTEGER NOT NULL,
+                amount        REAL    NOT NULL,
+                item_qty      REAL    NOT NULL,
+                unique_items  INTEGER NOT NULL,
+                PRIMARY KEY (boundary_hour, biz_date)
+            )""")
+        cn.execute("""
+            CREATE TABLE IF NOT EXISTS rollup_state (
+                boundary_hour  INTEGER PRIMARY KEY,
+                first_day      TEXT,
+                closed_through TEXT
+            )""")
+        if backend is not None:
+            self._claim(cn, backend)
+
+    def _claim(self, cn: sqlite3.Connection, backend: str) -> None:
+        cn.execute("CREATE TABLE IF NOT EXISTS rollup_meta (backend TEXT NOT NULL)")
+        row = cn.execute("SELECT backend FROM rollup_meta").fetchone()
+        if row is not None and row[0] == backend:
+            return
+        cn.execute("BEGIN IMMEDIATE")
+        try:
+            if row is not None:
+                cn.execute("DELETE FROM daily_rollup")
+                cn.execute("DELETE FROM rollup_state")
+            cn.execute("DELETE FROM rollup_meta")
+            cn.execute("INSERT INTO rollup_meta (backend) VALUES (?)", (backend,))
+            cn.execute("COMMIT")
+        except BaseException:
+            cn.execute("ROLLBACK")
+            raise
+
+    def _conn(self) -> sqlite3.Connection:
+        cn = getattr(self._local, "cn", None)
+        if cn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            cn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            cn.execute("PRAGMA journal_mode=WAL")
+            self._local.cn = cn
+            self._local.pid = os.getpid()
+        return cn
+
+    # ---------- refresh ----------
+    def last_closed_day(self, boundary_hour: int, now: Optional[datetime] = None) -> date:
+        """Newest day that is old enough to be materialized."""
+        return open_business_day(boundary_hour, now) - timedelta(days=self.settle_days + 1)
+
+    def _state(self, boundary_hour: int):
+        row = self._conn().execute(
+            "SELECT first_day, closed_through FROM rollup_state WHERE boundary_hour = ?",
+            (boundary_hour,),
+        ).fetchone()
+        if not row:
+            return None, None
+        return (
+            _to_date(row[0]) if row[0] else None,
+            _to_date(row[1]) if row[1] else None,
+        )
+
+    def refresh(self, boundary_hour: int, now: Optional[datetime] = None) -> int:
+        """Materialize every closed day not stored yet. Returns days written."""
+        with self._refresh_lock:
+            target = self.last_closed_day(boundary_hour, now)
+            first_day, closed_through = self._state(boundary_hour)
+            if first_day is None:
+                first_day = self.source.first_day(boundary_hour)
+                if first_day is None:
+                    self._last_refresh[boundary_hour] = time.monotonic()
+                    return 0  # no history at all yet
+            start = closed_through + timedelta(days=1) if closed_through else first_day
+            written = 0
+            cn = self._conn()
+            while start <= target:
+                end = min(target, start + timedelta(days=BACKFILL_CHUNK_DAYS - 1))
+                rows = self.source.fetch_days(start, end, boundary_hour)
+                cn.execute("BEGIN IMMEDIATE")
+                try:
+                    cn.executemany(
+                        "INSERT OR REPLACE INTO daily_rollup "
+                        "(biz_date, boundary_hour, receipts, amount, item_qty, unique_items) "
+                        "VALUES (?, ?, ?, ?, ?, ?)",
+                        [
+                            (
+                                r["biz_date"].isoformat(), boundary_hour, r["receipts"],
+                                r["amount"], r["item_qty"], r["unique_items"],
+                            )
+                            for r in rows
+                        ],
+                    )
+                    cn.execute(
+                        "INSERT OR REPLACE INTO rollup_state (boundary_hour, first_day, closed_through) "
+                        "VALUES (?, ?, ?)",
+                        (boundary_hour, first_day.isoformat(), end.isoformat()),
+                    )
+                    cn.execute("COMMIT")
+                except BaseException:
+                    cn.execute("ROLLBACK")
+                    raise
+                written += len(rows)
+                start = end + timedelta(days=1)
+            self._last_refresh[boundary_hour] = time.monotonic()
+            return written
+
+    def start_refresh(self, boundary_hour: int) -> threading.Thread:
+        """Run refresh(<boundary_hour>) on a daemon thread, unless one already is."""
+        with self._threads_lock:
+            thread = self._threads.get(boundary_hour)
+            if thread is None or not thread.is_alive():
+                thread = threading.Thread(
+                    target=self._refresh_quietly, args=(boundary_hour,),
+                    name=f"rollup-refresh-{boundary_hour}", daemon=True,
+                )
+                self._threads[boundary_hour] = thread
+                thread.start()
+            return thread
+
+    def _refresh_quietly(self, boundary_hour: int) -> None:
+        try:
+            self.refresh(boundary_hour)
+        except Exception:
+            logger.exception("Daily rollup refresh failed (boundary %s)", boundary_hour)
+            self._last_refresh[boundary_hour] = time.monotonic()  # retry after refresh_interval
+
+    def _maybe_refresh(self, boundary_hour: int) -> None:
+        last = self._last_refresh.get(boundary_hour)
+        if last is None or time.monotonic() - last >= self.refresh_interval:
+            if self.background:
+                self.start_refresh(boundary_hour)
+            else:
+                self.refresh(boundary_hour)
+
+    # ---------- reads ----------
+    def daily_rows(self, first, last, boundary_hour: int) -> List[Dict]:
+        """
+        Per-day aggregates for business days first..last (inclusive), oldest
+        first. Days without receipts are omitted, like a GROUP BY would.
+        """
+        first, last = _to_date(first), _to_date(last)
+        if first > last:
+            return []
+        self._maybe_refresh(boundary_hour)
+        _, closed_through = self._state(boundary_hour)
+
+        out: List[Dict] = []
+        if closed_through is not None and first <= closed_through:
+            stored = self._conn().execute(
+                "SELECT biz_date, receipts, amount, item_qty, unique_items "
+                "FROM daily_rollup "
+                "WHERE boundary_hour = ? AND biz_date BETWEEN ? AND ? "
+                "ORDER BY biz_date",
+                (boundary_hour, first.isoformat(), min(last, closed_through).isoformat()),
+            ).fetchall()
+            out.extend(
+                {
+                    "biz_date": _to_date(r[0]),
+                    "receipts": int(r[1]),
+                    "amount": float(r[2]),
+                    "item_qty": float(r[3]),
+                    "unique_items": int(r[4]),
+                }
+                for r in stored
+            )
+
+        live_first = first if closed_through is None else max(first, closed_through + timedelta(days=1))
+        if live_first <= last:
+            out.extend(self.source.fetch_days(live_first, last, boundary_hour))
+        return out
+
+    def first_day(self, boundary_hour: int) -> Optional[date]:
+        """Earliest business day with receipts (read live until the first refresh stored it)."""
+        self._maybe_refresh(boundary_hour)
+        first_day, _ = self._state(boundary_hour)
+        if first_day is None:
+            first_day = self.source.first_day(boundary_hour)
+        return first_day
+
+
+_store: Optional[DailyRollupStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> DailyRollupStore:
+    """Process-wide store reading MSSQL through the pooled _connect()."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                import config
+                from helpers_intelligence import _connect
+
+                _store = DailyRollupStore(
+                    config.ROLLUP_SQLITE_PATH,
+                    MssqlRollupSource(_connect),
+                    settle_days=config.ROLLUP_SETTLE_DAYS,
+                    backend=config.ANALYTICS_BACKEND,
+                )
+    return _store
+
+
+def daily_rows(first, last, boundary_hour: int) -> List[Dict]:
+    """Shortcut for get_store().daily_rows(...)."""
+    return get_store().daily_rows(first, last, boundary_hour)
@@ -0,0 +1,70 @@
+# routes/admin.py
+"""
+Maintenance endpoints (behind the normal login).
+
+  GET  /api/admin/pos-export   status of the columnar POS export job
+  POST /api/admin/pos-export   start it; JSON body {"from": "YYYY-MM-DD", "to": "YYYY-MM-DD"}
+                               (both optional, see pos_export.PosExporter.export_range)
+  GET    /api/admin/queries    slowest POS statements by helper (query_log);
+                               ?limit=20&sort=total_ms|max_ms|avg_ms|count|rows&recent=0
+  DELETE /api/admin/queries    empty the statement buffer
+"""
+from __future__ import annotations
+
+from flask import Blueprint, jsonify, request
+
+from pos_dates import parse_date
+
+admin_bp = Blueprint("admin", __name__)
+
+
+@admin_bp.get("/api/admin/pos-export")
+def api_pos_export_status():
+    from pos_export import export_status, get_exporter
+
+    exporter = get_exporter()
+    return jsonify({**export_status(), "directory": exporter.directory, "format": exporter.fmt})
+
+
+@admin_bp.post("/api/admin/pos-export")
+def api_pos_export_start():
+    from pos_export import export_status, start_export
+
+    payload = request.get_json(force=True, silent=True) or {}
+    try:
+        first = parse_date(payload.get("from"))
+        last = parse_date(payload.get("to"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if not start_export(first, last):
+        return jsonify({"error": "An export is already running", **export_status()}), 409
+    return jsonify(export_status()), 202
+
+
+@admin_bp.get("/api/admin/queries")
+def api_query_log():
+    import query_log
+    from helpers_intelligence import pool_stats
+
+    sort = request.args.get("sort", "total_ms")
+    try:
+        limit = max(1, min(int(request.args.get("limit", 20)), 500))
+        recent = max(0, min(int(request.args.get("recent", 0)), 2000))
+        top = query_log.top_offenders(limit, sort)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({
+        **query_log.stats(),
+        "pool": pool_stats(),
+        "top": top,
+        "recent": query_log.recent(recent),
+    })
+
+
+@admin_bp.delete("/api/admin/queries")
+def api_query_log_clear():
+    import query_log
+
+    query_log.clear()
+    return jsonify(query_log.stats())
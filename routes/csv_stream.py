@@ -0,0 +1,67 @@
+# routes/csv_stream.py
+"""
+Streaming CSV downloads shared by the export endpoints.
+
+Rows are written to a small reusable buffer and flushed to the client every
+<batch_rows> rows, so an export never holds more than one batch of CSV text
+in memory, however many rows it has. Rows can come from any iterable: a
+cached result list, or mssql_readonly_stream() reading the cursor with
+fetchmany().
+"""
+from __future__ import annotations
+
+import csv
+import io
+from typing import Any, Iterable, Iterator, Sequence
+
+from flask import Response, stream_with_context
+
+BATCH_ROWS = 500
+_BOM = "\ufeff"  # Excel-friendly BOM
+
+
+def iter_csv(
+    header: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    batch_rows: int = BATCH_ROWS,
+    bom: bool = True,
+) -> Iterator[bytes]:
+    """Yield UTF-8 CSV chunks: the header, then one chunk per <batch_rows> rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush() -> bytes:
+        chunk = buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+        return chunk
+
+    if bom:
+        buffer.write(_BOM)
+    writer.writerow(header)
+    yield flush()
+
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= batch_rows:
+            yield flush()
+            pending = 0
+    if pending:
+        yield flush()
+
+
+def csv_response(
+    header: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    filename: str,
+    batch_rows: int = BATCH_ROWS,
+    bom: bool = True,
+) -> Response:
+    """Streaming text/csv attachment built from iter_csv()."""
+    return Response(
+        stream_with_context(iter_csv(header, rows, batch_rows, bom)),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -1,5 +1,6 @@
 # routes/intelligence.py
 from flask import Blueprint, render_template, jsonify, request
+import config
 from helpers_intelligence import (
     get_kpis,
     get_receipts_by_day,
@@ -13,8 +14,11 @@ from helpers_intelligence import (
     get_affinity_pairs,
     get_hourly_profile,      
     get_dow_profile,
-    get_top_windows
+    get_top_windows,
+    get_intelligence_bundle,
+    INTELLIGENCE_WIDGETS,
 )
+from routes.widget_runner import run_widgets
 
 intelligence_bp = Blueprint("intelligence", __name__)
 
@@ -23,6 +27,23 @@ def intelligence_home():
     return render_template("intelligence.html")
 
 # --------- JSON endpoints consumed by modular JS ---------
+@intelligence_bp.route("/api/intelligence/bundle")
+def api_bundle():
+    """
+    All dashboard widgets in one round trip:
+      {"widgets": {name: data or null}, "errors": {name: reason}, "timings_ms": {...}}
+    Widgets run concurrently (see routes/widget_runner.py); one that fails or
+    times out is reported in "errors" without failing the others.
+    """
+    if config.INTEL_BUNDLE_WORKERS <= 1:
+        return jsonify({"widgets": get_intelligence_bundle(), "errors": {}, "timings_ms": {}})
+    return jsonify(run_widgets(
+        INTELLIGENCE_WIDGETS,
+        timeout=config.INTEL_WIDGET_TIMEOUT,
+        max_workers=config.INTEL_BUNDLE_WORKERS,
+    ))
+
+
 @intelligence_bp.route("/api/intelligence/kpis")
 def api_kpis():
     return jsonify(get_kpis())
@@ -73,7 +94,11 @@ def api_subgroup_velocity():
 
 @intelligence_bp.route("/api/intelligence/affinity")
 def api_affinity():
-    return jsonify(get_affinity_pairs(days=30, top=15))
+    return jsonify(get_affinity_pairs(
+        days=request.args.get("days", type=int, default=30),
+        top=request.args.get("top", type=int, default=15),
+        min_support=request.args.get("min_support", type=int, default=2),
+    ))
 
 
 @intelligence_bp.route("/api/intelligence/hourly-profile")
@@ -1,10 +1,15 @@
 # routes/realtime.py
-from flask import Blueprint, request, jsonify, render_template
+from flask import Blueprint, Response, request, jsonify, render_template
 from datetime import datetime
 from helpers_realtime import (
     rt_get_kpis, rt_get_hourly, rt_get_hourly_cumulative,
     rt_get_category, rt_get_items_sold, rt_get_receipts, rt_get_receipt_detail
 )
+import config
+import realtime_stream
+import receipt_details
+
+MAX_DETAIL_IDS = 200
 
 realtime_bp = Blueprint("realtime", __name__)
 
@@ -48,3 +53,40 @@ def api_rt_receipts():
 @realtime_bp.get("/api/realtime/receipt/<int:rcpt_id>")
 def api_rt_receipt_detail(rcpt_id: int):
     return jsonify(rt_get_receipt_detail(rcpt_id))
+
+def _detail_ids():
+    """?ids=101,102,... -> ([101, 102, ...], None), or (None, 400 response)."""
+    try:
+        ids = [int(x) for x in request.args.get("ids", "").split(",") if x.strip()]
+    except ValueError:
+        return None, (jsonify({"error": "ids must be comma-separated receipt ids"}), 400)
+    if len(ids) > MAX_DETAIL_IDS:
+        return None, (jsonify({"error": f"at most {MAX_DETAIL_IDS} ids per request"}), 400)
+    return ids, None
+
+@realtime_bp.get("/api/receipts/details")
+def api_receipt_details():
+    """Details of several receipts in one round trip: ?ids=101,102,... -> {"101": {...}, ...}."""
+    ids, error = _detail_ids()
+    if error:
+        return error
+    details = receipt_details.get_details(ids)
+    return jsonify({str(rid): d for rid, d in details.items()})
+
+@realtime_bp.get("/api/invoices/lines")
+def api_invoice_lines():
+    """Invoice line lists (as /api/invoices/<id> rows) in one round trip: ?ids=... -> {"101": [...], ...}."""
+    ids, error = _detail_ids()
+    if error:
+        return error
+    lines = receipt_details.get_invoice_lines(ids)
+    return jsonify({str(rid): rows for rid, rows in lines.items()})
+
+@realtime_bp.get("/api/realtime/stream")
+def api_rt_stream():
+    """Server-Sent Events for the open day, fed by one poller per process."""
+    body = realtime_stream.stream(realtime_stream.get_broadcaster(), config.REALTIME_STREAM_HEARTBEAT)
+    return Response(body, mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # nginx: don't buffer the stream
+    })
@@ -2,14 +2,32 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import Any, Dict, List, Tuple
+from typing import Any, Dict, List
 
-from flask import Blueprint, jsonify, render_template, request, Response
+from flask import Blueprint, jsonify, render_template, request
+
+from routes.csv_stream import csv_response
 
 # IMPORTANT:
 # - Keep queries read-only
 # - Keep all BizDate rules consistent (RCPT_DATE - 7h)
 # - Use parameterized queries (no string concat with user input)
+# - Items are scored once (reorder_scoring over the item cube) and cached;
+#   DataTables paging / sorting / filtering only slice that cached list
+
+
+EXPORT_COLUMNS = (
+    "itm_code",
+    "itm_name",
+    "score",
+    "qty_7d",
+    "qty_30d",
+    "avg_daily_30d",
+    "trend_ratio",
+    "days_since_last_sale",
+    "last_sold_bizdate",
+    "flags",
+)
 
 
 reorder_radar_bp = Blueprint("reorder_radar", __name__)
@@ -83,59 +101,63 @@ def reorder_radar_page():
     return render_template("reorder_radar.html")
 
 
+def _filter_items(
+    items: List[Dict[str, Any]], *, q: str, subgroup: str, only_action: bool
+) -> List[Dict[str, Any]]:
+    # Same semantics as the old SQL filters: substring match on code / title
+    # (case-insensitive, like the default collation) and exact subgroup id
+    needle = q.casefold()
+    out = []
+    for r in items:
+        if needle and needle not in str(r.get("itm_code") or "").casefold() \
+                and needle not in str(r.get("itm_name") or "").casefold():
+            continue
+        if subgroup and str(r.get("subgroup_id")) != subgroup:
+            continue
+        if only_action and not (
+            float(r.get("score") or 0) >= 5 or "STOCKOUT?" in (r.get("flags") or "")
+        ):
+            continue
+        out.append(r)
+    return out
+
+
+def _sort_items(items: List[Dict[str, Any]], order_by: str, order_dir: str) -> List[Dict[str, Any]]:
+    # IMPORTANT: order_by comes ONLY from _map_order_column (whitelisted)
+    # Stable tie-breaker on itm_code; NULLs sort first ascending (as in MSSQL)
+    rows = sorted(items, key=lambda r: str(r.get("itm_code")))
+
+    def key(r):
+        v = r.get(order_by)
+        if order_by == "itm_code":
+            v = str(v)
+        return (v is not None, v if v is not None else 0)
+
+    return sorted(rows, key=key, reverse=(order_dir == "desc"))
+
+
 @reorder_radar_bp.post("/api/reorder-radar")
 def reorder_radar_data():
     payload = request.get_json(force=True, silent=True) or {}
     dt = _parse_datatables_request(payload)
 
-    # NOTE:
-    # Replace this import with your actual MSSQL helper.
-    # You mentioned "helpers_intelligence" safe read-only mode.
-    from helpers_intelligence import mssql_readonly_query  # type: ignore
-
-    # Build query and params
-    order_by = _map_order_column(dt.order_col_index)
-    order_dir = dt.order_dir
-
-    sql, params = build_reorder_radar_sql(
-        q=dt.q,
-        subgroup=dt.subgroup,
-        lookback_days=dt.lookback,
-        only_action=(dt.only_action == "1"),
-        order_by=order_by,
-        order_dir=order_dir,
-        offset=dt.start,
-        page_size=dt.length,
-    )
-
-    rows: List[Dict[str, Any]] = mssql_readonly_query(sql, params)
+    from helpers_intelligence import get_reorder_radar_items  # type: ignore
 
-    # Separate count query for DataTables (total filtered)
-    count_sql, count_params = build_reorder_radar_count_sql(
-        q=dt.q,
-        subgroup=dt.subgroup,
-        lookback_days=dt.lookback,
-        only_action=(dt.only_action == "1"),
+    items = get_reorder_radar_items(dt.lookback)
+    filtered = _filter_items(
+        items, q=dt.q, subgroup=dt.subgroup, only_action=(dt.only_action == "1")
     )
-    count_rows = mssql_readonly_query(count_sql, count_params)
-    filtered_count = int(count_rows[0]["cnt"]) if count_rows else 0
-
-    # Total count (no filters) - optional; DataTables expects it
-    total_sql, total_params = build_reorder_radar_count_sql(
-        q="",
-        subgroup="",
-        lookback_days=dt.lookback,
-        only_action=False,  # total should be full population
-    )
-    total_rows = mssql_readonly_query(total_sql, total_params)
-    total_count = int(total_rows[0]["cnt"]) if total_rows else filtered_count
+    ordered = _sort_items(filtered, _map_order_column(dt.order_col_index), dt.order_dir)
+
+    start = max(0, dt.start)
+    length = dt.length if dt.length > 0 else len(ordered)  # DataTables sends -1 for "All"
 
     return jsonify(
         {
             "draw": dt.draw,
-            "recordsTotal": total_count,
-            "recordsFiltered": filtered_count,
-            "data": rows,
+            "recordsTotal": len(items),
+            "recordsFiltered": len(filtered),
+            "data": ordered[start:start + length],
         }
     )
 
@@ -149,346 +171,13 @@ def reorder_radar_export_csv():
         lookback = 30
     only_action = (request.args.get("onlyAction") or "1").strip() == "1"
 
-    from helpers_intelligence import mssql_readonly_query  # type: ignore
-
-    # Export a larger batch (still read-only)
-    sql, params = build_reorder_radar_sql(
-        q=q,
-        subgroup=subgroup,
-        lookback_days=lookback,
-        only_action=only_action,
-        order_by="score",
-        order_dir="desc",
-        offset=0,
-        page_size=5000,
-    )
-    rows: List[Dict[str, Any]] = mssql_readonly_query(sql, params)
-
-    # Build CSV
-    import csv
-    import io
-
-    output = io.StringIO()
-    writer = csv.writer(output)
-    writer.writerow(
-        [
-            "itm_code",
-            "itm_name",
-            "score",
-            "qty_7d",
-            "qty_30d",
-            "avg_daily_30d",
-            "trend_ratio",
-            "days_since_last_sale",
-            "last_sold_bizdate",
-            "flags",
-        ]
-    )
-    for r in rows:
-        writer.writerow(
-            [
-                r.get("itm_code"),
-                r.get("itm_name"),
-                r.get("score"),
-                r.get("qty_7d"),
-                r.get("qty_30d"),
-                r.get("avg_daily_30d"),
-                r.get("trend_ratio"),
-                r.get("days_since_last_sale"),
-                r.get("last_sold_bizdate"),
-                r.get("flags"),
-            ]
-        )
-
-    csv_bytes = output.getvalue().encode("utf-8-sig")  # Excel-friendly BOM
-
-    return Response(
-        csv_bytes,
-        mimetype="text/csv",
-        headers={"Content-Disposition": "attachment; filename=reorder_radar.csv"},
-    )
-
-
-def build_reorder_radar_sql(
-    *,
-    q: str,
-    subgroup: str,
-    lookback_days: int,
-    only_action: bool,
-    order_by: str,
-    order_dir: str,
-    offset: int,
-    page_size: int,
-) -> Tuple[str, Sequence[Any]]:
-    """
-    IMPORTANT:
-    - pyodbc uses positional parameter markers: '?'
-    - keep ORDER BY injected only from a whitelist (_map_order_column)
-    - BizDate = RCPT_DATE - 7h
-    """
-
-    qty_column = "c.ITM_QUANTITY"  # POS line quantity column
-
-
-    # IMPORTANT: order_by comes ONLY from _map_order_column (whitelisted)
-    safe_order_by = order_by
-    safe_order_dir = "DESC" if order_dir.lower() == "desc" else "ASC"
-
-    sql = f"""
-WITH receipts AS (
-    SELECT
-        r.RCPT_ID,
-        CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date) AS BizDate
-    FROM HISTORIC_RECEIPT r
-    WHERE CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date) >= DATEADD(DAY, -90, CAST(GETDATE() AS date))
-),
-lines AS (
-    SELECT
-        rc.BizDate,
-        c.ITM_CODE,
-        SUM({qty_column}) AS Qty
-    FROM receipts rc
-    INNER JOIN HISTORIC_RECEIPT_CONTENTS c
-        ON c.RCPT_ID = rc.RCPT_ID
-    GROUP BY rc.BizDate, c.ITM_CODE
-),
-agg AS (
-    SELECT
-        l.ITM_CODE,
-
-        SUM(CASE WHEN l.BizDate >= DATEADD(DAY, -7,  CAST(GETDATE() AS date)) THEN l.Qty ELSE 0 END) AS qty_7d,
-        SUM(CASE WHEN l.BizDate >= DATEADD(DAY, -30, CAST(GETDATE() AS date)) THEN l.Qty ELSE 0 END) AS qty_30d,
-        SUM(CASE WHEN l.BizDate >= DATEADD(DAY, -90, CAST(GETDATE() AS date)) THEN l.Qty ELSE 0 END) AS qty_90d,
-
-        COUNT(DISTINCT CASE WHEN l.BizDate >= DATEADD(DAY, -30, CAST(GETDATE() AS date)) AND l.Qty > 0 THEN l.BizDate END) AS days_sold_30d,
-        COUNT(DISTINCT CASE WHEN l.BizDate >= DATEADD(DAY, -90, CAST(GETDATE() AS date)) AND l.Qty > 0 THEN l.BizDate END) AS days_sold_90d,
-
-        MAX(CASE WHEN l.Qty > 0 THEN l.BizDate END) AS last_sold_bizdate
-    FROM lines l
-    GROUP BY l.ITM_CODE
-),
-scored AS (
-    SELECT
-        a.ITM_CODE AS itm_code,
-        i.ITM_TITLE AS itm_name,
-        sg.SubGrp_Name AS subgroup_name,
-
-        ISNULL(a.qty_7d, 0) AS qty_7d,
-        ISNULL(a.qty_30d, 0) AS qty_30d,
-        CAST(ISNULL(a.qty_30d, 0) / 30.0 AS decimal(10, 3)) AS avg_daily_30d,
-
-        CAST(
-            (ISNULL(a.qty_7d, 0) / 7.0 + 0.001) / (ISNULL(a.qty_90d, 0) / 90.0 + 0.001)
-            AS decimal(10, 3)
-        ) AS trend_ratio,
-
-        a.last_sold_bizdate,
-        CASE
-            WHEN a.last_sold_bizdate IS NULL THEN 9999
-            ELSE DATEDIFF(DAY, a.last_sold_bizdate, CAST(GETDATE() AS date))
-        END AS days_since_last_sale,
-
-        CAST(
-            (
-                (ISNULL(a.qty_30d, 0) / 30.0) * 10.0
-                + (
-                    CASE
-                        WHEN ((ISNULL(a.qty_7d, 0) / 7.0 + 0.001) / (ISNULL(a.qty_90d, 0) / 90.0 + 0.001)) >= 1.4 THEN 6
-                        WHEN ((ISNULL(a.qty_7d, 0) / 7.0 + 0.001) / (ISNULL(a.qty_90d, 0) / 90.0 + 0.001)) >= 1.1 THEN 3
-                        ELSE 0
-                    END
-                )
-                + (
-                    CASE
-                        WHEN (a.last_sold_bizdate IS NOT NULL)
-                             AND (DATEDIFF(DAY, a.last_sold_bizdate, CAST(GETDATE() AS date)) >= 5)
-                             AND (ISNULL(a.days_sold_90d, 0) >= 10)
-                        THEN 8
-                        ELSE 0
-                    END
-                )
-            ) AS decimal(10, 2)
-        ) AS score,
-
-        LTRIM(RTRIM(
-            CONCAT(
-                CASE WHEN ((ISNULL(a.qty_7d, 0) / 7.0 + 0.001) / (ISNULL(a.qty_90d, 0) / 90.0 + 0.001)) >= 1.4 THEN 'FAST ' ELSE '' END,
-                CASE WHEN (a.last_sold_bizdate IS NOT NULL)
-                          AND (DATEDIFF(DAY, a.last_sold_bizdate, CAST(GETDATE() AS date)) >= 5)
-                          AND (ISNULL(a.days_sold_90d, 0) >= 10)
-                     THEN 'STOCKOUT? ' ELSE '' END,
-                CASE WHEN ISNULL(a.qty_30d, 0) <= 2 AND ISNULL(a.days_sold_90d, 0) <= 3 THEN 'SLOW ' ELSE '' END
-            )
-        )) AS flags
-        FROM agg a
-        INNER JOIN ITEMS i
-            ON i.ITM_CODE = a.ITM_CODE
-        LEFT JOIN SUBGROUPS sg
-            ON sg.SubGrp_ID = i.ITM_SUBGROUP
-        WHERE 1=1
-        AND (
-                ? = ''
-                OR CAST(a.ITM_CODE AS varchar(50)) LIKE '%' + ? + '%'
-                OR i.ITM_TITLE LIKE '%' + ? + '%'
-            )
-        AND ( ? = '' OR CAST(i.ITM_SUBGROUP AS varchar(50)) = ? )
-
-),
-filtered AS (
-    SELECT *
-    FROM scored
-    WHERE 1=1
-      AND (
-        ? = 0
-        OR score >= 5
-        OR flags LIKE '%STOCKOUT?%'
-      )
-)
-SELECT
-    itm_code,
-    itm_name,
-    score,
-    qty_7d,
-    qty_30d,
-    avg_daily_30d,
-    trend_ratio,
-    days_since_last_sale,
-    CONVERT(varchar(10), last_sold_bizdate, 120) AS last_sold_bizdate,
-    subgroup_name
-    flags
-FROM filtered
-ORDER BY
-    CASE WHEN ? = 'itm_code' THEN CAST(itm_code AS varchar(50)) END,
-    CASE WHEN ? = 'itm_name' THEN itm_name END,
-    CASE WHEN ? = 'score' THEN score END,
-    CASE WHEN ? = 'qty_7d' THEN qty_7d END,
-    CASE WHEN ? = 'qty_30d' THEN qty_30d END,
-    CASE WHEN ? = 'avg_daily_30d' THEN avg_daily_30d END,
-    CASE WHEN ? = 'trend_ratio' THEN trend_ratio END,
-    CASE WHEN ? = 'days_since_last_sale' THEN days_since_last_sale END,
-    CASE WHEN ? = 'last_sold_bizdate' THEN last_sold_bizdate END,
-    CASE WHEN ? = 'flags' THEN flags END
-    -- Stable tie-breaker (ONLY ONCE, always safe)
-    , itm_code
-OFFSET ? ROWS
-FETCH NEXT ? ROWS ONLY;
-
-""".strip()
-
-    # IMPORTANT: positional params must match '?' order exactly
-    params: List[Any] = [
-        q, q, q,
-        subgroup, subgroup,
-        1 if only_action else 0,
-
-        # ORDER BY selector repeated 10 times (must match the 10 CASE WHEN ? = '...' lines)
-        safe_order_by, safe_order_by, safe_order_by, safe_order_by, safe_order_by,
-        safe_order_by, safe_order_by, safe_order_by, safe_order_by, safe_order_by,
-
-        int(offset),
-        int(page_size),
-    ]
-
-    return sql, params
-
-
-def build_reorder_radar_count_sql(
-    *,
-    q: str,
-    subgroup: str,
-    lookback_days: int,
-    only_action: bool,
-):
-    sql = """
-WITH receipts AS (
-    SELECT
-        r.RCPT_ID,
-        CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date) AS BizDate
-    FROM HISTORIC_RECEIPT r
-    WHERE CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date) >= DATEADD(DAY, -90, CAST(GETDATE() AS date))
-),
-lines AS (
-    SELECT
-        rc.BizDate,
-        c.ITM_CODE,
-        SUM(c.ITM_QUANTITY) AS Qty
-    FROM receipts rc
-    INNER JOIN HISTORIC_RECEIPT_CONTENTS c
-        ON c.RCPT_ID = rc.RCPT_ID
-    GROUP BY rc.BizDate, c.ITM_CODE
-),
-agg AS (
-    SELECT
-        l.ITM_CODE,
-        SUM(CASE WHEN l.BizDate >= DATEADD(DAY, -7,  CAST(GETDATE() AS date)) THEN l.Qty ELSE 0 END) AS qty_7d,
-        SUM(CASE WHEN l.BizDate >= DATEADD(DAY, -30, CAST(GETDATE() AS date)) THEN l.Qty ELSE 0 END) AS qty_30d,
-        SUM(CASE WHEN l.BizDate >= DATEADD(DAY, -90, CAST(GETDATE() AS date)) THEN l.Qty ELSE 0 END) AS qty_90d,
-        COUNT(DISTINCT CASE WHEN l.BizDate >= DATEADD(DAY, -90, CAST(GETDATE() AS date)) AND l.Qty > 0 THEN l.BizDate END) AS days_sold_90d,
-        MAX(CASE WHEN l.Qty > 0 THEN l.BizDate END) AS last_sold_bizdate
-    FROM lines l
-    GROUP BY l.ITM_CODE
-),
-scored AS (
-    SELECT
-        a.ITM_CODE AS itm_code,
-
-        -- score (same idea as main query, simplified but consistent)
-        CAST(
-            (
-                (ISNULL(a.qty_30d, 0) / 30.0) * 10.0
-                + CASE
-                    WHEN ((ISNULL(a.qty_7d, 0) / 7.0 + 0.001) / (ISNULL(a.qty_90d, 0) / 90.0 + 0.001)) >= 1.4 THEN 6
-                    WHEN ((ISNULL(a.qty_7d, 0) / 7.0 + 0.001) / (ISNULL(a.qty_90d, 0) / 90.0 + 0.001)) >= 1.1 THEN 3
-                    ELSE 0
-                  END
-                + CASE
-                    WHEN a.last_sold_bizdate IS NOT NULL
-                         AND DATEDIFF(DAY, a.last_sold_bizdate, CAST(GETDATE() AS date)) >= 5
-                         AND ISNULL(a.days_sold_90d, 0) >= 10
-                    THEN 8
-                    ELSE 0
-                  END
-            ) AS decimal(10, 2)
-        ) AS score,
-
-        CASE
-            WHEN a.last_sold_bizdate IS NOT NULL
-                 AND DATEDIFF(DAY, a.last_sold_bizdate, CAST(GETDATE() AS date)) >= 5
-                 AND ISNULL(a.days_sold_90d, 0) >= 10
-            THEN 'STOCKOUT?'
-            ELSE ''
-        END AS flags
-
-    FROM agg a
-    INNER JOIN ITEMS i
-        ON i.ITM_CODE = a.ITM_CODE
-    WHERE 1=1
-      AND (
-            ? = ''
-            OR CAST(a.ITM_CODE AS varchar(50)) LIKE '%' + ? + '%'
-            OR i.ITM_TITLE LIKE '%' + ? + '%'
-          )
-      AND ( ? = '' OR CAST(i.ITM_SUBGROUP AS varchar(50)) = ? )
-),
-filtered AS (
-    SELECT *
-    FROM scored
-    WHERE 1=1
-      AND (
-            ? = 0
-            OR score >= 5
-            OR flags = 'STOCKOUT?'
-          )
-)
-SELECT COUNT(1) AS cnt
-FROM filtered;
-""".strip()
-
-    params = [
-        q, q, q,
-        subgroup, subgroup,
-        1 if only_action else 0,
-    ]
-    return sql, params
+    from helpers_intelligence import get_reorder_radar_items  # type: ignore
 
+    rows = _filter_items(get_reorder_radar_items(lookback), q=q, subgroup=subgroup, only_action=only_action)
+    rows = _sort_items(rows, "score", "desc")
 
+    return csv_response(
+        EXPORT_COLUMNS,
+        ([r.get(c) for c in EXPORT_COLUMNS] for r in rows),
+        "reorder_radar.csv",
+    )
@@ -2,6 +2,7 @@
 from flask import Blueprint, render_template, request, jsonify, Response
 from datetime import datetime
 from models import get_setting
+from routes.csv_stream import csv_response
 from helpers_sales import (
     get_sales_summary,
     get_sales_by_hour,
@@ -196,29 +197,12 @@ def api_sales_summary_export_csv():
     except Exception as e:
         return Response(f"Failed to build CSV: {str(e)}", status=500, mimetype="text/plain")
 
-    # Build CSV safely
-    # IMPORTANT: keep it simple: label,total
-    import csv
-    import io
-
-    csv_buffer = io.StringIO()
-    writer = csv.writer(csv_buffer)
-    writer.writerow(["label", "total_sales"])  # header
-
-    for r in rows:
-        writer.writerow([r.get("label", ""), r.get("total", 0)])
-
-    # Add a final total row (optional but useful)
-    writer.writerow([])
-    writer.writerow(["TOTAL", total_sales])
-
-    csv_text = csv_buffer.getvalue()
+    # IMPORTANT: keep it simple: label,total + a final TOTAL row
+    def csv_rows():
+        for r in rows:
+            yield [r.get("label", ""), r.get("total", 0)]
+        yield []
+        yield ["TOTAL", total_sales]
 
     filename = f"sales_summary_{mode}_{from_str}_to_{to_str}.csv"
-    return Response(
-        csv_text,
-        mimetype="text/csv",
-        headers={
-            "Content-Disposition": f'attachment; filename="{filename}"'
-        },
-    )
\ No newline at end of file
+    return csv_response(["label", "total_sales"], csv_rows(), filename, bom=False)
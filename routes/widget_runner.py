@@ -0,0 +1,118 @@
+# routes/widget_runner.py
+"""
+Runs independent dashboard widgets concurrently for bundle endpoints.
+
+Widgets are (callable, kwargs) pairs keyed by name (see
+helpers_intelligence.INTELLIGENCE_WIDGETS). Each one runs on a worker of a
+process-wide bounded executor, so it checks out its own pooled MSSQL
+connection; a bundle then takes about as long as its slowest widget instead
+of the sum of all of them.
+
+Every widget gets <timeout> seconds once it starts running. A widget that
+overruns, raises, or is still queued when the bundle's overall budget is
+spent is reported in "errors" and comes back as None; the rest of the bundle
+is returned as usual. Overrunning widgets are not interrupted: they finish
+in the background and their ttl_cache entry is ready for the next request.
+
+The executor is sized once (first call); keep it below MSSQL_POOL_SIZE so
+widgets never queue on the connection pool.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on one wait(): catches widgets that started (and so got a
+# deadline) while the caller was already waiting.
+_POLL_SECONDS = 0.1
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor(max_workers: int) -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, int(max_workers)), thread_name_prefix="widget"
+                )
+    return _executor
+
+
+def run_widgets(
+    widgets: Dict[str, Tuple[Callable[..., Any], Dict[str, Any]]],
+    timeout: float = 20.0,
+    max_workers: int = 4,
+    total_timeout: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Run every widget concurrently and collect what finishes in time.
+
+    Returns:
+      {
+        "widgets":    {name: result or None},
+        "errors":     {name: "timed out after 20s" | "<ExceptionType>: message"},
+        "timings_ms": {name: elapsed run time, for widgets that finished},
+      }
+    total_timeout (default: 2 × timeout) bounds the whole call, including
+    time widgets spend queued behind others.
+    """
+    timeout = float(timeout)
+    total_timeout = float(total_timeout) if total_timeout is not None else 2 * timeout
+    executor = _get_executor(max_workers)
+    started: Dict[str, float] = {}
+
+    def run(name: str, fn: Callable[..., Any], kwargs: Dict[str, Any]) -> Tuple[Any, float]:
+        t0 = time.monotonic()
+        started[name] = t0
+        return fn(**kwargs), (time.monotonic() - t0) * 1000.0
+
+    t_submit = time.monotonic()
+    futures: Dict[Future, str] = {
+        executor.submit(run, name, fn, kwargs): name
+        for name, (fn, kwargs) in widgets.items()
+    }
+    results: Dict[str, Any] = {name: None for name in widgets}
+    errors: Dict[str, str] = {}
+    timings: Dict[str, float] = {}
+
+    pending = set(futures)
+    overall_deadline = t_submit + total_timeout
+    while pending:
+        now = time.monotonic()
+        deadlines = [overall_deadline]
+        deadlines += [started[futures[f]] + timeout for f in pending if futures[f] in started]
+        wait_for = min(_POLL_SECONDS, max(0.0, min(deadlines) - now))
+        done, _ = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+        for f in done:
+            pending.discard(f)
+            name = futures[f]
+            try:
+                results[name], timings[name] = f.result()
+            except Exception as e:
+                errors[name] = f"{type(e).__name__}: {e}"
+                logger.warning(f"Widget {name} failed: {e}", exc_info=True)
+
+        now = time.monotonic()
+        for f in list(pending):
+            name = futures[f]
+            t0 = started.get(name)
+            if t0 is not None and now - t0 >= timeout:
+                errors[name] = f"timed out after {timeout:g}s"
+            elif now >= overall_deadline:
+                f.cancel()  # still queued: never starts
+                errors[name] = f"timed out after {total_timeout:g}s" + (" (queued)" if t0 is None else "")
+            else:
+                continue
+            pending.discard(f)
+            logger.warning(f"Widget {name}: {errors[name]}")
+
+    return {"widgets": results, "errors": errors, "timings_ms": timings}
@@ -491,49 +491,29 @@ const IntelligencePOS = (() => {
     inited = true;
 
     try {
-      const [
-        kpisRes,
-        receiptsByDayRes,
-        hourlyRes,
-        topItemsRes,
-        subgroupRes,
-        iprData,
-        amtData,
-        velData,
-        affinityData,
-        hourlyProfileData,
-        dowProfileData,
-        topWindowsData
-      ] = await Promise.all([
-        fetchJSON("/api/intelligence/kpis"),
-        fetchJSON("/api/intelligence/receipts-by-day"),
-        fetchJSON("/api/intelligence/hourly-today"),
-        fetchJSON("/api/intelligence/top-items"),
-        fetchJSON("/api/intelligence/subgroup"),
-        fetchJSON("/api/intelligence/items-per-receipt"),
-        fetchJSON("/api/intelligence/receipt-amounts"),
-        fetchJSON("/api/intelligence/subgroup-velocity"),
-        fetchJSON("/api/intelligence/affinity"),
-        fetchJSON("/api/intelligence/hourly-profile"),
-        fetchJSON("/api/intelligence/dow-profile"),
-        fetchJSON("/api/intelligence/top-windows"),
-      ]);
+      // One round trip: every widget comes back in a single bundle.
+      // Widgets that failed/timed out are null and listed in bundle.errors.
+      const bundle = await fetchJSON("/api/intelligence/bundle");
+      const b = bundle.widgets || {};
+      Object.entries(bundle.errors || {}).forEach(([name, reason]) =>
+        console.warn(`[IntelligencePOS] widget ${name} unavailable: ${reason}`));
+      const hourlyProfileData = b.hourly_profile || [];
 
       enableTooltips();
-      renderKPIs(kpisRes ?? {});
-      renderReceiptsByDay(receiptsByDayRes ?? []);
-      renderHourly(hourlyRes ?? []);
-      renderTopItems(topItemsRes ?? []);
-      renderSubgroupBar(subgroupRes ?? []);
-      renderSubgroupShare(subgroupRes || []);
-      renderItemsPerReceipt(iprData || []);
-      renderReceiptAmounts(amtData || []);
-      renderSubgroupVelocity(velData || []);
-      renderAffinity(affinityData || []);
-      renderHourlyProfile(hourlyProfileData || []);
-      renderDowProfile(dowProfileData || []);
-      renderPeakHours(hourlyProfileData || []);
-      renderTopWindows(topWindowsData || []);
+      renderKPIs(b.kpis ?? {});
+      renderReceiptsByDay(b.receipts_by_day ?? []);
+      renderHourly(b.hourly_today ?? []);
+      renderTopItems(b.top_items ?? []);
+      renderSubgroupBar(b.subgroup ?? []);
+      renderSubgroupShare(b.subgroup || []);
+      renderItemsPerReceipt(b.items_per_receipt || []);
+      renderReceiptAmounts(b.receipt_amounts || []);
+      renderSubgroupVelocity(b.subgroup_velocity || []);
+      renderAffinity(b.affinity || []);
+      renderHourlyProfile(hourlyProfileData);
+      renderDowProfile(b.dow_profile || []);
+      renderPeakHours(hourlyProfileData);
+      renderTopWindows(b.top_windows || { top: [], quiet: [] });
 
 
     } catch (err) {
@@ -154,13 +154,30 @@ window.InvoicesModule = (function () {
 
       tbody.appendChild(tr);
     });
+
+    prefetchDetails(rows.map(r => r.rcpt_id));
   }
 
-  async function openInvoiceDetails(rcptId) {
-    const data = await fetchJson(`/api/invoices/${encodeURIComponent(rcptId)}`);
-    if (!data) return;
+  // Line items of the listed invoices, fetched in one request (/api/invoices/lines);
+  // same rows as /api/invoices/<id>, so the modal renders alike either way
+  const detailCache = new Map();
 
-    const rows = data.rows || [];
+  async function prefetchDetails(ids) {
+    const missing = ids.map(String).filter(id => !detailCache.has(id));
+    if (!missing.length) return;
+    const got = await fetchJson(buildUrl("/api/invoices/lines", { ids: missing.join(",") }));
+    Object.entries(got || {}).forEach(([id, rows]) => {
+      if (rows.length) detailCache.set(id, rows);
+    });
+  }
+
+  async function openInvoiceDetails(rcptId) {
+    let rows = detailCache.get(String(rcptId));
+    if (!rows) {
+      const data = await fetchJson(`/api/invoices/${encodeURIComponent(rcptId)}`);
+      if (!data) return;
+      rows = data.rows || [];
+    }
 
     const body = `
       <div class="small text-secondary mb-2">
@@ -32,8 +32,7 @@
     }
 
     // ------------------------------ KPIs ------------------------------
-    async function loadKPIs() {
-        const d = await j(`/api/realtime/kpis`);
+    function renderKPIs(d) {
         kpiTotal.textContent = nf.format(d.total_sales) + " LBP";
         kpiReceipts.textContent = (d.receipts ?? 0).toLocaleString();
         kpiAvg.textContent = nf.format(d.avg_ticket) + " LBP";
@@ -42,54 +41,59 @@
         kpiGY.textContent = (d.growth_vs_yesterday ?? 0).toFixed(1) + "%";
     }
 
+    async function loadKPIs() {
+        renderKPIs(await j(`/api/realtime/kpis`));
+    }
+
     // ------------------------------ Charts ------------------------------
-    async function loadHourly() {
-        const data = await j(`/api/realtime/hourly`);
-        const labels = data.map(p => `${(p.hour + 8) % 24}:00`);
-        const values = data.map(p => p.sales);
+    // Update in place when the chart exists (stream events arrive every few seconds)
+    function drawChart(chart, canvasId, config) {
+        if (chart) {
+            chart.data.labels = config.data.labels;
+            chart.data.datasets[0].data = config.data.datasets[0].data;
+            chart.update("none");
+            return chart;
+        }
+        return new Chart(document.getElementById(canvasId), config);
+    }
 
-        const ctx = document.getElementById("rtChartHourly");
-        if (chartHourly) chartHourly.destroy();
-        chartHourly = new Chart(ctx, {
+    function renderHourly(data) {
+        const labels = data.map(p => `${(p.hour + 8) % 24}:00`);
+        chartHourly = drawChart(chartHourly, "rtChartHourly", {
             type: "line",
-            data: { labels, datasets: [{ label: "Live Today", data: values, borderWidth: 2, fill: true }] },
+            data: { labels, datasets: [{ label: "Live Today", data: data.map(p => p.sales), borderWidth: 2, fill: true }] },
             options: { plugins: { legend: { display: false } } }
         });
-    }
 
-    async function loadCumulative() {
-        const data = await j(`/api/realtime/hourly-cumulative`);
-        const series = data[0]?.series ?? [];
-        const labels = series.map(p => `${(p.hour + 8) % 24}:00`);
-        const values = series.map(p => p.sales_total);
-
-        const ctx = document.getElementById("rtChartCumulative");
-        if (chartCum) chartCum.destroy();
-        chartCum = new Chart(ctx, {
+        // running total, same as /api/realtime/hourly-cumulative
+        let total = 0;
+        chartCum = drawChart(chartCum, "rtChartCumulative", {
             type: "line",
-            data: { labels, datasets: [{ label: "Cumulative", data: values, borderWidth: 2 }] },
+            data: { labels, datasets: [{ label: "Cumulative", data: data.map(p => (total += p.sales)), borderWidth: 2 }] },
             options: { plugins: { legend: { display: false } } }
         });
     }
 
-    async function loadCategory() {
-        const data = await j(`/api/realtime/category`);
-        const labels = data.map(r => r.subgroup);
-        const values = data.map(r => r.sales);
+    async function loadHourly() {
+        renderHourly(await j(`/api/realtime/hourly`));
+    }
 
-        const ctx = document.getElementById("rtChartCategory");
-        if (chartCategory) chartCategory.destroy();
-        chartCategory = new Chart(ctx, {
+    function renderCategory(data) {
+        chartCategory = drawChart(chartCategory, "rtChartCategory", {
             type: "bar",
-            data: { labels, datasets: [{ label: "Sales (LBP)", data: values }] },
+            data: { labels: data.map(r => r.subgroup), datasets: [{ label: "Sales (LBP)", data: data.map(r => r.sales) }] },
             options: { indexAxis: "y", plugins: { legend: { display: false } } }
         });
     }
 
+    async function loadCategory() {
+        renderCategory(await j(`/api/realtime/category`));
+    }
+
     // ------------------------------ Tables ------------------------------
-    function makeTable(selector, columns, url) {
+    function makeTable(selector, columns) {
         return new DataTable(selector, {
-            ajax: { url, dataSrc: "" },
+            data: [],
             columns,
             responsive: true,
             pageLength: 10,
@@ -108,8 +112,13 @@
         });
     }
 
-    async function loadItemsTable() {
-        if (tblItems) tblItems.destroy();
+    // replace the rows but keep the user's page, filter and sort
+    function setRows(tbl, rows) {
+        tbl.clear().rows.add(rows).draw(false);
+    }
+
+    function initTables() {
+        if (tblItems) return;
         tblItems = makeTable("#rtTblItemsSold", [
             { data: null, title: "#", render: (d, t, r, m) => m.row + 1 },
             { data: "item_name", title: "Item" },
@@ -118,11 +127,8 @@
             { data: "avg_price", title: "Avg. Price", className: "text-end", render: DataTable.render.number(",", ".", 0) },
             { data: "total_revenue", title: "Revenue", className: "text-end fw-semibold", render: DataTable.render.number(",", ".", 0) },
             { data: "share", title: "Share %", className: "text-end", render: d => `${(d ?? 0).toFixed(1)}%` },
-        ], `/api/realtime/items`);
-    }
+        ]);
 
-    async function loadReceiptsTable() {
-        if (tblReceipts) tblReceipts.destroy();
         tblReceipts = makeTable("#rtTblReceipts", [
             { data: "id", title: "Receipt ID" },
             { data: "datetime", title: "Time" },
@@ -135,18 +141,53 @@
                 orderable: false,
                 render: (d, t, row) => `<button class="btn btn-sm btn-outline-primary rt-view" data-id="${row.id}">View</button>`
             }
-        ], `/api/realtime/receipts`);
+        ]);
+
+        // paging/filtering → prefetch the details of the rows now visible
+        tblReceipts.on("page.dt search.dt order.dt length.dt", () => tblReceipts.one("draw", prefetchDetails));
 
-        // row click → fetch detail modal
+        // row click → detail modal (prefetched when possible)
         document.querySelector("#rtTblReceipts").addEventListener("click", async (e) => {
             const btn = e.target.closest(".rt-view");
             if (!btn) return;
-            const id = btn.getAttribute("data-id");
-            const detail = await j(`/api/realtime/receipt/${id}`);
+            const id = Number(btn.getAttribute("data-id"));
+            const detail = details.get(id) ?? await j(`/api/realtime/receipt/${id}`);
             showReceiptModal(detail);
         });
     }
 
+    // Receipt details by id, fetched a page at a time from /api/receipts/details
+    const details = new Map();
+
+    async function prefetchDetails() {
+        const ids = tblReceipts.rows({ page: "current" }).data().toArray()
+            .map(r => r.id).filter(id => !details.has(id));
+        if (!ids.length) return;
+        const got = await j(`/api/receipts/details?ids=${ids.join(",")}`);
+        Object.values(got).forEach(d => { if (d.exists) details.set(d.header.rcpt_id, d); });
+    }
+
+    async function loadItemsTable() {
+        setRows(tblItems, await j(`/api/realtime/items`));
+    }
+
+    // Receipts by id; stream events carry only new/changed rows and removed ids
+    const receipts = new Map();
+
+    function applyReceipts(delta) {
+        if (delta.reset) {
+            receipts.clear();
+            details.clear();
+        }
+        delta.remove.forEach(id => { receipts.delete(id); details.delete(id); });
+        delta.upsert.forEach(r => { receipts.set(r.id, r); details.delete(r.id); });
+        setRows(tblReceipts, [...receipts.values()].sort((a, b) => b.id - a.id));
+    }
+
+    async function loadReceiptsTable() {
+        applyReceipts({ reset: true, upsert: await j(`/api/realtime/receipts`), remove: [] });
+    }
+
     // ------------------------------ Modal (Invoice) ------------------------------
     function ensureModal() {
         // inject once
@@ -231,25 +272,40 @@
     // ------------------------------ Orchestrator ------------------------------
     // Master loader (Realtime = today only; server decides "today")
     async function loadAll() {
-        // run KPIs/charts first (can be parallelized)
+        initTables();
         await Promise.all([
             loadKPIs(),
             loadHourly(),
-            loadCumulative(),
-            loadCategory()
+            loadCategory(),
+            loadItemsTable(),
+            loadReceiptsTable()
         ]);
+    }
 
-        // then tables (init/destroy timing is cleaner sequentially)
-        await loadItemsTable();
-        await loadReceiptsTable();
+    // One shared server-side poller pushes changes to every open tab
+    // (/api/realtime/stream); plain fetches only where EventSource is missing.
+    function startStream() {
+        initTables();
+        const es = new EventSource("/api/realtime/stream");
+        const on = (name, fn) => es.addEventListener(name, e => fn(JSON.parse(e.data)));
+        on("kpis", renderKPIs);
+        on("hourly", renderHourly);
+        on("category", renderCategory);
+        on("items", rows => setRows(tblItems, rows));
+        on("receipts", applyReceipts);
+        // EventSource reconnects by itself and the server resends a full snapshot
     }
 
+    function start() {
+        if (window.EventSource) startStream();
+        else loadAll();
+    }
 
     // Auto-load when the Realtime tab is shown, but only once on first entry.
     document.getElementById("realtime-tab")?.addEventListener("shown.bs.tab", () => {
         if (rtLoadedOnce) return;
         rtLoadedOnce = true;
-        loadAll();
+        start();
     });
 
     // If Realtime tab is already active on initial page load, fire once.
@@ -258,7 +314,7 @@
         if (rtPane && rtPane.classList.contains("show") && rtPane.classList.contains("active")) {
             if (!rtLoadedOnce) {
                 rtLoadedOnce = true;
-                loadAll();
+                start();
             }
         }
     });
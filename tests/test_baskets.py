@@ -0,0 +1,48 @@
+# tests/test_baskets.py
+"""Tests for baskets.py — pair co-occurrence from (receipt, item) incidence."""
+import random
+from collections import Counter
+from itertools import combinations
+
+import pytest
+
+from baskets import PairTable, build
+
+
+def test_pairs_support_and_lift_of_a_small_window():
+    lines = [
+        (1, "10"), (1, "20"), (1, "20"),  # repeated line counts once
+        (2, "10"), (2, "20"), (2, "30"),
+        (3, "10"), (3, "31"),             # 30 and 31 share a label
+        (4, "30"),
+    ]
+    titles = {"10": "Cola", "20": "Chips", "30": "Gum", "31": "Gum"}
+    table = build([r for r, _ in lines], [c for _, c in lines], titles.get)
+
+    assert table.receipts == 4 and len(table) == 3
+    assert table.top(10, min_support=1) == [
+        {"a": "Chips", "b": "Cola", "co_count": 2, "coverage_pct": 0.5, "lift": 2 * 4 / (2 * 3)},
+        {"a": "Cola", "b": "Gum", "co_count": 2, "coverage_pct": 0.5, "lift": 2 * 4 / (3 * 3)},
+        {"a": "Chips", "b": "Gum", "co_count": 1, "coverage_pct": 0.25, "lift": 1 * 4 / (2 * 3)},
+    ]
+    assert [(p["a"], p["b"]) for p in table.top(10)] == [("Chips", "Cola"), ("Cola", "Gum")]
+    assert table.top(1) == table.top(10)[:1]
+
+
+def test_matches_a_brute_force_count():
+    rng = random.Random(7)
+    baskets = {rid: rng.sample(range(40), rng.choice([1, 1, 2, 3, 5, 12])) for rid in range(500)}
+    rcpt, codes = zip(*[(rid, str(code)) for rid, items in baskets.items() for code in items])
+    table = build(list(rcpt), list(codes))
+
+    expected = Counter()
+    for items in baskets.values():
+        expected.update(combinations(sorted(str(c) for c in items), 2))
+    got = {(p["a"], p["b"]): p["co_count"] for p in table.top(10 ** 6, min_support=1)}
+    assert got == dict(expected)
+
+
+@pytest.mark.parametrize("rcpt, codes", [([], []), ([1, 2], ["10", "10"])])
+def test_windows_without_pairs(rcpt, codes):
+    table = build(rcpt, codes)
+    assert isinstance(table, PairTable) and table.top(5, min_support=1) == []
@@ -0,0 +1,99 @@
+"""Tests for the benchmark suite (benchmarks/): measurement, baselines, and a tiny end-to-end run."""
+
+import pytest
+
+from benchmarks import harness
+from benchmarks.cases import BenchContext, helper_cases
+
+
+def test_percentile_is_nearest_rank():
+    values = [5.0, 1.0, 4.0, 2.0, 3.0]
+    assert harness.percentile(values, 50) == 3.0
+    assert harness.percentile(values, 95) == 5.0
+    assert harness.percentile([7.0], 95) == 7.0
+    assert harness.percentile([], 50) == 0.0
+
+
+def test_count_rows():
+    assert harness.count_rows([1, 2, 3]) == 3
+    assert harness.count_rows({"items": [1, 2], "total": 9}) == 2
+    assert harness.count_rows({"total": 9}) == 1
+    assert harness.count_rows(None) == 0
+
+
+def test_compare_flags_slowdowns_scans_and_failures():
+    baseline = {"results": {
+        "a": {"p50_ms": 100.0, "vm_ksteps": 50.0},
+        "b": {"p50_ms": 1.0, "vm_ksteps": 2.0},
+        "c": {"p50_ms": 10.0, "vm_ksteps": 5.0},
+    }}
+    results = [
+        harness.Result("a", p50_ms=130.0, vm_ksteps=50.0),   # 1.3x slower
+        harness.Result("b", p50_ms=2.0, vm_ksteps=2.0),      # 2x, but only 1 ms
+        harness.Result("c", error="boom"),
+        harness.Result("new", p50_ms=999.0),                  # no baseline yet
+    ]
+    found = harness.compare(results, baseline, threshold=1.25, min_delta_ms=5)
+    assert [f.split(":")[0] for f in found] == ["a", "c"]
+
+    found = harness.compare([harness.Result("b", p50_ms=1.0, vm_ksteps=9.0)], baseline)
+    assert found == ["b: VM steps 2k -> 9k"]
+
+
+@pytest.fixture
+def configured(tmp_path, monkeypatch, load_root_module):
+    """A tiny stand-in, with the helpers pointed at it by harness.configure()."""
+    import dimensions
+    import helpers_intelligence as hi
+    import item_cube
+    import realtime_aggregator
+    import receipt_details
+    import rollups
+    from cache_utils import clear_cache
+
+    db_path = harness.dataset("3000", data_dir=str(tmp_path), days=30)
+    assert harness.dataset("3000", data_dir=str(tmp_path), days=30) == db_path  # reused
+
+    # configure() rewires these globals; monkeypatch puts them back
+    monkeypatch.setattr(hi, "config", load_root_module("_root_config", "config.py"))
+    monkeypatch.setattr(hi, "_pool", None)
+    monkeypatch.setattr(rollups, "_store", rollups._store)
+    monkeypatch.setattr(item_cube, "_cube", item_cube._cube)
+    monkeypatch.setattr(realtime_aggregator, "_aggregator", realtime_aggregator._aggregator)
+    monkeypatch.setattr(receipt_details, "_caches", receipt_details._caches)
+    monkeypatch.setattr(dimensions, "_cache", dimensions._cache)
+    harness.configure(db_path, str(tmp_path / "work"))
+    try:
+        yield db_path
+    finally:
+        if hi._pool is not None:
+            hi._pool.close_all()
+        clear_cache()
+
+
+def test_end_to_end_on_a_tiny_dataset(configured, tmp_path):
+    db_path = configured
+    ctx = BenchContext.from_db(db_path)
+    assert ctx.live_rcpt_id > ctx.rcpt_id > 0
+
+    results = [harness.measure(c.name, lambda c=c: c.call(ctx), repeats=2) for c in helper_cases()]
+    assert [r.name for r in results if r.error] == []
+    by_name = {r.name: r for r in results}
+    kpis = by_name["helpers_realtime.rt_get_kpis"]
+    assert kpis.p95_ms >= kpis.p50_ms > 0 and kpis.vm_ksteps > 0 and kpis.peak_kib > 0
+
+    path = harness.baseline_path("3000", str(tmp_path / "baselines"))
+    harness.save_baseline(path, "3000", db_path, results)
+    baseline = harness.load_baseline(path)
+    assert baseline["lines"] > 0
+    assert harness.compare(results, baseline) == []
+
+
+def test_item_subgroup_temp_table_replaces_the_subgroups_scan(configured):
+    from benchmarks import plans
+
+    got = plans.compare_plans(BenchContext.from_db(configured), repeats=1)
+    assert any(line.startswith("SCAN s") for line in got["or_join"]["plan"])
+    assert any("#ItemSubgroup" in line and "ITM_CODE=?" in line for line in got["item_subgroup"]["plan"])
+    assert not any(line.startswith("SCAN") for line in got["item_subgroup"]["plan"])
+    assert got["item_subgroup"]["rows"] == got["or_join"]["rows"]  # pos_synth items resolve to one subgroup
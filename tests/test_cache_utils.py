@@ -1,5 +1,8 @@
 # tests/test_cache_utils.py
 import time
+
+import pytest
+
 from cache_utils import ttl_cache, clear_cache
 
 
@@ -55,3 +58,275 @@ def test_clear_cache_forces_re_execution():
     clear_cache()
     fn(7)
     assert call_count["n"] == 2  # cache was cleared → re-executed
+
+
+def test_lru_evicts_least_recently_used_entry():
+    from cache_utils import LRUCache
+
+    cache = LRUCache(max_entries=2, max_bytes=10**6)
+    cache.set("ns", "a", 1, ttl=60)
+    cache.set("ns", "b", 2, ttl=60)
+    assert cache.get("ns", "a") == (True, 1)  # a becomes most recent
+    cache.set("ns", "c", 3, ttl=60)
+    assert cache.get("ns", "b") == (False, None)
+    assert cache.get("ns", "a") == (True, 1)
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_limit_evicts_and_skips_oversized_values():
+    from cache_utils import LRUCache
+
+    cache = LRUCache(max_entries=100, max_bytes=3000)
+    cache.set("ns", "a", "x" * 1000, ttl=60)
+    cache.set("ns", "b", "y" * 1000, ttl=60)
+    cache.set("ns", "c", "z" * 1500, ttl=60)
+    assert cache.get("ns", "a")[0] is False
+    assert cache.stats()["bytes"] <= 3000
+
+    cache.set("ns", "huge", "h" * 5000, ttl=60)
+    assert cache.get("ns", "huge")[0] is False
+    assert cache.get("ns", "c")[0] is True
+
+
+def test_expired_entries_purged_on_write_sweep():
+    from cache_utils import LRUCache
+
+    cache = LRUCache(max_entries=100, max_bytes=10**6, purge_interval=0)
+    cache.set("ns", "old", 1, ttl=0.01)
+    time.sleep(0.02)
+    cache.set("ns", "new", 2, ttl=60)
+    stats = cache.stats()
+    assert stats["entries"] == 1
+    assert stats["expirations"] == 1
+
+
+def test_clear_single_namespace_and_stats():
+    from cache_utils import cache_stats
+
+    calls = {"a": 0, "b": 0}
+
+    @ttl_cache(seconds=60)
+    def fa(x):
+        calls["a"] += 1
+        return x
+
+    @ttl_cache(seconds=60)
+    def fb(x):
+        calls["b"] += 1
+        return x
+
+    fa(1); fa(1); fb(1)
+    ns = cache_stats()["namespaces"][fa.cache_namespace]
+    assert ns["hits"] == 1 and ns["misses"] == 1 and ns["entries"] == 1
+
+    clear_cache(fa.cache_namespace)
+    fa(1); fb(1)
+    assert calls == {"a": 2, "b": 1}
+
+
+def _run_concurrently(fn, n):
+    import threading
+
+    results, errors = [], []
+
+    def call():
+        try:
+            results.append(fn(1))
+        except Exception as exc:  # noqa: BLE001
+            errors.append(exc)
+
+    threads = [threading.Thread(target=call) for _ in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    return results, errors
+
+
+def test_concurrent_misses_run_function_once():
+    from cache_utils import cache_stats
+
+    call_count = {"n": 0}
+
+    @ttl_cache(seconds=60)
+    def slow(x):
+        call_count["n"] += 1
+        time.sleep(0.2)
+        return x * 10
+
+    results, errors = _run_concurrently(slow, 5)
+    assert results == [10] * 5 and not errors
+    assert call_count["n"] == 1
+    assert cache_stats()["namespaces"][slow.cache_namespace]["coalesced"] == 4
+
+
+def test_leader_exception_propagates_to_waiters_and_is_not_cached():
+    call_count = {"n": 0}
+
+    @ttl_cache(seconds=60)
+    def failing(x):
+        call_count["n"] += 1
+        time.sleep(0.2)
+        raise ValueError("db down")
+
+    results, errors = _run_concurrently(failing, 3)
+    assert not results
+    assert len(errors) == 3 and all(isinstance(e, ValueError) for e in errors)
+    assert call_count["n"] == 1
+
+    with pytest.raises(ValueError):
+        failing(1)
+    assert call_count["n"] == 2
+
+
+def test_waiter_computes_itself_after_wait_timeout():
+    from cache_utils import cache_stats
+
+    call_count = {"n": 0}
+
+    @ttl_cache(seconds=60, wait_timeout=0.05)
+    def slow(x):
+        call_count["n"] += 1
+        time.sleep(0.3)
+        return x
+
+    results, errors = _run_concurrently(slow, 2)
+    assert results == [1, 1] and not errors
+    assert call_count["n"] == 2
+    assert cache_stats()["namespaces"][slow.cache_namespace]["flight_timeouts"] == 1
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_stale_value_served_while_refreshing_in_background():
+    from cache_utils import cache_stats
+
+    version = {"n": 0}
+
+    @ttl_cache(seconds=0.05, stale_seconds=60)
+    def widget():
+        version["n"] += 1
+        time.sleep(0.1)
+        return version["n"]
+
+    assert widget() == 1
+    time.sleep(0.06)  # now stale
+
+    started = time.monotonic()
+    assert widget() == 1  # stale value, no waiting on the recompute
+    assert time.monotonic() - started < 0.05
+    assert widget() == 1  # refresh already scheduled; not scheduled twice
+
+    assert _wait_for(lambda: cache_stats()["namespaces"][widget.cache_namespace]["refreshes"] == 1)
+    assert widget() == 2
+    assert version["n"] == 2
+
+
+def test_value_past_stale_window_is_recomputed_synchronously():
+    call_count = {"n": 0}
+
+    @ttl_cache(seconds=0.02, stale_seconds=0.02)
+    def widget():
+        call_count["n"] += 1
+        return call_count["n"]
+
+    assert widget() == 1
+    time.sleep(0.06)
+    assert widget() == 2
+
+
+def test_sqlite_backend_is_shared_between_instances(tmp_path):
+    from cache_utils import SQLiteBackend
+
+    path = str(tmp_path / "cache.sqlite3")
+    worker_a = SQLiteBackend(path)
+    worker_b = SQLiteBackend(path)  # stands in for a second gunicorn worker
+
+    worker_a.set("ns", "k", {"rows": [1, 2, 3]}, ttl=60)
+    assert worker_b.get("ns", "k") == (True, {"rows": [1, 2, 3]})
+
+    worker_b.clear("ns")
+    assert worker_a.get("ns", "k") == (False, None)
+
+
+def test_sqlite_backend_stale_window_and_lru_eviction(tmp_path):
+    from cache_utils import SQLiteBackend
+
+    cache = SQLiteBackend(str(tmp_path / "cache.sqlite3"), max_entries=2, touch_interval=0)
+    cache.set("ns", "stale", 1, ttl=0, stale=60)
+    assert cache.lookup("ns", "stale") == (True, 1, True)
+
+    cache.set("ns", "b", 2, ttl=60)
+    time.sleep(0.01)
+    cache.get("ns", "stale")  # touch → b is now least recently used
+    cache.set("ns", "c", 3, ttl=60)
+    assert cache.get("ns", "b") == (False, None)
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["evictions"] == 1
+
+
+def test_sqlite_hits_skip_recent_touches_and_totals_stay_exact(tmp_path):
+    from cache_utils import SQLiteBackend
+
+    cache = SQLiteBackend(str(tmp_path / "cache.sqlite3"), max_entries=3, touch_interval=60)
+    cache.set("ns", "a", "x" * 100, ttl=60)
+    cache.set("ns", "a", "y", ttl=60)  # replaced, not added
+    cache.set("other", "b", 2, ttl=60)
+    cn = cache._conn()
+    writes = cn.total_changes
+    for _ in range(3):
+        assert cache.get("ns", "a") == (True, "y")
+    assert cn.total_changes == writes  # last_access is younger than touch_interval
+
+    def totals():
+        return cn.execute("SELECT entries, bytes FROM cache_totals").fetchone()
+
+    assert totals() == cn.execute("SELECT COUNT(*), SUM(size) FROM cache_entries").fetchone()
+    assert cache.try_lease("ns", "a", seconds=30)
+    cache.clear("ns")
+    assert totals() == (1, cache.stats()["bytes"]) and not cache.lease_active("ns", "a")
+    cache.clear()
+    assert totals() == (0, 0)
+
+
+def test_sqlite_lease_allows_one_computing_process(tmp_path):
+    from cache_utils import SQLiteBackend
+
+    path = str(tmp_path / "cache.sqlite3")
+    worker_a, worker_b = SQLiteBackend(path), SQLiteBackend(path)
+
+    assert worker_a.try_lease("ns", "k", seconds=30) is True
+    assert worker_b.try_lease("ns", "k", seconds=30) is False
+    assert worker_b.lease_active("ns", "k") is True
+
+    worker_a.release_lease("ns", "k")
+    assert worker_b.lease_active("ns", "k") is False
+    assert worker_b.try_lease("ns", "k", seconds=30) is True
+
+
+def test_ttl_cache_runs_on_configured_sqlite_backend(tmp_path):
+    import cache_utils
+
+    previous = cache_utils._cache
+    try:
+        cache_utils.configure(backend="sqlite", sqlite_path=str(tmp_path / "c.sqlite3"))
+        call_count = {"n": 0}
+
+        @ttl_cache(seconds=60)
+        def fn(x):
+            call_count["n"] += 1
+            return [x]
+
+        assert fn(3) == [3]
+        assert fn(3) == [3]
+        assert call_count["n"] == 1
+        assert cache_utils.cache_stats()["backend"] == "sqlite"
+    finally:
+        cache_utils._cache = previous
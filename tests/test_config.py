@@ -107,3 +107,26 @@ def test_activation_key_optional_has_default(monkeypatch):
     monkeypatch.delenv("ACTIVATION_KEY", raising=False)
     cfg = _reload_config()
     assert cfg.ACTIVATION_KEY == ""
+
+
+def test_pool_settings_default_when_blank(monkeypatch):
+    """Blank optional pool keys fall back to defaults instead of crashing."""
+    monkeypatch.setenv("MSSQL_POOL_SIZE", "")
+    monkeypatch.delenv("MSSQL_POOL_TIMEOUT", raising=False)
+    cfg = _reload_config()
+    assert cfg.MSSQL_POOL_SIZE == 8
+    assert cfg.MSSQL_POOL_TIMEOUT == 15.0
+
+
+def test_pool_size_reads_env(monkeypatch):
+    monkeypatch.setenv("MSSQL_POOL_SIZE", "3")
+    cfg = _reload_config()
+    assert cfg.MSSQL_POOL_SIZE == 3
+
+
+def test_bundle_settings_default_when_blank(monkeypatch):
+    monkeypatch.setenv("INTEL_BUNDLE_WORKERS", "")
+    monkeypatch.delenv("INTEL_WIDGET_TIMEOUT", raising=False)
+    cfg = _reload_config()
+    assert cfg.INTEL_BUNDLE_WORKERS == 4
+    assert cfg.INTEL_WIDGET_TIMEOUT == 20.0
@@ -0,0 +1,82 @@
+# tests/test_csv_stream.py
+"""Tests for routes/csv_stream.py and the fetchmany-backed mssql_readonly_stream."""
+import csv
+import io
+from contextlib import contextmanager
+
+import pytest
+
+import helpers_intelligence as hi
+
+
+@pytest.fixture(scope="module")
+def csv_stream(load_root_module):
+    return load_root_module("routes.csv_stream", "routes/csv_stream.py")
+
+
+def test_iter_csv_flushes_one_chunk_per_batch(csv_stream):
+    rows = ([i, f"item {i}"] for i in range(1, 8))
+    chunks = list(csv_stream.iter_csv(["id", "name"], rows, batch_rows=3))
+    assert len(chunks) == 1 + 3  # header, 3 + 3 + 1 rows
+    assert chunks[0].startswith("\ufeff".encode("utf-8"))
+
+    parsed = list(csv.reader(io.StringIO(b"".join(chunks).decode("utf-8-sig"))))
+    assert parsed[0] == ["id", "name"]
+    assert parsed[-1] == ["7", "item 7"]
+    assert len(parsed) == 8
+
+
+def test_iter_csv_is_lazy(csv_stream):
+    consumed = []
+
+    def rows():
+        for i in range(10):
+            consumed.append(i)
+            yield [i]
+
+    stream = csv_stream.iter_csv(["n"], rows(), batch_rows=2, bom=False)
+    assert next(stream) == b"n\r\n"
+    assert next(stream) == b"0\r\n1\r\n"
+    assert consumed == [0, 1]
+
+
+class FakeCursor:
+    description = [("RCPT_ID",), ("AMOUNT",)]
+
+    def __init__(self, n):
+        self.rows = [(i, i * 10.0) for i in range(n)]
+        self.fetch_sizes = []
+
+    def execute(self, sql, params=()):
+        self.sql, self.params = sql, params
+
+    def fetchmany(self, size):
+        self.fetch_sizes.append(size)
+        out, self.rows = self.rows[:size], self.rows[size:]
+        return out
+
+    def fetchall(self):
+        raise AssertionError("streaming must not fetchall()")
+
+
+def test_mssql_readonly_stream_reads_in_batches(monkeypatch):
+    cursor = FakeCursor(5)
+    released = []
+
+    @contextmanager
+    def fake_connect():
+        yield type("Conn", (), {"cursor": lambda self: cursor})()
+        released.append(True)
+
+    monkeypatch.setattr(hi, "_connect", fake_connect)
+    stream = hi.mssql_readonly_stream("SELECT RCPT_ID, AMOUNT FROM x WHERE d >= ?", ["2026-05-01"], batch_size=2)
+    assert next(stream) == ["RCPT_ID", "AMOUNT"]
+    assert list(stream) == [(i, i * 10.0) for i in range(5)]
+    assert cursor.fetch_sizes == [2, 2, 2, 2]
+    assert cursor.params == ("2026-05-01",)
+    assert released == [True]
+
+
+def test_mssql_readonly_stream_rejects_writes():
+    with pytest.raises(ValueError):
+        next(hi.mssql_readonly_stream("DELETE FROM dbo.ITEMS"))
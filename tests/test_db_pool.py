@@ -0,0 +1,179 @@
+import threading
+import time
+
+import pytest
+
+from db_pool import ConnectionPool, PoolTimeout
+
+
+class FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, *params):
+        if self.conn.broken:
+            raise RuntimeError("link down")
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.broken = False
+        self.closed = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        self.closed = True
+
+
+def _pool(**kwargs):
+    created = []
+
+    def factory():
+        conn = FakeConnection()
+        created.append(conn)
+        return conn
+
+    return ConnectionPool(factory, **kwargs), created
+
+
+def test_connection_is_reused_between_checkouts():
+    pool, created = _pool(max_size=2)
+    with pool.connection() as c1:
+        pass
+    with pool.connection() as c2:
+        pass
+    assert c1 is c2
+    assert len(created) == 1
+    assert pool.stats()["checkouts"] == 2
+    assert pool.stats()["creations"] == 1
+
+
+def test_broken_idle_connection_is_replaced_on_checkout():
+    pool, created = _pool(max_size=1)
+    with pool.connection() as c1:
+        pass
+    c1.broken = True
+    with pool.connection() as c2:
+        pass
+    assert c2 is not c1
+    assert c1.closed
+    assert pool.stats()["health_failures"] == 1
+
+
+def test_idle_connection_recycled_after_max_idle():
+    pool, created = _pool(max_size=1, max_idle=0.05)
+    with pool.connection() as c1:
+        pass
+    time.sleep(0.1)
+    with pool.connection() as c2:
+        pass
+    assert c2 is not c1
+    assert c1.closed
+    assert pool.stats()["recycled"] == 1
+
+
+def test_connection_recycled_after_max_lifetime():
+    pool, created = _pool(max_size=1, max_lifetime=0.05)
+    with pool.connection() as c1:
+        time.sleep(0.1)
+    assert c1.closed  # not returned to the idle list
+    assert pool.stats()["idle"] == 0
+
+
+def test_error_in_caller_discards_connection():
+    pool, created = _pool(max_size=1)
+    with pytest.raises(ValueError):
+        with pool.connection() as c1:
+            raise ValueError("boom")
+    assert c1.closed
+    assert pool.stats()["discarded"] == 1
+    assert pool.stats()["open"] == 0
+
+
+def test_session_state_lives_as_long_as_the_connection():
+    pool, created = _pool(max_size=1)
+    with pool.connection() as c1:
+        pool.session(c1)["temp_table"] = "v1"
+    with pool.connection() as c2:
+        assert c2 is c1 and pool.session(c2) == {"temp_table": "v1"}
+    with pytest.raises(ValueError):
+        with pool.connection() as c3:
+            raise ValueError("boom")
+    with pool.connection() as c4:
+        assert c4 is not c1 and pool.session(c4) == {}
+    assert pool.session(c1) == {}  # not checked out
+
+
+def test_on_checkout_prepares_the_session_before_the_caller():
+    seen = []
+
+    def prepare(conn, session):
+        seen.append(conn)
+        if session.get("fail"):
+            raise RuntimeError("setup failed")
+        session["ready"] = session.get("ready", 0) + 1
+
+    pool, created = _pool(max_size=1, on_checkout=prepare)
+    with pool.connection() as c1:
+        assert pool.session(c1) == {"ready": 1}
+    with pool.connection() as c2:
+        assert c2 is c1 and pool.session(c2)["ready"] == 2
+        pool.session(c2)["fail"] = True
+    with pytest.raises(RuntimeError):
+        with pool.connection():
+            pass
+    assert seen == [c1, c1, c1] and pool.stats()["discarded"] == 1
+
+
+def test_pool_is_bounded_and_times_out():
+    pool, created = _pool(max_size=1, timeout=0.05)
+    with pool.connection():
+        with pytest.raises(PoolTimeout):
+            pool.acquire()
+    stats = pool.stats()
+    assert stats["timeouts"] == 1
+    assert stats["waits"] == 1
+
+
+def test_waiter_gets_connection_when_released():
+    pool, created = _pool(max_size=1, timeout=2)
+    got = {}
+    held = pool.acquire()
+
+    def worker():
+        with pool.connection() as conn:
+            got["conn"] = conn
+
+    t = threading.Thread(target=worker)
+    t.start()
+    time.sleep(0.05)
+    pool.release(held)
+    t.join(2)
+    assert got["conn"] is held.conn
+    assert len(created) == 1
+    assert pool.stats()["waits"] == 1
+
+
+def test_factory_failure_frees_the_slot():
+    calls = {"n": 0}
+
+    def factory():
+        calls["n"] += 1
+        if calls["n"] == 1:
+            raise RuntimeError("login failed")
+        return FakeConnection()
+
+    pool = ConnectionPool(factory, max_size=1, timeout=0.05)
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+    with pool.connection():
+        pass
+    assert pool.stats()["creations"] == 1
@@ -0,0 +1,85 @@
+# tests/test_dimensions.py
+"""Tests for dimensions.py — the in-memory ITEMS / SUBGROUPS / ITEM_BARCODE cache."""
+import sqlite3
+from contextlib import contextmanager
+
+import pytest
+
+import dimensions
+import tsql_sqlite
+from pos_sync import SCHEMA
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = str(tmp_path / "pos.sqlite3")
+    raw = sqlite3.connect(path)
+    for stmt in SCHEMA:
+        raw.execute(stmt)
+    raw.executescript("""
+        INSERT INTO SUBGROUPS VALUES (1, 'Drinks', NULL), (2, 'Snacks ', NULL), (3, '42', NULL);
+        INSERT INTO ITEMS (ITM_CODE, ITM_TITLE, ITM_SUBGROUP) VALUES
+          (10, 'Cola ', '1'), (20, 'Chips', 'snacks'), (30, NULL, 'Loose'), (40, 'Gum', NULL);
+        INSERT INTO ITEM_BARCODE VALUES (10, '5449', 1000.0), (10, '0001', 1200.0);
+    """)
+    raw.commit()
+    raw.close()
+    return path
+
+
+@contextmanager
+def _connect(path):
+    cn = tsql_sqlite.connect(path)
+    try:
+        yield cn
+    finally:
+        cn.close()
+
+
+def test_resolve_subgroup_by_id_then_name_then_raw_text():
+    by_id = {1: "Drinks", 3: "42"}
+    by_name = {"drinks": 1, "42": 3}
+    assert dimensions.resolve_subgroup("1", by_id, by_name) == (1, "Drinks")
+    assert dimensions.resolve_subgroup(" DRINKS ", by_id, by_name) == (1, "Drinks")
+    assert dimensions.resolve_subgroup("42", by_id, by_name) == (3, "42")  # no id 42, name '42'
+    assert dimensions.resolve_subgroup("Loose", by_id, by_name) == (None, "Loose")
+    assert dimensions.resolve_subgroup("  ", by_id, by_name) == (None, "Unknown")
+
+
+def test_load_resolves_every_item_once(path):
+    with _connect(path) as cn:
+        dims = dimensions.load(cn)
+    cola = dims.get(10)
+    assert (cola.title, cola.subgroup_id, cola.subgroup, cola.barcode, cola.price) == (
+        "Cola", 1, "Drinks", "0001", 1200.0)
+    assert (dims.title("20"), dims.subgroup("20")) == ("Chips", "Snacks")
+    assert (dims.title("30"), dims.subgroup("30")) == ("30", "Loose")
+    assert dims.subgroup("40") == "Unknown"
+    assert (dims.title("99", "(Unknown)"), dims.subgroup("99")) == ("(Unknown)", "Unknown")
+    assert dims.labels()["20"] == {"title": "Chips", "subgroup_raw": "snacks", "subgroup_label": "Snacks"}
+
+
+def test_cache_reloads_on_checksum_change_ttl_and_invalidate(path):
+    now = [0.0]
+    cache = dimensions.DimensionCache(
+        lambda: _connect(path), ttl=100, check_interval=10, clock=lambda: now[0])
+    assert cache.get().title("10") == "Cola" and cache.loads == 1
+
+    raw = sqlite3.connect(path)
+    raw.execute("UPDATE ITEMS SET ITM_TITLE = 'Cola Zero' WHERE ITM_CODE = 10")
+    raw.commit()
+    raw.close()
+    now[0] = 5.0
+    assert cache.get().title("10") == "Cola"  # not checked yet
+    now[0] = 10.0
+    assert cache.get().title("10") == "Cola Zero" and cache.loads == 2
+    now[0] = 20.0
+    cache.get()
+    assert cache.loads == 2  # checksum unchanged
+
+    now[0] = 110.0
+    cache.get()
+    assert cache.loads == 3  # ttl
+    cache.invalidate()
+    cache.get()
+    assert cache.loads == 4
@@ -0,0 +1,133 @@
+# tests/test_intelligence_bundle.py
+"""
+/api/intelligence/bundle: every widget over one connection, with MaxBizDate
+and the windowed receipts (#Rcpt) computed once and shared.
+"""
+from contextlib import contextmanager
+from datetime import datetime
+
+import pytest
+
+import dimensions
+import helpers_intelligence as hi
+from cache_utils import clear_cache
+from rollups import DailyRollupStore, MssqlRollupSource
+
+
+class _Row:
+    """Single-row result: MAX/MIN(RCPT_DATE) seeks; every other column is NULL."""
+    max_dt = datetime(2026, 5, 20, 13, 30)
+    min_dt = datetime(2026, 4, 1, 9)
+
+    def __getattr__(self, name):
+        return None
+
+    def __getitem__(self, i):
+        return self.min_dt
+
+
+class FakeCursor:
+    def __init__(self, log):
+        self.log = log
+
+    def execute(self, sql, params=()):
+        self.log.append((sql, list(params)))
+
+    def fetchone(self):
+        return _Row()
+
+    def fetchall(self):
+        return []
+
+
+class FakeConnection:
+    def __init__(self, log):
+        self.log = log
+
+    def cursor(self):
+        return FakeCursor(self.log)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class LoadedDimensions:
+    """Dimension cache that never touches the pool (item labels are not under test)."""
+
+    def get(self, cn=None):
+        return dimensions.Dimensions({}, {})
+
+
+class FakePool:
+    def __init__(self):
+        self.log = []
+        self.checkouts = 0
+
+    @contextmanager
+    def connection(self):
+        self.checkouts += 1
+        yield FakeConnection(self.log)
+
+
+@pytest.fixture
+def pool(monkeypatch, tmp_path):
+    fake = FakePool()
+    monkeypatch.setattr(hi, "_get_pool", lambda: fake)
+    monkeypatch.setattr(dimensions, "_cache", LoadedDimensions())
+    store = DailyRollupStore(str(tmp_path / "rollup.sqlite3"), MssqlRollupSource(hi._connect), background=False)
+    monkeypatch.setattr(hi, "rollup_rows", store.daily_rows)
+    clear_cache()
+    yield fake
+    clear_cache()
+
+
+def _statements(pool, needle):
+    return [sql for sql, _ in pool.log if needle in sql]
+
+
+def test_bundle_returns_every_widget(pool):
+    payload = hi.get_intelligence_bundle()
+    assert set(payload) == set(hi.INTELLIGENCE_WIDGETS)
+    assert payload["top_windows"] == {"top": [], "quiet": []}
+
+
+def test_bundle_shares_one_connection_and_window(pool):
+    hi.get_intelligence_bundle()
+    assert pool.checkouts == 1
+    assert len(_statements(pool, "MAX(r.RCPT_DATE)")) == 1
+    assert len(_statements(pool, "INTO #Rcpt")) == 1
+
+    # Receipt-window widgets read the temp table, never HISTORIC_RECEIPT again
+    widget_sql = _statements(pool, "FROM (SELECT * FROM #Rcpt WHERE BizDate >= ?)")
+    assert len(widget_sql) == 8
+    assert pool.log[-1][0].strip().endswith("DROP TABLE #Rcpt;")
+
+
+def test_narrower_widgets_filter_the_shared_window(pool):
+    hi.get_intelligence_bundle()
+    firsts = {
+        params[0] for sql, params in pool.log
+        if "#Rcpt WHERE BizDate >= ?" in sql
+    }
+    # 30-day widgets, 14-day velocity, 10-day top items, 7-day histograms
+    assert {d.isoformat() for d in firsts} == {"2026-04-21", "2026-05-07", "2026-05-11", "2026-05-14"}
+
+
+def test_cached_widgets_skip_the_database(pool):
+    hi.get_intelligence_bundle()
+    pool.log.clear()
+    hi.get_intelligence_bundle()
+    # Everything is still fresh in ttl_cache: no temp table, no widget SQL
+    assert _statements(pool, "#Rcpt") == []
+    assert pool.checkouts == 2
+
+
+def test_widgets_outside_a_bundle_use_their_own_connection(pool):
+    hi.get_top_items(limit=10, days=1)
+    hi.get_affinity_pairs(days=30, top=15)
+    assert pool.checkouts == 2
+    assert _statements(pool, "#Rcpt") == []
+    assert len(_statements(pool, "r.RCPT_DATE >= ? AND r.RCPT_DATE < ?")) == 2
@@ -0,0 +1,124 @@
+"""Tests for item_cube.py — per-day partitions, live tail and slice aggregates."""
+import threading
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from item_cube import CubeSlice, ItemCube, from_ts, open_business_day
+
+
+class FakeSource:
+    """Two items sold every day; item B only on even days."""
+
+    def __init__(self, first):
+        self.first = first
+        self.calls = []
+
+    def first_day(self):
+        return self.first
+
+    def fetch_rows(self, first, last):
+        self.calls.append((first, last))
+        rows = []
+        d = max(first, self.first)
+        while d <= last:
+            rows.append({"biz_date": d, "item_code": "A", "hour": 9, "qty": 2.0,
+                         "amount": 20.0, "receipts": 2, "last_ts": datetime(d.year, d.month, d.day, 9, 30)})
+            rows.append({"biz_date": d, "item_code": "A", "hour": 23, "qty": 1.0,
+                         "amount": 10.0, "receipts": 1, "last_ts": datetime(d.year, d.month, d.day, 23, 5)})
+            if d.day % 2 == 0:
+                rows.append({"biz_date": d, "item_code": "B", "hour": 2, "qty": 5.0,
+                             "amount": 5.0, "receipts": 1,
+                             "last_ts": datetime(d.year, d.month, d.day, 2, 0) + timedelta(days=1)})
+            d += timedelta(days=1)
+        return rows
+
+
+def _cube(tmp_path, first=None):
+    first = first or open_business_day(7) - timedelta(days=20)
+    source = FakeSource(first)
+    cube = ItemCube(str(tmp_path / "cube"), source, settle_days=1, refresh_interval=3600)
+    return cube, source
+
+
+def test_refresh_writes_one_partition_per_closed_day(tmp_path):
+    cube, source = _cube(tmp_path)
+    written = cube.refresh()
+    assert written == 19  # first .. open day - 2
+    assert cube.closed_through() == open_business_day(7) - timedelta(days=2)
+    assert len(list((tmp_path / "cube").glob("*.npz"))) == 19
+
+    source.calls.clear()
+    assert cube.refresh() == 0
+    assert source.calls == []
+
+
+def test_slice_reads_partitions_and_fetches_only_live_tail(tmp_path):
+    cube, source = _cube(tmp_path)
+    cube.refresh()
+    source.calls.clear()
+
+    today = open_business_day(7)
+    sl = cube.slice(today - timedelta(days=5), today)
+    assert source.calls == [(today - timedelta(days=1), today)]
+    assert set(np.unique(sl.item_code)) <= {"A", "B"}
+    assert sorted(set(sl.day.tolist())) == [
+        (today - timedelta(days=n)).toordinal() for n in range(5, -1, -1)
+    ]
+
+    # Live tail is memoized
+    cube.slice(today - timedelta(days=1), today)
+    assert len(source.calls) == 1
+
+
+def test_per_item_totals_and_last_sale(tmp_path):
+    cube, _ = _cube(tmp_path, first=date(2026, 1, 1))
+    cube.refresh()
+    sl = cube.slice(date(2026, 1, 1), date(2026, 1, 4))
+    totals = sl.per_item()
+    assert totals["item_code"].tolist() == ["A", "B"]
+    assert totals["qty"].tolist() == [12.0, 10.0]
+    assert totals["receipts"].tolist() == [12, 2]
+    assert from_ts(totals["last_ts"][0]) == datetime(2026, 1, 4, 23, 5)
+    assert date.fromordinal(int(totals["last_day"][1])) == date(2026, 1, 4)
+
+
+def test_reads_are_served_live_while_the_backfill_runs(tmp_path):
+    cube, source = _cube(tmp_path)
+    release = threading.Event()
+    fetch_rows = source.fetch_rows
+
+    def slow_backfill(first, last):
+        if threading.current_thread().name == "item-cube-refresh":
+            release.wait(5)
+        return fetch_rows(first, last)
+
+    source.fetch_rows = slow_backfill
+    today = open_business_day(7)
+    sl = cube.slice(today - timedelta(days=3), today)
+    assert cube.closed_through() is None and len(set(sl.day.tolist())) == 4
+    assert cube.max_biz_date() == today
+
+    release.set()
+    cube.start_refresh().join(5)
+    assert cube.closed_through() == today - timedelta(days=2)
+    assert cube._manifest()["last_day"] == (today - timedelta(days=2)).isoformat()
+
+
+def test_max_biz_date_and_empty_history(tmp_path):
+    cube, _ = _cube(tmp_path)
+    assert cube.max_biz_date() == open_business_day(7)
+
+    empty = CubeSlice.from_rows([])
+    assert len(empty) == 0 and empty.per_item()["qty"].size == 0
+
+
+def test_partitions_of_another_backend_are_deleted(tmp_path):
+    first = open_business_day(7) - timedelta(days=5)
+    cube = ItemCube(str(tmp_path / "cube"), FakeSource(first), backend="standin")
+    cube.refresh()
+    assert ItemCube(str(tmp_path / "cube"), FakeSource(first), backend="standin").closed_through()
+
+    other = ItemCube(str(tmp_path / "cube"), FakeSource(first), backend="mssql")
+    assert other.closed_through() is None and other.max_biz_date() == open_business_day(7)
+    assert list((tmp_path / "cube").glob("*.npz")) == []
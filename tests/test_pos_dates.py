@@ -1,6 +1,9 @@
 from datetime import date, datetime
 import pytest
-from pos_dates import biz_date_range_8h, biz_date_range_7h, cutoff_dt_8h, cutoff_dt_7h
+from pos_dates import (
+    biz_date_range_8h, biz_date_range_7h, cutoff_dt_8h, cutoff_dt_7h,
+    biz_window_7h, biz_date_7h, parse_date,
+)
 
 
 def test_8h_start():
@@ -40,3 +43,18 @@ def test_cutoff_7h_is_days_ago():
     result = cutoff_dt_7h(30)
     expected_date = datetime.now().date() - timedelta(days=31)
     assert result.date() == expected_date
+
+
+def test_biz_window_7h_spans_first_to_last():
+    start, end = biz_window_7h(date(2026, 4, 10), date(2026, 4, 14))
+    assert start == datetime(2026, 4, 10, 7, 0, 0)
+    assert end == datetime(2026, 4, 15, 7, 0, 0)
+
+def test_biz_date_7h_shifts_early_hours_back():
+    assert biz_date_7h(datetime(2026, 4, 15, 6, 59)) == date(2026, 4, 14)
+    assert biz_date_7h(datetime(2026, 4, 15, 7, 0)) == date(2026, 4, 15)
+
+def test_parse_date_accepts_strings_and_blanks():
+    assert parse_date("2026-04-14") == date(2026, 4, 14)
+    assert parse_date(datetime(2026, 4, 14, 23, 0)) == date(2026, 4, 14)
+    assert parse_date("  ") is None
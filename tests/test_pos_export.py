@@ -0,0 +1,128 @@
+"""Tests for pos_export.py — incremental, chunked, date-partitioned columnar export."""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+import pyarrow.parquet as pq  # noqa: E402
+
+from pos_export import PosExporter  # noqa: E402
+
+NOW = datetime(2026, 5, 20, 10, 0)  # open business day 2026-05-20 → last closed 2026-05-18
+
+
+class FakeStream:
+    """Stands in for mssql_readonly_stream: <day-of-month> receipts of 2 lines each."""
+
+    def __init__(self, fail_on=None):
+        self.calls = []
+        self.fail_on = fail_on
+
+    def __call__(self, sql, params):
+        start, end = params
+        self.calls.append((start, end))
+        day = start.date()
+        if day == self.fail_on:
+            raise RuntimeError("connection lost")
+        lines = "RCPT_LINE" in sql
+        yield ["RCPT_ID"]
+        for n in range(day.day if day.weekday() != 6 else 0):  # closed on Sundays
+            ts = datetime(day.year, day.month, day.day, 9) + timedelta(minutes=n)
+            rid = day.toordinal() * 1000 + n
+            if lines:
+                yield (rid, 1, 100, Decimal("2"), Decimal("1500.5"), ts)
+                yield (rid, 2, "A7", Decimal("1"), Decimal("250"), ts)
+            else:
+                yield (rid, n + 1, ts, Decimal("3250.5"))
+
+
+def _exporter(tmp_path, stream=None, fmt="parquet", chunk_rows=4):
+    stream = stream or FakeStream()
+    exp = PosExporter(str(tmp_path / "export"), stream, lambda: date(2026, 5, 10),
+                      fmt=fmt, chunk_rows=chunk_rows, settle_days=1)
+    return exp, stream
+
+
+def test_exports_closed_days_into_partitions(tmp_path):
+    exp, stream = _exporter(tmp_path)
+    result = exp.export_range(now=NOW)
+    assert result["days"] == 9 and result["last"] == "2026-05-18"
+    # Sundays 2026-05-10 and 2026-05-17 had no receipts
+    assert result["rows"]["receipts"] == sum(range(10, 19)) - 10 - 17
+    assert result["rows"]["receipt_contents"] == 2 * result["rows"]["receipts"]
+
+    # Bounds follow the 07:00 business day
+    assert stream.calls[0] == (datetime(2026, 5, 10, 7), datetime(2026, 5, 11, 7))
+
+    f = pq.ParquetFile(exp.partition_path("receipt_contents", date(2026, 5, 12)))
+    assert f.metadata.num_rows == 24
+    assert f.metadata.num_row_groups == 6  # chunk_rows=4
+    table = f.read()
+    assert table.schema.field("ITM_CODE").type == pa.string()
+    assert table.column("ITM_PRICE").to_pylist()[:2] == [1500.5, 250.0]
+
+    empty = pq.read_table(exp.partition_path("receipts", date(2026, 5, 17)))
+    assert empty.num_rows == 0 and "RCPT_AMOUNT" in empty.column_names
+
+
+def test_second_run_only_exports_new_days(tmp_path):
+    exp, stream = _exporter(tmp_path)
+    exp.export_range(now=NOW)
+    stream.calls.clear()
+    assert exp.export_range(now=NOW)["days"] == 0
+    assert stream.calls == []
+
+    result = exp.export_range(now=NOW + timedelta(days=1))
+    assert result["days"] == 1 and exp.is_exported(date(2026, 5, 19))
+
+
+def test_failed_day_leaves_no_partition(tmp_path):
+    exp, _ = _exporter(tmp_path, stream=FakeStream(fail_on=date(2026, 5, 12)))
+    with pytest.raises(RuntimeError):
+        exp.export_range(now=NOW)
+    assert exp.is_exported(date(2026, 5, 11))
+    assert not exp.is_exported(date(2026, 5, 12))
+    assert not list((tmp_path / "export").rglob("*.tmp"))
+
+
+def test_failed_write_closes_the_stream(tmp_path, monkeypatch):
+    import pos_export
+
+    closed = []
+
+    def stream(sql, params):
+        try:
+            yield from FakeStream()(sql, params)
+        finally:
+            closed.append(params[0])
+
+    class FullDisk(pos_export.ParquetPartWriter):
+        def write(self, chunk):
+            raise OSError("disk full")
+
+    monkeypatch.setitem(pos_export.WRITERS, "parquet", FullDisk)
+    exp, _ = _exporter(tmp_path, stream=stream)
+    try:
+        exp.export_day(date(2026, 5, 12))
+    except OSError:
+        # closed by the time the error surfaces, not whenever the traceback is freed
+        assert closed == [datetime(2026, 5, 12, 7)]
+    else:
+        pytest.fail("write error swallowed")
+    assert not list((tmp_path / "export").rglob("*.tmp"))
+
+
+def test_arrow_ipc_format(tmp_path):
+    exp, _ = _exporter(tmp_path, fmt="arrow")
+    exp.export_range(date(2026, 5, 11), date(2026, 5, 11), now=NOW)
+    path = exp.partition_path("receipts", date(2026, 5, 11))
+    assert path.endswith("part-0.arrow")
+    with pa.memory_map(path) as source:
+        table = pa.ipc.open_file(source).read_all()
+    assert table.num_rows == 11
+
+
+def test_unknown_format_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        _exporter(tmp_path, fmt="xlsx")
@@ -0,0 +1,176 @@
+"""Tests for pos_sync.py — incremental POS mirror, and helpers running on it."""
+from datetime import datetime, timedelta
+
+
+from pos_sync import PosReplica
+
+_FMT = "%Y-%m-%d %H:%M:%S"
+
+
+class FakeSource:
+    """Stands in for MssqlSyncSource over in-memory receipts / lines / dimensions."""
+
+    def __init__(self):
+        self.receipts, self.lines = [], []
+        self.items = [(1, "Water", None, 1, 1, "1", 1), (2, "Bread", None, 1, 1, "2", 1)]
+        self.subgroups = [(1, "Drinks", None), (2, "Bakery", None)]
+        self.barcodes = [(1, "111", 1000.0), (2, "222", 2000.0)]
+        self.snapshots = 0
+
+    def add(self, rcpt_id, ts, lines):
+        amount = sum(q * p for _, q, p in lines)
+        self.receipts.append((rcpt_id, rcpt_id, ts.strftime(_FMT), amount))
+        self.lines += [(rcpt_id, n, code, q, p) for n, (code, q, p) in enumerate(lines, 1)]
+        self.receipts.sort()
+
+    def receipts_after(self, after_id, limit):
+        return [r for r in self.receipts if r[0] > after_id][:limit]
+
+    def receipts_between(self, start, end):
+        return [r for r in self.receipts if start.strftime(_FMT) <= r[2] < end.strftime(_FMT)]
+
+    def lines_for_ids(self, first_id, last_id):
+        return [ln for ln in self.lines if first_id <= ln[0] <= last_id]
+
+    def lines_between(self, start, end):
+        ids = {r[0] for r in self.receipts_between(start, end)}
+        return [ln for ln in self.lines if ln[0] in ids]
+
+    def snapshot(self, table):
+        self.snapshots += 1
+        return {"ITEMS": self.items, "SUBGROUPS": self.subgroups, "ITEM_BARCODE": self.barcodes}[table]
+
+
+T0 = datetime(2026, 5, 19, 9, 0)
+
+
+def _replica(tmp_path, source, **kw):
+    return PosReplica(str(tmp_path / "replica.sqlite3"), source, **kw)
+
+
+def _count(replica, table):
+    return replica._conn().execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+def test_sync_copies_past_high_water_mark_in_batches(tmp_path):
+    source = FakeSource()
+    for i in range(1, 8):
+        source.add(100 + i, T0 + timedelta(minutes=i), [(1, 1.0, 1000.0), (2, 2.0, 2000.0)])
+    replica = _replica(tmp_path, source, batch_rows=3)
+
+    result = replica.sync()
+    assert result["receipts"] == 7
+    assert result["hwm_id"] == 107
+    assert _count(replica, "HISTORIC_RECEIPT_CONTENTS") == 14
+    assert result["dimensions"] == {"ITEMS": 2, "SUBGROUPS": 2, "ITEM_BARCODE": 2}
+
+    source.add(108, T0 + timedelta(minutes=30), [(1, 1.0, 1000.0)])
+    replica.sync()
+    assert replica.high_water_mark() == (108, T0 + timedelta(minutes=30))
+    assert _count(replica, "HISTORIC_RECEIPT") == 8
+    assert _count(replica, "HISTORIC_RECEIPT_CONTENTS") == 15
+
+
+def test_overlap_picks_up_late_receipts_without_duplicates(tmp_path):
+    source = FakeSource()
+    source.add(200, T0, [(1, 1.0, 1000.0)])
+    source.add(201, T0 + timedelta(minutes=10), [(1, 1.0, 1000.0)])
+    replica = _replica(tmp_path, source, overlap_minutes=60)
+    replica.sync()
+
+    # Archived late: lower RCPT_ID than the high-water mark, inside the overlap
+    source.add(150, T0 + timedelta(minutes=5), [(2, 3.0, 2000.0)])
+    replica.sync()
+    replica.sync()
+
+    ids = [r[0] for r in replica._conn().execute("SELECT RCPT_ID FROM HISTORIC_RECEIPT ORDER BY RCPT_ID")]
+    assert ids == [150, 200, 201]
+    assert _count(replica, "HISTORIC_RECEIPT_CONTENTS") == 3
+
+
+def test_dimension_snapshots_follow_interval(tmp_path):
+    source = FakeSource()
+    replica = _replica(tmp_path, source, snapshot_interval=3600)
+    replica.sync()
+    replica.sync()
+    assert source.snapshots == 3  # one snapshot of 3 tables
+
+    source.items = [(1, "Sparkling water", None, 1, 1, "1", 1)]
+    replica.sync(force_snapshot=True)
+    titles = [r[0] for r in replica._conn().execute("SELECT ITM_TITLE FROM ITEMS")]
+    assert titles == ["Sparkling water"]
+
+
+def test_helpers_run_on_replica_backend(tmp_path, monkeypatch, load_root_module):
+    import dimensions
+    import helpers_intelligence as hi
+    import receipt_details
+    from cache_utils import clear_cache
+
+    source = FakeSource()
+    source.add(300, T0, [(1, 2.0, 1000.0), (2, 1.0, 2000.0)])
+    source.add(301, T0 + timedelta(hours=1), [(1, 1.0, 1000.0)])
+    replica = _replica(tmp_path, source)
+    replica.sync()
+
+    cfg = load_root_module("_root_config", "config.py")
+    cfg.ANALYTICS_BACKEND = "replica"
+    cfg.POS_REPLICA_PATH = replica.path
+    monkeypatch.setattr(hi, "config", cfg)
+    monkeypatch.setattr(hi, "_pool", None)
+    monkeypatch.setattr(dimensions, "_cache", dimensions.DimensionCache(hi._connect))
+    monkeypatch.setattr(receipt_details, "_caches", {
+        "invoice_lines": receipt_details._build_invoice_lines(100)})
+    clear_cache()
+    try:
+        with hi._connect() as cn:
+            assert hi._max_biz_date(cn.cursor()).isoformat() == "2026-05-19"
+        assert hi.get_invoice_details("300") == [
+            {"item_code": "2", "item_title": "Bread", "subgroup": "2", "qty": 1.0},
+            {"item_code": "1", "item_title": "Water", "subgroup": "1", "qty": 2.0},
+        ]
+        assert hi.get_top_items(limit=5, days=1) == [
+            {"item": "Water", "qty": 3.0, "amount": 3000.0},
+            {"item": "Bread", "qty": 1.0, "amount": 2000.0},
+        ]
+        # ad-hoc SQL reads the analytics backend too, never the POS pool
+        sql = "SELECT COUNT(*) AS n FROM dbo.HISTORIC_RECEIPT"
+        assert hi.execute_sql_readonly(sql) == hi.mssql_readonly_query(sql) == [{"n": 2}]
+    finally:
+        hi._get_pool().close_all()
+        clear_cache()
+
+
+def test_sync_daemon_starts_and_reuses_the_replica(tmp_path, monkeypatch, load_root_module):
+    import sys
+    import threading
+
+    import pos_sync
+
+    cfg = load_root_module("_root_config", "config.py")
+    cfg.POS_REPLICA_PATH = str(tmp_path / "replica.sqlite3")
+    monkeypatch.setitem(sys.modules, "config", cfg)
+    monkeypatch.setattr(pos_sync, "_replica", None)
+    monkeypatch.setattr(pos_sync, "_daemon", None)
+    stop, running, runs = threading.Event(), threading.Event(), []
+
+    def fake_run_forever(replica, interval):
+        runs.append((replica, interval))
+        running.set()
+        stop.wait(5)
+
+    monkeypatch.setattr(pos_sync, "run_forever", fake_run_forever)
+
+    started = []
+    caller = threading.Thread(target=lambda: started.append(pos_sync.start_sync_daemon(3600)), daemon=True)
+    caller.start()
+    caller.join(5)
+    try:
+        assert not caller.is_alive(), "start_sync_daemon deadlocked"
+        (daemon,) = started
+        assert running.wait(5) and daemon.is_alive()
+        assert pos_sync.start_sync_daemon(3600) is daemon
+        assert runs == [(pos_sync.get_replica(), 3600)]
+        assert pos_sync.get_replica().path == cfg.POS_REPLICA_PATH
+    finally:
+        stop.set()
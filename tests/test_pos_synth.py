@@ -0,0 +1,221 @@
+"""Tests for pos_synth.py — synthetic POS data, and every helper run on the stand-in backend."""
+import importlib
+import sqlite3
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import pos_backends
+from pos_synth import SynthPos, SynthProfile, generate
+
+SMALL = SynthProfile(items=60, subgroups=6, receipts_per_day=30, seed=3)
+
+
+def test_generation_is_deterministic_and_in_store_hours(tmp_path):
+    a, b = str(tmp_path / "a.sqlite3"), str(tmp_path / "b.sqlite3")
+    first, last = date(2026, 3, 1), date(2026, 3, 14)
+    counts = SynthPos(SMALL).write(a, first, last)
+    assert SynthPos(SMALL).write(b, first, last) == counts
+    assert counts["receipts"] > 14 * 15 and counts["live_receipts"] == 0
+
+    cn = sqlite3.connect(a)
+    lo, hi_ = cn.execute("SELECT MIN(RCPT_DATE), MAX(RCPT_DATE) FROM HISTORIC_RECEIPT").fetchone()
+    assert lo >= "2026-03-01 08:00:00" and hi_ < "2026-03-15 02:00:00"
+    hours = {int(h) for (h,) in cn.execute("SELECT DISTINCT substr(RCPT_DATE, 12, 2) FROM HISTORIC_RECEIPT")}
+    assert not hours & {2, 3, 4, 5, 6, 7}
+    # header amounts match their lines; one line per item per receipt
+    assert cn.execute("""
+        SELECT COUNT(*) FROM HISTORIC_RECEIPT r
+        WHERE ABS(r.RCPT_AMOUNT - (SELECT SUM(ITM_QUANTITY * ITM_PRICE) FROM HISTORIC_RECEIPT_CONTENTS c
+                                   WHERE c.RCPT_ID = r.RCPT_ID)) > 0.01
+    """).fetchone()[0] == 0
+    assert cn.execute("""
+        SELECT COUNT(*) FROM (SELECT RCPT_ID, ITM_CODE FROM HISTORIC_RECEIPT_CONTENTS
+                              GROUP BY RCPT_ID, ITM_CODE HAVING COUNT(*) > 1)
+    """).fetchone()[0] == 0
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError, match="standin"):
+        pos_backends.get_backend("oracle")
+
+
+@pytest.fixture(scope="module")
+def standin(tmp_path_factory, load_root_module):
+    import dimensions
+    import helpers_intelligence as hi
+    import item_cube
+    import realtime_aggregator
+    import receipt_details
+    import rollups
+    from cache_utils import clear_cache
+
+    tmp = tmp_path_factory.mktemp("standin")
+    cfg = load_root_module("_root_config", "config.py")
+    cfg.ANALYTICS_BACKEND = "standin"
+    cfg.POS_STANDIN_PATH = str(tmp / "pos.sqlite3")
+    generate(cfg.POS_STANDIN_PATH, 60, SMALL)
+
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setattr(hi, "config", cfg)
+        mp.setattr(hi, "_pool", None)
+        mp.setattr(rollups, "_store", rollups.DailyRollupStore(
+            str(tmp / "rollup.sqlite3"), rollups.MssqlRollupSource(hi._connect), background=False))
+        mp.setattr(item_cube, "_cube", item_cube.ItemCube(
+            str(tmp / "cube"), item_cube.MssqlCubeSource(hi._connect), background=False))
+        mp.setattr(realtime_aggregator, "_aggregator", realtime_aggregator.RealtimeAggregator(
+            realtime_aggregator.MssqlRealtimeSource(hi._connect_pos), poll_interval=0))
+        mp.setattr(dimensions, "_cache", dimensions.DimensionCache(hi._connect))
+        mp.setattr(receipt_details, "_caches", {
+            "details": receipt_details._build_details(100),
+            "invoice_lines": receipt_details._build_invoice_lines(100),
+        })
+        clear_cache()
+        yield
+        hi._get_pool().close_all()
+        clear_cache()
+
+
+_LIVE = (datetime.now() - timedelta(hours=8)).date()
+_DAY = _LIVE - timedelta(days=1)
+
+HELPERS = [
+    ("helpers_intelligence", "get_kpis", ()),
+    ("helpers_intelligence", "get_receipts_by_day", ()),
+    ("helpers_intelligence", "get_hourly_last_business_day", ()),
+    ("helpers_intelligence", "get_top_items", ()),
+    ("helpers_intelligence", "get_subgroup_contribution", ()),
+    ("helpers_intelligence", "get_top_items_in_subgroup", ("Tobacco",)),
+    ("helpers_intelligence", "get_items_per_receipt_histogram", ()),
+    ("helpers_intelligence", "get_receipt_amount_histogram", ()),
+    ("helpers_intelligence", "get_subgroup_velocity", ()),
+    ("helpers_intelligence", "get_affinity_pairs", ()),
+    ("helpers_intelligence", "get_hourly_profile", ()),
+    ("helpers_intelligence", "get_dow_profile", ()),
+    ("helpers_intelligence", "get_top_windows", ()),
+    ("helpers_intelligence", "get_intelligence_bundle", ()),
+    ("helpers_intelligence", "get_subgroups_list", ()),
+    ("helpers_intelligence", "get_item_trends", (_DAY - timedelta(days=20), _DAY, "weekly", 5)),
+    ("helpers_intelligence", "search_items_explorer", ()),
+    ("helpers_intelligence", "get_item_daily_series", ("5",)),
+    ("helpers_intelligence", "get_item_last_invoices", ("5",)),
+    ("helpers_intelligence", "get_item_momentum_kpis", ("5",)),
+    ("helpers_intelligence", "search_invoices", ()),
+    ("helpers_intelligence", "get_invoices_list", ()),
+    ("helpers_intelligence", "get_invoice_details", ("100010",)),
+    ("helpers_intelligence", "get_daily_items_summary", ()),
+    ("helpers_intelligence", "get_daily_items_for_date", (_DAY.isoformat(),)),
+    ("helpers_intelligence", "get_daily_items_summary_legacy", (_DAY - timedelta(days=7), _DAY)),
+    ("helpers_intelligence", "get_daily_items_detail", (_DAY,)),
+    ("helpers_intelligence", "get_dead_items", ()),
+    ("helpers_intelligence", "get_dead_items_page", ()),
+    ("helpers_intelligence", "get_reorder_radar_items", ()),
+    ("helpers_intelligence", "get_pos_sales_total_by_range", ((_DAY - timedelta(days=7)).isoformat(), _DAY.isoformat())),
+    ("helpers_intelligence", "get_pos_sales_daily_by_range", ((_DAY - timedelta(days=7)).isoformat(), _DAY.isoformat())),
+    ("helpers_items", "list_items", ()),
+    ("helpers_items", "list_subgroups", ()),
+    ("helpers_items", "get_item_details", ("5",)),
+    ("helpers_realtime", "rt_get_kpis", (_LIVE.isoformat(),)),
+    ("helpers_realtime", "rt_get_hourly", (_LIVE.isoformat(),)),
+    ("helpers_realtime", "rt_get_category", (_LIVE.isoformat(),)),
+    ("helpers_realtime", "rt_get_items_sold", (_LIVE.isoformat(),)),
+    ("helpers_realtime", "rt_get_receipts", (_LIVE.isoformat(),)),
+]
+
+
+@pytest.mark.parametrize("module, name, args", HELPERS, ids=[h[1] for h in HELPERS])
+def test_helper_runs_on_standin(standin, module, name, args):
+    fn = getattr(importlib.import_module(module), name)
+    result = fn(*args)
+    assert result  # the stand-in has data for every helper's window
+
+
+def test_item_edits_reach_the_standin(standin):
+    from helpers_items import get_item_details, update_item_fields
+
+    ok, _ = update_item_fields("5", title="Renamed item", price="12000")
+    assert ok
+    assert get_item_details("5")["item"]["title"] == "Renamed item"
+
+
+def test_realtime_totals_match_the_sql_helpers(standin, monkeypatch):
+    import helpers_realtime as hr
+    import realtime_aggregator
+
+    views = ["rt_get_kpis", "rt_get_hourly", "rt_get_category", "rt_get_items_sold", "rt_get_receipts"]
+    live = {v: getattr(hr, v)(_LIVE.isoformat()) for v in views}
+    monkeypatch.setattr(realtime_aggregator, "live", lambda day: None)
+    sql = {v: getattr(hr, v)(_LIVE.isoformat()) for v in views}
+
+    def rounded(value):
+        if isinstance(value, float):
+            return round(value, 6)
+        if isinstance(value, dict):
+            return {k: rounded(v) for k, v in value.items()}
+        if isinstance(value, list):
+            return [rounded(v) for v in value]
+        return value
+
+    def by_key(rows, key):
+        return sorted(rounded(rows), key=lambda r: r[key])
+
+    assert rounded(live["rt_get_kpis"]) == rounded(sql["rt_get_kpis"])
+    assert rounded(live["rt_get_hourly"]) == rounded(sql["rt_get_hourly"])
+    assert rounded(live["rt_get_receipts"]) == rounded(sql["rt_get_receipts"])
+    # ties in the ORDER BY may come out in either order
+    assert by_key(live["rt_get_category"], "subgroup") == by_key(sql["rt_get_category"], "subgroup")
+    assert by_key(live["rt_get_items_sold"], "item_name") == by_key(sql["rt_get_items_sold"], "item_name")
+
+
+def test_receipt_details_batch_matches_single_lookups(standin):
+    import helpers_intelligence as hi
+    import helpers_realtime as hr
+    import receipt_details
+
+    ids = [r["id"] for r in hr.rt_get_receipts(_LIVE.isoformat())][:3] + [100010, 100011]
+    batch = receipt_details.get_details(ids)
+    assert [batch[rid]["historic"] for rid in ids] == [False, False, False, True, True]
+    for rid in ids:
+        assert hr.rt_get_receipt_detail(rid) == batch[rid]
+        assert len(batch[rid]["lines"]) > 0
+
+    lines = hi.get_invoice_details_many([100010, 100011])
+    assert hi.get_invoice_details("100010") == lines[100010]
+    assert sorted(r["item_code"] for r in lines[100011]) == sorted(ln["item_code"] for ln in batch[100011]["lines"])
+
+
+def test_invoice_lines_route_matches_the_single_invoice_rows(standin, load_root_module):
+    from flask import Flask
+
+    import helpers_intelligence as hi
+
+    app = Flask(__name__)
+    app.register_blueprint(load_root_module("_realtime_routes", "routes/realtime.py").realtime_bp)
+    got = app.test_client().get("/api/invoices/lines?ids=100010,100011,1").get_json()
+    assert got["100010"] == hi.get_invoice_details("100010")
+    assert got["100011"] == hi.get_invoice_details("100011")
+    assert got["1"] == []
+
+def test_stale_dimensions_need_no_second_connection(standin, monkeypatch):
+    import dimensions
+    import helpers_intelligence as hi
+    import helpers_items
+    import receipt_details
+    from db_pool import ConnectionPool
+
+    now = [0.0]
+    pool = ConnectionPool(hi._new_connection, max_size=2, timeout=0.5, on_checkout=hi._ensure_item_subgroups)
+    monkeypatch.setattr(hi, "_pool", pool)
+    monkeypatch.setattr(dimensions, "_cache", dimensions.DimensionCache(
+        hi._connect, ttl=100, check_interval=10, clock=lambda: now[0]))
+    dimensions.get()
+    receipt_details.clear()
+    try:
+        with pool.connection():  # the helpers get the last free connection
+            now[0] = 50.0  # checksum poll due
+            assert helpers_items.list_subgroups()
+            now[0] = 150.0  # reload due
+            assert receipt_details.get_details([100010])[100010]["lines"]
+        assert dimensions.get_cache().loads == 2
+    finally:
+        pool.close_all()
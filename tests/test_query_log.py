@@ -0,0 +1,121 @@
+# tests/test_query_log.py
+"""Tests for query_log.py — per-statement timings, slow log and the admin route."""
+import logging
+import sqlite3
+import time
+
+import pytest
+from flask import Flask
+
+import query_log
+from cache_utils import clear_cache, ttl_cache
+
+
+@pytest.fixture
+def log(monkeypatch):
+    qlog = query_log.QueryLog(size=50, slow_ms=0)
+    monkeypatch.setattr(query_log, "_log", qlog)
+    monkeypatch.setattr(query_log, "_enabled", True)
+    return qlog
+
+
+@pytest.fixture
+def raw():
+    cn = sqlite3.connect(":memory:", check_same_thread=False)
+    cn.execute("CREATE TABLE t (id INTEGER, name TEXT)")
+    cn.executemany("INSERT INTO t VALUES (?, ?)", [(i, f"n{i}") for i in range(10)])
+    yield cn
+    cn.close()
+
+
+def load_names(cn, below):
+    cur = cn.cursor()
+    cur.execute("SELECT name FROM t WHERE id < ?", (below,))
+    first = cur.fetchone()
+    rest = cur.fetchall()
+    cur.execute("SELECT   name\n FROM t   WHERE id < ?", (below + 1,))
+    return [first] + rest + list(cur)
+
+
+def test_records_helper_fingerprints_timings_and_rows(log, raw):
+    with query_log.track(raw, time.perf_counter() - 0.002) as cn:
+        names = load_names(cn, 3)
+    assert len(names) == 3 + 4
+
+    first, second = log.records()
+    assert first.helper.endswith("test_query_log.load_names")
+    assert first.sql == "SELECT name FROM t WHERE id < ?"
+    assert (first.rows, second.rows) == (3, 4)
+    # whitespace does not change the statement, parameters change their fingerprint
+    assert first.sql_fp == second.sql_fp and first.params_fp != second.params_fp
+    # the checkout is charged once, to the first statement
+    assert first.connect_ms >= 2 and second.connect_ms == 0
+    assert first.execute_ms > 0 and first.cache_ns is None
+
+    (top,) = log.top_offenders()
+    assert (top["count"], top["rows"], top["distinct_params"]) == (2, 7, 2)
+
+
+def test_failed_statement_is_recorded_and_reraised(log, raw):
+    with pytest.raises(sqlite3.OperationalError):
+        with query_log.track(raw, time.perf_counter()) as cn:
+            cn.cursor().execute("SELECT nope FROM t")
+    (rec,) = log.records()
+    assert rec.error.startswith("OperationalError")
+
+
+def test_disabled_tracking_yields_the_raw_connection(log, raw, monkeypatch):
+    monkeypatch.setattr(query_log, "_enabled", False)
+    with query_log.track(raw, time.perf_counter()) as cn:
+        assert cn is raw
+    assert log.records() == []
+
+
+def test_ring_buffer_and_slow_log(log, raw, caplog):
+    log.resize(3)
+    log.slow_ms = 1e-6
+    with caplog.at_level(logging.WARNING, logger="query_log.slow"):
+        with query_log.track(raw, time.perf_counter()) as cn:
+            for i in range(5):
+                cn.cursor().execute("SELECT ?", (i,)).fetchall()
+    assert len(log.records()) == 3
+    assert log.stats()["recorded"] == 5 and log.stats()["slow"] == 5
+    assert len(caplog.records) == 5 and '"sql": "SELECT ?"' in caplog.records[0].getMessage()
+
+
+def test_statements_inside_a_cache_miss_carry_its_namespace(log, raw):
+    @ttl_cache(seconds=60)
+    def cached_names(below):
+        with query_log.track(raw, time.perf_counter()) as cn:
+            return load_names(cn, below)
+
+    clear_cache()
+    cached_names(2)
+    cached_names(2)  # hit: no SQL
+    assert len(log.records()) == 2
+    assert {r.cache_ns for r in log.records()} == {cached_names.cache_namespace}
+
+    (top,) = query_log.top_offenders()
+    assert (top["cache_hits"], top["cache_misses"]) == (1, 1)
+    clear_cache()
+
+
+def test_admin_route_lists_top_offenders(log, raw, monkeypatch, load_root_module):
+    import helpers_intelligence as hi
+
+    monkeypatch.setattr(hi, "pool_stats", lambda: {"open": 0})
+    with query_log.track(raw, time.perf_counter()) as cn:
+        load_names(cn, 5)
+        cn.cursor().execute("SELECT COUNT(*) FROM t").fetchone()
+
+    app = Flask(__name__)
+    app.register_blueprint(load_root_module("_admin_routes", "routes/admin.py").admin_bp)
+    client = app.test_client()
+
+    body = client.get("/api/admin/queries?sort=count&recent=1").get_json()
+    assert body["recorded"] == 3 and body["pool"] == {"open": 0}
+    assert [t["count"] for t in body["top"]] == [2, 1]
+    assert len(body["recent"]) == 1 and body["recent"][0]["sql"] == "SELECT COUNT(*) FROM t"
+
+    assert client.get("/api/admin/queries?sort=bogus").status_code == 400
+    assert client.delete("/api/admin/queries").get_json()["buffered"] == 0
@@ -0,0 +1,167 @@
+# tests/test_realtime_aggregator.py
+"""Tests for realtime_aggregator.py — open-day running totals fed by RCPT_ID deltas."""
+import threading
+from datetime import datetime
+
+import pytest
+
+import realtime_aggregator
+from realtime_aggregator import RealtimeAggregator
+
+LABELS = {"1": ("Cola", "Drinks"), "2": ("Chips", "Snacks")}
+
+
+def label(code):
+    return LABELS.get(code, ("(Unknown)", "Unknown"))
+
+
+class FakeSource:
+    """dbo.RECEIPT in memory: {rcpt_id: (RCPT_DATE, amount, [(code, qty, price)])}."""
+
+    def __init__(self):
+        self.receipts = {}
+        self.calls = []
+
+    def add(self, rid, when, lines):
+        self.receipts[rid] = (when, sum(q * p for _, q, p in lines), lines)
+
+    def fetch(self, start, end, since_id):
+        self.calls.append(since_id)
+        picked = sorted(rid for rid, (when, _, _) in self.receipts.items()
+                        if start <= when < end and rid > since_id)
+        receipts = [{"id": rid, "date": self.receipts[rid][0], "amount": self.receipts[rid][1]}
+                    for rid in picked]
+        lines = [{"rcpt_id": rid, "code": code, "qty": qty, "price": price}
+                 for rid in picked for code, qty, price in self.receipts[rid][2]]
+        return receipts, lines
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def setup():
+    src = FakeSource()
+    clock = Clock(datetime(2026, 5, 20, 12, 0))
+    return src, clock, RealtimeAggregator(src, poll_interval=0, overlap=2, now=clock, label=label)
+
+
+def test_polls_fold_in_deltas_only(setup):
+    src, clock, agg = setup
+    src.add(10, datetime(2026, 5, 20, 9, 15), [("1", 2, 1000.0)])
+    src.add(11, datetime(2026, 5, 20, 9, 40), [("2", 1, 3000.0), ("1", 1, 1000.0)])
+    src.add(9, datetime(2026, 5, 19, 22, 0), [("1", 1, 1000.0)])  # previous business day
+    agg.refresh()
+    for rid in range(12, 16):
+        src.add(rid, datetime(2026, 5, 20, 11, rid), [("1", 1, 1000.0)])
+    agg.refresh()
+    assert src.calls == [0, 9]  # second poll re-reads the newest 2 known (overlap)
+
+    src.add(16, datetime(2026, 5, 20, 11, 30), [("2", 2, 3000.0)])
+    agg.refresh()
+    assert src.calls[-1] == 13
+
+    k = agg.kpis()
+    assert (k["receipts"], k["total_sales"], k["items_sold"]) == (7, 16000.0, 10.0)
+    assert k["peak_hour"] == "11:00"
+    assert agg.hourly() == [{"hour": 1, "sales": 6000.0}, {"hour": 3, "sales": 10000.0}]
+    assert agg.category() == [{"subgroup": "Snacks", "sales": 9000.0}, {"subgroup": "Drinks", "sales": 7000.0}]
+    items = {r["item_name"]: r for r in agg.items_sold()}
+    assert items["Chips"]["total_qty"] == 3.0 and items["Chips"]["avg_price"] == 3000.0
+    assert items["Chips"]["share"] == round(9000 / 16000 * 100, 1)
+    assert [r["id"] for r in agg.receipts()] == [16, 15, 14, 13, 12, 11, 10]
+    assert agg.receipts()[-1] == {"id": 10, "datetime": "09:15", "items_count": 2.0, "total": 2000.0}
+
+
+def test_overlap_picks_up_late_lines_and_voids(setup):
+    src, clock, agg = setup
+    src.add(1, datetime(2026, 5, 20, 9, 0), [("1", 1, 1000.0)])
+    src.add(2, datetime(2026, 5, 20, 9, 5), [])  # header committed, lines not yet
+    agg.refresh()
+    assert agg.kpis()["items_sold"] == 1.0 and agg.receipts()[0]["items_count"] == 0.0
+
+    src.add(2, datetime(2026, 5, 20, 9, 5), [("2", 4, 3000.0)])
+    src.add(3, datetime(2026, 5, 20, 10, 0), [("1", 1, 1000.0)])
+    agg.refresh()
+    assert agg.kpis()["items_sold"] == 6.0
+    assert {c["subgroup"] for c in agg.category()} == {"Drinks", "Snacks"}
+
+    del src.receipts[2]  # voided
+    agg.refresh()
+    k = agg.kpis()
+    assert (k["receipts"], k["total_sales"]) == (2, 2000.0)
+    assert agg.category() == [{"subgroup": "Drinks", "sales": 2000.0}]
+    assert [r["item_name"] for r in agg.items_sold()] == ["Cola"]
+    assert agg.hourly() == [{"hour": 1, "sales": 1000.0}, {"hour": 2, "sales": 1000.0}]
+
+
+def test_unknown_items_and_empty_day(setup):
+    src, clock, agg = setup
+    agg.refresh()
+    assert agg.kpis()["peak_hour"] is None and agg.kpis()["total_sales"] == 0.0
+    src.add(1, datetime(2026, 5, 20, 9, 0), [("999", 1, 500.0)])
+    agg.refresh()
+    assert agg.items_sold()[0]["item_name"] == "(Unknown)"
+    assert agg.category() == [{"subgroup": "Unknown", "sales": 500.0}]
+
+
+def test_state_resets_at_the_8am_boundary(setup):
+    src, clock, agg = setup
+    src.add(1, datetime(2026, 5, 20, 23, 0), [("1", 1, 1000.0)])
+    clock.now = datetime(2026, 5, 21, 7, 59)  # still business day 05-20
+    agg.refresh()
+    assert agg.kpis()["receipts"] == 1
+
+    clock.now = datetime(2026, 5, 21, 8, 0)
+    src.add(2, datetime(2026, 5, 21, 8, 0), [("2", 1, 3000.0)])
+    agg.refresh()
+    assert agg.day.isoformat() == "2026-05-21"
+    assert src.calls[-1] == 0
+    assert [r["id"] for r in agg.receipts()] == [2]
+
+
+def test_polls_are_throttled_and_live_only_serves_the_open_day(monkeypatch):
+    src = FakeSource()
+    clock = Clock(datetime(2026, 5, 20, 12, 0))
+    agg = RealtimeAggregator(src, poll_interval=60, now=clock, label=label)
+    monkeypatch.setattr(realtime_aggregator, "_aggregator", agg)
+
+    assert realtime_aggregator.live(datetime(2026, 5, 19).date()) is None
+    assert realtime_aggregator.live(datetime(2026, 5, 20).date()) is agg
+    realtime_aggregator.live(datetime(2026, 5, 20).date())
+    assert len(src.calls) == 1
+
+    realtime_aggregator.invalidate()
+    realtime_aggregator.live(datetime(2026, 5, 20).date())
+    assert src.calls == [0, 0]
+
+
+def test_views_do_not_wait_for_a_poll_in_flight(setup):
+    src, clock, agg = setup
+    src.add(10, datetime(2026, 5, 20, 9, 15), [("1", 2, 1000.0)])
+    agg.refresh()
+    src.add(11, datetime(2026, 5, 20, 9, 40), [("2", 1, 3000.0)])
+
+    fetching, release = threading.Event(), threading.Event()
+    fetch = src.fetch
+
+    def slow_fetch(start, end, since_id):
+        fetching.set()
+        release.wait(5)
+        return fetch(start, end, since_id)
+
+    src.fetch = slow_fetch
+    poller = threading.Thread(target=agg.refresh)
+    poller.start()
+    assert fetching.wait(5)
+    agg.refresh()  # another poll is running: serve the last state
+    assert agg.kpis()["receipts"] == 1 and agg.category() == [{"subgroup": "Drinks", "sales": 2000.0}]
+
+    release.set()
+    poller.join(5)
+    assert agg.kpis()["receipts"] == 2 and agg.polls == 2
@@ -0,0 +1,97 @@
+# tests/test_realtime_stream.py
+"""Tests for realtime_stream.py — one poller fanning open-day changes out over SSE."""
+import json
+
+from flask import Flask
+
+import realtime_stream
+from realtime_stream import RealtimeBroadcaster
+
+
+class FakeDay:
+    """Payloads as open_day_payloads() returns them, counting polls."""
+
+    def __init__(self):
+        self.polls = 0
+        self.data = {
+            "day": "2026-05-20",
+            "kpis": {"total_sales": 3000.0, "receipts": 2},
+            "hourly": [{"hour": 1, "sales": 3000.0}],
+            "category": [{"subgroup": "Drinks", "sales": 3000.0}],
+            "items": [{"item_name": "Cola", "total_qty": 3.0}],
+            "receipts": [{"id": 11, "total": 2000.0}, {"id": 10, "total": 1000.0}],
+        }
+
+    def __call__(self):
+        self.polls += 1
+        return json.loads(json.dumps(self.data))
+
+
+def _drain(sub):
+    out = []
+    while not sub.queue.empty():
+        out.append(sub.queue.get_nowait())
+    return out
+
+
+def test_one_poll_serves_every_subscriber_and_only_changes_are_sent():
+    day = FakeDay()
+    b = RealtimeBroadcaster(day, autostart=False)
+    a, c = b.subscribe(), b.subscribe()
+    b.tick()
+    assert day.polls == 1
+    for sub in (a, c):
+        events = _drain(sub)
+        assert [e for e, _ in events] == ["kpis", "hourly", "category", "items", "receipts"]
+        assert events[-1][1]["reset"] is True and len(events[-1][1]["upsert"]) == 2
+
+    assert b.tick() == []  # nothing new
+    day.data["kpis"] = {"total_sales": 3500.0, "receipts": 3}
+    day.data["receipts"] = [{"id": 12, "total": 500.0}, {"id": 11, "total": 2000.0}]  # 10 voided
+    b.tick()
+    events = _drain(a)
+    assert [e for e, _ in events] == ["kpis", "receipts"]
+    assert events[1][1] == {"day": "2026-05-20", "reset": False,
+                            "upsert": [{"id": 12, "total": 500.0}], "remove": [10]}
+    assert _drain(c) == events
+
+    late = b.subscribe()  # joins from the last state, without another poll
+    assert [e for e, _ in _drain(late)][-1] == "receipts" and day.polls == 3
+
+
+def test_new_business_day_resets_and_stalled_clients_are_dropped():
+    day = FakeDay()
+    b = RealtimeBroadcaster(day, queue_size=6, autostart=False)
+    fast, slow = b.subscribe(), b.subscribe()
+    b.tick()
+    _drain(fast)
+
+    day.data["day"] = "2026-05-21"
+    day.data["receipts"] = []
+    b.tick()
+    events = _drain(fast)
+    assert events[-1][1] == {"day": "2026-05-21", "reset": True, "upsert": [], "remove": []}
+    assert slow.closed.is_set() and b.subscribers == 1
+
+
+def test_stream_route_sends_sse_and_unsubscribes_on_close(monkeypatch, load_root_module):
+    day = FakeDay()
+    b = RealtimeBroadcaster(day, interval=0.01)
+    monkeypatch.setattr(realtime_stream, "_broadcaster", b)
+    routes = load_root_module("_realtime_routes", "routes/realtime.py")
+    monkeypatch.setattr(routes.config, "REALTIME_STREAM_HEARTBEAT", 0.05, raising=False)
+
+    app = Flask(__name__)
+    app.register_blueprint(routes.realtime_bp)
+    resp = app.test_client().get("/api/realtime/stream", buffered=False)
+    assert resp.mimetype == "text/event-stream"
+    assert resp.headers["Cache-Control"] == "no-cache"
+
+    chunks = iter(resp.response)
+    assert next(chunks) == b"retry: 5000\n\n"
+    first = next(chunks).decode()
+    assert first.startswith("event: kpis\ndata: ") and first.endswith("\n\n")
+    assert json.loads(first.split("data: ", 1)[1]) == day.data["kpis"]
+    assert b.subscribers == 1
+    resp.close()
+    assert b.subscribers == 0
@@ -0,0 +1,65 @@
+# tests/test_receipt_details.py
+"""Tests for receipt_details.py — batched receipt detail and the closed-receipt LRU."""
+import sqlite3
+
+import pytest
+
+import dimensions
+import tsql_sqlite
+from pos_sync import SCHEMA
+from pos_synth import LIVE_SCHEMA
+from receipt_details import ReceiptCache, fetch_details
+
+
+@pytest.fixture
+def cn(tmp_path):
+    path = str(tmp_path / "pos.sqlite3")
+    raw = sqlite3.connect(path)
+    for stmt in SCHEMA + LIVE_SCHEMA:
+        raw.execute(stmt)
+    raw.executescript("""
+        INSERT INTO SUBGROUPS VALUES (1, 'Drinks', NULL), (2, 'Snacks', NULL);
+        INSERT INTO ITEMS (ITM_CODE, ITM_TITLE, ITM_SUBGROUP) VALUES (10, 'Cola', '1'), (20, 'Chips ', 'Snacks');
+        INSERT INTO HISTORIC_RECEIPT VALUES (1, 501, '2026-05-19 09:00:00', 5000.0), (2, 502, '2026-05-19 09:05:00', 0);
+        INSERT INTO HISTORIC_RECEIPT_CONTENTS VALUES (1, 2, 20, 1, 3000.0), (1, 1, 10, 2, 1000.0), (1, 3, 99, 1, 0);
+        INSERT INTO RECEIPT VALUES (7, 507, '2026-05-20 10:00:00', 1000.0);
+        INSERT INTO RECEIPT_CONTENTS VALUES (7, 1, 10, 1, 1000.0);
+    """)
+    raw.commit()
+    raw.close()
+    conn = tsql_sqlite.connect(path)
+    yield conn
+    conn.close()
+
+
+def test_headers_and_lines_of_open_and_closed_receipts_in_one_statement(cn):
+    got = fetch_details(cn, [1, 2, 7, 404], dimensions.load(cn))
+    assert sorted(got) == [1, 2, 7]
+
+    closed = got[1]
+    assert closed["historic"] is True
+    assert closed["header"] == {"rcpt_id": 1, "rcpt_no": 501, "datetime": "2026-05-19 09:00",
+                                "total_amount": 5000.0}
+    assert [(ln["line"], ln["item_name"], ln["category"], ln["line_total"]) for ln in closed["lines"]] == [
+        (1, "Cola", "Drinks", 2000.0), (2, "Chips", "Snacks", 3000.0), (3, "(Unknown)", "Unknown", 0.0)]
+    assert got[2]["lines"] == []
+    assert got[7]["historic"] is False and got[7]["lines"][0]["item_code"] == "10"
+
+
+def test_cache_keeps_what_it_is_told_and_evicts_least_recent():
+    calls = []
+
+    def load(ids):
+        calls.append(ids)
+        return {i: {"id": i, "closed": i < 100} for i in ids if i != 404}
+
+    cache = ReceiptCache(load, max_size=2, keep=lambda v: v["closed"], missing="none")
+    assert cache.get_many([1, 2, 150, 404]) == {
+        1: {"id": 1, "closed": True}, 2: {"id": 2, "closed": True}, 150: {"id": 150, "closed": False}, 404: "none"}
+    cache.get_many([2, 1, 150])
+    assert calls[-1] == [150]  # open receipts are always re-read
+
+    cache.get_many([3])  # evicts 2, the least recently used
+    cache.get_many([1, 2])
+    assert calls[-1] == [2]
+    assert cache.stats() == {"size": 2, "max_size": 2, "hits": 3, "misses": 7}
@@ -0,0 +1,116 @@
+# tests/test_reorder_radar.py
+"""Tests for routes/reorder_radar.py — one cached scored set, sliced per DataTables draw."""
+from datetime import date, datetime, timedelta
+
+import pytest
+from flask import Flask
+
+import helpers_intelligence as hi
+from cache_utils import clear_cache
+from item_cube import CubeSlice
+
+
+MAX_BIZ = date(2026, 5, 20)
+
+
+def _sales(code, ages, qty=1.0):
+    """Cube rows for <code>: <qty> sold on each BizDate <age> days before MAX_BIZ."""
+    out = []
+    for age in ages:
+        d = MAX_BIZ - timedelta(days=age)
+        out.append({"biz_date": d, "item_code": code, "hour": 12, "qty": qty, "amount": qty,
+                    "receipts": 1, "last_ts": datetime(d.year, d.month, d.day, 12)})
+    return out
+
+
+ROWS = (
+    _sales("101", range(7), qty=3.0)     # selling fast this week
+    + _sales("102", range(10, 61))       # regular seller gone quiet -> STOCKOUT?
+    + _sales("103", [40])                # one sale 40 days ago -> SLOW
+    + _sales("104", range(90))           # steady
+    + _sales("999", range(3))            # not in ITEMS
+)
+
+DIMENSION = {
+    "101": {"title": "Green Tea", "subgroup_raw": "1", "subgroup_label": "Tea"},
+    "102": {"title": "Black Tea", "subgroup_raw": "2", "subgroup_label": "Tea"},
+    "103": {"title": "Coffee", "subgroup_raw": "1", "subgroup_label": "Tea"},
+    "104": {"title": "Tea Biscuits", "subgroup_raw": "2", "subgroup_label": "Tea"},
+}
+
+
+class FakeCube:
+    def __init__(self):
+        self.slices = []
+
+    def max_biz_date(self):
+        return MAX_BIZ
+
+    def slice(self, first, last):
+        self.slices.append((first, last))
+        return CubeSlice.from_rows([r for r in ROWS if first <= r["biz_date"] <= last])
+
+
+@pytest.fixture(scope="module")
+def reorder_radar(load_root_module):
+    # Its `from routes.csv_stream import ...` must find the root module
+    load_root_module("routes.csv_stream", "routes/csv_stream.py")
+    return load_root_module("reorder_radar", "routes/reorder_radar.py")
+
+
+@pytest.fixture
+def client(monkeypatch, reorder_radar):
+    cube = FakeCube()
+    monkeypatch.setattr(hi, "get_cube", lambda: cube)
+    monkeypatch.setattr(hi, "_item_dimension", lambda: DIMENSION)
+    clear_cache()
+    app = Flask(__name__)
+    app.register_blueprint(reorder_radar.reorder_radar_bp)
+    yield app.test_client(), cube.slices
+    clear_cache()
+
+
+def _draw(client, **payload):
+    body = {"draw": 1, "start": 0, "length": 25, "lookback": 30, "onlyAction": "0"}
+    body.update(payload)
+    return client.post("/api/reorder-radar", json=body).get_json()
+
+
+def test_paging_and_sorting_reuse_one_cube_read(client):
+    c, slices = client
+    first = _draw(c, length=2)
+    second = _draw(c, start=2, length=2, order=[{"column": 1, "dir": "asc"}])
+    _draw(c, lookback=90)
+    assert slices == [(MAX_BIZ - timedelta(days=89), MAX_BIZ)]
+
+    assert first["recordsTotal"] == first["recordsFiltered"] == 3
+    assert [r["itm_code"] for r in first["data"]] == ["102", "101"]  # score desc
+    assert [r["itm_name"] for r in second["data"]] == ["Tea Biscuits"]
+
+
+def test_lookback_decides_which_items_are_listed(client):
+    c, _ = client
+    assert _draw(c, lookback=7)["recordsTotal"] == 2
+    assert _draw(c, lookback=30)["recordsTotal"] == 3
+    assert _draw(c, lookback=90)["recordsTotal"] == 4
+
+
+def test_filters_only_narrow_records_filtered(client):
+    c, _ = client
+    res = _draw(c, q="TEA", onlyAction="1", lookback=90)
+    assert res["recordsTotal"] == 4
+    assert [r["itm_code"] for r in res["data"]] == ["102", "101", "104"]
+    assert res["data"][0]["flags"] == "STOCKOUT?"
+
+    res = _draw(c, subgroup="2")
+    assert res["recordsFiltered"] == 2
+
+
+def test_export_reads_the_cached_scores(client):
+    c, slices = client
+    _draw(c)
+    res = c.get("/api/reorder-radar/export?lookback=90&onlyAction=0")
+    assert res.status_code == 200
+    lines = res.data.decode("utf-8-sig").splitlines()
+    assert [line.split(",")[0] for line in lines[1:]] == ["102", "101", "104", "103"]
+    assert len(slices) == 1
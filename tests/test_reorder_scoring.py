@@ -0,0 +1,74 @@
+"""Tests for reorder_scoring.py — dense qty matrix and vectorized scores/flags."""
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from item_cube import CubeSlice
+from reorder_scoring import NO_SALE_DAYS, qty_matrix, score_items
+
+LAST = date(2026, 5, 20)
+
+
+def _slice(sales):
+    """sales: [(item_code, age_in_days, qty)] relative to LAST."""
+    rows = []
+    for code, age, qty in sales:
+        d = LAST - timedelta(days=age)
+        rows.append({"biz_date": d, "item_code": code, "hour": 10, "qty": qty, "amount": qty,
+                     "receipts": 1, "last_ts": datetime(d.year, d.month, d.day, 10)})
+    return CubeSlice.from_rows(rows)
+
+
+def test_qty_matrix_places_days_and_sums_hours():
+    sl = _slice([("B", 0, 1.0), ("B", 0, 2.0), ("A", 89, 4.0), ("A", 90, 9.0)])
+    codes, matrix = qty_matrix(sl, LAST)
+    assert codes.tolist() == ["A", "B"]
+    assert matrix.shape == (2, 90)
+    assert matrix[0, 0] == 4.0 and matrix[0].sum() == 4.0  # age 90 is outside the window
+    assert matrix[1, 89] == 3.0
+
+
+def test_scores_match_the_reference_formula():
+    sales = (
+        [("FAST", age, 3.0) for age in range(7)]
+        + [("GONE", age, 1.0) for age in range(10, 61)]
+        + [("SLOW", 40, 1.0)]
+        + [("FLAT", age, 1.0) for age in range(90)]
+    )
+    scores = score_items(*qty_matrix(_slice(sales), LAST))
+    by_code = {c: i for i, c in enumerate(scores.item_code.tolist())}
+
+    i = by_code["FAST"]
+    trend = (21 / 7 + 0.001) / (21 / 90 + 0.001)
+    assert scores.trend_ratio[i] == round(trend, 3)
+    assert scores.score[i] == round(21 / 30 * 10 + 6, 2)
+    assert scores.flags(i) == "FAST"
+
+    i = by_code["GONE"]
+    assert scores.days_since_last_sale[i] == 10
+    assert scores.days_sold_90d[i] == 51
+    assert scores.score[i] == round(20 / 30 * 10 + 8, 2)
+    assert scores.flags(i) == "STOCKOUT?"
+
+    i = by_code["SLOW"]
+    assert scores.flags(i) == "SLOW"
+    assert scores.score[i] == 0.0
+
+    i = by_code["FLAT"]
+    assert scores.trend_ratio[i] == 1.0 and scores.flags(i) == ""
+    assert scores.score[i] == 10.0
+
+
+def test_rows_report_last_sold_bizdate_and_no_sale_items():
+    sl = _slice([("A", 3, 2.0), ("Z", 5, 0.0)])
+    rows = {r["itm_code"]: r for r in score_items(*qty_matrix(sl, LAST)).rows(LAST)}
+    assert rows["A"]["last_sold_bizdate"] == "2026-05-17"
+    assert rows["A"]["days_since_last_sale"] == 3
+    assert rows["Z"]["days_since_last_sale"] == NO_SALE_DAYS
+    assert rows["Z"]["last_sold_bizdate"] is None
+
+
+def test_empty_slice():
+    scores = score_items(*qty_matrix(CubeSlice.empty(), LAST))
+    assert len(scores) == 0 and scores.score.size == 0
+    assert isinstance(scores.rows(LAST), list) and not np.any(scores.stockout)
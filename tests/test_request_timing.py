@@ -0,0 +1,84 @@
+# tests/test_request_timing.py
+"""Tests for request_timing.py — Server-Timing phases and the /metrics exposition."""
+import sqlite3
+import time
+
+import pytest
+from flask import Flask, jsonify, render_template_string
+
+import query_log
+import request_timing
+from request_timing import Metrics, register_request_timing, timed_phase
+
+
+def _phases(header):
+    out = {}
+    for part in header.split(", "):
+        name, _, rest = part.partition(";dur=")
+        out[name] = float(rest.split(";")[0])
+    return out
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(request_timing, "metrics", Metrics())
+    monkeypatch.setattr(query_log, "_log", query_log.QueryLog(slow_ms=0))
+    monkeypatch.setattr(query_log, "_enabled", True)
+
+    app = Flask(__name__)
+    register_request_timing(app)
+
+    @app.before_request
+    @timed_phase("auth")
+    def slow_auth():
+        time.sleep(0.01)
+
+    @app.get("/json")
+    def as_json():
+        raw = sqlite3.connect(":memory:")
+        with query_log.track(raw, time.perf_counter()) as cn:
+            cn.cursor().execute("SELECT 1").fetchall()
+            cn.cursor().execute("SELECT 2").fetchall()
+        raw.close()
+        return jsonify({"rows": list(range(1000))})
+
+    @app.get("/page")
+    def page():
+        return render_template_string("{% for i in range(n) %}{{ i }}{% endfor %}", n=100)
+
+    return app.test_client()
+
+
+def test_server_timing_splits_the_request_into_phases(client):
+    resp = client.get("/json")
+    phases = _phases(resp.headers["Server-Timing"])
+    assert phases["auth"] >= 10
+    assert set(phases) == {"auth", "db", "serialize", "app", "total"}
+    assert 'desc="2 statements"' in resp.headers["Server-Timing"]
+    assert phases["total"] >= phases["auth"] + phases["db"] + phases["serialize"]
+
+    phases = _phases(client.get("/page").headers["Server-Timing"])
+    assert set(phases) == {"auth", "render", "app", "total"}
+
+
+def test_metrics_are_prometheus_text(client):
+    client.get("/json")
+    client.get("/json")
+    client.get("/missing")
+
+    resp = client.get("/metrics")
+    assert resp.mimetype == "text/plain"
+    text = resp.get_data(as_text=True)
+    assert 'http_request_duration_seconds_count{endpoint="as_json",method="GET"} 2' in text
+    assert 'http_request_duration_seconds_bucket{endpoint="as_json",method="GET",le="+Inf"} 2' in text
+    assert 'http_responses_total{endpoint="<unmatched>",status="4xx"} 1' in text
+    assert 'http_request_phase_seconds_total{endpoint="as_json",phase="auth"}' in text
+
+
+def test_histogram_buckets_are_cumulative():
+    m = Metrics(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.5, 0.5, 5.0):
+        m.observe("ep", "GET", 200, seconds, {})
+    text = m.render()
+    assert 'le="0.1"} 1' in text and 'le="1"} 3' in text and 'le="+Inf"} 4' in text
+    assert 'http_request_duration_seconds_sum{endpoint="ep",method="GET"} 6.050000' in text
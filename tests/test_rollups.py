@@ -0,0 +1,131 @@
+"""Tests for rollups.py — incremental daily rollup store with a live tail."""
+import threading
+from datetime import date, datetime, timedelta
+
+from rollups import DailyRollupStore, open_business_day
+
+
+class FakeSource:
+    """Stands in for MssqlRollupSource: one receipt worth <day-of-month> per day."""
+
+    def __init__(self, first):
+        self.first = first
+        self.calls = []
+
+    def first_day(self, boundary_hour):
+        return self.first
+
+    def fetch_days(self, first, last, boundary_hour):
+        self.calls.append((first, last, boundary_hour))
+        out = []
+        if self.first is None:
+            return out
+        d = max(first, self.first)
+        while d <= last:
+            if d.weekday() != 6:  # closed on Sundays → no row
+                out.append({
+                    "biz_date": d, "receipts": 1, "amount": float(d.day),
+                    "item_qty": 2.0, "unique_items": 1,
+                })
+            d += timedelta(days=1)
+        return out
+
+
+NOW = datetime(2026, 5, 20, 10, 0)  # open business day: 2026-05-20
+
+
+def _store(tmp_path, first=date(2026, 3, 1)):
+    source = FakeSource(first)
+    store = DailyRollupStore(str(tmp_path / "rollup.sqlite3"), source, settle_days=1,
+                             refresh_interval=3600)
+    return store, source
+
+
+def test_open_business_day_respects_boundary():
+    assert open_business_day(7, datetime(2026, 5, 20, 6, 59)) == date(2026, 5, 19)
+    assert open_business_day(7, datetime(2026, 5, 20, 7, 0)) == date(2026, 5, 20)
+    assert open_business_day(8, datetime(2026, 5, 20, 7, 30)) == date(2026, 5, 19)
+
+
+def test_refresh_backfills_in_chunks_then_only_new_days(tmp_path):
+    store, source = _store(tmp_path)
+    store.refresh(7, now=NOW)
+    # Materialized through open day - settle - 1 = 2026-05-18, in <=31-day chunks
+    assert source.calls[0][0] == date(2026, 3, 1)
+    assert source.calls[-1][1] == date(2026, 5, 18)
+    assert all((last - first).days < 31 for first, last, _ in source.calls)
+
+    source.calls.clear()
+    store.refresh(7, now=NOW + timedelta(days=2))
+    assert source.calls == [(date(2026, 5, 19), date(2026, 5, 20), 7)]
+
+
+def test_daily_rows_merge_stored_history_with_live_tail(tmp_path):
+    store, source = _store(tmp_path)
+    store.refresh(7, now=NOW)
+    source.calls.clear()
+
+    rows = store.daily_rows(date(2026, 5, 15), date(2026, 5, 20), 7)
+    # Only the unsettled day and the open day are read live
+    assert source.calls == [(date(2026, 5, 19), date(2026, 5, 20), 7)]
+    # 2026-05-17 is a Sunday → no receipts → no row
+    assert [r["biz_date"] for r in rows] == [
+        date(2026, 5, 15), date(2026, 5, 16), date(2026, 5, 18),
+        date(2026, 5, 19), date(2026, 5, 20),
+    ]
+    assert rows[0] == {
+        "biz_date": date(2026, 5, 15), "receipts": 1, "amount": 15.0,
+        "item_qty": 2.0, "unique_items": 1,
+    }
+
+
+def test_boundaries_are_stored_independently(tmp_path):
+    store, source = _store(tmp_path)
+    store.refresh(7, now=NOW)
+    assert store.daily_rows("2026-04-01", "2026-04-01", 7)[0]["amount"] == 1.0
+
+    source.calls.clear()
+    store.refresh(8, now=NOW)
+    assert source.calls and all(h == 8 for _, _, h in source.calls)
+
+
+def test_empty_history_reads_everything_live(tmp_path):
+    store, source = _store(tmp_path, first=None)
+    assert store.refresh(7, now=NOW) == 0
+    assert store.first_day(7) is None
+    store.daily_rows(date(2026, 5, 19), date(2026, 5, 20), 7)
+    assert source.calls == [(date(2026, 5, 19), date(2026, 5, 20), 7)]
+
+
+def test_first_read_is_served_live_while_the_backfill_runs(tmp_path):
+    store, source = _store(tmp_path)
+    release = threading.Event()
+    fetch_days = source.fetch_days
+
+    def slow_backfill(first, last, boundary_hour):
+        if threading.current_thread().name.startswith("rollup-refresh"):
+            release.wait(5)
+        return fetch_days(first, last, boundary_hour)
+
+    source.fetch_days = slow_backfill
+    rows = store.daily_rows(date(2026, 4, 1), date(2026, 4, 3), 7)
+    assert [r["amount"] for r in rows] == [1.0, 2.0, 3.0]
+    assert store._state(7) == (None, None) and store.first_day(7) == date(2026, 3, 1)
+
+    release.set()
+    store.start_refresh(7).join(5)
+    assert store._state(7)[1] is not None
+    source.calls.clear()
+    assert store.daily_rows(date(2026, 4, 1), date(2026, 4, 3), 7) == rows
+    assert source.calls == []
+
+
+def test_store_built_from_another_backend_is_emptied(tmp_path):
+    path = str(tmp_path / "rollup.sqlite3")
+    store = DailyRollupStore(path, FakeSource(date(2026, 3, 1)), backend="standin")
+    store.refresh(7, now=NOW)
+    assert DailyRollupStore(path, FakeSource(None), backend="standin")._state(7)[1] is not None
+
+    other = DailyRollupStore(path, FakeSource(None), backend="mssql")
+    assert other._state(7) == (None, None)
+    assert other._conn().execute("SELECT COUNT(*) FROM daily_rollup").fetchone()[0] == 0
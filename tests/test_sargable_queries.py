@@ -0,0 +1,155 @@
+# tests/test_sargable_queries.py
+"""
+Regression tests: BizDate-windowed helpers must filter HISTORIC_RECEIPT with
+RCPT_DATE >= ? AND RCPT_DATE < ? bounds, never with an expression on
+RCPT_DATE (CAST/DATEADD/...) in a predicate, which forces a full scan.
+
+Each helper runs against a recording fake connection; helpers that read
+through the rollup store / item cube get stores wired to the same fake, so
+their source SQL is checked too.
+"""
+import re
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import pytest
+
+import helpers_intelligence as hi
+from cache_utils import clear_cache
+from item_cube import ItemCube, MssqlCubeSource
+from rollups import DailyRollupStore, MssqlRollupSource
+
+MAX_DT = datetime(2026, 5, 20, 13, 30)
+
+# A predicate line (WHERE/AND/OR/ON/HAVING) that wraps RCPT_DATE in a function
+# (aggregates such as HAVING MAX(RCPT_DATE) < ? are fine)
+_WRAPPED_PREDICATE = re.compile(
+    r"^\s*(WHERE|AND|OR|ON|HAVING)\b.*\b(?!MAX\b|MIN\b)\w+\s*\([^()]*\bRCPT_DATE\b",
+    re.IGNORECASE | re.MULTILINE,
+)
+_RECEIPT_SCAN = re.compile(r"\bdbo\.HISTORIC_RECEIPT\b(?!_)", re.IGNORECASE)
+_BOUNDED = re.compile(r"RCPT_DATE\s*>=\s*\?\s*AND\s+r\.RCPT_DATE\s*<\s*\?", re.IGNORECASE)
+_SEEK = re.compile(r"SELECT\s+(MAX|MIN)\(\s*(r\.)?RCPT_DATE\s*\)", re.IGNORECASE)
+
+
+class _Row:
+    def __init__(self, **values):
+        self.__dict__.update(values)
+
+    def __getitem__(self, i):
+        return list(self.__dict__.values())[i]
+
+
+class RecordingCursor:
+    def __init__(self, log):
+        self.log = log
+
+    def execute(self, sql, params=()):
+        self.log.append(sql)
+
+    def fetchone(self):
+        return _Row(max_dt=MAX_DT, min_dt=datetime(2025, 1, 1, 9))
+
+    def fetchall(self):
+        return []
+
+
+class RecordingConnection:
+    def __init__(self, log):
+        self.log = log
+
+    def cursor(self):
+        return RecordingCursor(self.log)
+
+
+def assert_sargable(sql):
+    assert not _WRAPPED_PREDICATE.search(sql), sql
+    if _SEEK.search(sql):
+        return
+    # Every other read of the receipt header table carries explicit bounds
+    # (a BizDate filter on an unbounded CTE still scans the whole table)
+    assert _BOUNDED.search(sql), sql
+
+
+@pytest.fixture
+def statements(monkeypatch, tmp_path):
+    log = []
+
+    @contextmanager
+    def fake_connect():
+        yield RecordingConnection(log)
+
+    monkeypatch.setattr(hi, "_connect", fake_connect)
+
+    store = DailyRollupStore(str(tmp_path / "rollup.sqlite3"), MssqlRollupSource(fake_connect), background=False)
+    cube = ItemCube(str(tmp_path / "cube"), MssqlCubeSource(fake_connect), background=False)
+    monkeypatch.setattr(hi, "rollup_store", lambda: store)
+    monkeypatch.setattr(hi, "rollup_rows", store.daily_rows)
+    monkeypatch.setattr(hi, "get_cube", lambda: cube)
+    clear_cache()
+    yield log
+    clear_cache()
+
+
+HELPERS = {
+    "search_items_explorer": lambda: hi.search_items_explorer(query="tea", days=30),
+    "get_item_daily_series": lambda: hi.get_item_daily_series("100", days=30, lookback=14),
+    "get_item_momentum_kpis": lambda: hi.get_item_momentum_kpis("100", days=30),
+    "search_invoices": lambda: hi.search_invoices(date(2026, 5, 1), date(2026, 5, 20), q="5"),
+    "search_invoices_default_window": lambda: hi.search_invoices(),
+    "get_invoices_list": lambda: hi.get_invoices_list("2026-05-01", "2026-05-20"),
+    "get_invoices_list_open_range": lambda: hi.get_invoices_list(),
+    "get_daily_items_summary": lambda: hi.get_daily_items_summary("2026-05-01", "2026-05-20"),
+    "get_daily_items_for_date": lambda: hi.get_daily_items_for_date("2026-05-19"),
+    "get_daily_items_summary_legacy": lambda: hi.get_daily_items_summary_legacy(date(2026, 5, 1), date(2026, 5, 20)),
+    "get_daily_items_detail": lambda: hi.get_daily_items_detail(date(2026, 5, 19)),
+    "get_item_last_invoices": lambda: hi.get_item_last_invoices("100", days=30),
+    "get_dead_items": lambda: hi.get_dead_items(dead_days=60, window_days=180),
+    "get_dead_items_page": lambda: hi.get_dead_items_page(lookback_days=90, dead_days=30),
+    "get_pos_sales_total_by_range": lambda: hi.get_pos_sales_total_by_range("2026-05-01", "2026-05-20"),
+    "get_pos_sales_daily_by_range": lambda: hi.get_pos_sales_daily_by_range("2026-05-01", "2026-05-20"),
+    "get_top_items": lambda: hi.get_top_items(limit=10, days=1),
+    "get_subgroup_velocity": lambda: hi.get_subgroup_velocity(days=14, top=8),
+    "get_affinity_pairs": lambda: hi.get_affinity_pairs(days=30, top=15),
+    "get_hourly_profile": lambda: hi.get_hourly_profile(days=30),
+    "get_top_windows": lambda: hi.get_top_windows(),
+}
+
+
+@pytest.mark.parametrize("name", sorted(HELPERS))
+def test_helper_sql_is_sargable(statements, name):
+    HELPERS[name]()
+    receipt_reads = [sql for sql in statements if _RECEIPT_SCAN.search(sql)]
+    assert receipt_reads, f"{name} issued no receipt query"
+    for sql in receipt_reads:
+        assert_sargable(sql)
+
+
+def test_checker_rejects_the_old_bizdate_filter():
+    with pytest.raises(AssertionError):
+        assert_sargable("""
+            SELECT r.RCPT_ID FROM dbo.HISTORIC_RECEIPT r
+            WHERE CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date) >= ?
+        """)
+    with pytest.raises(AssertionError):
+        assert_sargable("""
+            SELECT r.RCPT_ID FROM dbo.HISTORIC_RECEIPT r
+            WHERE r.RCPT_DATE >= ? AND r.RCPT_DATE < ?
+              AND DATEADD(HOUR, -7, r.RCPT_DATE) >= ?
+        """)
+    with pytest.raises(AssertionError):
+        assert_sargable("""
+            WITH R AS (SELECT r.RCPT_ID, CAST(DATEADD(HOUR, -7, r.RCPT_DATE) AS date) AS BizDate
+                       FROM dbo.HISTORIC_RECEIPT r)
+            SELECT * FROM R r
+            WHERE r.BizDate = CAST(? AS date)
+        """)
+
+
+def test_window_bounds_are_anchored_on_max_rcpt_date(statements):
+    with hi._connect() as cn:
+        start, end, max_biz = hi._trailing_window(cn.cursor(), 30)
+    assert max_biz == date(2026, 5, 20)
+    assert start == datetime(2026, 4, 21, 7)
+    assert end == datetime(2026, 5, 21, 7)
+    assert statements == ["SET NOCOUNT ON; SELECT MAX(r.RCPT_DATE) AS max_dt FROM dbo.HISTORIC_RECEIPT r;"]
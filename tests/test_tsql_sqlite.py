@@ -0,0 +1,119 @@
+"""Tests for tsql_sqlite.py — T-SQL translation and the pyodbc-style wrapper."""
+import sqlite3
+from datetime import date, datetime
+
+import pytest
+
+import tsql_sqlite
+from tsql_sqlite import translate
+
+
+def _one(sql):
+    stmts = translate(sql)
+    assert len(stmts) == 1
+    return stmts[0]
+
+
+def test_top_becomes_limit_and_dbo_is_dropped():
+    t = _one("SELECT TOP (?) r.RCPT_ID FROM dbo.HISTORIC_RECEIPT r WHERE r.RCPT_ID > ? ORDER BY r.RCPT_ID")
+    assert "dbo." not in t.sql
+    assert t.sql.endswith("LIMIT ?")
+    # TOP's parameter is bound last now
+    assert t.bind(["n", "id"]) == ["id", "n"]
+
+
+def test_set_and_declare_are_consumed_and_variables_inlined():
+    stmts = translate("""
+        SET NOCOUNT ON;
+        DECLARE @d date = ?;
+        SELECT COUNT(*) AS n FROM dbo.HISTORIC_RECEIPT WHERE RCPT_DATE >= @d AND RCPT_DATE < DATEADD(DAY, 1, @d);
+    """)
+    assert len(stmts) == 1
+    assert "tsql_dateadd('day'" in stmts[0].sql
+    assert stmts[0].bind(["2026-05-01"]) == ["2026-05-01", "2026-05-01"]
+
+
+def test_offset_fetch_and_temp_tables():
+    t = _one("SELECT RCPT_ID FROM HISTORIC_RECEIPT ORDER BY RCPT_ID OFFSET ? ROWS FETCH NEXT ? ROWS ONLY")
+    assert "LIMIT ? OFFSET ?" in t.sql
+    assert t.bind([10, 20]) == [20, 10]
+
+    stmts = translate("""
+        IF OBJECT_ID('tempdb..#Rcpt') IS NOT NULL DROP TABLE #Rcpt;
+        SELECT r.RCPT_ID INTO #Rcpt FROM dbo.HISTORIC_RECEIPT r;
+        CREATE CLUSTERED INDEX IX_Rcpt ON #Rcpt (RCPT_ID);
+    """)
+    assert [s.sql.split()[0] for s in stmts] == ["DROP", "CREATE", "CREATE"]
+    assert stmts[1].sql.startswith('CREATE TEMP TABLE "#Rcpt" AS')
+    assert "temp.IX_Rcpt" in stmts[2].sql
+
+
+def test_like_character_class_becomes_glob():
+    t = _one("SELECT 1 WHERE x NOT LIKE N'%[^0-9]%'")
+    assert "NOT GLOB '*[^0-9]*'" in t.sql
+
+
+@pytest.fixture
+def cn(tmp_path):
+    path = str(tmp_path / "pos.sqlite3")
+    raw = sqlite3.connect(path)
+    raw.executescript("""
+        CREATE TABLE HISTORIC_RECEIPT (RCPT_ID INTEGER PRIMARY KEY, RCPT_NO INTEGER,
+                                       RCPT_DATE TEXT, RCPT_AMOUNT REAL);
+        INSERT INTO HISTORIC_RECEIPT VALUES
+            (1, 1, '2026-05-19 06:30:00', 100.0),
+            (2, 2, '2026-05-19 07:15:00', 250.0),
+            (3, 3, '2026-05-20 01:00:00', 50.0);
+    """)
+    raw.commit()
+    raw.close()
+    conn = tsql_sqlite.connect(path)
+    yield conn
+    conn.close()
+
+
+def test_date_functions_match_tsql(cn):
+    cur = cn.cursor()
+    cur.execute("""
+        SELECT CAST(DATEADD(HOUR, -7, RCPT_DATE) AS date) AS BizDate,
+               DATEPART(HOUR, RCPT_DATE)                  AS h,
+               CONVERT(varchar(10), RCPT_DATE, 120)       AS d_txt,
+               DATEDIFF(DAY, RCPT_DATE, ?)                AS age
+        FROM dbo.HISTORIC_RECEIPT ORDER BY RCPT_ID
+    """, date(2026, 5, 21))
+    rows = cur.fetchall()
+    assert [r.BizDate for r in rows] == [date(2026, 5, 18), date(2026, 5, 19), date(2026, 5, 19)]
+    assert [r.h for r in rows] == [6, 7, 1]
+    assert rows[0].d_txt == "2026-05-19"  # explicit char conversion stays text
+    assert [r[3] for r in rows] == [2, 2, 1]
+
+
+def test_cursor_surface_like_pyodbc(cn):
+    cur = cn.cursor()
+    cur.execute("SELECT MAX(RCPT_DATE) AS mx, SUM(RCPT_AMOUNT) AS total FROM dbo.HISTORIC_RECEIPT "
+                "WHERE RCPT_DATE >= ?", (datetime(2026, 5, 19, 7),))
+    row = cur.fetchone()
+    assert row.mx == datetime(2026, 5, 20, 1, 0)
+    assert row.total == 300.0
+    assert [d[0] for d in cur.description] == ["mx", "total"]
+
+    cur.execute("SELECT RCPT_ID FROM HISTORIC_RECEIPT ORDER BY RCPT_ID")
+    assert [r[0] for r in cur.fetchmany(2)] == [1, 2]
+    assert [r[0] for r in cur.fetchmany(2)] == [3]
+
+
+def test_connection_is_read_only(cn):
+    with pytest.raises(sqlite3.OperationalError):
+        cn.cursor().execute("DELETE FROM HISTORIC_RECEIPT")
+
+
+def test_declared_temp_table_is_writable_on_a_read_only_connection(cn):
+    cur = cn.cursor()
+    cur.execute("""
+        IF OBJECT_ID('tempdb..#T') IS NOT NULL DROP TABLE #T;
+        CREATE TABLE #T (ITM_CODE nvarchar(50) COLLATE DATABASE_DEFAULT NOT NULL PRIMARY KEY CLUSTERED,
+                         Name nvarchar(200) NULL);
+    """)
+    cur.executemany("INSERT INTO #T (ITM_CODE, Name) VALUES (?, ?);", [("1", "a"), ("2", "b")])
+    cur.execute("SELECT COUNT(*) AS n FROM #T")
+    assert cur.fetchone().n == 2
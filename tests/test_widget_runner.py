@@ -0,0 +1,89 @@
+# tests/test_widget_runner.py
+"""Tests for routes/widget_runner.py — concurrent widgets, timeouts, partial results."""
+import threading
+import time
+
+import pytest
+
+
+@pytest.fixture(scope="module")
+def widget_runner(load_root_module):
+    return load_root_module("widget_runner", "routes/widget_runner.py")
+
+
+@pytest.fixture
+def run_widgets(widget_runner):
+    return widget_runner.run_widgets
+
+
+@pytest.fixture(autouse=True)
+def fresh_executor(monkeypatch, widget_runner):
+    monkeypatch.setattr(widget_runner, "_executor", None)
+    yield
+    if widget_runner._executor is not None:
+        widget_runner._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _sleepy(seconds, value):
+    time.sleep(seconds)
+    return value
+
+
+def test_widgets_run_concurrently(run_widgets):
+    widgets = {f"w{i}": (_sleepy, {"seconds": 0.3, "value": i}) for i in range(4)}
+    t0 = time.monotonic()
+    out = run_widgets(widgets, timeout=5, max_workers=4)
+    elapsed = time.monotonic() - t0
+
+    assert out["widgets"] == {"w0": 0, "w1": 1, "w2": 2, "w3": 3}
+    assert out["errors"] == {}
+    assert set(out["timings_ms"]) == set(widgets)
+    assert elapsed < 0.9  # ~slowest widget, not the 1.2s sum
+
+
+def test_failing_widget_is_reported_without_failing_the_bundle(run_widgets):
+    def boom():
+        raise RuntimeError("db down")
+
+    out = run_widgets({"ok": (_sleepy, {"seconds": 0, "value": 1}), "bad": (boom, {})},
+                      timeout=5, max_workers=2)
+    assert out["widgets"] == {"ok": 1, "bad": None}
+    assert out["errors"] == {"bad": "RuntimeError: db down"}
+
+
+def test_slow_widget_times_out_and_the_rest_return(run_widgets):
+    release = threading.Event()
+
+    def stuck():
+        release.wait(5)
+        return "late"
+
+    t0 = time.monotonic()
+    out = run_widgets({"fast": (_sleepy, {"seconds": 0, "value": "ok"}), "slow": (stuck, {})},
+                      timeout=0.3, max_workers=2)
+    elapsed = time.monotonic() - t0
+    release.set()
+
+    assert out["widgets"] == {"fast": "ok", "slow": None}
+    assert out["errors"] == {"slow": "timed out after 0.3s"}
+    assert elapsed < 1.0
+
+
+def test_queued_widgets_are_cancelled_at_the_overall_deadline(run_widgets):
+    release = threading.Event()
+    ran = []
+
+    def stuck():
+        release.wait(5)
+
+    def never():
+        ran.append(True)
+
+    out = run_widgets({"stuck": (stuck, {}), "queued": (never, {})},
+                      timeout=5, max_workers=1, total_timeout=0.3)
+    release.set()
+
+    assert out["errors"]["queued"] == "timed out after 0.3s (queued)"
+    assert out["errors"]["stuck"] == "timed out after 0.3s"
+    time.sleep(0.1)
+    assert ran == []
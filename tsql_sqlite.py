@@ -0,0 +1,918 @@
+# tsql_sqlite.py
+"""
+pyodbc-compatible connection over a local SQLite copy of the POS tables.
+
+The analytics helpers speak T-SQL. To run them unchanged against the local
+replica (pos_sync.py) this module translates the subset of T-SQL they use
+into SQLite and wraps sqlite3 in the pyodbc surface they touch:
+connect() -> connection.cursor() -> execute(sql, params) -> fetchone /
+fetchall / fetchmany / description, rows readable by index or attribute.
+
+Translated:
+  - batches: statements split on ';'; SET ... and DECLARE @v type = expr are
+    consumed (later @v references are inlined with their parameters)
+  - IF OBJECT_ID('tempdb..#T') IS NOT NULL DROP TABLE #T, SELECT ... INTO #T,
+    CREATE TABLE #T (...), CREATE [NON]CLUSTERED INDEX ... ON #T  (temp tables)
+  - SELECT TOP (n) -> LIMIT n;  OFFSET x ROWS FETCH NEXT y ROWS ONLY
+  - CROSS APPLY (SELECT <expr> AS a, ...) AS x  (x.a is inlined)
+  - [TRY_]CAST / [TRY_]CONVERT, DATEADD / DATEDIFF / DATEPART, GETDATE(),
+    ISNULL, LEN, LEFT / RIGHT, CHECKSUM_AGG(BINARY_CHECKSUM(...)) (values
+    differ from MSSQL's; only changes matter), N'...' literals, dbo. prefixes,
+    '...' + x concatenation, LIKE patterns with [...] character classes
+    (-> GLOB), COLLATE <any> (-> NOCASE)
+
+Dates are stored as text ('YYYY-MM-DD HH:MM:SS' / 'YYYY-MM-DD'), which
+sorts and compares like the MSSQL types. Result values that look like dates
+come back as datetime / date objects (as pyodbc returns them), except
+columns the query explicitly converted to character data.
+
+Anything else is passed through as is; SQLite reports what it cannot parse.
+"""
+from __future__ import annotations
+
+import re
+import sqlite3
+import zlib
+from datetime import date, datetime, time as dt_time, timedelta
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# ---------- Tokenizer ----------
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<ws>\s+|--[^\n]*|/\*.*?\*/)
+  | (?P<str>[Nn]?'(?:[^']|'')*')
+  | (?P<qid>\[[^\]]*\]|"[^"]*")
+  | (?P<num>\d+(?:\.\d*)?(?:[eE][-+]?\d+)?|\.\d+)
+  | (?P<id>[A-Za-z_#@][\w#@$]*)
+  | (?P<param>\?)
+  | (?P<op><=|>=|<>|!=|\|\||[-+*/%=<>(),.;~&|^])
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+class Tok:
+    __slots__ = ("kind", "text", "param")
+
+    def __init__(self, kind: str, text: str, param: Optional[int] = None):
+        self.kind = kind
+        self.text = text
+        self.param = param  # original parameter index of a '?'
+
+    @property
+    def upper(self) -> str:
+        return self.text.upper()
+
+    def is_kw(self, *words: str) -> bool:
+        return self.kind == "id" and self.text.upper() in words
+
+    def __repr__(self) -> str:  # debugging aid
+        return f"Tok({self.kind}, {self.text!r})"
+
+
+def tokenize(sql: str) -> List[Tok]:
+    out: List[Tok] = []
+    pos, n_param = 0, 0
+    while pos < len(sql):
+        m = _TOKEN_RE.match(sql, pos)
+        if not m:
+            raise sqlite3.OperationalError(f"Cannot tokenize SQL near: {sql[pos:pos + 30]!r}")
+        kind = m.lastgroup
+        text = m.group()
+        pos = m.end()
+        if kind == "ws":
+            if not out or out[-1].kind != "ws":
+                out.append(Tok("ws", " "))
+            continue
+        if kind == "str" and text[0] in "Nn":
+            text = text[1:]
+        if kind == "param":
+            out.append(Tok("param", "?", n_param))
+            n_param += 1
+            continue
+        out.append(Tok(kind, text))
+    return out
+
+
+def _sig(tokens: List[Tok], i: int, step: int = 1) -> int:
+    """Index of the next non-whitespace token from i (inclusive) in <step> direction, or -1/len."""
+    while 0 <= i < len(tokens) and tokens[i].kind == "ws":
+        i += step
+    return i
+
+
+def _match_paren(tokens: List[Tok], i: int) -> int:
+    """tokens[i] is '('; returns the index of its matching ')'."""
+    depth = 0
+    for j in range(i, len(tokens)):
+        t = tokens[j]
+        if t.kind == "op" and t.text == "(":
+            depth += 1
+        elif t.kind == "op" and t.text == ")":
+            depth -= 1
+            if depth == 0:
+                return j
+    raise sqlite3.OperationalError("Unbalanced parentheses in SQL")
+
+
+def _split_top(tokens: List[Tok], sep: str = ",") -> List[List[Tok]]:
+    """Split on <sep> at paren depth 0."""
+    parts: List[List[Tok]] = [[]]
+    depth = 0
+    for t in tokens:
+        if t.kind == "op" and t.text == "(":
+            depth += 1
+        elif t.kind == "op" and t.text == ")":
+            depth -= 1
+        if depth == 0 and t.kind == "op" and t.text == sep:
+            parts.append([])
+            continue
+        parts[-1].append(t)
+    return parts
+
+
+def _strip(tokens: List[Tok]) -> List[Tok]:
+    a, b = 0, len(tokens)
+    while a < b and tokens[a].kind == "ws":
+        a += 1
+    while b > a and tokens[b - 1].kind == "ws":
+        b -= 1
+    return tokens[a:b]
+
+
+def _raw(text: str) -> List[Tok]:
+    """Tokens for SQL written by the translator itself (no parameters)."""
+    return [t for t in tokenize(text)]
+
+
+def _wrap(tokens: List[Tok]) -> List[Tok]:
+    return [Tok("op", "(")] + tokens + [Tok("op", ")")]
+
+
+# ---------- Types ----------
+_CHAR_TYPES = {"VARCHAR", "NVARCHAR", "CHAR", "NCHAR", "TEXT", "NTEXT", "SYSNAME"}
+_INT_TYPES = {"INT", "BIGINT", "SMALLINT", "TINYINT", "BIT"}
+_REAL_TYPES = {"FLOAT", "REAL"}
+_DEC_TYPES = {"DECIMAL", "NUMERIC", "MONEY", "SMALLMONEY"}
+_DATETIME_TYPES = {"DATETIME", "DATETIME2", "SMALLDATETIME", "DATETIMEOFFSET"}
+
+
+def _parse_type(tokens: List[Tok]) -> Tuple[str, List[str]]:
+    toks = [t for t in tokens if t.kind != "ws"]
+    name = toks[0].upper
+    args = [t.text for t in toks[1:] if t.kind == "num"]
+    return name, args
+
+
+def _cast_to(expr: List[Tok], type_name: str, type_args: List[str], style: Optional[str] = None) -> List[Tok]:
+    if type_name == "DATE":
+        return _raw("tsql_date") + _wrap(expr)
+    if type_name in _DATETIME_TYPES:
+        return _raw("tsql_datetime") + _wrap(expr)
+    if type_name == "TIME":
+        return _raw("tsql_time") + _wrap(expr)
+    if type_name in _INT_TYPES:
+        return _raw("CAST") + _wrap(expr + _raw(" AS INTEGER"))
+    if type_name in _REAL_TYPES:
+        return _raw("CAST") + _wrap(expr + _raw(" AS REAL"))
+    if type_name in _DEC_TYPES:
+        scale = type_args[1] if len(type_args) > 1 else ("4" if "MONEY" in type_name else "0")
+        return _raw("ROUND") + _wrap(_raw("CAST") + _wrap(expr + _raw(" AS REAL")) + _raw(f", {scale}"))
+    if type_name in _CHAR_TYPES:
+        if style is not None:
+            length = type_args[0] if type_args and type_args[0].isdigit() else "30"
+            return _raw("substr") + _wrap(_raw("tsql_datetime") + _wrap(expr) + _raw(f", 1, {length}"))
+        return _raw("tsql_text") + _wrap(expr)
+    return expr
+
+
+def _try_cast_to(expr: List[Tok], type_name: str, type_args: List[str]) -> List[Tok]:
+    # Numeric TRY_CAST yields NULL for non-numeric text (plain CAST gives 0)
+    if type_name in _INT_TYPES or type_name in _REAL_TYPES or type_name in _DEC_TYPES:
+        kind = "int" if type_name in _INT_TYPES else "real"
+        return _cast_to(_raw("tsql_try_number") + _wrap(expr + _raw(f", '{kind}'")), type_name, type_args)
+    return _cast_to(expr, type_name, type_args)
+
+
+# ---------- Expression-level rewrites ----------
+_DATEPARTS = {
+    "YEAR": "year", "YY": "year", "YYYY": "year",
+    "QUARTER": "quarter", "QQ": "quarter", "Q": "quarter",
+    "MONTH": "month", "MM": "month", "M": "month",
+    "DAYOFYEAR": "dayofyear", "DY": "dayofyear", "Y": "dayofyear",
+    "DAY": "day", "DD": "day", "D": "day",
+    "WEEK": "week", "WK": "week", "WW": "week",
+    "WEEKDAY": "weekday", "DW": "weekday", "W": "weekday",
+    "HOUR": "hour", "HH": "hour",
+    "MINUTE": "minute", "MI": "minute", "N": "minute",
+    "SECOND": "second", "SS": "second", "S": "second",
+}
+
+_RENAMED_FUNCS = {"ISNULL": "IFNULL", "LEN": "LENGTH", "GETDATE": "tsql_now",
+                  "SYSDATETIME": "tsql_now", "CURRENT_TIMESTAMP": "tsql_now",
+                  "BINARY_CHECKSUM": "tsql_binary_checksum", "CHECKSUM_AGG": "tsql_checksum_agg"}
+
+
+def _like_to_glob(pattern: str) -> str:
+    body = pattern[1:-1].replace("''", "'")
+    out, i = [], 0
+    while i < len(body):
+        c = body[i]
+        if c == "[":
+            j = body.index("]", i)
+            out.append(body[i:j + 1])
+            i = j + 1
+            continue
+        out.append({"%": "*", "_": "?", "*": "[*]", "?": "[?]"}.get(c, c))
+        i += 1
+    return "'" + "".join(out).replace("'", "''") + "'"
+
+
+def _rewrite_expr(tokens: List[Tok], text_aliases: set) -> List[Tok]:
+    """Rewrite function calls, literals and operators inside one statement body."""
+    out: List[Tok] = []
+    i = 0
+    while i < len(tokens):
+        t = tokens[i]
+
+        # dbo.X -> X
+        if t.is_kw("DBO"):
+            j = _sig(tokens, i + 1)
+            if j < len(tokens) and tokens[j].text == ".":
+                i = _sig(tokens, j + 1)
+                continue
+
+        # temp tables
+        if t.kind == "id" and t.text.startswith("#"):
+            out.append(Tok("qid", f'"{t.text}"'))
+            i += 1
+            continue
+
+        if t.kind == "id":
+            j = _sig(tokens, i + 1)
+            is_call = j < len(tokens) and tokens[j].kind == "op" and tokens[j].text == "("
+            name = t.upper
+            if name == "CURRENT_TIMESTAMP" and not is_call:
+                out += _raw("tsql_now()")
+                i += 1
+                continue
+            if is_call:
+                k = _match_paren(tokens, j)
+                inner = tokens[j + 1:k]
+                replacement = _rewrite_call(name, t.text, inner, text_aliases)
+                if replacement is not None:
+                    out += replacement
+                    i = k + 1
+                    continue
+
+            # COLLATE <SQL Server collation> -> COLLATE NOCASE (the POS is case-insensitive)
+            if name == "COLLATE":
+                j = _sig(tokens, i + 1)
+                out += _raw("COLLATE NOCASE")
+                i = j + 1
+                continue
+
+            # [NOT] LIKE '[..]' -> GLOB
+            if name == "LIKE":
+                j = _sig(tokens, i + 1)
+                if j < len(tokens) and tokens[j].kind == "str" and "[" in tokens[j].text:
+                    out.append(Tok("id", "GLOB"))
+                    out.append(Tok("ws", " "))
+                    out.append(Tok("str", _like_to_glob(tokens[j].text)))
+                    i = j + 1
+                    continue
+
+        # '...' + x  /  x + '...'  -> ||
+        if t.kind == "op" and t.text == "+":
+            p = _sig(out, len(out) - 1, -1)
+            q = _sig(tokens, i + 1)
+            prev_str = p >= 0 and out[p].kind == "str"
+            next_str = q < len(tokens) and tokens[q].kind == "str"
+            if prev_str or next_str:
+                out.append(Tok("op", "||"))
+                i += 1
+                continue
+
+        if t.kind == "op" and t.text == "(":
+            k = _match_paren(tokens, i)
+            out += _wrap(_rewrite_expr(tokens[i + 1:k], text_aliases))
+            i = k + 1
+            continue
+
+        out.append(t)
+        i += 1
+    return out
+
+
+def _rewrite_call(name: str, original: str, inner: List[Tok], text_aliases: set) -> Optional[List[Tok]]:
+    args = [_strip(a) for a in _split_top(inner)] if _strip(inner) else []
+
+    def x(tokens: List[Tok]) -> List[Tok]:
+        return _rewrite_expr(tokens, text_aliases)
+
+    if name in ("CAST", "TRY_CAST"):
+        # [TRY_]CAST(<expr> AS <type>)
+        depth, split = 0, None
+        for idx, t in enumerate(inner):
+            if t.kind == "op" and t.text == "(":
+                depth += 1
+            elif t.kind == "op" and t.text == ")":
+                depth -= 1
+            elif depth == 0 and t.is_kw("AS"):
+                split = idx
+        if split is None:
+            return None
+        type_name, type_args = _parse_type(inner[split + 1:])
+        if name == "TRY_CAST":
+            return _try_cast_to(x(_strip(inner[:split])), type_name, type_args)
+        return _cast_to(x(_strip(inner[:split])), type_name, type_args)
+
+    if name in ("CONVERT", "TRY_CONVERT") and len(args) >= 2:
+        type_name, type_args = _parse_type(args[0])
+        style = "".join(t.text for t in args[2]) if len(args) > 2 else None
+        if name == "TRY_CONVERT" and style is None:
+            return _try_cast_to(x(args[1]), type_name, type_args)
+        return _cast_to(x(args[1]), type_name, type_args, style)
+
+    if name in ("DATEADD", "DATEDIFF", "DATEPART", "DATENAME") and args:
+        part = _DATEPARTS.get("".join(t.text for t in args[0]).upper())
+        if part is None:
+            return None
+        rest: List[Tok] = []
+        for a in args[1:]:
+            rest += [Tok("op", ",")] + x(a)
+        return _raw(f"tsql_{name.lower()}") + _wrap(_raw(f"'{part}'") + rest)
+
+    if name in ("LEFT", "RIGHT") and len(args) == 2:
+        if name == "LEFT":
+            return _raw("substr") + _wrap(x(args[0]) + _raw(", 1, ") + x(args[1]))
+        return _raw("substr") + _wrap(x(args[0]) + _raw(", -") + _wrap(x(args[1])))
+
+    if name in _RENAMED_FUNCS:
+        body: List[Tok] = []
+        for n, a in enumerate(args):
+            body += ([Tok("op", ",")] if n else []) + x(a)
+        return _raw(_RENAMED_FUNCS[name]) + _wrap(body)
+
+    return None
+
+
+# ---------- Statement-level rewrites ----------
+class Translation:
+    """One executable SQLite statement plus where its parameters come from."""
+
+    def __init__(self, sql: str, param_map: List[int], text_columns: set):
+        self.sql = sql
+        self.param_map = param_map      # original parameter index per '?'
+        self.text_columns = text_columns  # aliases explicitly converted to text
+
+    def bind(self, params: Sequence[Any]) -> List[Any]:
+        return [params[i] for i in self.param_map]
+
+
+def _render(tokens: List[Tok]) -> Tuple[str, List[int]]:
+    parts, params = [], []
+    for t in tokens:
+        parts.append(t.text)
+        if t.kind == "param":
+            params.append(t.param)
+    return "".join(parts).strip(), params
+
+
+def _inline_variables(tokens: List[Tok], variables: Dict[str, List[Tok]]) -> List[Tok]:
+    out: List[Tok] = []
+    for t in tokens:
+        if t.kind == "id" and t.text.startswith("@") and t.text.upper() in variables:
+            out += _wrap(variables[t.text.upper()])
+        else:
+            out.append(t)
+    return out
+
+
+def _apply_cross_apply(tokens: List[Tok]) -> List[Tok]:
+    """CROSS APPLY (SELECT <expr> AS a, ...) AS x  ->  removed; x.a inlined as (<expr>)."""
+    while True:
+        idx = None
+        for i, t in enumerate(tokens):
+            if t.is_kw("CROSS"):
+                j = _sig(tokens, i + 1)
+                if j < len(tokens) and tokens[j].is_kw("APPLY"):
+                    idx = i
+                    break
+        if idx is None:
+            return tokens
+        open_i = _sig(tokens, _sig(tokens, idx + 1) + 1)
+        close_i = _match_paren(tokens, open_i)
+        body = _strip(tokens[open_i + 1:close_i])
+        if not body or not body[0].is_kw("SELECT") or any(t.is_kw("FROM") for t in body):
+            raise sqlite3.OperationalError("Only expression-only CROSS APPLY is supported")
+        j = _sig(tokens, close_i + 1)
+        if j < len(tokens) and tokens[j].is_kw("AS"):
+            j = _sig(tokens, j + 1)
+        alias = tokens[j].text.upper()
+        end = j + 1
+
+        columns: Dict[str, List[Tok]] = {}
+        for col in _split_top(body[1:]):
+            col = _strip(col)
+            as_i = max(n for n, t in enumerate(col) if t.is_kw("AS"))
+            columns[col[_sig(col, as_i + 1)].text.upper()] = _strip(col[:as_i])
+
+        rest = tokens[:idx] + tokens[end:]
+        out: List[Tok] = []
+        i = 0
+        while i < len(rest):
+            t = rest[i]
+            if t.kind == "id" and t.upper == alias and i + 2 < len(rest) and rest[i + 1].text == "." \
+                    and rest[i + 2].upper in columns:
+                out += _wrap(columns[rest[i + 2].upper])
+                i += 3
+                continue
+            out.append(t)
+            i += 1
+        tokens = out
+
+
+def _apply_top(tokens: List[Tok]) -> List[Tok]:
+    """SELECT [DISTINCT] TOP (n) ... -> SELECT ... LIMIT n (at the end of that SELECT)."""
+    while True:
+        found = None
+        depth = 0
+        for i, t in enumerate(tokens):
+            if t.kind == "op" and t.text == "(":
+                depth += 1
+            elif t.kind == "op" and t.text == ")":
+                depth -= 1
+            elif t.is_kw("TOP"):
+                p = _sig(tokens, i - 1, -1)
+                if p >= 0 and (tokens[p].is_kw("SELECT") or tokens[p].is_kw("DISTINCT")):
+                    found = (i, depth)
+                    break
+        if found is None:
+            return tokens
+        i, depth = found
+        j = _sig(tokens, i + 1)
+        if tokens[j].kind == "op" and tokens[j].text == "(":
+            k = _match_paren(tokens, j)
+            limit = tokens[j + 1:k]
+        else:
+            k = j
+            limit = [tokens[j]]
+        # End of this SELECT: closing paren of its level, UNION at its level, or end
+        d, end = 0, len(tokens)
+        for m in range(k + 1, len(tokens)):
+            t = tokens[m]
+            if t.kind == "op" and t.text == "(":
+                d += 1
+            elif t.kind == "op" and t.text == ")":
+                if d == 0:
+                    end = m
+                    break
+                d -= 1
+            elif d == 0 and t.is_kw("UNION", "EXCEPT", "INTERSECT"):
+                end = m
+                break
+        tokens = tokens[:i] + tokens[k + 1:end] + _raw(" LIMIT ") + limit + [Tok("ws", " ")] + tokens[end:]
+
+
+def _apply_offset_fetch(tokens: List[Tok]) -> List[Tok]:
+    """OFFSET x ROWS FETCH NEXT y ROWS ONLY -> LIMIT y OFFSET x."""
+    for i, t in enumerate(tokens):
+        if not t.is_kw("OFFSET"):
+            continue
+        rows_i = next((n for n in range(i + 1, len(tokens)) if tokens[n].is_kw("ROWS", "ROW")), None)
+        fetch_i = _sig(tokens, rows_i + 1) if rows_i is not None else None
+        if fetch_i is None or fetch_i >= len(tokens) or not tokens[fetch_i].is_kw("FETCH"):
+            continue
+        next_i = _sig(tokens, fetch_i + 1)
+        rows2_i = next(n for n in range(next_i + 1, len(tokens)) if tokens[n].is_kw("ROWS", "ROW"))
+        only_i = _sig(tokens, rows2_i + 1)
+        offset = tokens[i + 1:rows_i]
+        count = tokens[next_i + 1:rows2_i]
+        return (tokens[:i] + _raw("LIMIT ") + _strip(count) + _raw(" OFFSET ") + _strip(offset)
+                + tokens[only_i + 1:])
+    return tokens
+
+
+def _text_aliases(tokens: List[Tok]) -> set:
+    """Aliases whose expression is an explicit CAST/CONVERT to character data."""
+    out = set()
+    for i, t in enumerate(tokens):
+        if not t.is_kw("CAST", "CONVERT"):
+            continue
+        j = _sig(tokens, i + 1)
+        if j >= len(tokens) or tokens[j].text != "(":
+            continue
+        k = _match_paren(tokens, j)
+        inner = tokens[j + 1:k]
+        if t.is_kw("CONVERT"):
+            type_name = _parse_type(_split_top(inner)[0])[0]
+        else:
+            as_i = [n for n, x in enumerate(inner) if x.is_kw("AS")]
+            if not as_i:
+                continue
+            type_name = _parse_type(inner[as_i[-1] + 1:])[0]
+        if type_name not in _CHAR_TYPES:
+            continue
+        a = _sig(tokens, k + 1)
+        if a < len(tokens) and tokens[a].is_kw("AS"):
+            a = _sig(tokens, a + 1)
+            if a < len(tokens) and tokens[a].kind in ("id", "qid"):
+                out.add(tokens[a].text.strip('[]"').upper())
+    return out
+
+
+def translate(sql: str) -> List[Translation]:
+    """Translate a T-SQL batch into SQLite statements (in order)."""
+    statements = _split_top(tokenize(sql), ";")
+    variables: Dict[str, List[Tok]] = {}
+    out: List[Translation] = []
+    for stmt in statements:
+        stmt = _strip(stmt)
+        if not stmt:
+            continue
+        head = stmt[0].upper
+
+        if head == "SET":
+            continue
+
+        if head == "DECLARE":
+            stmt = _inline_variables(stmt, variables)
+            for decl in _split_top(stmt[1:]):
+                decl = _strip(decl)
+                name = decl[0].text.upper()
+                eq = next((n for n, t in enumerate(decl) if t.kind == "op" and t.text == "="), None)
+                expr = _strip(decl[eq + 1:]) if eq is not None else _raw("NULL")
+                variables[name] = expr
+            continue
+
+        stmt = _inline_variables(stmt, variables)
+
+        # IF OBJECT_ID('tempdb..#T') IS NOT NULL DROP TABLE #T
+        if head == "IF":
+            drop = next((n for n, t in enumerate(stmt) if t.is_kw("DROP")), None)
+            if drop is None:
+                raise sqlite3.OperationalError("Only IF OBJECT_ID(...) DROP TABLE is supported")
+            table = [t for t in stmt[drop:] if t.kind in ("id", "qid")][-1]
+            stmt = _raw(f'DROP TABLE IF EXISTS "{table.text}"')
+        elif head == "CREATE":
+            stmt = [t for t in stmt if not t.is_kw("CLUSTERED", "NONCLUSTERED")]
+            idx = next((n for n, t in enumerate(stmt) if t.is_kw("INDEX")), None)
+            on = next((n for n, t in enumerate(stmt) if t.is_kw("ON")), None)
+            if idx is not None and on is not None and stmt[_sig(stmt, on + 1)].text.startswith("#"):
+                name_i = _sig(stmt, idx + 1)
+                stmt = stmt[:name_i] + [Tok("id", "temp." + stmt[name_i].text)] + stmt[name_i + 1:]
+            elif idx is None:
+                # CREATE TABLE #T (...)  ->  CREATE TEMP TABLE "#T" (...)
+                table_i = _sig(stmt, 1)
+                if stmt[table_i].is_kw("TABLE") and stmt[_sig(stmt, table_i + 1)].text.startswith("#"):
+                    stmt = stmt[:table_i] + _raw("TEMP ") + stmt[table_i:]
+        elif head in ("SELECT", "WITH"):
+            # SELECT ... INTO #T FROM ...  ->  CREATE TEMP TABLE "#T" AS SELECT ... FROM ...
+            depth = 0
+            for n, t in enumerate(stmt):
+                if t.kind == "op" and t.text == "(":
+                    depth += 1
+                elif t.kind == "op" and t.text == ")":
+                    depth -= 1
+                elif depth == 0 and t.is_kw("INTO"):
+                    target = _sig(stmt, n + 1)
+                    name = stmt[target].text
+                    stmt = (_raw(f'CREATE TEMP TABLE "{name}" AS ') + stmt[:n] + stmt[target + 1:])
+                    break
+
+        text_cols = _text_aliases(stmt)
+        stmt = _apply_cross_apply(stmt)
+        stmt = _apply_offset_fetch(stmt)
+        stmt = _apply_top(stmt)
+        stmt = _rewrite_expr(stmt, text_cols)
+        rendered, param_map = _render(stmt)
+        out.append(Translation(rendered, param_map, text_cols))
+    return out
+
+
+# ---------- SQL functions ----------
+_DT_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def _to_dt(value) -> Optional[datetime]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    if isinstance(value, bytes):
+        value = value.decode()
+    text = str(value).strip()
+    if len(text) == 10:
+        return datetime.strptime(text, "%Y-%m-%d")
+    if len(text) == 8 and text[2] == ":":
+        return datetime.combine(date(1900, 1, 1), dt_time.fromisoformat(text))
+    return datetime.fromisoformat(text[:19].replace("T", " "))
+
+
+def _fmt_dt(dt: Optional[datetime]) -> Optional[str]:
+    return dt.strftime(_DT_FORMAT) if dt is not None else None
+
+
+def _is_date_text(value) -> bool:
+    return isinstance(value, str) and len(value) == 10 and value[4] == "-" and value[7] == "-"
+
+
+def _tsql_date(value):
+    dt = _to_dt(value)
+    return dt.strftime("%Y-%m-%d") if dt is not None else None
+
+
+def _tsql_datetime(value):
+    return _fmt_dt(_to_dt(value))
+
+
+def _tsql_time(value):
+    dt = _to_dt(value)
+    return dt.strftime("%H:%M:%S") if dt is not None else None
+
+
+def _tsql_text(value):
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def _tsql_try_number(value, kind):
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        return int(str(value).strip()) if kind == "int" else float(str(value).strip())
+    except ValueError:
+        return None
+
+
+def _tsql_dateadd(part, n, value):
+    dt = _to_dt(value)
+    if dt is None or n is None:
+        return None
+    n = int(n)
+    if part in ("year", "quarter", "month"):
+        months = n * {"year": 12, "quarter": 3, "month": 1}[part]
+        y, m = divmod(dt.month - 1 + months, 12)
+        year, month = dt.year + y, m + 1
+        day = dt.day
+        while True:
+            try:
+                dt = dt.replace(year=year, month=month, day=day)
+                break
+            except ValueError:
+                day -= 1
+    else:
+        dt = dt + timedelta(**{
+            "dayofyear": {"days": n}, "day": {"days": n}, "weekday": {"days": n},
+            "week": {"weeks": n}, "hour": {"hours": n}, "minute": {"minutes": n},
+            "second": {"seconds": n},
+        }[part])
+    return dt.strftime("%Y-%m-%d") if _is_date_text(value) else _fmt_dt(dt)
+
+
+def _tsql_datediff(part, start, end):
+    a, b = _to_dt(start), _to_dt(end)
+    if a is None or b is None:
+        return None
+    if part == "year":
+        return b.year - a.year
+    if part == "quarter":
+        return (b.year - a.year) * 4 + (b.month - 1) // 3 - (a.month - 1) // 3
+    if part == "month":
+        return (b.year - a.year) * 12 + b.month - a.month
+    if part in ("day", "dayofyear", "weekday"):
+        return (b.date() - a.date()).days
+    if part == "week":  # Sunday-based week boundaries (DATEFIRST 7)
+        return ((b.date() - a.date()).days + (a.isoweekday() % 7) - (b.isoweekday() % 7)) // 7
+    seconds = {"hour": 3600, "minute": 60, "second": 1}[part]
+    floor = {"hour": lambda d: d.replace(minute=0, second=0, microsecond=0),
+             "minute": lambda d: d.replace(second=0, microsecond=0),
+             "second": lambda d: d.replace(microsecond=0)}[part]
+    return int((floor(b) - floor(a)).total_seconds() // seconds)
+
+
+def _tsql_datepart(part, value):
+    dt = _to_dt(value)
+    if dt is None:
+        return None
+    if part == "weekday":  # DATEFIRST 7: Sunday = 1 .. Saturday = 7
+        return dt.isoweekday() % 7 + 1
+    if part == "quarter":
+        return (dt.month - 1) // 3 + 1
+    if part == "dayofyear":
+        return dt.timetuple().tm_yday
+    if part == "week":
+        jan1 = date(dt.year, 1, 1)
+        return ((dt.date() - jan1).days + jan1.isoweekday() % 7) // 7 + 1
+    return getattr(dt, part)
+
+
+def _tsql_datename(part, value):
+    dt = _to_dt(value)
+    if dt is None:
+        return None
+    if part == "weekday":
+        return dt.strftime("%A")
+    if part == "month":
+        return dt.strftime("%B")
+    return str(_tsql_datepart(part, value))
+
+
+def _tsql_now():
+    return datetime.now().strftime(_DT_FORMAT)
+
+
+def _tsql_binary_checksum(*values):
+    return zlib.crc32(repr(values).encode("utf-8")) - (1 << 31)
+
+
+class _ChecksumAgg:
+    """XOR of the values, as CHECKSUM_AGG is (order-independent)."""
+
+    def __init__(self):
+        self.value = None
+
+    def step(self, value):
+        if value is not None:
+            self.value = (self.value or 0) ^ int(value)
+
+    def finalize(self):
+        return self.value
+
+
+def register_functions(cn: sqlite3.Connection) -> None:
+    cn.create_function("tsql_date", 1, _tsql_date, deterministic=True)
+    cn.create_function("tsql_datetime", 1, _tsql_datetime, deterministic=True)
+    cn.create_function("tsql_time", 1, _tsql_time, deterministic=True)
+    cn.create_function("tsql_text", 1, _tsql_text, deterministic=True)
+    cn.create_function("tsql_try_number", 2, _tsql_try_number, deterministic=True)
+    cn.create_function("tsql_dateadd", 3, _tsql_dateadd, deterministic=True)
+    cn.create_function("tsql_datediff", 3, _tsql_datediff, deterministic=True)
+    cn.create_function("tsql_datepart", 2, _tsql_datepart, deterministic=True)
+    cn.create_function("tsql_datename", 2, _tsql_datename, deterministic=True)
+    cn.create_function("tsql_now", 0, _tsql_now)
+    cn.create_function("tsql_binary_checksum", -1, _tsql_binary_checksum, deterministic=True)
+    cn.create_aggregate("tsql_checksum_agg", 1, _ChecksumAgg)
+
+
+# ---------- pyodbc surface ----------
+def _adapt(value):
+    if isinstance(value, datetime):
+        return value.strftime(_DT_FORMAT)
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, bool):
+        return int(value)
+    return value
+
+
+_DATETIME_RE = re.compile(r"^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}$")
+_DATE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def _convert(value):
+    if isinstance(value, str):
+        if _DATETIME_RE.match(value):
+            return datetime.strptime(value, _DT_FORMAT)
+        if _DATE_RE.match(value):
+            return date.fromisoformat(value)
+    return value
+
+
+class Row(tuple):
+    """Tuple with attribute access by column name, like pyodbc.Row."""
+
+    _columns: Dict[str, int] = {}
+
+    def __getattr__(self, name: str):
+        try:
+            return self[self._columns[name]]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    @property
+    def cursor_description(self):
+        return self._description
+
+
+def _row_class(description) -> type:
+    columns = {}
+    for i, d in enumerate(description):
+        columns.setdefault(d[0], i)
+    return type("Row", (Row,), {"_columns": columns, "_description": description})
+
+
+class Cursor:
+    def __init__(self, connection: "Connection"):
+        self.connection = connection
+        self._cur: Optional[sqlite3.Cursor] = None
+        self._row_cls: Optional[type] = None
+        self._keep_text: List[bool] = []
+        self.description = None
+        self.rowcount = -1
+
+    def execute(self, sql: str, *params):
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = tuple(params[0])
+        values = [_adapt(p) for p in params]
+        self.description = None
+        self._cur = None
+        self.rowcount = -1
+        raw = self.connection._raw
+        for stmt in translate(sql):
+            cur = raw.execute(stmt.sql, stmt.bind(values))
+            if cur.description is not None and self._cur is None:
+                self._cur = cur
+                self.description = tuple(
+                    (d[0], None, None, None, None, None, True) for d in cur.description
+                )
+                self._row_cls = _row_class(self.description)
+                self._keep_text = [d[0].upper() in stmt.text_columns for d in cur.description]
+            else:
+                self.rowcount = cur.rowcount
+        return self
+
+    def executemany(self, sql: str, seq_of_params):
+        for params in seq_of_params:
+            self.execute(sql, params)
+        return self
+
+    def _wrap_row(self, row):
+        if row is None:
+            return None
+        return self._row_cls(
+            v if keep else _convert(v) for v, keep in zip(row, self._keep_text)
+        )
+
+    def fetchone(self):
+        if self._cur is None:
+            return None
+        return self._wrap_row(self._cur.fetchone())
+
+    def fetchmany(self, size: int = 1):
+        if self._cur is None:
+            return []
+        return [self._wrap_row(r) for r in self._cur.fetchmany(size)]
+
+    def fetchall(self):
+        if self._cur is None:
+            return []
+        return [self._wrap_row(r) for r in self._cur.fetchall()]
+
+    def nextset(self) -> bool:
+        return False
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def close(self) -> None:
+        self._cur = None
+
+
+class Connection:
+    """The pieces of pyodbc.Connection the helpers and the pool use."""
+
+    def __init__(self, raw: sqlite3.Connection):
+        self._raw = raw
+        self.autocommit = False
+
+    def cursor(self) -> Cursor:
+        return Cursor(self)
+
+    def execute(self, sql: str, *params) -> Cursor:
+        return self.cursor().execute(sql, *params)
+
+    def commit(self) -> None:
+        self._raw.commit()
+
+    def rollback(self) -> None:
+        self._raw.rollback()
+
+    def close(self) -> None:
+        self._raw.close()
+
+
+def connect(path: str, readonly: bool = True, timeout: float = 10.0) -> Connection:
+    """
+    Open <path> (a replica written by pos_sync.py) as a T-SQL speaking,
+    pyodbc-like connection. Read-only by default; temp tables still work.
+    """
+    if readonly:
+        raw = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=timeout, check_same_thread=False)
+    else:
+        raw = sqlite3.connect(path, timeout=timeout, check_same_thread=False)
+    register_functions(raw)
+    return Connection(raw)